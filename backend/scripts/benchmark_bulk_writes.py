@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de escrituras de mensajes y memorias: fila por fila vs. por lotes.
+
+Compara filas/segundo de:
+- MessageRepository.add_message (INSERT + COMMIT + SELECT por fila) contra
+  add_messages_bulk (INSERT ... RETURNING en lotes, un commit por lote).
+- MemoryRepository.add_memory contra add_memories_bulk, con y sin embedding
+  (vector(768), como escriben la ingesta y los resúmenes episódicos).
+
+Requiere PostgreSQL con pgvector (el contenedor del docker-compose). Los datos
+se escriben en casos con teléfono 'bench-bulk-%' y se borran al terminar.
+
+Uso:
+    python backend/scripts/benchmark_bulk_writes.py --rows 5000 --batch 500
+    python backend/scripts/benchmark_bulk_writes.py --rows 2000 --output bulk.json
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from infrastructure.persistence.db import engine, SessionLocal, init_db
+from infrastructure.persistence.models import Case, Memory
+from infrastructure.persistence.repositories import MemoryRepository, MessageRepository
+from sqlalchemy import text
+
+
+def _rate(rows: int, seconds: float) -> dict:
+    return {"rows": rows, "seconds": round(seconds, 3), "rows_per_sec": round(rows / seconds, 1) if seconds else None}
+
+
+def _embedding() -> list:
+    return [random.random() for _ in range(768)]
+
+
+def bench_messages(db, case_id: int, rows: int, batch: int) -> dict:
+    repo = MessageRepository(db)
+    start = time.perf_counter()
+    for i in range(rows):
+        repo.add_message(case_id, "user", f"mensaje {i}")
+    single = _rate(rows, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for offset in range(0, rows, batch):
+        repo.add_messages_bulk([
+            {"case_id": case_id, "role": "user", "content": f"mensaje {i}"}
+            for i in range(offset, min(rows, offset + batch))
+        ])
+    bulk = _rate(rows, time.perf_counter() - start)
+    return {"single": single, "bulk": bulk}
+
+
+def bench_memories(db, case_id: int, rows: int, batch: int, with_embedding: bool) -> dict:
+    repo = MemoryRepository(db)
+    vectors = [_embedding() for _ in range(rows)] if with_embedding else None
+
+    start = time.perf_counter()
+    for i in range(rows):
+        if with_embedding:
+            # Como store_episodic_memory: una fila con su vector, commit y refresh
+            memory = Memory(case_id=case_id, kind="episodic", content=f"memoria {i}", embedding=vectors[i])
+            db.add(memory)
+            db.commit()
+            db.refresh(memory)
+        else:
+            repo.add_memory(case_id, "episodic", f"memoria {i}")
+    single = _rate(rows, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for offset in range(0, rows, batch):
+        repo.add_memories_bulk([
+            {"case_id": case_id, "kind": "episodic", "content": f"memoria {i}",
+             **({"embedding": vectors[i]} if with_embedding else {})}
+            for i in range(offset, min(rows, offset + batch))
+        ])
+    bulk = _rate(rows, time.perf_counter() - start)
+    return {"single": single, "bulk": bulk}
+
+
+def cleanup() -> None:
+    with engine.begin() as conn:
+        for table in ("messages", "memories"):
+            conn.execute(text(
+                f"DELETE FROM {table} WHERE case_id IN (SELECT id FROM cases WHERE phone LIKE 'bench-bulk-%')"
+            ))
+        conn.execute(text("DELETE FROM cases WHERE phone LIKE 'bench-bulk-%'"))
+
+
+def _print(label: str, result: dict) -> None:
+    single, bulk = result["single"], result["bulk"]
+    speedup = bulk["rows_per_sec"] / single["rows_per_sec"] if single["rows_per_sec"] else 0
+    print(f"   {label:24} fila a fila {single['rows_per_sec']:10.1f} filas/s | "
+          f"por lotes {bulk['rows_per_sec']:10.1f} filas/s | x{speedup:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de escrituras por lotes")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--output", type=str, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("❌ El benchmark requiere PostgreSQL")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    report = {"rows": args.rows, "batch": args.batch}
+    try:
+        case = Case(phone=f"bench-bulk-{int(time.time())}")
+        db.add(case)
+        db.commit()
+
+        print(f"⏱️  {args.rows} filas por escenario, lotes de {args.batch}\n")
+        report["messages"] = bench_messages(db, case.id, args.rows, args.batch)
+        _print("mensajes", report["messages"])
+        report["memories"] = bench_memories(db, case.id, args.rows, args.batch, with_embedding=False)
+        _print("memorias", report["memories"])
+        report["memories_embedding"] = bench_memories(db, case.id, args.rows, args.batch, with_embedding=True)
+        _print("memorias + embedding", report["memories_embedding"])
+    finally:
+        db.close()
+        cleanup()
+        print("\n🧹 Datos sintéticos eliminados")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
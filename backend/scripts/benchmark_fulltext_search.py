@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Benchmark de búsqueda de texto completo sobre un corpus sintético.
+
+Genera N mensajes (default 1.000.000) repartidos en casos sintéticos usando
+generate_series del lado del servidor (sin round-trips por fila), aplica la
+migración de texto completo y mide la latencia del endpoint de búsqueda
+(CaseSearchService) para un set de consultas típicas de operadores.
+
+Requiere PostgreSQL. Usar una base descartable: los datos sintéticos se
+identifican con teléfono 'bench-%' y se borran con --cleanup.
+
+Uso:
+    python backend/scripts/benchmark_fulltext_search.py --messages 1000000 --cases 20000
+    python backend/scripts/benchmark_fulltext_search.py --cleanup
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from infrastructure.persistence.db import engine, SessionLocal, init_db
+from infrastructure.persistence.fulltext import FULLTEXT_DDL
+from application.services.case_search_service import CaseSearchService
+from sqlalchemy import text
+
+APELLIDOS = ["Pérez", "González", "Rodríguez", "Fernández", "López", "Martínez", "Gómez", "Díaz", "Sánchez", "Romero"]
+NOMBRES = ["Juan", "María", "José", "Ana", "Carlos", "Lucía", "Jorge", "Sofía", "Miguel", "Valentina"]
+PALABRAS = [
+    "divorcio", "acta", "matrimonio", "documentación", "cónyuge", "hijos", "alimentos", "bienes",
+    "audiencia", "juzgado", "San Rafael", "Mendoza", "domicilio", "calle", "Belgrano", "Mitre",
+    "recibo", "sueldo", "ANSES", "certificado", "negativa", "abogado", "convenio", "cuota",
+    "vivienda", "alquiler", "operador", "turno", "mañana", "gracias", "consulta", "trámite",
+]
+
+QUERIES = [
+    "divorcio", "acta de matrimonio", "Belgrano", "certificado ANSES", "González",
+    "\"cuota alimentaria\"", "alquiler -propia", "Sofia Romero", "juzgado Mendoza", "recibo sueldo",
+]
+
+
+def generate_corpus(n_cases: int, n_messages: int) -> None:
+    print(f"📝 Generando {n_cases} casos y {n_messages} mensajes sintéticos...")
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(
+            text("""
+                INSERT INTO cases (phone, status, phase, apellido, nombres, nombre, dni,
+                                   domicilio, nombre_conyuge, created_at, updated_at)
+                SELECT 'bench-' || g,
+                       (ARRAY['new','datos_personales_completos','info_completa'])[1 + g % 3],
+                       'documentacion',
+                       (:apellidos)[1 + g % 10],
+                       (:nombres)[1 + (g / 10) % 10],
+                       (:nombres)[1 + (g / 10) % 10] || ' ' || (:apellidos)[1 + g % 10],
+                       (20000000 + g)::text,
+                       (:palabras)[1 + g % 32] || ' ' || (g % 2000) || ', San Rafael, Mendoza',
+                       (:nombres)[1 + g % 10] || ' ' || (:apellidos)[1 + (g / 7) % 10],
+                       now() - (g || ' minutes')::interval,
+                       now()
+                FROM generate_series(1, :n) AS g
+            """),
+            {"n": n_cases, "apellidos": APELLIDOS, "nombres": NOMBRES, "palabras": PALABRAS},
+        )
+        conn.execute(
+            text("""
+                INSERT INTO messages (case_id, role, content, created_at)
+                SELECT c.id,
+                       (ARRAY['user','assistant'])[1 + g % 2],
+                       (:palabras)[1 + (g * 7) % 32] || ' ' || (:palabras)[1 + (g * 13) % 32] || ' ' ||
+                       (:palabras)[1 + (g * 17) % 32] || ' ' || (:palabras)[1 + (g * 31) % 32],
+                       now() - (g || ' seconds')::interval
+                FROM generate_series(1, :n) AS g
+                JOIN LATERAL (
+                    SELECT id FROM cases WHERE phone = 'bench-' || (1 + g % :n_cases)
+                ) c ON true
+            """),
+            {"n": n_messages, "n_cases": n_cases, "palabras": PALABRAS},
+        )
+        conn.execute(text("ANALYZE cases"))
+        conn.execute(text("ANALYZE messages"))
+    print(f"   ✅ corpus generado en {time.perf_counter() - start:.1f}s")
+
+
+def run_queries(repeats: int) -> dict:
+    db = SessionLocal()
+    service = CaseSearchService(db)
+    report = {}
+    try:
+        for q in QUERIES:
+            service.search(q, limit=20)  # calentar caché de páginas
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                results = service.search(q, limit=20)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            report[q] = {
+                "results": len(results),
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 2),
+                "max_ms": round(timings[-1], 2),
+            }
+            print(f"   {q!r:28} -> {len(results):3} casos | p50 {report[q]['p50_ms']:8.2f} ms | p95 {report[q]['p95_ms']:8.2f} ms")
+    finally:
+        db.close()
+    return report
+
+
+def cleanup() -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM messages WHERE case_id IN (SELECT id FROM cases WHERE phone LIKE 'bench-%')"))
+        conn.execute(text("DELETE FROM cases WHERE phone LIKE 'bench-%'"))
+    print("🧹 Datos sintéticos eliminados")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda de texto completo")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--cases", type=int, default=20_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--skip-generate", action="store_true", help="Reusar corpus existente")
+    parser.add_argument("--cleanup", action="store_true", help="Borrar corpus sintético y salir")
+    parser.add_argument("--output", type=str, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("❌ El benchmark requiere PostgreSQL")
+        sys.exit(1)
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    init_db()
+    with engine.connect() as conn:
+        for sql in FULLTEXT_DDL:
+            conn.execute(text(sql))
+        conn.commit()
+
+    if not args.skip_generate:
+        generate_corpus(args.cases, args.messages)
+
+    print(f"\n⏱️  Ejecutando {len(QUERIES)} consultas x {args.repeats} repeticiones...")
+    report = run_queries(args.repeats)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "messages": args.messages,
+            "cases": args.cases,
+            "queries": report,
+        }, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark del chequeo de alucinaciones basado en reglas por tamaño de contexto.
+
+Arma contextos de distintos largos repitiendo los Base_Conocimiento_*.md de
+la raíz (o un texto sintético si no están) y corre
+HallucinationDetectionService.check_response con respuestas que mencionan
+datos, URLs y nombres propios, algunos presentes en el contexto y otros no.
+Reporta la latencia por respuesta (p50/p95/max) para cada tamaño.
+
+Uso:
+    python backend/scripts/benchmark_hallucination_check.py
+    python backend/scripts/benchmark_hallucination_check.py --context-chars 2000,50000,500000 \\
+        --iterations 500 --output hallucination.json
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+RESPONSES = [
+    "Según lo que me contaste, el trámite de divorcio puede variar según el juzgado. Te recomiendo consultar.",
+    "Tu expediente número 4521 está en el Juzgado 3 y la audiencia es el 12/03/2025, con Marta Sosa.",
+    "Según mis registros tu DNI es 30123456. Podés ver https://tramites.example/divorcio o hablar con Juan Pereyra.",
+    "En San Rafael la Defensoría atiende de lunes a viernes. Quizás convenga llevar el acta de matrimonio "
+    "y la partida de nacimiento de los hijos; el plazo depende del Juzgado 2 y de la Cámara Civil.",
+]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 3)
+
+
+def base_text() -> str:
+    paths = sorted(PROJECT_ROOT.glob("Base_Conocimiento_*.md"))
+    text = "\n\n".join(path.read_text(encoding="utf-8") for path in paths)
+    if not text:
+        text = "El divorcio se tramita ante el juzgado de familia de San Rafael con el expediente correspondiente. "
+    # Datos que algunas respuestas reutilizan (y no deben marcarse)
+    return "Caso: expediente número 4521, juzgado 3, audiencia 12/03/2025 con Marta Sosa.\n\n" + text
+
+
+async def run(args) -> Dict:
+    import logging
+    import structlog
+    from application.services.hallucination_detection_service import HallucinationDetectionService
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    service = HallucinationDetectionService()
+    text = base_text()
+    report: Dict = {"iterations": args.iterations, "sizes": []}
+    for size in args.context_chars:
+        context = (text * (size // len(text) + 1))[:size]
+        latencies: List[float] = []
+        flagged = 0
+        for i in range(args.iterations):
+            response = RESPONSES[i % len(RESPONSES)]
+            start = time.perf_counter()
+            result = await service.check_response(response, context, "¿Cuánto tarda el divorcio?")
+            latencies.append((time.perf_counter() - start) * 1000)
+            flagged += not result.is_valid
+        report["sizes"].append({
+            "context_chars": size,
+            "invalid_responses": flagged,
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "max": round(max(latencies), 3),
+            },
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del chequeo de alucinaciones por tamaño de contexto")
+    parser.add_argument("--context-chars", type=lambda v: [int(x) for x in v.split(",")],
+                        default=[2_000, 20_000, 200_000, 1_000_000], help="Tamaños de contexto separados por coma")
+    parser.add_argument("--iterations", type=int, default=200, help="Respuestas verificadas por tamaño")
+    parser.add_argument("--output", type=str, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    print(f"▶️  {args.iterations} respuestas por tamaño de contexto: {args.context_chars}")
+    report = asyncio.run(run(args))
+    for row in report["sizes"]:
+        latency = row["latency_ms"]
+        print(f"   contexto {row['context_chars']:>9} chars | p50 {latency['p50']} ms | p95 {latency['p95']} ms "
+              f"| max {latency['max']} ms | inválidas {row['invalid_responses']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
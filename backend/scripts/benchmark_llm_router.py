@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline del fallback del LLMRouter contra el mock de Ollama.
+
+Lanza N pedidos de chat concurrentes a LLMRouter con Ollama Cloud y Ollama
+local apuntando a scripts/mock_services.py y reporta latencia de punta a
+punta, tasa de éxito y cómo se repartió la carga entre proveedores (según
+los contadores del mock). Las fallas se inyectan con el JSON del mock: tasa
+de errores, cuelgues y ventanas de caída por ruta y modelo. Gemini queda
+deshabilitado (sin API key) para que la corrida no salga a la red.
+
+Uso:
+    python backend/scripts/benchmark_llm_router.py --requests 200 --concurrency 20
+    python backend/scripts/benchmark_llm_router.py --requests 500 --concurrency 50 \\
+        --mock-config backend/scripts/mock_services.example.json --output router.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_services import MockConfig, MockServer
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 1)
+
+
+async def run(args) -> Dict:
+    import logging
+    import structlog
+    from infrastructure.ai.router import LLMRouter
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    router = LLMRouter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    failures: Dict[str, int] = {}
+
+    async def one(i: int) -> None:
+        messages = [{"role": "user", "content": f"Consulta {i}: ¿cuánto tarda el trámite de divorcio?"}]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await router.chat(messages, task_type=args.task_type)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": args.requests,
+        "ok": len(latencies),
+        "failed": failures,
+        "wall_seconds": round(wall, 3),
+        "requests_per_sec": round(args.requests / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": round(max(latencies), 1) if latencies else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del fallback del router de LLMs contra el mock")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--task-type", default="chat")
+    parser.add_argument("--mock-config", type=str, help="JSON del mock (ver mock_services.example.json)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=str, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    if args.mock_config:
+        config = MockConfig.from_file(args.mock_config, seed=args.seed)
+    else:
+        # Sin archivo: Cloud rápido pero con 20% de errores, local lento y estable
+        config = MockConfig.from_dict({
+            "seed": args.seed,
+            "routes": {
+                "cloud": {"latency": {"distribution": "lognormal", "mean_ms": 300, "spread_ms": 150}, "error_rate": 0.2},
+                "local": {"latency": {"distribution": "normal", "mean_ms": 900, "spread_ms": 200}},
+            },
+        })
+
+    with MockServer(config) as mock:
+        # Antes de importar el backend: Settings lee el entorno al importarse
+        os.environ.update({
+            "OLLAMA_BASE_URL": mock.url,
+            "OLLAMA_CLOUD_BASE_URL": mock.url,
+            "OLLAMA_CLOUD_API_KEY": "mock",
+            "GEMINI_API_KEY": "",
+        })
+        print(f"▶️  {args.requests} pedidos '{args.task_type}', concurrencia {args.concurrency}, mock en {mock.url}")
+        report = asyncio.run(run(args))
+        report["providers"] = mock.stats["routes"]
+
+    latency = report["latency_ms"]
+    print(f"\n📊 {report['ok']}/{report['requests']} exitosos en {report['wall_seconds']}s "
+          f"({report['requests_per_sec']} pedidos/s) | fallidos: {report['failed'] or 0}")
+    print(f"   latencia p50 {latency['p50']} ms | p95 {latency['p95']} ms | p99 {latency['p99']} ms | max {latency['max']} ms")
+    for route, s in sorted(report["providers"].items()):
+        print(f"   {route:18} pedidos {s['requests']:6} | errores {s['errors']:5} | timeouts {s['timeouts']:4} "
+              f"| caídas {s['outages']:5} | p50 {s['latency_p50_ms']} ms")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Calcula los agregados del embudo de fases (phase_monthly_stats).
+
+El job periódico de Celery recalcula el mes actual y el anterior; este script
+sirve para recalcular un rango mayor (p. ej. tras un cambio de criterio de
+abandono) y para asegurar las particiones mensuales de phase_events.
+
+Uso:
+    python backend/scripts/compute_phase_analytics.py [--months 12]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from infrastructure.persistence.db import engine, init_db
+from infrastructure.persistence.phase_events import (
+    compute_phase_month_stats,
+    ensure_phase_event_partitions,
+    recent_months,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcular embudo de fases")
+    parser.add_argument("--months", type=int, default=2, help="Meses hacia atrás, incluyendo el actual")
+    args = parser.parse_args()
+
+    init_db()
+    with engine.begin() as conn:
+        partitions = ensure_phase_event_partitions(conn)
+    if partitions:
+        print(f"🗂️  Particiones aseguradas: {', '.join(partitions)}")
+
+    print(f"\n🔄 Recalculando embudo de fases ({args.months} meses)...\n")
+    for month in recent_months(args.months):
+        with engine.begin() as conn:
+            rows = compute_phase_month_stats(conn, month)
+        print(f"   {month.strftime('%Y-%m')}: {rows} fases")
+    print("\n✅ Embudo actualizado")
+
+
+if __name__ == "__main__":
+    main()
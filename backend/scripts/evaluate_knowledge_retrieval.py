@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Evaluación offline de la búsqueda en la base de conocimiento legal.
+
+Arma el set de evaluación a partir de los Base_Conocimiento_*.md de la raíz
+del repo: por cada encabezado (secciones y "**Art. N - ...**") se generan
+una consulta por referencia exacta ("art. 438") cuando el encabezado cita
+artículos, y una consulta temática con el texto del encabezado. Un fragmento
+es relevante si su texto o su ruta de secciones contiene alguno de los
+encabezados de su consulta.
+
+Mide recall@k, MRR y latencia (p50/p95) de KnowledgeRetriever en modo
+léxico, vectorial e híbrido, y guarda el resultado en JSON para comparar
+entre commits.
+
+Por defecto carga los documentos en una base SQLite descartable con la
+división por secciones de IngestLegalDocumentUseCase; con --database-url se evalúa la base
+ya cargada (load_legal_knowledge.py). Los embeddings salen del LLMRouter
+configurado; con --no-embeddings (o si el proveedor no responde) solo el
+modo léxico es significativo.
+
+Uso:
+    python backend/scripts/evaluate_knowledge_retrieval.py --k 1 3 5
+    python backend/scripts/evaluate_knowledge_retrieval.py --no-embeddings --output eval.json
+    python backend/scripts/evaluate_knowledge_retrieval.py --database-url postgresql://... --dump-eval set.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).parent.parent
+PROJECT_ROOT = BACKEND_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR / "src"))
+
+_HEADING_RE = re.compile(r"^(?:#{2,4}\s+(?P<section>.+?)|\*\*(?P<article>Arts?\.\s*\d[^*]*)\*\*)\s*$")
+_ARTICLE_RE = re.compile(r"Arts?\.\s*(\d+)", re.IGNORECASE)
+_MARKUP_RE = re.compile(r"[*_`#]")
+
+
+def _plain(text: str) -> str:
+    return " ".join(_MARKUP_RE.sub("", text).split()).lower()
+
+
+def build_eval_set(paths: List[Path]) -> List[Dict]:
+    """Consultas con los encabezados que puede contener el fragmento relevante."""
+    from application.services.knowledge_retriever import query_terms
+
+    relevant: Dict[str, List[str]] = {}
+    sources: Dict[str, str] = {}
+    for path in paths:
+        for line in path.read_text(encoding="utf-8").splitlines():
+            match = _HEADING_RE.match(line.strip())
+            if not match:
+                continue
+            heading = match.group("section") or match.group("article")
+            target = _plain(heading)
+            queries = [f"art. {number}" for number in _ARTICLE_RE.findall(heading)[:1]]
+            topic = _ARTICLE_RE.sub("", re.sub(r"\(.*?\)|^[A-Z0-9]+[.)]\s+", "", heading))
+            if len(query_terms(topic)) >= 2:
+                queries.append(_plain(topic).strip(" -:"))
+            for query in queries:
+                targets = relevant.setdefault(query, [])
+                if target not in targets:
+                    targets.append(target)
+                sources.setdefault(query, path.name)
+    return [{"query": q, "relevant": targets, "source": sources[q]} for q, targets in relevant.items()]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank], 2)
+
+
+async def ingest(db, paths: List[Path], embeddings: bool) -> int:
+    from application.use_cases.ingest_legal_document import IngestLegalDocumentUseCase
+    from infrastructure.persistence.models import SemanticKnowledge
+
+    use_case = IngestLegalDocumentUseCase(db)
+    total = 0
+    for path in paths:
+        chunks = use_case.chunk(path.read_text(encoding="utf-8"), "markdown")
+        vectors: List[Optional[List[float]]] = [None] * len(chunks)
+        if embeddings:
+            try:
+                vectors = list(await use_case.llm.embed([c.content for c in chunks])) or vectors
+            except Exception as e:
+                print(f"   ⚠️  Sin embeddings para {path.name}: {e}")
+        for chunk, vector in zip(chunks, vectors):
+            db.add(SemanticKnowledge(
+                title=use_case._chunk_title(path.stem, chunk), content=chunk.content, embedding=vector or None,
+                source=path.name, section=chunk.section or None, content_hash=chunk.content_hash(),
+            ))
+        total += len(chunks)
+    db.commit()
+    return total
+
+
+async def evaluate(db, items: List[Dict], modes: List[str], ks: List[int], embeddings: bool) -> Dict:
+    from application.services.knowledge_retriever import KnowledgeRetriever
+    from infrastructure.ai.router import LLMRouter
+
+    retriever = KnowledgeRetriever(db)
+    router = LLMRouter() if embeddings else None
+    query_vectors: Dict[str, List[float]] = {}
+    embed_ms: List[float] = []
+    for item in items:
+        if router is None:
+            break
+        start = time.perf_counter()
+        try:
+            vector = (await router.embed([item["query"]]) or [[]])[0]
+        except Exception:
+            vector = []
+        embed_ms.append((time.perf_counter() - start) * 1000)
+        query_vectors[item["query"]] = vector
+
+    report = {"queries": len(items), "embed_ms_p50": percentile(embed_ms, 50), "modes": {}}
+    for mode in modes:
+        hits_at = {k: 0 for k in ks}
+        reciprocal_ranks, latencies = [], []
+        for item in items:
+            start = time.perf_counter()
+            hits = await retriever.search(item["query"], query_vectors.get(item["query"]), limit=max(ks), mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            rank = next((
+                i for i, hit in enumerate(hits, start=1)
+                if any(target in _plain(f"{hit.get('section') or ''}\n{hit['content']}") for target in item["relevant"])
+            ), None)
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+            for k in ks:
+                hits_at[k] += bool(rank and rank <= k)
+        report["modes"][mode] = {
+            **{f"recall@{k}": round(hits_at[k] / len(items), 3) for k in ks},
+            "mrr": round(sum(reciprocal_ranks) / len(items), 3),
+            "latency_ms_p50": percentile(latencies, 50),
+            "latency_ms_p95": percentile(latencies, 95),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluación offline de la búsqueda en la base de conocimiento")
+    parser.add_argument("--database-url", type=str, help="Base ya cargada; default: SQLite descartable")
+    parser.add_argument("--no-embeddings", action="store_true", help="No llamar al proveedor de embeddings")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--modes", nargs="+", default=["lexical", "vector", "hybrid"])
+    parser.add_argument("--dump-eval", type=str, help="Guardar el set de evaluación generado en JSON")
+    parser.add_argument("--output", type=str, help="Guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        db_file = Path(tempfile.mkdtemp(prefix="knowledge_eval_")) / "eval.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    else:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from infrastructure.persistence.db import SessionLocal, init_db
+
+    paths = sorted(PROJECT_ROOT.glob("Base_Conocimiento_*.md"))
+    if not paths:
+        print(f"❌ No se encontraron Base_Conocimiento_*.md en {PROJECT_ROOT}")
+        sys.exit(1)
+    items = build_eval_set(paths)
+    print(f"📋 Set de evaluación: {len(items)} consultas de {len(paths)} documentos")
+    if args.dump_eval:
+        Path(args.dump_eval).write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    db = SessionLocal()
+    try:
+        if not args.database_url:
+            init_db()
+            chunks = asyncio.run(ingest(db, paths, embeddings=not args.no_embeddings))
+            print(f"📚 {chunks} fragmentos cargados en {os.environ['DATABASE_URL']}")
+        report = asyncio.run(evaluate(db, items, args.modes, args.k, embeddings=not args.no_embeddings))
+    finally:
+        db.close()
+
+    print(f"\n{'modo':<10}" + "".join(f"{f'recall@{k}':>11}" for k in args.k) + f"{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for mode, row in report["modes"].items():
+        print(
+            f"{mode:<10}" + "".join(f"{row[f'recall@{k}']:>11.3f}" for k in args.k)
+            + f"{row['mrr']:>8.3f}{row['latency_ms_p50'] or 0:>9.2f}{row['latency_ms_p95'] or 0:>9.2f}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n💾 Resultado guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 """
 Script para cargar la base de conocimiento legal sobre divorcio en Mendoza.
 
-Carga los documentos desde los archivos Markdown y JSON preparados.
+Carga los documentos desde los archivos Markdown y JSON preparados. Es
+incremental: cada documento se identifica por su archivo (`source`) y en cada
+corrida solo se generan embeddings de los fragmentos nuevos o modificados; los
+que ya no están en el documento se borran.
 Uso: python load_legal_knowledge.py
 """
 import sys
 from pathlib import Path
-import json
 import asyncio
+import textwrap
 
 # Añadir el directorio src al path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
@@ -16,6 +19,16 @@ from infrastructure.persistence.db import SessionLocal
 from application.use_cases.ingest_legal_document import IngestLegalDocumentUseCase
 
 
+def _report(result) -> None:
+    if result.success:
+        print(
+            f"   ✅ {result.chunks_created} chunks nuevos, {result.chunks_unchanged} sin cambios, "
+            f"{result.chunks_deleted} eliminados"
+        )
+    else:
+        print("   ❌ Error al procesar el documento")
+
+
 async def load_knowledge():
     """Carga la base de conocimiento legal"""
     
@@ -40,13 +53,12 @@ async def load_knowledge():
             result = await use_case.execute(
                 title="Base de Conocimiento: Divorcio en Argentina y Mendoza",
                 content=content,
-                category="legislacion"
+                category="legislacion",
+                source=md_file.name,
+                content_format="markdown",
             )
             
-            if result.success:
-                print(f"   ✅ {result.chunks_created} chunks creados")
-            else:
-                print(f"   ❌ Error al procesar el documento")
+            _report(result)
         else:
             print(f"   ⚠️  Archivo no encontrado: {md_file}")
         
@@ -54,21 +66,18 @@ async def load_knowledge():
         if json_file.exists():
             print(f"\n📄 Procesando: {json_file.name}")
             with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Convertir JSON a texto legible
-            json_content = json.dumps(data, indent=2, ensure_ascii=False)
+                json_content = f.read()
             
+            # Fragmentos por claves del JSON (no el volcado completo como texto)
             result = await use_case.execute(
                 title="Base de Conocimiento JSON: Procedimientos Ley 9120",
                 content=json_content,
-                category="legislacion"
+                category="legislacion",
+                source=json_file.name,
+                content_format="json",
             )
             
-            if result.success:
-                print(f"   ✅ {result.chunks_created} chunks creados")
-            else:
-                print(f"   ❌ Error al procesar el documento")
+            _report(result)
         else:
             print(f"   ⚠️  Archivo no encontrado: {json_file}")
         
@@ -77,21 +86,17 @@ async def load_knowledge():
         if hijos_json_file.exists():
             print(f"\n📄 Procesando: {hijos_json_file.name}")
             with open(hijos_json_file, 'r', encoding='utf-8') as f:
-                data_hijos = json.load(f)
-            
-            # Convertir JSON a texto legible
-            json_content_hijos = json.dumps(data_hijos, indent=2, ensure_ascii=False)
+                json_content_hijos = f.read()
             
             result = await use_case.execute(
                 title="Base de Conocimiento JSON: Responsabilidad Parental y Cuidado Personal",
                 content=json_content_hijos,
-                category="legislacion"
+                category="legislacion",
+                source=hijos_json_file.name,
+                content_format="json",
             )
             
-            if result.success:
-                print(f"   ✅ {result.chunks_created} chunks creados")
-            else:
-                print(f"   ❌ Error al procesar el documento")
+            _report(result)
         else:
             print(f"   ⚠️  Archivo no encontrado: {hijos_json_file}")
         
@@ -105,13 +110,12 @@ async def load_knowledge():
             result = await use_case.execute(
                 title="Base de Conocimiento: Regulación de Hijos tras Divorcio - Terminología CCyC 2015",
                 content=content_hijos_md,
-                category="legislacion"
+                category="legislacion",
+                source=hijos_md_file.name,
+                content_format="markdown",
             )
             
-            if result.success:
-                print(f"   ✅ {result.chunks_created} chunks creados")
-            else:
-                print(f"   ❌ Error al procesar el documento")
+            _report(result)
         else:
             print(f"   ⚠️  Archivo no encontrado: {hijos_md_file}")
         
@@ -185,14 +189,13 @@ async def load_knowledge():
         
         result = await use_case.execute(
             title="Procedimientos Específicos Divorcio Mendoza",
-            content=procedimientos_content,
-            category="legislacion"
+            content=textwrap.dedent(procedimientos_content),
+            category="legislacion",
+            source="procedimientos_especificos_ley_9120",
+            content_format="markdown",
         )
         
-        if result.success:
-            print(f"   ✅ {result.chunks_created} chunks creados")
-        else:
-            print(f"   ❌ Error al procesar el documento")
+        _report(result)
         
         # Resumen final
         total_docs = db.query(SemanticKnowledge).count()
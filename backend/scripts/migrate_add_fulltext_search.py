@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Migración: búsqueda de texto completo sobre casos, mensajes y base de
+conocimiento (solo PostgreSQL).
+
+Crea (idempotente):
+- Extensión unaccent y configuración de búsqueda es_unaccent (spanish + unaccent)
+- Columnas search_vector (tsvector) en cases, messages y semantic_knowledge
+- Triggers que mantienen search_vector al insertar/actualizar
+- Índices GIN sobre search_vector
+
+Luego completa search_vector en las filas existentes por lotes.
+
+Uso:
+    python backend/scripts/migrate_add_fulltext_search.py [--batch-size 5000] [--skip-backfill]
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from infrastructure.persistence.db import engine
+from infrastructure.persistence.fulltext import FULLTEXT_DDL, backfill_search_vectors
+from sqlalchemy import text
+import structlog
+
+logger = structlog.get_logger()
+
+
+def run(batch_size: int, skip_backfill: bool) -> bool:
+    if engine.dialect.name != "postgresql":
+        print("⚠️  La búsqueda de texto completo requiere PostgreSQL; nada que migrar.")
+        return True
+
+    print("\n🔄 Creando estructuras de búsqueda de texto completo...\n")
+    try:
+        with engine.connect() as conn:
+            for sql in FULLTEXT_DDL:
+                conn.execute(text(sql))
+            conn.commit()
+    except Exception as e:
+        logger.error("fulltext_migration_failed", error=str(e))
+        print(f"\n❌ Error en migración: {e}\n")
+        return False
+
+    if not skip_backfill:
+        print("📝 Completando search_vector en filas existentes...")
+        totals = backfill_search_vectors(engine, batch_size=batch_size)
+        print(
+            f"   ✅ casos: {totals['cases']} | mensajes: {totals['messages']}"
+            f" | conocimiento: {totals['semantic_knowledge']}"
+        )
+
+    print("\n✅ Migración completada\n")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agregar búsqueda de texto completo")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--skip-backfill", action="store_true")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.batch_size, args.skip_backfill) else 1)
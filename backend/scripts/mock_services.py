@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Servidor local que reemplaza a Ollama (Cloud y local) y a WAHA para pruebas
+de rendimiento sin red ni modelos.
+
+Implementa el subconjunto que usa el backend:
+- Ollama: POST /api/chat (con y sin streaming), POST /api/embeddings, POST /api/embed
+- WAHA:   POST /api/sendText, POST /api/sendFile, GET /api/files/{media_id}
+
+Las respuestas son determinísticas: el chat responde según el tipo de pedido
+(OCR de DNI/acta/ANSES con JSON válido, validación de alucinaciones, chat
+libre) y los embeddings salen de un hash del texto. Los archivos de WAHA son
+imágenes sintéticas generadas con Pillow: `dni-*` y `acta-*` se reconocen
+después en el OCR simulado, así un turno con foto recorre el mismo camino que
+en producción.
+
+Comportamiento configurable por ruta (ver scripts/mock_services.example.json):
+- latencia con distribución fija, uniforme, normal o lognormal;
+- tasa de errores HTTP, tasa de cuelgues (timeouts) y ventanas de caída total,
+  para medir el fallback del router y los reintentos de la cola de salida;
+- respuestas enlatadas por subcadena del prompt, ruta o modelo.
+
+Las rutas se nombran `<destino>.<operación>`: `cloud.chat`, `local.chat`,
+`cloud.embed`, `local.embeddings`, `waha.sendText`, `waha.sendFile`,
+`waha.files`. Los pedidos con header Authorization son de Ollama Cloud y los
+que no, de Ollama local (los dos clientes pueden apuntar al mismo mock). Un
+perfil se busca de lo más específico a lo más general: `cloud.chat@<modelo>`,
+`cloud.chat`, `cloud`, `ollama` y `*`. La configuración se puede reemplazar en
+caliente con POST /mock/config (p. ej. tirar Cloud a mitad de un benchmark) y
+GET /mock/stats reporta pedidos, errores inyectados y latencia por ruta.
+
+Uso:
+    python backend/scripts/mock_services.py --port 8099 --ollama-latency-ms 400 --waha-latency-ms 80
+    python backend/scripts/mock_services.py --port 8099 --config backend/scripts/mock_services.example.json
+    # y apuntar WAHA_BASE_URL, OLLAMA_BASE_URL y OLLAMA_CLOUD_BASE_URL a http://localhost:8099
+"""
+import io
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+EMBEDDING_DIM = 768
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+
+# --- Configuración ------------------------------------------------------------
+
+@dataclass
+class LatencySpec:
+    """Latencia simulada en milisegundos.
+
+    `spread_ms` es ±spread en la uniforme y el desvío estándar en la normal y
+    la lognormal (esta última tiene la cola larga de un modelo real).
+    """
+    distribution: str = "fixed"
+    mean_ms: float = 0.0
+    spread_ms: float = 0.0
+
+    def __post_init__(self):
+        if self.distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Distribución de latencia desconocida: {self.distribution}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.mean_ms <= 0 and self.spread_ms <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            value = rng.uniform(self.mean_ms - self.spread_ms, self.mean_ms + self.spread_ms)
+        elif self.distribution == "normal":
+            value = rng.gauss(self.mean_ms, self.spread_ms)
+        elif self.distribution == "lognormal" and self.mean_ms > 0:
+            sigma2 = math.log(1 + (self.spread_ms / self.mean_ms) ** 2)
+            value = rng.lognormvariate(math.log(self.mean_ms) - sigma2 / 2, math.sqrt(sigma2))
+        else:
+            value = self.mean_ms
+        return max(0.0, value)
+
+
+@dataclass
+class RouteProfile:
+    latency: LatencySpec = field(default_factory=LatencySpec)
+    # Fracción de pedidos que responden `error_status` (después de la latencia)
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Fracción de pedidos que se cuelgan `hang_ms` y responden 504; por defecto más
+    # que el timeout de los clientes (60-120 s), así el que corta es el cliente
+    timeout_rate: float = 0.0
+    hang_ms: float = 150_000.0
+    # Ventanas [desde, hasta) en segundos desde el arranque con 503 inmediato
+    outages: List[Tuple[float, float]] = field(default_factory=list)
+    # Streaming: pausa entre tokens (la latencia es el tiempo al primer token)
+    token_interval_ms: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RouteProfile":
+        data = dict(data)
+        latency = data.pop("latency", None) or {}
+        outages = [tuple(w) for w in data.pop("outages", [])]
+        return cls(latency=LatencySpec(**latency), outages=outages, **data)
+
+
+@dataclass
+class CannedResponse:
+    """Respuesta fija para los pedidos de chat que coinciden (la primera que aplica)."""
+    content: str
+    contains: str = ""
+    route: Optional[str] = None
+    model: Optional[str] = None
+
+    def matches(self, route: str, model: Optional[str], prompt: str) -> bool:
+        return (
+            (self.route is None or self.route in (route, route.split(".", 1)[0]))
+            and (self.model is None or self.model == model)
+            and self.contains.lower() in prompt.lower()
+        )
+
+
+@dataclass
+class MockConfig:
+    # Atajos para el caso común: latencia media + jitter uniforme por servicio.
+    # Se usan si `routes` no define "ollama" ni "waha".
+    ollama_latency_ms: float = 0.0
+    ollama_jitter_ms: float = 0.0
+    waha_latency_ms: float = 0.0
+    waha_jitter_ms: float = 0.0
+    seed: int = 42
+    routes: Dict[str, RouteProfile] = field(default_factory=dict)
+    responses: List[CannedResponse] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.routes.setdefault("ollama", RouteProfile(
+            latency=LatencySpec("uniform", self.ollama_latency_ms, self.ollama_jitter_ms)
+        ))
+        self.routes.setdefault("waha", RouteProfile(
+            latency=LatencySpec("uniform", self.waha_latency_ms, self.waha_jitter_ms)
+        ))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MockConfig":
+        data = dict(data)
+        routes = {name: RouteProfile.from_dict(p) for name, p in (data.pop("routes", None) or {}).items()}
+        responses = [CannedResponse(**r) for r in (data.pop("responses", None) or [])]
+        return cls(routes=routes, responses=responses, **data)
+
+    @classmethod
+    def from_file(cls, path: str, **overrides) -> "MockConfig":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        data.update({k: v for k, v in overrides.items() if v is not None})
+        return cls.from_dict(data)
+
+    def profile(self, route: str, model: Optional[str] = None) -> RouteProfile:
+        target = route.split(".", 1)[0]
+        candidates = [f"{route}@{model}"] if model else []
+        candidates += [route, target]
+        if target in ("cloud", "local"):
+            candidates.append("ollama")
+        candidates.append("*")
+        for name in candidates:
+            if name in self.routes:
+                return self.routes[name]
+        return RouteProfile()
+
+
+# --- Respuestas canónicas -----------------------------------------------------
+
+def _fake_person(key: str) -> Dict[str, str]:
+    n = int(hashlib.sha256(key.encode()).hexdigest()[:8], 16)
+    return {
+        "dni": str(20_000_000 + n % 25_000_000),
+        "nombre": ["JUAN PÉREZ", "MARÍA GÓMEZ", "CARLOS DÍAZ", "LUCÍA ROMERO"][n % 4],
+        "nacimiento": f"{1 + n % 28:02d}/{1 + n % 12:02d}/{1960 + n % 40}",
+    }
+
+
+def ocr_answer(kind: str, key: str) -> str:
+    person = _fake_person(key)
+    if kind == "dni":
+        return json.dumps({
+            "numero_documento": person["dni"],
+            "nombre_completo": person["nombre"],
+            "fecha_nacimiento": person["nacimiento"],
+            "sexo": "M",
+            "fecha_emision": "10/03/2018",
+        })
+    if kind == "acta":
+        return json.dumps({
+            "fecha_matrimonio": "15/03/2005",
+            "lugar_matrimonio": "San Rafael, Mendoza",
+            "nombre_conyuge_1": person["nombre"],
+            "nombre_conyuge_2": "ANA LÓPEZ",
+            "registro_civil": "Registro Civil San Rafael",
+            "numero_acta": "123",
+            "tomo": "4",
+            "folio": "56",
+        })
+    return json.dumps({"numero_documento": None, "nombre_completo": None, "fecha_nacimiento": None})
+
+
+HALLUCINATION_OK = json.dumps({
+    "is_consistent": True,
+    "invents_data": False,
+    "appropriate": True,
+    "confidence": 0.92,
+    "issues": [],
+    "explanation": "Respuesta consistente con el contexto",
+})
+
+CHAT_ANSWER = (
+    "El trámite de divorcio se inicia con la documentación que ya te pedimos. "
+    "Un operador de la Defensoría revisa tu caso y te contacta por este medio."
+)
+
+
+def embedding_for(text: str) -> list:
+    """Vector unitario determinístico a partir del texto."""
+    rng = random.Random(hashlib.sha256(text.encode()).digest())
+    vector = [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+def synthetic_document(kind: str, key: str) -> bytes:
+    """JPEG sintético con aspecto de documento (tamaño similar a una foto comprimida de WhatsApp)."""
+    from PIL import Image, ImageDraw
+
+    seed = int(hashlib.sha256(f"{kind}:{key}".encode()).hexdigest()[:8], 16)
+    image = Image.new("RGB", (1280, 820) if kind == "dni" else (1240, 1754), (235, 238, 242))
+    draw = ImageDraw.Draw(image)
+    rng = random.Random(seed)
+    title = "REPUBLICA ARGENTINA - DOCUMENTO NACIONAL DE IDENTIDAD" if kind == "dni" else "ACTA DE MATRIMONIO"
+    draw.text((60, 50), title, fill=(20, 40, 90))
+    for row in range(18):
+        y = 130 + row * 36
+        draw.text((60, y), f"{kind.upper()} {key} campo {row}: {rng.randint(10_000, 99_999)}", fill=(40, 40, 40))
+    # Ruido para que el JPEG no sea trivialmente compresible
+    for _ in range(4000):
+        x, y = rng.randrange(image.width), rng.randrange(image.height)
+        draw.point((x, y), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=80)
+    return out.getvalue()
+
+
+def _token_count(text: str) -> int:
+    # ~4 caracteres por token: alcanza para que los clientes contabilicen algo realista
+    return max(1, len(text) // 4) if text else 0
+
+
+# --- Aplicación ---------------------------------------------------------------
+
+class FaultInjected(Exception):
+    def __init__(self, status: int, detail: str):
+        self.status = status
+        self.detail = detail
+
+
+class MockState:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        # sha256 de cada imagen servida -> (tipo, clave), para reconocerla en el OCR simulado
+        self.images: Dict[str, tuple] = {}
+        self.files: Dict[str, bytes] = {}
+        self.sent = 0
+        self.requests: Dict[str, int] = {}
+        self.routes: Dict[str, Dict[str, Any]] = {}
+
+    def reset(self, config: Optional[MockConfig] = None) -> None:
+        """Limpia contadores y reinicia el reloj de las caídas; con `config` también la reemplaza."""
+        with self.lock:
+            if config is not None:
+                self.config = config
+                self.rng = random.Random(config.seed)
+            self.started = time.monotonic()
+            self.sent = 0
+            self.requests.clear()
+            self.routes.clear()
+
+    async def apply(self, route: str, model: Optional[str] = None) -> RouteProfile:
+        """Cuenta el pedido y le aplica caídas, cuelgues, latencia y errores del perfil.
+
+        Lanza FaultInjected si al pedido le toca fallar.
+        """
+        profile = self.config.profile(route, model)
+        with self.lock:
+            stats = self.routes.setdefault(
+                route, {"requests": 0, "errors": 0, "timeouts": 0, "outages": 0, "latency_ms": []}
+            )
+            stats["requests"] += 1
+            self.requests[route] = self.requests.get(route, 0) + 1
+            elapsed = time.monotonic() - self.started
+            down = any(start <= elapsed < end for start, end in profile.outages)
+            latency = profile.latency.sample(self.rng)
+            roll = self.rng.random()
+            if down:
+                stats["outages"] += 1
+            elif roll < profile.timeout_rate:
+                stats["timeouts"] += 1
+            elif roll < profile.timeout_rate + profile.error_rate:
+                stats["errors"] += 1
+        if down:
+            raise FaultInjected(503, "mock outage")
+        if roll < profile.timeout_rate:
+            await asyncio.sleep(profile.hang_ms / 1000)
+            raise FaultInjected(504, "mock timeout")
+        await asyncio.sleep(latency / 1000)
+        with self.lock:
+            stats["latency_ms"].append(latency)
+        if roll < profile.timeout_rate + profile.error_rate:
+            raise FaultInjected(profile.error_status, "mock error")
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            routes = {}
+            for route, s in self.routes.items():
+                values = sorted(s["latency_ms"])
+                routes[route] = {
+                    **{k: s[k] for k in ("requests", "errors", "timeouts", "outages")},
+                    "latency_p50_ms": round(values[len(values) // 2], 1) if values else None,
+                    "latency_p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1) if values else None,
+                }
+            return {"requests": dict(self.requests), "sent": self.sent, "routes": routes}
+
+    def file(self, media_id: str) -> bytes:
+        with self.lock:
+            if media_id not in self.files:
+                kind = media_id.split("-", 1)[0] if "-" in media_id else "doc"
+                data = synthetic_document(kind, media_id)
+                self.files[media_id] = data
+                self.images[hashlib.sha256(data).hexdigest()] = (kind, media_id)
+            return self.files[media_id]
+
+    def image_kind(self, image_b64: str) -> Optional[tuple]:
+        import base64
+        try:
+            digest = hashlib.sha256(base64.b64decode(image_b64)).hexdigest()
+        except Exception:
+            return None
+        return self.images.get(digest)
+
+
+def _prompt_text(messages: list) -> str:
+    return "\n".join(str(m.get("content") or "") for m in messages if isinstance(m, dict))
+
+
+def chat_answer(state: MockState, payload: Dict[str, Any], route: str = "cloud.chat") -> str:
+    messages = payload.get("messages") or []
+    prompt = _prompt_text(messages)
+    for canned in state.config.responses:
+        if canned.matches(route, payload.get("model"), prompt):
+            return canned.content
+    images = [img for m in messages if isinstance(m, dict) for img in (m.get("images") or [])]
+    if images:
+        known = state.image_kind(images[0])
+        key = known[1] if known else "x"
+        # "ACTA" va primero: el prompt de DNI dice "EXACTAMENTE"
+        if "ACTA DE MATRIMONIO" in prompt:
+            return ocr_answer("acta" if known and known[0] == "acta" else "none", key)
+        if "ANSES" in prompt:
+            return json.dumps({"cuil": None, "periodo": None, "es_negativa": None})
+        if "DNI" in prompt:
+            return ocr_answer("dni" if known and known[0] == "dni" else "none", key)
+        return f"Documento {known[0] if known else 'desconocido'}"
+    if "consistencia" in prompt or "is_consistent" in prompt:
+        return HALLUCINATION_OK
+    return CHAT_ANSWER
+
+
+def _ollama_target(request: Request) -> str:
+    return "cloud" if request.headers.get("authorization") else "local"
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    config = config or MockConfig()
+    state = MockState(config)
+    app = FastAPI(title="Mock Ollama/WAHA")
+    app.state.mock = state
+
+    @app.exception_handler(FaultInjected)
+    async def fault_handler(request: Request, exc: FaultInjected):
+        return JSONResponse(status_code=exc.status, content={"error": exc.detail})
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        payload = await request.json()
+        route = f"{_ollama_target(request)}.chat"
+        model = payload.get("model")
+        profile = await state.apply(route, model)
+        content = chat_answer(state, payload, route)
+        final = {
+            "model": model,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": _token_count(_prompt_text(payload.get("messages") or [])),
+            "eval_count": _token_count(content),
+        }
+        # Como Ollama: streaming salvo que se pida "stream": false
+        if payload.get("stream", True) is False:
+            return {**final, "message": {"role": "assistant", "content": content}}
+
+        async def chunks():
+            for token in re.findall(r"\S+\s*", content):
+                yield json.dumps({
+                    "model": model,
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }) + "\n"
+                if profile.token_interval_ms > 0:
+                    await asyncio.sleep(profile.token_interval_ms / 1000)
+            yield json.dumps({**final, "message": {"role": "assistant", "content": ""}}) + "\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        payload = await request.json()
+        await state.apply(f"{_ollama_target(request)}.embeddings", payload.get("model"))
+        return {"embedding": embedding_for(str(payload.get("prompt", "")))}
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        payload = await request.json()
+        await state.apply(f"{_ollama_target(request)}.embed", payload.get("model"))
+        inputs = payload.get("input", "")
+        vectors = [embedding_for(str(t)) for t in (inputs if isinstance(inputs, list) else [inputs])]
+        # Ollama responde "embeddings"; el cliente cloud lee "embedding"
+        return {"model": payload.get("model"), "embeddings": vectors, "embedding": vectors[0] if vectors else []}
+
+    @app.post("/api/sendText")
+    async def send_text(request: Request):
+        payload = await request.json()
+        await state.apply("waha.sendText")
+        with state.lock:
+            state.sent += 1
+            n = state.sent
+        chat_id = payload.get("chatId") or f"{payload.get('phone')}@c.us"
+        return {"id": {"fromMe": True, "remote": chat_id, "id": f"MOCK{n}", "_serialized": f"true_{chat_id}_MOCK{n}"}}
+
+    @app.post("/api/sendFile")
+    async def send_file(request: Request):
+        payload = await request.json()
+        await state.apply("waha.sendFile")
+        with state.lock:
+            state.sent += 1
+            n = state.sent
+        return {"id": {"fromMe": True, "remote": payload.get("chatId"), "_serialized": f"true_file_MOCK{n}"}}
+
+    @app.get("/api/files/{media_id}")
+    async def files(media_id: str):
+        await state.apply("waha.files")
+        if media_id.startswith("missing"):
+            raise HTTPException(status_code=404, detail="media not found")
+        return Response(content=state.file(media_id), media_type="image/jpeg")
+
+    @app.get("/mock/stats")
+    async def stats():
+        return state.stats()
+
+    @app.post("/mock/config")
+    async def replace_config(request: Request):
+        """Reemplaza rutas y respuestas enlatadas (mismo formato que --config)."""
+        try:
+            new_config = MockConfig.from_dict(await request.json())
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        state.reset(new_config)
+        return {"routes": sorted(new_config.routes), "responses": len(new_config.responses)}
+
+    @app.post("/mock/reset")
+    async def reset():
+        state.reset()
+        return {"ok": True}
+
+    return app
+
+
+class MockServer:
+    """Corre el mock en un hilo propio (su propio event loop), para usarlo desde otro script."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        import socket
+        import uvicorn
+
+        if port == 0:
+            with socket.socket() as sock:
+                sock.bind((host, 0))
+                port = sock.getsockname()[1]
+        self.app = create_app(config)
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "MockServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("El mock no arrancó")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    @property
+    def state(self) -> MockState:
+        return self.app.state.mock
+
+    def reconfigure(self, config: MockConfig) -> None:
+        self.state.reset(config)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return self.state.stats()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock local de Ollama y WAHA")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--config", type=str, help="JSON con rutas, fallas y respuestas enlatadas")
+    parser.add_argument("--ollama-latency-ms", type=float)
+    parser.add_argument("--ollama-jitter-ms", type=float)
+    parser.add_argument("--waha-latency-ms", type=float)
+    parser.add_argument("--waha-jitter-ms", type=float)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    overrides = {
+        "ollama_latency_ms": args.ollama_latency_ms,
+        "ollama_jitter_ms": args.ollama_jitter_ms,
+        "waha_latency_ms": args.waha_latency_ms,
+        "waha_jitter_ms": args.waha_jitter_ms,
+        "seed": args.seed,
+    }
+    if args.config:
+        config = MockConfig.from_file(args.config, **overrides)
+    else:
+        config = MockConfig(**{k: v for k, v in overrides.items() if v is not None})
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
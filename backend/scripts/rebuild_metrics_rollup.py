@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Recalcula la tabla de rollups de métricas (case_daily_stats) desde cases.
+
+Los rollups se mantienen solos ante altas/cambios/bajas hechas vía ORM.
+Correr este script después de cargas o borrados masivos con SQL directo
+(p. ej. benchmark_fulltext_search.py) o si se sospecha que quedaron
+desalineados.
+
+Uso:
+    python backend/scripts/rebuild_metrics_rollup.py
+"""
+import sys
+from pathlib import Path
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from infrastructure.persistence.db import engine, init_db
+from infrastructure.persistence.rollups import rebuild_case_daily_stats
+
+
+def main():
+    init_db()
+    print("\n🔄 Recalculando rollups de métricas de casos...\n")
+    with engine.begin() as conn:
+        rows = rebuild_case_daily_stats(conn)
+    print(f"✅ case_daily_stats recalculada ({rows} filas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Replay de conversaciones completas y benchmark de throughput de punta a punta.
+
+Sintetiza N conversaciones concurrentes que recorren todo el grafo de fases de
+ProcessIncomingMessageUseCase (inicio → datos personales → perfil económico →
+cónyuge → matrimonio → hijos → bienes → documentación), incluidos turnos con
+foto de DNI y de acta, una consulta libre (LLM + chequeo de alucinaciones) y
+el cierre. Ollama y WAHA se reemplazan por el mock local de
+scripts/mock_services.py (determinístico; latencia, fallas y respuestas
+configurables con --mock-config), que corre en su propio hilo para no
+contaminar la medición del event loop.
+
+Reporta turnos/seg, p50/p95/p99 por fase, queries a la base por turno y lag
+del event loop, y guarda todo en JSON para comparar entre commits
+(--compare resultado_anterior.json).
+
+Por defecto usa una base SQLite descartable; para números representativos
+apuntar --database-url a PostgreSQL (los casos quedan con teléfono +54926 y
+el prefijo de la corrida, ver "run_tag" en el JSON).
+
+Uso:
+    python backend/scripts/replay_conversations.py --conversations 50 --concurrency 10
+    python backend/scripts/replay_conversations.py --conversations 200 --concurrency 40 \\
+        --ollama-latency-ms 600 --waha-latency-ms 80 --output replay.json
+    python backend/scripts/replay_conversations.py --conversations 200 --compare replay.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import contextvars
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR / "src"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mock_services import MockConfig, MockServer
+
+APELLIDOS = ["Pérez", "González", "Rodríguez", "Fernández", "López", "Martínez", "Gómez", "Díaz", "Sánchez", "Romero"]
+NOMBRES = ["Juan", "María", "José", "Ana", "Carlos", "Lucía", "Jorge", "Sofía", "Miguel", "Valentina"]
+SITUACIONES = ["Relación de dependencia", "Desocupado", "Monotributo", "Changas", "Jubilación"]
+CALLES = ["San Martín", "Belgrano", "Mitre", "Sarmiento", "Rivadavia", "Moreno"]
+
+# Fases que cierran la entrevista: de acá en adelante el guion es de documentación
+DOCS_PHASE = "documentacion"
+MAX_TURNS = 80
+# Turnos seguidos en la misma fase antes de abandonar la conversación (guion desfasado)
+MAX_STALLED_TURNS = 3
+
+
+# --- Conversaciones sintéticas ----------------------------------------------
+
+@dataclass
+class Persona:
+    index: int
+    phone: str
+    tipo: str
+    apellido: str
+    nombres: str
+    dni: str
+    situacion: str
+    alquila: bool
+    apellido_conyuge: str
+    nombres_conyuge: str
+    dni_conyuge: str
+    hijos: int
+    bienes: bool
+
+
+def persona_for(index: int, run_tag: str, rng: random.Random) -> Persona:
+    return Persona(
+        index=index,
+        phone=f"+54926{run_tag}{index:05d}",
+        tipo="unilateral" if index % 2 == 0 else "conjunta",
+        apellido=rng.choice(APELLIDOS),
+        nombres=rng.choice(NOMBRES),
+        dni=str(rng.randint(20_000_000, 44_999_999)),
+        situacion=SITUACIONES[index % len(SITUACIONES)],
+        alquila=rng.random() < 0.5,
+        apellido_conyuge=rng.choice(APELLIDOS),
+        nombres_conyuge=rng.choice(NOMBRES),
+        dni_conyuge=str(rng.randint(20_000_000, 44_999_999)),
+        hijos=rng.choice([0, 0, 1, 2]),
+        bienes=rng.random() < 0.3,
+    )
+
+
+def next_input(p: Persona, phase: str) -> str:
+    """Respuesta del usuario sintético según la fase en la que está su caso."""
+    calle = CALLES[p.index % len(CALLES)]
+    answers = {
+        None: "Hola, quiero divorciarme",
+        "inicio": "Hola, quiero divorciarme",
+        "tipo_divorcio": "Solo yo (Unilateral)" if p.tipo == "unilateral" else "Los dos (Conjunta)",
+        "apellido": p.apellido,
+        "nombres": p.nombres,
+        "cuit": f"20-{p.dni}-3",
+        "fecha_nacimiento": f"{1 + p.index % 28:02d}/{1 + p.index % 12:02d}/{1970 + p.index % 30}",
+        "domicilio": f"{calle} {100 + p.index % 900}, San Rafael, Mendoza",
+        "econ_intro": p.situacion,
+        "econ_situacion": p.situacion,
+        "econ_ingreso": str(250_000 + (p.index % 10) * 50_000),
+        "econ_vivienda": "Alquilo" if p.alquila else "Propia",
+        "econ_alquiler": "150000",
+        "econ_patrimonio_inmuebles": "no",
+        "econ_patrimonio_registrables": "no",
+        "econ_cierre": "ok",
+        "apellido_conyuge": p.apellido_conyuge,
+        "nombres_conyuge": p.nombres_conyuge,
+        "doc_conyuge": p.dni_conyuge,
+        "fecha_nacimiento_conyuge": "20/08/1987",
+        "domicilio_conyuge": f"Belgrano {200 + p.index % 700}, San Rafael, Mendoza",
+        "info_matrimonio": "Nos casamos el 15-03-2005 en San Rafael, Mendoza",
+        # El validador de jurisdicción rechaza algunas calles ("San Martín ..."), no es lo que se mide
+        "ultimo_domicilio_conyugal": f"Mitre {100 + p.index % 900}, San Rafael, Mendoza",
+        "hijos": "Sí" if p.hijos else "No",
+        "hijos_cuantos": str(p.hijos),
+        "hijo_nombre": f"Tomás {p.apellido}",
+        "hijo_fecha": "10/10/2015",
+        "hijo_mayor_eval": "Ninguna aplica",
+        "bienes": "Sí" if p.bienes else "No",
+        "bienes_detalle": "Un auto Fiat Palio 2010",
+    }
+    return answers.get(phase, "ok")
+
+
+def docs_script(p: Persona) -> List[tuple]:
+    """Turnos de la fase documentación: (etiqueta, texto, media_id)."""
+    return [
+        ("media:dni", None, f"dni-{p.phone[1:]}"),
+        ("media:acta", None, f"acta-{p.phone[1:]}"),
+        ("documentacion:consulta", "¿Cuánto tarda el trámite de divorcio?", None),
+        ("documentacion:listo", "listo", None),
+    ]
+
+
+# --- Medición ----------------------------------------------------------------
+
+_query_counter: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("replay_queries", default=None)
+
+
+def install_query_counter(engine) -> None:
+    """Cuenta sentencias SQL del turno en curso (cada conversación corre en su propia task)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter = _query_counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+class LoopLagMonitor:
+    """Mide cuánto se atrasa un sleep corto: el tiempo que el loop estuvo bloqueado."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples_ms: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples_ms.append(max(0.0, (loop.time() - start - self.interval) * 1000))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+@dataclass
+class Recorder:
+    turns: Dict[str, List[float]] = field(default_factory=dict)
+    queries: Dict[str, List[int]] = field(default_factory=dict)
+    errors: List[Dict[str, str]] = field(default_factory=list)
+    completed: int = 0
+
+    def record(self, label: str, elapsed_ms: float, queries: int) -> None:
+        self.turns.setdefault(label, []).append(elapsed_ms)
+        self.queries.setdefault(label, []).append(queries)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return round(ordered[rank], 2)
+
+
+def distribution(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 2) if values else None,
+    }
+
+
+# --- Ejecución ---------------------------------------------------------------
+
+async def run_conversation(persona: Persona, session_factory, recorder: Recorder, media: bool) -> None:
+    from application.use_cases.process_incoming_message import IncomingMessageRequest, ProcessIncomingMessageUseCase
+    from infrastructure.persistence.models import Case
+
+    db = session_factory()
+    try:
+        phase, stalled, docs = None, 0, None
+        for _ in range(MAX_TURNS):
+            if phase == DOCS_PHASE:
+                docs = docs if docs is not None else [t for t in docs_script(persona) if media or t[2] is None]
+                if not docs:
+                    recorder.completed += 1
+                    return
+                label, text, media_id = docs.pop(0)
+            else:
+                label, text, media_id = phase or "inicio", next_input(persona, phase), None
+
+            request = IncomingMessageRequest(
+                phone=persona.phone,
+                text=text or "",
+                media_id=media_id,
+                mime_type="image/jpeg" if media_id else None,
+            )
+            counter = [0]
+            token = _query_counter.set(counter)
+            start = time.perf_counter()
+            try:
+                # Un caso de uso por turno, como el webhook
+                await ProcessIncomingMessageUseCase(db).execute(request)
+            except Exception as e:
+                db.rollback()
+                recorder.errors.append({"phone": persona.phone, "phase": label, "error": repr(e)[:300]})
+                return
+            finally:
+                _query_counter.reset(token)
+            recorder.record(label, (time.perf_counter() - start) * 1000, counter[0])
+
+            db.expire_all()
+            new_phase = db.query(Case.phase).filter(Case.phone == persona.phone).scalar()
+            if new_phase == phase and phase != DOCS_PHASE:
+                stalled += 1
+                if stalled >= MAX_STALLED_TURNS:
+                    recorder.errors.append({"phone": persona.phone, "phase": phase, "error": "conversación trabada en la fase"})
+                    return
+            else:
+                stalled = 0
+            phase = new_phase
+        recorder.errors.append({"phone": persona.phone, "phase": phase, "error": f"más de {MAX_TURNS} turnos"})
+    finally:
+        db.close()
+
+
+async def replay(args, session_factory, run_tag: str) -> Dict:
+    rng = random.Random(args.seed)
+    personas = [persona_for(i, run_tag, rng) for i in range(args.conversations)]
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def _bounded(persona: Persona) -> None:
+        async with semaphore:
+            await run_conversation(persona, session_factory, recorder, media=not args.no_media)
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(_bounded(p) for p in personas))
+    wall = time.perf_counter() - start
+    await monitor.stop()
+
+    all_turns = [ms for values in recorder.turns.values() for ms in values]
+    all_queries = [q for values in recorder.queries.values() for q in values]
+    return {
+        "summary": {
+            "conversations": args.conversations,
+            "completed": recorder.completed,
+            "errors": len(recorder.errors),
+            "turns": len(all_turns),
+            "wall_seconds": round(wall, 3),
+            "turns_per_sec": round(len(all_turns) / wall, 2) if wall else None,
+            "turn_ms": distribution(all_turns),
+        },
+        "phases": {
+            label: {**distribution(values), "queries_mean": round(sum(recorder.queries[label]) / len(values), 1)}
+            for label, values in sorted(recorder.turns.items())
+        },
+        "db_queries_per_turn": distribution([float(q) for q in all_queries]),
+        "loop_lag_ms": distribution(monitor.samples_ms),
+        "errors": recorder.errors[:50],
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def print_report(report: Dict) -> None:
+    s = report["summary"]
+    print(f"\n📊 {s['turns']} turnos en {s['wall_seconds']}s -> {s['turns_per_sec']} turnos/s "
+          f"({s['completed']}/{s['conversations']} conversaciones completas, {s['errors']} errores)")
+    print(f"   turno p50 {s['turn_ms']['p50']} ms | p95 {s['turn_ms']['p95']} ms | p99 {s['turn_ms']['p99']} ms")
+    q, lag = report["db_queries_per_turn"], report["loop_lag_ms"]
+    print(f"   queries/turno media {q['mean']} | p95 {q['p95']} | max {q['max']}")
+    print(f"   lag del event loop p50 {lag['p50']} ms | p99 {lag['p99']} ms | max {lag['max']} ms\n")
+    print(f"   {'fase':34} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}")
+    for label, d in report["phases"].items():
+        print(f"   {label:34} {d['count']:5} {d['p50']:9.1f} {d['p95']:9.1f} {d['p99']:9.1f} {d['queries_mean']:8.1f}")
+    for error in report["errors"][:5]:
+        print(f"   ⚠️  {error['phone']} [{error['phase']}]: {error['error']}")
+
+
+def print_comparison(report: Dict, baseline: Dict) -> None:
+    def _delta(new, old) -> str:
+        if new is None or not old:
+            return "   n/a"
+        return f"{(new - old) / old * 100:+6.1f}%"
+
+    print(f"\n🔁 Comparación con {baseline.get('meta', {}).get('commit') or 'baseline'}")
+    old_s, new_s = baseline["summary"], report["summary"]
+    print(f"   turnos/s {old_s['turns_per_sec']} -> {new_s['turns_per_sec']} ({_delta(new_s['turns_per_sec'], old_s['turns_per_sec'])})")
+    print(f"   queries/turno {baseline['db_queries_per_turn']['mean']} -> {report['db_queries_per_turn']['mean']}")
+    for label, d in report["phases"].items():
+        old = baseline["phases"].get(label)
+        if old:
+            print(f"   {label:34} p95 {old['p95']:9.1f} -> {d['p95']:9.1f} ({_delta(d['p95'], old['p95'])})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de conversaciones y benchmark de throughput")
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--no-media", action="store_true", help="Omitir los turnos con foto (DNI/acta)")
+    parser.add_argument("--ollama-latency-ms", type=float, default=300.0)
+    parser.add_argument("--ollama-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--waha-latency-ms", type=float, default=50.0)
+    parser.add_argument("--waha-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--mock-config", type=str,
+                        help="JSON del mock con distribuciones, fallas y respuestas (ver mock_services.example.json)")
+    parser.add_argument("--database-url", type=str, help="Default: SQLite descartable")
+    parser.add_argument("--redis-url", type=str, default="redis://127.0.0.1:6379/0",
+                        help="Eventos y jobs; si no responde se sigue sin ellos")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=str, help="Guardar resultados en JSON")
+    parser.add_argument("--compare", type=str, help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="replay-"))
+    database_url = args.database_url or f"sqlite:///{workdir / 'replay.db'}"
+    run_tag = f"{int(time.time()) % 10_000:04d}"
+    latency = {
+        "ollama_latency_ms": args.ollama_latency_ms,
+        "ollama_jitter_ms": args.ollama_jitter_ms,
+        "waha_latency_ms": args.waha_latency_ms,
+        "waha_jitter_ms": args.waha_jitter_ms,
+    }
+    if args.mock_config:
+        # Las rutas del archivo mandan; los --*-latency-ms solo cubren "ollama"/"waha" si no están definidas
+        config = MockConfig.from_file(args.mock_config, seed=args.seed, **latency)
+    else:
+        config = MockConfig(seed=args.seed, **latency)
+
+    with MockServer(config) as mock:
+        # Antes de importar el backend: Settings y Celery leen el entorno al importarse
+        os.environ.update({
+            "DATABASE_URL": database_url,
+            "REDIS_URL": args.redis_url,
+            "WAHA_BASE_URL": mock.url,
+            "OLLAMA_BASE_URL": mock.url,
+            "OLLAMA_CLOUD_BASE_URL": mock.url,
+            "OLLAMA_CLOUD_API_KEY": "mock",
+            "GEMINI_API_KEY": "",
+            "MEDIA_STORE_PATH": str(workdir / "media"),
+        })
+        import structlog
+        import logging
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from infrastructure.persistence.db import Base
+        from infrastructure.observability.tracing import configure_tracing, shutdown_tracing
+        import infrastructure.persistence.models  # noqa: F401
+
+        # Los logs por turno dominarían el tiempo medido
+        structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+        connect_args = {"timeout": 30} if database_url.startswith("sqlite") else {}
+        engine = create_engine(database_url, connect_args=connect_args)
+        Base.metadata.create_all(bind=engine)
+        install_query_counter(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+        print(f"▶️  {args.conversations} conversaciones, concurrencia {args.concurrency}, "
+              f"base {engine.dialect.name}, mock en {mock.url}")
+        # Con TRACING_EXPORTER=file cada turno queda desarmado por etapa (ver scripts/trace_report.py)
+        configure_tracing()
+        report = asyncio.run(replay(args, session_factory, run_tag))
+        shutdown_tracing()
+        from infrastructure.ai.usage import usage_recorder
+        usage_recorder.flush()  # llm_usage de la corrida (tokens por caso/fase)
+        report["mock"] = mock.stats["routes"]
+
+    report["meta"] = {
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "run_tag": run_tag,
+        "database": engine.dialect.name,
+        "args": vars(args),
+    }
+    print_report(report)
+    if args.compare:
+        print_comparison(report, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Desarma los turnos más lentos a partir de las trazas en archivo.
+
+Lee el JSONL que escribe el exportador "file" (TRACING_EXPORTER=file,
+TRACING_FILE_PATH) y muestra:
+- por nombre de span: cantidad, p50, p95 y tiempo total;
+- los N turnos más lentos como árbol de etapas, con duración y atributos
+  (proveedor, modelo, tamaños, reintentos).
+
+Uso:
+    TRACING_EXPORTER=file python backend/scripts/replay_conversations.py --conversations 20
+    python backend/scripts/trace_report.py traces/spans.jsonl --slowest 3
+    python backend/scripts/trace_report.py traces/spans.jsonl --root webhook.whatsapp --min-ms 2000
+"""
+import sys
+import json
+import argparse
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+
+def load(path: Path) -> List[dict]:
+    spans = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def _pct(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def print_summary(spans: List[dict]) -> None:
+    by_name: Dict[str, List[float]] = defaultdict(list)
+    for s in spans:
+        if s.get("duration_ms") is not None:
+            by_name[s["name"]].append(s["duration_ms"])
+    print(f"   {'span':32} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9}")
+    for name, values in sorted(by_name.items(), key=lambda kv: -sum(kv[1])):
+        print(f"   {name:32} {len(values):6} {_pct(values, 50):9.1f} {_pct(values, 95):9.1f} {sum(values) / 1000:9.2f}")
+
+
+def print_tree(span: dict, children: Dict[str, List[dict]], root_start: int, depth: int = 0) -> None:
+    offset = (span["start_ns"] - root_start) / 1e6
+    attrs = " ".join(f"{k}={v}" for k, v in span.get("attributes", {}).items())
+    status = " ❌" if span.get("status") == "ERROR" else ""
+    print(f"   {'  ' * depth}{span['name']:<{40 - 2 * depth}} +{offset:8.1f} ms {span['duration_ms']:9.1f} ms{status}  {attrs}")
+    for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start_ns"]):
+        print_tree(child, children, root_start, depth + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reporte de trazas por turno")
+    parser.add_argument("path", nargs="?", default="traces/spans.jsonl")
+    parser.add_argument("--root", default=None,
+                        help="Nombre del span raíz a analizar (default: webhook.whatsapp o turn.execute)")
+    parser.add_argument("--slowest", type=int, default=3)
+    parser.add_argument("--min-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    path = Path(args.path)
+    if not path.exists():
+        print(f"❌ No existe {path}")
+        sys.exit(1)
+    spans = [s for s in load(path) if s.get("duration_ms") is not None]
+    ids = {s["span_id"] for s in spans}
+    children: Dict[str, List[dict]] = defaultdict(list)
+    for s in spans:
+        if s.get("parent_id") in ids:
+            children[s["parent_id"]].append(s)
+
+    print(f"📄 {len(spans)} spans en {path}\n")
+    print_summary(spans)
+
+    roots = [s for s in spans if s.get("parent_id") not in ids]
+    names = [args.root] if args.root else ["webhook.whatsapp", "turn.execute"]
+    for name in names:
+        candidates = [s for s in roots if s["name"] == name and s["duration_ms"] >= args.min_ms]
+        if candidates:
+            break
+    slowest = sorted(candidates, key=lambda s: -s["duration_ms"])[:args.slowest]
+    for root in slowest:
+        print(f"\n🐢 {root['name']} {root['duration_ms']:.1f} ms (trace {root['trace_id']})")
+        print_tree(root, children, root["start_ns"])
+
+
+if __name__ == "__main__":
+    main()
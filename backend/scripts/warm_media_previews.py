@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Genera las previews de documentos recibidos antes del pipeline de miniaturas.
+
+Recorre los media_id de DNI, actas y documentos de respaldo; los que no están
+en el media store se bajan de WAHA una vez. Es idempotente: solo renderiza las
+variantes faltantes, así que se puede cortar y relanzar.
+
+Uso:
+    python backend/scripts/warm_media_previews.py [--limit 500]
+"""
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+# Agregar src al path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from infrastructure.persistence.db import SessionLocal, init_db
+from application.services.preview_service import PreviewService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar previews de documentos históricos")
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de documentos a revisar")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print("\n🖼️  Generando previews de documentos históricos...\n")
+        stats = asyncio.run(PreviewService(db).warm(args.limit))
+    finally:
+        db.close()
+    print(f"   Revisados:      {stats['checked']}")
+    print(f"   Generados:      {stats['generated']}")
+    print(f"   Sin preview:    {stats['unavailable']}")
+    print(f"   Con error:      {stats['failed']}")
+    print("\n✅ Listo")
+
+
+if __name__ == "__main__":
+    main()
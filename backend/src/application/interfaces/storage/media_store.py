@@ -0,0 +1,34 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional
+
+class MediaStore(ABC):
+    """Almacenamiento direccionado por contenido: la clave es el SHA-256 de los bytes.
+
+    Las variantes (previews, miniaturas) se guardan junto al original bajo el
+    mismo digest y un nombre de variante, p. ej. ("abc...", "preview-thumb.webp").
+    """
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Guarda los bytes (idempotente) y retorna su SHA-256 en hex"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_variant(self, digest: str, variant: str, data: bytes) -> None:
+        """Guarda un derivado del contenido `digest` (reemplaza si existía)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, digest: str, variant: Optional[str] = None) -> bool:
+        """Indica si el contenido (o su variante) está almacenado"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def open(self, digest: str, variant: Optional[str] = None) -> BinaryIO:
+        """Abre el contenido para lectura binaria (con seek, para rangos)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def size(self, digest: str, variant: Optional[str] = None) -> int:
+        """Tamaño en bytes del contenido"""
+        raise NotImplementedError
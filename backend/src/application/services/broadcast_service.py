@@ -0,0 +1,272 @@
+"""
+Envíos masivos del operador (p. ej. un cambio de horarios de la Defensoría).
+
+`create` valida plantilla y filtro y registra el envío; el job `send_broadcast`
+llama a `run`, que resuelve los destinatarios con una sola consulta, escribe
+historial, memoria inmediata y cola de salida con inserts por lotes y pasa los
+chats a la cola a `broadcast_rate_per_second`, para que las respuestas del bot
+no queden detrás del envío masivo. El progreso y el resultado por destinatario
+salen de las filas de outbound_messages del envío.
+"""
+import asyncio
+import json
+import string
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import distinct, func, insert
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from infrastructure.persistence.models import Broadcast, Case, Message, OutboundMessage
+from infrastructure.persistence.repositories import MemoryRepository, MessageRepository
+from .outbound_service import OutboundMessageService
+
+logger = structlog.get_logger()
+
+TEMPLATE_FIELDS = ("nombre", "apellido", "caso", "fase")
+FILTER_FIELDS = ("status", "type", "phase", "search")
+_BATCH_SIZE = 200
+# Cada cuántos chats pasados a la cola se guarda el avance
+_PROGRESS_EVERY = 20
+
+
+class BroadcastError(ValueError):
+    """Plantilla o filtro inválido, o sin destinatarios"""
+
+
+def validate_template(template: str) -> None:
+    """Solo se permiten los campos de TEMPLATE_FIELDS, sin formato ni conversión."""
+    if not template or not template.strip():
+        raise BroadcastError("La plantilla está vacía")
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError as e:
+        raise BroadcastError(f"Plantilla inválida: {e}")
+    for _, field, spec, conversion in parsed:
+        if field is None:
+            continue
+        if field not in TEMPLATE_FIELDS or spec or conversion:
+            raise BroadcastError(
+                f"Campo de plantilla no soportado: {{{field}}}. Disponibles: {', '.join(TEMPLATE_FIELDS)}"
+            )
+
+
+def render_template(template: str, row) -> str:
+    return template.format_map({
+        "nombre": row.nombres or row.nombre or "",
+        "apellido": row.apellido or "",
+        "caso": row.id,
+        "fase": row.phase or "",
+    }).strip()
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class BroadcastService:
+    def __init__(self, db: Session, outbound: Optional[OutboundMessageService] = None):
+        self.db = db
+        self.outbound = outbound or OutboundMessageService(db)
+
+    # --- Destinatarios ----------------------------------------------------
+
+    @staticmethod
+    def clean_filters(filters: Dict[str, Any]) -> Dict[str, str]:
+        unknown = set(filters) - set(FILTER_FIELDS)
+        if unknown:
+            raise BroadcastError(f"Filtros no soportados: {', '.join(sorted(unknown))}")
+        cleaned = {k: str(v).strip() for k, v in filters.items() if v is not None and str(v).strip()}
+        if not cleaned:
+            # Un envío a todos los casos tiene que ser explícito por otra vía, no un filtro vacío
+            raise BroadcastError("Indicar al menos un filtro de casos")
+        return cleaned
+
+    def recipients_query(self, filters: Dict[str, str]):
+        query = self.db.query(Case.id, Case.phone, Case.nombre, Case.nombres, Case.apellido, Case.phase).filter(
+            Case.phone.isnot(None), Case.phone != ""
+        )
+        if filters.get("status"):
+            query = query.filter(Case.status == filters["status"])
+        if filters.get("type"):
+            query = query.filter(Case.type == filters["type"])
+        if filters.get("phase"):
+            query = query.filter(Case.phase == filters["phase"])
+        if filters.get("search"):
+            term = f"%{filters['search']}%"
+            query = query.filter(Case.nombre.ilike(term) | Case.dni.ilike(term))
+        return query.order_by(Case.id)
+
+    def count_recipients(self, filters: Dict[str, str]) -> int:
+        # Un mismo teléfono con varios casos recibe un solo mensaje
+        return self.recipients_query(filters).order_by(None).with_entities(func.count(distinct(Case.phone))).scalar() or 0
+
+    def preview(self, filters: Dict[str, Any], template: str, sample: int = 3) -> Dict[str, Any]:
+        filters = self.clean_filters(filters)
+        validate_template(template)
+        rows = self.recipients_query(filters).limit(sample).all()
+        return {
+            "total": self.count_recipients(filters),
+            "samples": [{"case_id": r.id, "phone": r.phone, "text": render_template(template, r)} for r in rows],
+        }
+
+    # --- Alta y ejecución -------------------------------------------------
+
+    def get(self, broadcast_id: int) -> Optional[Broadcast]:
+        return self.db.query(Broadcast).get(broadcast_id)
+
+    def create(self, filters: Dict[str, Any], template: str, created_by: Optional[str] = None,
+               idempotency_key: Optional[str] = None) -> Broadcast:
+        """Registra el envío (pending). Con `idempotency_key` repetida retorna el existente."""
+        if idempotency_key:
+            existing = self.db.query(Broadcast).filter(Broadcast.idempotency_key == idempotency_key).first()
+            if existing:
+                return existing
+        filters = self.clean_filters(filters)
+        validate_template(template)
+        total = self.count_recipients(filters)
+        if total == 0:
+            raise BroadcastError("Ningún caso con teléfono coincide con el filtro")
+        if total > settings.broadcast_max_recipients:
+            raise BroadcastError(
+                f"{total} destinatarios supera el máximo de {settings.broadcast_max_recipients}; acotar el filtro"
+            )
+        broadcast = Broadcast(
+            template=template.strip(),
+            filters=json.dumps(filters),
+            total=total,
+            created_by=created_by,
+            idempotency_key=idempotency_key,
+        )
+        self.db.add(broadcast)
+        self.db.commit()
+        self.db.refresh(broadcast)
+        logger.info("broadcast_created", broadcast_id=broadcast.id, total=total, filters=filters)
+        return broadcast
+
+    def mark_failed(self, broadcast: Broadcast, error: str) -> None:
+        broadcast.status = "failed"
+        broadcast.error = error[:1000]
+        self.db.commit()
+
+    async def run(self, broadcast: Broadcast, rate_per_second: Optional[float] = None) -> Dict[str, Any]:
+        """Escribe los destinatarios que falten y los pasa a la cola. Se puede reintentar."""
+        if broadcast.status == "done":
+            return self.progress(broadcast)
+        broadcast.status = "running"
+        broadcast.error = None
+        broadcast.started_at = broadcast.started_at or datetime.utcnow()
+        self.db.commit()
+        try:
+            self._materialize(broadcast)
+            await self._dispatch(broadcast, rate_per_second or settings.broadcast_rate_per_second)
+        except Exception as e:
+            self.db.rollback()
+            self.mark_failed(broadcast, str(e))
+            logger.error("broadcast_failed", broadcast_id=broadcast.id, error=str(e))
+            raise
+        broadcast.status = "done"
+        broadcast.finished_at = datetime.utcnow()
+        self.db.commit()
+        logger.info("broadcast_dispatched", broadcast_id=broadcast.id, total=broadcast.total)
+        return self.progress(broadcast)
+
+    def _materialize(self, broadcast: Broadcast) -> None:
+        existing = {
+            case_id for (case_id,) in
+            self.db.query(OutboundMessage.case_id).filter(OutboundMessage.broadcast_id == broadcast.id)
+        }
+        phones, pending = set(), []
+        for row in self.recipients_query(json.loads(broadcast.filters or "{}")).all():
+            if row.phone in phones:
+                continue
+            phones.add(row.phone)
+            if row.id not in existing:
+                pending.append(row)
+        for start in range(0, len(pending), _BATCH_SIZE):
+            self._insert_batch(broadcast, pending[start:start + _BATCH_SIZE])
+        broadcast.total = len(existing) + len(pending)
+        self.db.commit()
+
+    def _insert_batch(self, broadcast: Broadcast, rows: List[Any]) -> None:
+        """Historial, memoria y cola de salida de un lote, en una transacción y tres INSERT."""
+        texts = [render_template(broadcast.template, row) for row in rows]
+        message_ids = MessageRepository(self.db).add_messages_bulk(
+            [{"case_id": row.id, "role": "operator", "content": text, "status": "queued"}
+             for row, text in zip(rows, texts)],
+            commit=False,
+        )
+        self.db.execute(insert(OutboundMessage), [
+            {
+                "case_id": row.id,
+                "message_id": message_id,
+                "chat_id": row.phone,
+                "text": text,
+                "status": "queued",
+                "attempts": 0,
+                "idempotency_key": f"broadcast:{broadcast.id}:{row.id}",
+                "broadcast_id": broadcast.id,
+            }
+            for row, text, message_id in zip(rows, texts, message_ids)
+        ])
+        MemoryRepository(self.db).add_memories_bulk(
+            [{"case_id": row.id, "kind": "immediate", "content": f"Operador: {text}"}
+             for row, text in zip(rows, texts)],
+            commit=False,
+        )
+        self.db.commit()
+
+    async def _dispatch(self, broadcast: Broadcast, rate_per_second: float) -> None:
+        interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        chats = [
+            chat_id for (chat_id,) in
+            self.db.query(OutboundMessage.chat_id)
+            .filter(OutboundMessage.broadcast_id == broadcast.id)
+            .order_by(OutboundMessage.id)
+            .offset(broadcast.dispatched)
+        ]
+        for i, chat_id in enumerate(chats, 1):
+            started = time.monotonic()
+            await self.outbound.dispatch_chat(chat_id)
+            broadcast.dispatched += 1
+            if i % _PROGRESS_EVERY == 0 or i == len(chats):
+                self.db.commit()
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    # --- Progreso ---------------------------------------------------------
+
+    def progress(self, broadcast: Broadcast) -> Dict[str, Any]:
+        """Estado del envío y destinatarios por estado de entrega."""
+        rows = (
+            self.db.query(OutboundMessage.status, Message.status, func.count(OutboundMessage.id))
+            .outerjoin(Message, Message.id == OutboundMessage.message_id)
+            .filter(OutboundMessage.broadcast_id == broadcast.id)
+            .group_by(OutboundMessage.status, Message.status)
+            .all()
+        )
+        counts = {"queued": 0, "sent": 0, "delivered": 0, "read": 0, "failed": 0}
+        for outbound_status, message_status, count in rows:
+            if outbound_status == "dead":
+                counts["failed"] += count
+            elif outbound_status == "sent" and message_status in ("delivered", "read"):
+                counts[message_status] += count
+            else:
+                counts["sent" if outbound_status == "sent" else "queued"] += count
+        return {
+            "broadcast_id": broadcast.id,
+            "job_id": broadcast.job_id,
+            "status": broadcast.status,
+            "template": broadcast.template,
+            "filters": json.loads(broadcast.filters or "{}"),
+            "total": broadcast.total,
+            "dispatched": broadcast.dispatched,
+            "counts": counts,
+            "error": broadcast.error,
+            "created_by": broadcast.created_by,
+            "created_at": _iso(broadcast.created_at),
+            "started_at": _iso(broadcast.started_at),
+            "finished_at": _iso(broadcast.finished_at),
+        }
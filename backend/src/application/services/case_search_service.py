@@ -0,0 +1,163 @@
+import html
+import re
+from typing import List, Dict, Any
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+import structlog
+
+from infrastructure.persistence.models import Case, Message
+from infrastructure.persistence.fulltext import SEARCH_CONFIG, CASE_HEADLINE_SOURCE, CASE_WEIGHTED_FIELDS
+
+logger = structlog.get_logger()
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+
+def _sql_html_escape(expression: str) -> str:
+    """Escapa &, < y > en SQL (como html.escape(quote=False)) antes de que ts_headline agregue <mark>."""
+    return f"replace(replace(replace({expression}, '&', '&amp;'), '<', '&lt;'), '>', '&gt;')"
+
+
+class CaseSearchService:
+    """
+    Búsqueda de casos por texto libre sobre datos del caso e historial de conversación.
+
+    En PostgreSQL usa las columnas tsvector (configuración es_unaccent) con índices GIN,
+    ranking ts_rank_cd y resaltado con ts_headline. En otros motores (SQLite en tests)
+    degrada a ILIKE con resaltado en Python.
+
+    Los resultados se agrupan por caso: cada caso aparece una vez con su mejor
+    puntaje y los fragmentos coincidentes (del caso y/o de mensajes).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(self, query: str, limit: int = 20, include_messages: bool = True) -> List[Dict[str, Any]]:
+        query = (query or "").strip()
+        if not query:
+            return []
+        if self.db.bind and self.db.bind.dialect.name == "postgresql":  # type: ignore[attr-defined]
+            hits = self._search_postgres(query, limit, include_messages)
+        else:
+            hits = self._search_fallback(query, limit, include_messages)
+        results = self._group_by_case(hits, limit)
+        logger.info("case_search", query_length=len(query), hits=len(hits), cases=len(results))
+        return results
+
+    def _search_postgres(self, query: str, limit: int, include_messages: bool) -> List[Dict[str, Any]]:
+        # El ranking se hace sobre el índice GIN y solo los top-N pasan por ts_headline,
+        # que es la parte costosa (re-tokeniza el texto original). El texto se escapa
+        # antes: el dashboard muestra el snippet como HTML y solo <mark> debe ser marcado.
+        headline_opts = (
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+            "MaxFragments=2, MaxWords=20, MinWords=5"
+        )
+        params = {"q": query, "limit": limit, "opts": headline_opts}
+        case_sql = f"""
+            WITH q AS (SELECT websearch_to_tsquery('{SEARCH_CONFIG}', :q) AS query),
+            top AS (
+                SELECT c.id, ts_rank_cd(c.search_vector, q.query) AS rank
+                FROM cases c, q
+                WHERE c.search_vector @@ q.query
+                ORDER BY rank DESC
+                LIMIT :limit
+            )
+            SELECT top.id AS case_id, NULL AS message_id, top.rank,
+                   ts_headline('{SEARCH_CONFIG}', {_sql_html_escape(CASE_HEADLINE_SOURCE)}, q.query, :opts) AS snippet
+            FROM top JOIN cases USING (id), q
+        """
+        hits = [dict(r._mapping, source="case") for r in self.db.execute(text(case_sql), params)]
+        if include_messages:
+            message_sql = f"""
+                WITH q AS (SELECT websearch_to_tsquery('{SEARCH_CONFIG}', :q) AS query),
+                top AS (
+                    SELECT m.id, m.case_id, ts_rank_cd(m.search_vector, q.query) AS rank
+                    FROM messages m, q
+                    WHERE m.search_vector @@ q.query
+                    ORDER BY rank DESC
+                    LIMIT :limit
+                )
+                SELECT top.case_id, top.id AS message_id, top.rank,
+                       ts_headline('{SEARCH_CONFIG}', {_sql_html_escape('messages.content')}, q.query, :opts) AS snippet
+                FROM top JOIN messages ON messages.id = top.id, q
+            """
+            hits.extend(dict(r._mapping, source="message") for r in self.db.execute(text(message_sql), params))
+        return hits
+
+    def _search_fallback(self, query: str, limit: int, include_messages: bool) -> List[Dict[str, Any]]:
+        term = f"%{query}%"
+        fields = [getattr(Case, f) for fields in CASE_WEIGHTED_FIELDS.values() for f in fields]
+        hits = []
+        for case in self.db.query(Case).filter(or_(*[f.ilike(term) for f in fields])).limit(limit).all():
+            source_text = " ".join(str(getattr(case, f.key)) for f in fields if getattr(case, f.key))
+            hits.append({
+                "case_id": case.id,
+                "message_id": None,
+                "rank": 1.0,
+                "snippet": _highlight(source_text, query),
+                "source": "case",
+            })
+        if include_messages:
+            rows = (
+                self.db.query(Message)
+                .filter(Message.content.ilike(term))
+                .order_by(Message.created_at.desc())
+                .limit(limit)
+                .all()
+            )
+            for m in rows:
+                hits.append({
+                    "case_id": m.case_id,
+                    "message_id": m.id,
+                    "rank": 0.5,
+                    "snippet": _highlight(m.content or "", query),
+                    "source": "message",
+                })
+        return hits
+
+    def _group_by_case(self, hits: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        grouped: Dict[int, Dict[str, Any]] = {}
+        for hit in hits:
+            entry = grouped.setdefault(hit["case_id"], {"case_id": hit["case_id"], "rank": 0.0, "matches": []})
+            entry["rank"] = max(entry["rank"], float(hit["rank"] or 0.0))
+            entry["matches"].append({
+                "source": hit["source"],
+                "message_id": hit["message_id"],
+                "snippet": hit["snippet"],
+            })
+        ranked = sorted(grouped.values(), key=lambda e: e["rank"], reverse=True)[:limit]
+        if not ranked:
+            return ranked
+        # Datos mínimos del caso para mostrar en el dashboard, en una sola consulta
+        cases = {
+            c.id: c for c in self.db.query(Case).filter(Case.id.in_([e["case_id"] for e in ranked])).all()
+        }
+        for entry in ranked:
+            case = cases.get(entry["case_id"])
+            entry["nombre"] = case.nombre if case else None
+            entry["dni"] = case.dni if case else None
+            entry["status"] = case.status if case else None
+            entry["phase"] = case.phase if case else None
+        return ranked
+
+
+def _highlight(source: str, query: str, width: int = 80) -> str:
+    """Recorta un fragmento alrededor de la coincidencia y la resalta (HTML escapado salvo <mark>)."""
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    match = pattern.search(source)
+    if not match:
+        return html.escape(source[:width], quote=False)
+    start = max(0, match.start() - width // 2)
+    end = min(len(source), match.end() + width // 2)
+    fragment = source[start:end]
+    parts, cursor = [], 0
+    for m in pattern.finditer(fragment):
+        parts += [
+            html.escape(fragment[cursor:m.start()], quote=False),
+            HIGHLIGHT_START, html.escape(m.group(0), quote=False), HIGHLIGHT_STOP,
+        ]
+        cursor = m.end()
+    parts.append(html.escape(fragment[cursor:], quote=False))
+    return "".join(parts)
@@ -0,0 +1,195 @@
+"""
+Armado del contexto de los prompts con presupuesto de tokens.
+
+Cada nivel de memoria es una sección con prioridad y una porción reservada
+del presupuesto (según `task_type`, ver `context_token_budgets`). Las
+porciones que una sección no usa pasan a las siguientes en orden de
+prioridad. Dentro de su asignación cada sección se recorta a su manera:
+- conversación reciente: se conservan los mensajes más nuevos;
+- datos del caso: JSON compacto, sin valores vacíos;
+- conocimiento legal y episodios: resumen extractivo, con las oraciones que
+  más palabras comparten con la consulta, en su orden original.
+"""
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import structlog
+
+from core.config import settings
+
+logger = structlog.get_logger()
+
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+_WORD_RE = re.compile(r"[^\W\d_]{4,}", re.UNICODE)
+_ELLIPSIS = "…"
+
+
+def count_tokens(text: str) -> int:
+    """Estimación rápida de tokens BPE sin tokenizador externo.
+
+    Palabras: ~1 token cada 5 letras (el español parte más que el inglés);
+    números: 1 cada 3 dígitos; cada signo de puntuación, 1.
+    """
+    total = 0
+    for piece in _TOKEN_RE.findall(text or ""):
+        if piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        elif piece[0].isalpha():
+            total += math.ceil(len(piece) / 5)
+        else:
+            total += 1
+    return total
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Corta `text` en un límite de palabra para que entre en `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:mid])) + 1 <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return " ".join(words[:low]) + _ELLIPSIS if low else ""
+
+
+def _keywords(text: str) -> set:
+    return {w.lower() for w in _WORD_RE.findall(text or "")}
+
+
+def summarize_extractive(text: str, query: str, max_tokens: int) -> str:
+    """Oraciones de `text` más afines a `query` (en orden original) hasta `max_tokens`."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+    terms = _keywords(query)
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: (-len(_keywords(sentences[i]) & terms), i),
+    )
+    chosen, used = [], 0
+    for index in ranked:
+        cost = count_tokens(sentences[index]) + 1
+        if used + cost <= max_tokens:
+            chosen.append(index)
+            used += cost
+    if not chosen:
+        return truncate_to_tokens(sentences[ranked[0]], max_tokens)
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def compact_json(data: Dict[str, Any]) -> str:
+    """JSON sin indentación ni espacios, omitiendo valores vacíos."""
+    cleaned = {k: v for k, v in data.items() if v not in (None, "", [], {})}
+    return json.dumps(cleaned, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+@dataclass
+class ContextSection:
+    """Nivel de memoria a incluir. `items` van del más al menos importante."""
+    name: str
+    title: str
+    items: List[str]
+    share: float
+    mode: str = "truncate"  # truncate | recent | extractive
+    joiner: str = "\n"
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    tokens: int
+    budget: int
+    sections: Dict[str, int] = field(default_factory=dict)
+    trimmed: List[str] = field(default_factory=list)
+
+
+def _budgets() -> Dict[str, int]:
+    try:
+        return json.loads(settings.context_token_budgets) if settings.context_token_budgets else {}
+    except ValueError:
+        logger.warning("context_token_budgets_invalid")
+        return {}
+
+
+def budget_for(task_type: str) -> int:
+    return int(_budgets().get(task_type, settings.context_token_budget_default))
+
+
+class ContextAssembler:
+    """Reparte un presupuesto de tokens entre secciones y las recorta para que entren."""
+
+    def __init__(self, budget: int, query: str = ""):
+        self.budget = budget
+        self.query = query
+
+    def _render(self, section: ContextSection, items: List[str]) -> str:
+        return f"## {section.title}:\n" + section.joiner.join(items)
+
+    def _fit(self, section: ContextSection, allowance: int) -> List[str]:
+        """Items de la sección recortados para que el bloque completo entre en `allowance`."""
+        available = allowance - count_tokens(self._render(section, []))
+        if available <= 0:
+            return []
+        sep = count_tokens(section.joiner) or 1
+        if section.mode == "recent":
+            # Los más nuevos están al final; se descartan los más viejos
+            kept, used = [], 0
+            for item in reversed(section.items):
+                cost = count_tokens(item) + sep
+                if used + cost > available:
+                    if not kept:
+                        kept.append(truncate_to_tokens(item, available - sep))
+                    break
+                kept.append(item)
+                used += cost
+            return [k for k in reversed(kept) if k]
+        fitted, used = [], 0
+        for item in section.items:
+            remaining = available - used - sep
+            if remaining <= 0:
+                break
+            if section.mode == "extractive":
+                piece = summarize_extractive(item, self.query, remaining)
+            else:
+                piece = truncate_to_tokens(item, remaining)
+            if piece:
+                fitted.append(piece)
+                used += count_tokens(piece) + sep
+        return fitted
+
+    def assemble(self, sections: List[ContextSection]) -> AssembledContext:
+        sections = [s for s in sections if s.items]
+        needs = {s.name: count_tokens(self._render(s, s.items)) for s in sections}
+
+        # 1) Porción reservada de cada sección; 2) lo que sobra, en orden de prioridad
+        allowance = {s.name: min(needs[s.name], int(self.budget * s.share)) for s in sections}
+        spare = self.budget - sum(allowance.values())
+        for s in sections:
+            extra = min(max(spare, 0), needs[s.name] - allowance[s.name])
+            allowance[s.name] += extra
+            spare -= extra
+
+        blocks, report, trimmed = [], {}, []
+        for s in sections:
+            if allowance[s.name] >= needs[s.name]:
+                items = s.items
+            else:
+                items = self._fit(s, allowance[s.name])
+                trimmed.append(s.name)
+            if items:
+                block = self._render(s, items)
+                blocks.append(block)
+                report[s.name] = count_tokens(block)
+
+        text = "\n\n".join(blocks)
+        return AssembledContext(text=text, tokens=count_tokens(text), budget=self.budget, sections=report, trimmed=trimmed)
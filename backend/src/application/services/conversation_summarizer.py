@@ -0,0 +1,158 @@
+"""
+Resumen incremental de conversaciones largas.
+
+El historial completo vive en `messages`, pero el contexto del LLM solo ve la
+memoria inmediata (últimos mensajes) y los episodios más afines a la
+consulta. Para que los datos viejos sigan siendo recuperables sin que el
+contexto crezca, los mensajes que ya salieron de la ventana inmediata se
+pliegan, por tramos, en memorias episódicas con embedding.
+
+`Case.summarized_through_message_id` marca hasta qué mensaje se resumió. Se
+dispara cada `summary_every_turns` turnos pendientes o cuando esos mensajes
+superan `summary_token_threshold` tokens; corre en el worker (cola bulk).
+"""
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from application.services.context_assembler import count_tokens, truncate_to_tokens
+from application.services.memory_service import MemoryService
+from core.config import settings
+from infrastructure.persistence.models import Case, Memory, Message
+
+logger = structlog.get_logger()
+
+_PROMPT = """Estás resumiendo una conversación de WhatsApp entre una persona y el asistente de la \
+Defensoría Civil sobre un trámite de divorcio.
+
+{previous}Mensajes a resumir:
+{conversation}
+
+Escribí un resumen de 3 a 5 oraciones de estos mensajes. Conservá los hechos concretos (nombres,
+fechas, montos, domicilios, hijos, bienes, documentos enviados, decisiones y dudas pendientes).
+No inventes nada que no esté en los mensajes.
+
+Resumen:"""
+
+
+class ConversationSummarizer:
+    """Pliega los mensajes viejos de un caso en resúmenes episódicos."""
+
+    def __init__(self, db: Session, memory: Optional[MemoryService] = None):
+        self.db = db
+        self.memory = memory or MemoryService(db)
+        self.keep_recent = settings.summary_keep_recent_messages
+        self.chunk_size = settings.summary_max_messages_per_chunk
+
+    def _pending_query(self, case_id: int, watermark: Optional[int]):
+        query = self.db.query(Message).filter(Message.case_id == case_id)
+        if watermark:
+            query = query.filter(Message.id > watermark)
+        return query
+
+    def pending_stats(self, case_id: int, watermark: Optional[int]) -> Dict[str, int]:
+        """Mensajes sin resumir fuera de la ventana inmediata y sus tokens aproximados (una query)."""
+        count, chars = (
+            self._pending_query(case_id, watermark)
+            .with_entities(func.count(Message.id), func.sum(func.length(Message.content)))
+            .one()
+        )
+        count = int(count or 0)
+        # Los últimos keep_recent mensajes siguen en la memoria inmediata
+        outside = max(count - self.keep_recent, 0)
+        tokens = int((chars or 0) * outside / count / 4) if count else 0
+        return {"messages": outside, "tokens": tokens}
+
+    @staticmethod
+    def is_due(stats: Dict[str, int]) -> bool:
+        return (
+            stats["messages"] >= 2 * settings.summary_every_turns
+            or (stats["messages"] > 0 and stats["tokens"] >= settings.summary_token_threshold)
+        )
+
+    def should_summarize(self, case: Case) -> bool:
+        return self.is_due(self.pending_stats(case.id, case.summarized_through_message_id))
+
+    def _previous_summary(self, case_id: int) -> Optional[str]:
+        latest = (
+            self.db.query(Memory.content)
+            .filter(Memory.case_id == case_id, Memory.kind == "episodic")
+            .order_by(Memory.created_at.desc(), Memory.id.desc())
+            .first()
+        )
+        return latest[0] if latest else None
+
+    def _chunk(self, case_id: int, watermark: Optional[int]) -> List[Message]:
+        """Próximo tramo a resumir: mensajes sin resumir fuera de la ventana inmediata."""
+        ids = [
+            row[0]
+            for row in self._pending_query(case_id, watermark)
+            .with_entities(Message.id)
+            .order_by(Message.id.desc())
+            .offset(self.keep_recent)
+            .all()
+        ]
+        if not ids:
+            return []
+        ids = sorted(ids)[: self.chunk_size]
+        return self.db.query(Message).filter(Message.id.in_(ids)).order_by(Message.id).all()
+
+    def _prompt(self, messages: List[Message], previous: Optional[str]) -> str:
+        lines = [f"{'Usuario' if m.role == 'user' else 'Asistente'}: {m.content or ''}" for m in messages]
+        conversation = truncate_to_tokens("\n".join(lines), settings.summary_token_threshold * 2)
+        prefix = f"Resumen de lo anterior (solo para continuidad):\n{previous}\n\n" if previous else ""
+        return _PROMPT.format(previous=prefix, conversation=conversation)
+
+    async def summarize_pending(self, case_id: int, force: bool = False) -> Dict[str, Any]:
+        """
+        Resume los tramos pendientes del caso. Sin `force` solo actúa si se
+        alcanzó algún umbral. Si otro proceso avanzó la marca mientras tanto,
+        descarta su tramo (compare-and-set sobre la marca).
+        """
+        case = self.db.query(Case).get(case_id)
+        if case is None:
+            return {"case_id": case_id, "summaries": 0}
+        if not force and not self.should_summarize(case):
+            return {"case_id": case_id, "summaries": 0}
+
+        summaries = 0
+        folded = 0
+        watermark = case.summarized_through_message_id
+        while True:
+            chunk = self._chunk(case_id, watermark)
+            if not chunk:
+                break
+            summary = (await self.memory.llm.chat(
+                [{"role": "user", "content": self._prompt(chunk, self._previous_summary(case_id))}]
+            )).strip()
+            if not summary:
+                break
+            await self.memory.store_episodic_memory(case_id, summary, commit=False)
+            new_watermark = chunk[-1].id
+            advanced = self.db.execute(
+                update(Case)
+                .where(Case.id == case_id)
+                .where(
+                    Case.summarized_through_message_id.is_(None) if watermark is None
+                    else Case.summarized_through_message_id == watermark
+                )
+                .values(summarized_through_message_id=new_watermark)
+            ).rowcount
+            if not advanced:
+                self.db.rollback()
+                logger.info("conversation_summary_superseded", case_id=case_id)
+                break
+            self.db.commit()
+            summaries += 1
+            folded += len(chunk)
+            watermark = new_watermark
+            logger.info(
+                "conversation_summary_stored",
+                case_id=case_id,
+                messages=len(chunk),
+                through_message_id=new_watermark,
+                summary_tokens=count_tokens(summary),
+            )
+        return {"case_id": case_id, "summaries": summaries, "messages": folded, "through_message_id": watermark}
@@ -0,0 +1,216 @@
+"""
+División de documentos legales en fragmentos para la base de conocimiento.
+
+Los fragmentos siguen la estructura del documento en lugar de cortar cada N
+caracteres:
+- Markdown: una sección por encabezado (#, ##, ...), con la ruta de
+  encabezados como `section` ("I. MARCO LEGAL › A. Código Civil");
+- JSON: un fragmento por objeto que entre en el límite, con la ruta de claves
+  como `section`; los objetos grandes se dividen por sus claves;
+- texto plano: por párrafos.
+
+El límite es en tokens (`count_tokens`, el mismo estimador del armado de
+contexto). Una sección que no entra se parte por párrafos, luego por líneas
+y oraciones; cada continuación repite el encabezado y arrastra las últimas
+unidades del fragmento anterior (`overlap_tokens`) para no perder contexto
+en el corte.
+"""
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, List
+
+from application.services.context_assembler import count_tokens, truncate_to_tokens
+
+SECTION_SEPARATOR = " › "
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+")
+
+
+@dataclass
+class DocumentChunk:
+    section: str
+    content: str
+
+    def content_hash(self, salt: str = "") -> str:
+        """sha256 de sección + contenido (+ `salt`, p. ej. el modelo de embeddings)."""
+        return hashlib.sha256(f"{salt}\n{self.section}\n{self.content}".encode("utf-8")).hexdigest()
+
+
+def _clean_heading(text: str) -> str:
+    return re.sub(r"[*_`]", "", text).strip()
+
+
+def _split_unit(unit: str, max_tokens: int) -> List[str]:
+    """Parte una unidad que no entra: por líneas, después por oraciones, y en última instancia por palabras."""
+    if count_tokens(unit) <= max_tokens:
+        return [unit]
+    for pattern in ("\n", _SENTENCE_RE):
+        parts = [p for p in (unit.split(pattern) if pattern == "\n" else pattern.split(unit)) if p.strip()]
+        if len(parts) > 1:
+            return [piece for part in parts for piece in _split_unit(part, max_tokens)]
+    pieces, rest = [], unit
+    while rest and count_tokens(rest) > max_tokens:
+        piece = truncate_to_tokens(rest, max_tokens).rstrip("…")
+        if not piece:
+            break
+        pieces.append(piece)
+        rest = rest[len(piece):].lstrip()
+    return pieces + ([rest] if rest else [])
+
+
+def pack_units(
+    units: List[str], max_tokens: int, overlap_tokens: int = 0, header: str = "", joiner: str = "\n\n"
+) -> List[str]:
+    """Agrupa unidades (párrafos, líneas) en fragmentos de hasta `max_tokens`.
+
+    `header` encabeza cada fragmento; las continuaciones arrastran las últimas
+    unidades del anterior hasta `overlap_tokens`.
+    """
+    header_tokens = count_tokens(header) + 1 if header else 0
+    budget = max(max_tokens - header_tokens, 1)
+    pieces = [piece for unit in units if unit.strip() for piece in _split_unit(unit.strip("\n").rstrip(), budget)]
+
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for piece in pieces:
+        cost = count_tokens(piece) + 1
+        if current and used + cost > budget:
+            chunks.append(current)
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                previous_tokens = count_tokens(previous) + 1
+                if carried_tokens + previous_tokens > overlap_tokens or carried_tokens + previous_tokens + cost > budget:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            current, used = carried, carried_tokens
+        current.append(piece)
+        used += cost
+    if current:
+        chunks.append(current)
+    return [(f"{header}\n\n" if header else "") + joiner.join(chunk) for chunk in chunks]
+
+
+def chunk_markdown(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[DocumentChunk]:
+    """Un fragmento (o varios, si no entra) por sección de encabezado Markdown.
+
+    Si el documento tiene un único encabezado de nivel 1 (su título), no se
+    repite en la ruta de cada sección.
+    """
+    chunks: List[DocumentChunk] = []
+    headings = {}  # índice de línea -> (nivel, título); se ignoran los bloques de código
+    lines = (text or "").splitlines()
+    in_code = False
+    for index, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else _HEADING_RE.match(line)
+        if match:
+            headings[index] = (len(match.group(1)), _clean_heading(match.group(2)))
+    skip_level = 1 if sum(1 for level, _ in headings.values() if level == 1) == 1 else 0
+    stack: List[tuple] = []  # (nivel, título)
+    heading_line = ""
+    body: List[str] = []
+
+    def flush():
+        paragraphs = [p for p in re.split(r"\n\s*\n", "\n".join(body)) if p.strip() and not _RULE_RE.match(p)]
+        if not paragraphs:
+            return
+        section = SECTION_SEPARATOR.join(title for level, title in stack if level != skip_level)
+        for content in pack_units(paragraphs, max_tokens, overlap_tokens, header=heading_line):
+            chunks.append(DocumentChunk(section=section, content=content))
+
+    for index, line in enumerate(lines):
+        if index not in headings:
+            body.append(line)
+            continue
+        flush()
+        level, title = headings[index]
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, title))
+        heading_line, body = line.strip(), []
+    flush()
+    return chunks
+
+
+def _label(key: Any) -> str:
+    # Claves como PROCEDIMIENTO_CORRECTO_LEY_9120: separar para que "Ley 9120" sea buscable
+    return str(key).replace("_", " ").strip()
+
+
+def _render(value: Any, indent: int = 0) -> List[str]:
+    pad = "  " * indent
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            if isinstance(item, (dict, list)) and item:
+                lines.append(f"{pad}{_label(key)}:")
+                lines.extend(_render(item, indent + 1))
+            else:
+                lines.append(f"{pad}{_label(key)}: {item}")
+        return lines
+    if isinstance(value, list):
+        lines = []
+        for item in value:
+            if isinstance(item, (dict, list)) and item:
+                nested = _render(item, indent + 1)
+                lines.append(f"{pad}- {nested[0].strip()}")
+                lines.extend(nested[1:])
+            else:
+                lines.append(f"{pad}- {item}")
+        return lines
+    return [f"{pad}{value}"]
+
+
+def chunk_json(data: Any, max_tokens: int, overlap_tokens: int = 0) -> List[DocumentChunk]:
+    """Un fragmento por objeto JSON que entre en el límite; los grandes se dividen por claves."""
+    chunks: List[DocumentChunk] = []
+
+    def emit(path: List[str], lines: List[str]):
+        section = SECTION_SEPARATOR.join(path)
+        for content in pack_units(lines, max_tokens, overlap_tokens, header=section, joiner="\n"):
+            chunks.append(DocumentChunk(section=section, content=content))
+
+    def walk(value: Any, path: List[str]):
+        lines = _render(value)
+        header = SECTION_SEPARATOR.join(path)
+        if count_tokens("\n".join(lines)) + count_tokens(header) + 1 <= max_tokens or not isinstance(value, (dict, list)):
+            if any(line.strip() for line in lines):
+                emit(path, lines)
+            return
+        items = list(value.items()) if isinstance(value, dict) else [(f"[{i + 1}]", v) for i, v in enumerate(value)]
+        nested = [(key, item) for key, item in items if isinstance(item, (dict, list)) and item]
+        scalars = [
+            f"{_label(key)}: {item}" if isinstance(value, dict) else f"- {item}"
+            for key, item in items if not (isinstance(item, (dict, list)) and item)
+        ]
+        if scalars:
+            emit(path, scalars)
+        for key, item in nested:
+            walk(item, path + [_label(key)])
+
+    walk(data, [])
+    return chunks
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[DocumentChunk]:
+    paragraphs = [p for p in re.split(r"\n\s*\n", text or "") if p.strip()]
+    return [DocumentChunk(section="", content=c) for c in pack_units(paragraphs, max_tokens, overlap_tokens)]
+
+
+def chunk_document(content: str, content_format: str, max_tokens: int, overlap_tokens: int = 0) -> List[DocumentChunk]:
+    """Fragmentos de `content` según su formato: markdown | json | text."""
+    if content_format == "markdown":
+        return chunk_markdown(content, max_tokens, overlap_tokens)
+    if content_format == "json":
+        data = json.loads(content) if isinstance(content, str) else content
+        return chunk_json(data, max_tokens, overlap_tokens)
+    if content_format == "text":
+        return chunk_text(content, max_tokens, overlap_tokens)
+    raise ValueError(f"formato de documento desconocido: {content_format}")
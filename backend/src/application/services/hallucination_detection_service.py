@@ -1,11 +1,107 @@
 import re
 import json
+import time
 import structlog
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 
 logger = structlog.get_logger()
 
+# Lugares conocidos de Mendoza que no cuentan como nombres propios inventados
+_KNOWN_PLACES = frozenset({"san rafael", "mendoza", "argentina", "defensoría"})
+_URL_PATTERN = r"https?://[^\s]+"
+_PROPER_NOUN_PATTERN = r"\b[A-Z][a-z]+\s+[A-Z][a-z]+\b"
+# Preguntas cuya respuesta exacta el asistente no puede conocer
+_IMPOSSIBLE_QUESTION_PATTERNS = (
+    r"cuánto (tiempo|demora|tarda)",
+    r"cuándo (va a|se va a)",
+    r"qué (día|fecha) exacta",
+)
+
+
+class _RuleSet:
+    """
+    Reglas del chequeo compiladas una vez por proceso.
+
+    Acceso a sistemas y datos específicos van en una sola alternancia con
+    grupos con nombre (`finditer` + `lastgroup`); URLs y nombres propios se
+    buscan cada uno en su propia pasada, como antes. Si compartieran la
+    alternancia, un nombre propio se comería el comienzo de un dato ("Primer
+    Juzgado 5" taparía "Juzgado 5") y una URL los dígitos que contiene.
+    """
+
+    def __init__(self, claims: Tuple[str, ...], data: Tuple[str, ...], uncertainty: Tuple[str, ...]):
+        alternatives = [f"(?P<claim{i}>(?i:{p}))" for i, p in enumerate(claims)]
+        alternatives += [f"(?P<data{i}>(?i:{p}))" for i, p in enumerate(data)]
+        self.scanner = re.compile("|".join(alternatives))
+        self.urls = re.compile(_URL_PATTERN)
+        self.nouns = re.compile(_PROPER_NOUN_PATTERN)
+        self.uncertainty = re.compile("|".join(re.escape(w) for w in uncertainty), re.IGNORECASE)
+        self.questions = re.compile(
+            "|".join(f"(?P<q{i}>{p})" for i, p in enumerate(_IMPOSSIBLE_QUESTION_PATTERNS)), re.IGNORECASE
+        )
+
+    def scan(self, response: str) -> Tuple[List[str], List[Tuple[int, str]], List[str], List[str]]:
+        """(patrones de acceso a sistemas, [(índice de patrón, dato)], URLs, nombres propios)."""
+        claims: Dict[str, None] = {}
+        data: List[Tuple[int, str]] = []
+        for match in self.scanner.finditer(response):
+            group = match.lastgroup or ""
+            if group.startswith("claim"):
+                claims[group] = None  # una marca por patrón, aunque aparezca varias veces
+            else:
+                data.append((int(group[4:]), match.group()))
+        # Datos en el orden de los patrones, como si se buscara patrón por patrón
+        data.sort(key=lambda item: item[0])
+        claim_names = sorted(claims, key=lambda name: int(name[5:]))
+        return claim_names, data, self.urls.findall(response), self.nouns.findall(response)
+
+    def impossible_questions(self, question: str) -> List[str]:
+        """Patrones de pregunta imposible presentes en `question` (uno por patrón)."""
+        return list(dict.fromkeys(m.lastgroup for m in self.questions.finditer(question or "")))
+
+
+@lru_cache(maxsize=8)
+def _compile_rules(claims: Tuple[str, ...], data: Tuple[str, ...], uncertainty: Tuple[str, ...]) -> _RuleSet:
+    return _RuleSet(claims, data, uncertainty)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class _KnownText:
+    """
+    Contexto y pregunta preparados una vez para verificar si un dato aparece.
+
+    Los textos se pasan a minúsculas una sola vez y cada frase distinta se
+    busca una sola vez (`str.find`, en C) aunque la respuesta la repita; la
+    coincidencia debe ser de palabras completas, así "12345678" no está en
+    "123456789".
+    """
+
+    def __init__(self, *texts: Optional[str]):
+        self._texts = [(text or "").lower() for text in texts]
+        self._seen: Dict[str, bool] = {}
+
+    def __contains__(self, phrase: str) -> bool:
+        key = phrase.lower()
+        if key not in self._seen:
+            self._seen[key] = bool(key) and any(self._find(text, key) for text in self._texts)
+        return self._seen[key]
+
+    @staticmethod
+    def _find(text: str, key: str) -> bool:
+        start = text.find(key)
+        while start != -1:
+            end = start + len(key)
+            if (start == 0 or not _is_word_char(text[start - 1])) and (end == len(text) or not _is_word_char(text[end])):
+                return True
+            start = text.find(key, start + 1)
+        return False
+
+
 @dataclass
 class HallucinationCheckResult:
     """Resultado de verificación de alucinación"""
@@ -54,8 +150,12 @@ class HallucinationDetectionService:
     ]
     
     def __init__(self, llm_router=None):
-        self.compiled_patterns = [re.compile(p, re.IGNORECASE) for p in self.HALLUCINATION_PATTERNS]
-        self.data_patterns = [re.compile(p, re.IGNORECASE) for p in self.SPECIFIC_DATA_PATTERNS]
+        # Reglas compiladas una vez por proceso (por combinación de patrones)
+        self.rules = _compile_rules(
+            tuple(self.HALLUCINATION_PATTERNS),
+            tuple(self.SPECIFIC_DATA_PATTERNS),
+            tuple(self.UNCERTAINTY_INDICATORS),
+        )
         
         # LLMRouter para validación semántica avanzada (opcional)
         self.llm_router = llm_router
@@ -75,64 +175,59 @@ class HallucinationDetectionService:
             context: Contexto proporcionado al LLM
             question: Pregunta original del usuario
         """
+        start = time.perf_counter()
         flags = []
         confidence = 1.0
-        
+        rules = self.rules
+
+        # Acceso a sistemas y datos en una pasada; URLs y nombres propios aparte
+        claims, data, urls, nouns = rules.scan(response)
+        # Pregunta (corta) primero; contexto y pregunta se preparan solo si hay datos que verificar
+        known = _KnownText(question, context) if data else None
+
         # 1. Verificar patrones sospechosos de alucinación
-        for pattern in self.compiled_patterns:
-            if pattern.search(response):
-                flags.append("claims_system_access")
-                confidence -= 0.3
-        
+        for _ in claims:
+            flags.append("claims_system_access")
+            confidence -= 0.3
+
         # 2. Verificar si menciona datos específicos no presentes en contexto NI en la pregunta original
-        for pattern in self.data_patterns:
-            matches = pattern.findall(response)
-            for match in matches:
-                # Si el dato aparece en el contexto O en la pregunta del usuario,
-                # asumimos que el asistente solo lo está reutilizando y NO lo marcamos como inventado.
-                if match in context or match in question:
-                    continue
-                flags.append(f"invents_specific_data:{match}")
-                confidence -= 0.4
-        
+        for _, match in data:
+            # Si el dato aparece en el contexto O en la pregunta del usuario,
+            # asumimos que el asistente solo lo está reutilizando y NO lo marcamos como inventado.
+            if match in known:
+                continue
+            flags.append(f"invents_specific_data:{match}")
+            confidence -= 0.4
+
         # 3. Verificar URLs o referencias inventadas
-        url_pattern = re.compile(r"https?://[^\s]+")
-        urls = url_pattern.findall(response)
         if urls:
             flags.append("mentions_urls")
             confidence -= 0.2
-        
-        # 4. Verificar nombres propios no en contexto (excepto lugares conocidos de Mendoza)
-        known_places = ["san rafael", "mendoza", "argentina", "defensoría"]
-        capitalized_words = re.findall(r"\b[A-Z][a-z]+\s+[A-Z][a-z]+\b", response)
-        for word in capitalized_words:
-            if word.lower() not in known_places and word not in context:
+
+        # 4. Verificar nombres propios no en contexto (excepto lugares conocidos de Mendoza).
+        # Solo el contexto y tal cual se escribió: un nombre que aparece únicamente en la
+        # pregunta del usuario, o con otras mayúsculas, no está verificado.
+        for word in nouns:
+            if word.lower() not in _KNOWN_PLACES and word not in (context or ""):
                 flags.append(f"unknown_proper_noun:{word}")
                 confidence -= 0.1
-        
+
         # 5. POSITIVO: Verificar indicadores de incertidumbre apropiada
-        uncertainty_count = sum(1 for ind in self.UNCERTAINTY_INDICATORS if ind in response.lower())
-        if uncertainty_count > 0:
+        if rules.uncertainty.search(response):
             confidence += 0.1  # Bonus por expresar incertidumbre
-        
+
         # 6. Verificar longitud excesiva (posible sobre-elaboración)
         if len(response.split()) > 300:
             flags.append("excessive_length")
             confidence -= 0.1
-        
+
         # 7. Verificar si responde a pregunta que no puede responder
-        impossible_questions = [
-            r"cuánto (tiempo|demora|tarda)",
-            r"cuándo (va a|se va a)",
-            r"qué (día|fecha) exacta"
-        ]
-        for pattern_str in impossible_questions:
-            if re.search(pattern_str, question.lower()):
-                # Verificar si responde con fecha/tiempo específico sin datos
-                if any(p.search(response) for p in self.data_patterns[:2]):
-                    flags.append("answers_impossible_question")
-                    confidence -= 0.5
-        
+        # (con DNI o fecha concreta: los dos primeros patrones de datos)
+        if any(index < 2 for index, _ in data):
+            for _ in rules.impossible_questions(question):
+                flags.append("answers_impossible_question")
+                confidence -= 0.5
+
         # Normalizar confidence
         confidence = max(0.0, min(1.0, confidence))
         
@@ -144,7 +239,9 @@ class HallucinationDetectionService:
             "hallucination_check",
             is_valid=is_valid,
             confidence=confidence,
-            flags=flags
+            flags=flags,
+            context_chars=len(context or ""),
+            duration_ms=round((time.perf_counter() - start) * 1000, 2),
         )
         
         return HallucinationCheckResult(
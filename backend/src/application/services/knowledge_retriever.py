@@ -0,0 +1,266 @@
+"""
+Recuperación híbrida sobre la base de conocimiento legal.
+
+La búsqueda vectorial sola pierde referencias exactas ("art. 438", "Ley 9120",
+"BLSG") porque el embedding de un número o una sigla dice poco. Se combinan
+dos recuperadores y se fusionan sus rankings con Reciprocal Rank Fusion
+(score = Σ 1 / (k + rank)), que no necesita normalizar puntajes de escalas
+distintas:
+- léxico: texto completo de PostgreSQL (`search_vector`, ts_rank_cd) o BM25
+  en Python en otros motores (SQLite en tests, tabla chica);
+- vectorial: pgvector o el índice en memoria (ver vector_index), según
+  `vector_search_backend`.
+
+Opcionalmente, un cross-encoder local (`knowledge_reranker_model`) reordena
+los candidatos fusionados en un hilo, con un tiempo máximo
+(`knowledge_rerank_timeout_ms`); si no llega, queda el orden de la fusión.
+"""
+import asyncio
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+from opentelemetry import trace
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from infrastructure.observability.tracing import set_attributes
+from infrastructure.persistence.fulltext import SEARCH_CONFIG
+from infrastructure.persistence.models import SemanticKnowledge
+from infrastructure.persistence.vector_index import knowledge_vector_search
+
+logger = structlog.get_logger()
+
+MODES = ("hybrid", "lexical", "vector")
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    "a", "al", "con", "como", "cual", "cuál", "de", "del", "el", "en", "es", "la", "las", "lo", "los",
+    "me", "mi", "o", "para", "por", "que", "qué", "se", "si", "sin", "su", "sus", "un", "una", "y",
+}
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_COLUMNS = (
+    SemanticKnowledge.id, SemanticKnowledge.title, SemanticKnowledge.content,
+    SemanticKnowledge.source, SemanticKnowledge.section,
+)
+
+
+def _normalize(term: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", term.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def query_terms(query: str) -> List[str]:
+    """Términos de búsqueda sin stopwords; los números se conservan ("438", "9120")."""
+    terms = []
+    for raw in _TERM_RE.findall(query or ""):
+        term = _normalize(raw)
+        if term in _STOPWORDS or (len(term) < 2 and not term.isdigit()):
+            continue
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fusiona rankings de ids (el mejor primero) en uno solo, ordenado por score RRF."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def bm25_rank(query: str, documents: Dict[int, str], limit: int) -> List[int]:
+    """Ranking BM25 de `documents` ({id: texto}) para `query`; solo ids con alguna coincidencia."""
+    terms = query_terms(query)
+    if not terms or not documents:
+        return []
+    tokenized = {doc_id: [_normalize(t) for t in _TERM_RE.findall(body or "")] for doc_id, body in documents.items()}
+    avg_len = sum(len(tokens) for tokens in tokenized.values()) / len(tokenized) or 1.0
+    frequency = Counter(term for tokens in tokenized.values() for term in set(tokens) if term in terms)
+    total = len(tokenized)
+    scored = []
+    for doc_id, tokens in tokenized.items():
+        counts = Counter(tokens)
+        score = 0.0
+        for term in terms:
+            tf = counts.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (total - frequency[term] + 0.5) / (frequency[term] + 0.5))
+            score += idf * tf * (_BM25_K1 + 1) / (tf + _BM25_K1 * (1 - _BM25_B + _BM25_B * len(tokens) / avg_len))
+        if score > 0:
+            scored.append((score, doc_id))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [doc_id for _, doc_id in scored[:limit]]
+
+
+# Cross-encoder cargado una vez por proceso (False = no disponible, no reintentar)
+_reranker: Any = None
+_reranker_lock = threading.Lock()
+
+
+def _load_reranker(model_name: str):
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            try:
+                from sentence_transformers import CrossEncoder
+                _reranker = CrossEncoder(model_name)
+                logger.info("knowledge_reranker_loaded", model=model_name)
+            except ImportError:
+                logger.warning("knowledge_reranker_unavailable", hint="pip install sentence-transformers")
+                _reranker = False
+            except Exception as e:
+                logger.warning("knowledge_reranker_load_failed", model=model_name, error=str(e))
+                _reranker = False
+        return _reranker or None
+
+
+class KnowledgeRetriever:
+    """Búsqueda híbrida (léxica + vectorial, RRF) con re-ranking opcional."""
+
+    def __init__(self, db: Session, candidates: Optional[int] = None, rrf_k: Optional[int] = None):
+        self.db = db
+        self.candidates = candidates or settings.knowledge_candidates
+        self.rrf_k = rrf_k or settings.knowledge_rrf_k
+
+    @property
+    def _is_postgres(self) -> bool:
+        return bool(self.db.bind and self.db.bind.dialect.name == "postgresql")  # type: ignore[attr-defined]
+
+    async def search(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]] = None,
+        limit: int = 3,
+        mode: str = "hybrid",
+    ) -> List[Dict[str, Any]]:
+        """
+        Top `limit` fragmentos para `query`. `mode` permite evaluar cada
+        recuperador por separado (ver scripts/evaluate_knowledge_retrieval.py).
+        """
+        if mode not in MODES:
+            raise ValueError(f"modo de búsqueda desconocido: {mode}")
+        start = time.perf_counter()
+        corpus = None if self._is_postgres else self._load_corpus()
+
+        lexical: List[int] = []
+        if mode != "vector":
+            lexical = self._lexical_postgres(query) if corpus is None else bm25_rank(
+                query, {doc_id: f"{row[0]}\n{row[0]}\n{row[1]}" for doc_id, row in corpus.items()},
+                self.candidates,
+            )
+        distances: Dict[int, float] = {}
+        if mode != "lexical" and query_embedding:
+            distances = knowledge_vector_search(self.db, query_embedding, self.candidates)
+
+        fused = reciprocal_rank_fusion([lexical, list(distances)], self.rrf_k)[: self.candidates]
+        hits = self._hydrate(fused, distances, set(lexical), corpus)
+        reranked = False
+        if settings.knowledge_reranker_model and len(hits) > 1:
+            hits, reranked = await self._rerank(query, hits)
+
+        set_attributes(trace.get_current_span(), {
+            "retrieval.mode": mode,
+            "retrieval.lexical_hits": len(lexical),
+            "retrieval.vector_hits": len(distances),
+            "retrieval.reranked": reranked,
+        })
+        logger.debug(
+            "knowledge_search",
+            mode=mode,
+            lexical_hits=len(lexical),
+            vector_hits=len(distances),
+            reranked=reranked,
+            duration_ms=int((time.perf_counter() - start) * 1000),
+        )
+        return hits[:limit]
+
+    def _lexical_postgres(self, query: str) -> List[int]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        # OR entre términos: ts_rank_cd premia a los fragmentos que tienen más de ellos
+        rows = self.db.execute(
+            text(f"""
+                SELECT id, ts_rank_cd(search_vector, q.query) AS rank
+                FROM semantic_knowledge, websearch_to_tsquery('{SEARCH_CONFIG}', :q) AS q(query)
+                WHERE search_vector @@ q.query
+                ORDER BY rank DESC, id
+                LIMIT :limit
+            """),
+            {"q": " or ".join(t for t in terms if t != "or"), "limit": self.candidates},
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _load_corpus(self) -> Dict[int, tuple]:
+        """(título, contenido, fuente, sección) por id: fuera de PostgreSQL la tabla es chica."""
+        return {row[0]: (row[1] or "", row[2] or "", row[3], row[4]) for row in self.db.query(*_COLUMNS).all()}
+
+    def _hydrate(
+        self,
+        fused: List[Tuple[int, float]],
+        distances: Dict[int, float],
+        lexical: set,
+        corpus: Optional[Dict[int, tuple]],
+    ) -> List[Dict[str, Any]]:
+        if not fused:
+            return []
+        if corpus is None:
+            rows = (
+                self.db.query(*_COLUMNS)
+                .filter(SemanticKnowledge.id.in_([doc_id for doc_id, _ in fused]))
+                .all()
+            )
+            corpus = {row[0]: (row[1] or "", row[2] or "", row[3], row[4]) for row in rows}
+        hits = []
+        for doc_id, score in fused:
+            if doc_id not in corpus:
+                continue
+            title, content, source, section = corpus[doc_id]
+            sources = [name for name, found in (("lexical", doc_id in lexical), ("vector", doc_id in distances)) if found]
+            hits.append({
+                "id": doc_id,
+                "title": title,
+                "content": content,
+                "source": source,
+                "section": section,
+                "distance": distances.get(doc_id),
+                "score": score,
+                "sources": sources,
+            })
+        return hits
+
+    async def _rerank(self, query: str, hits: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """Reordena con el cross-encoder en un hilo; si excede el tiempo, deja el orden RRF."""
+        def score() -> Optional[List[float]]:
+            model = _load_reranker(settings.knowledge_reranker_model)
+            if model is None:
+                return None
+            pairs = [(query, f"{hit['title']}\n{hit['content']}") for hit in hits]
+            return [float(s) for s in model.predict(pairs)]
+
+        try:
+            scores = await asyncio.wait_for(
+                asyncio.to_thread(score), timeout=settings.knowledge_rerank_timeout_ms / 1000
+            )
+        except asyncio.TimeoutError:
+            logger.warning("knowledge_rerank_timeout", timeout_ms=settings.knowledge_rerank_timeout_ms)
+            return hits, False
+        except Exception as e:
+            logger.warning("knowledge_rerank_failed", error=str(e))
+            return hits, False
+        if scores is None:
+            return hits, False
+        for hit, value in zip(hits, scores):
+            hit["rerank_score"] = value
+        return sorted(hits, key=lambda hit: -hit["rerank_score"]), True
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from infrastructure.ai.usage import usage_recorder
+from infrastructure.persistence.models import LLMUsage
+
+
+class LLMUsageService:
+    """
+    Agregados de consumo de LLMs (tokens, costo, duración) desde `llm_usage`.
+
+    Las filas se escriben por lotes, así que los totales pueden atrasar unos
+    segundos respecto de las últimas llamadas; `tokens_for_case` suma además
+    lo que sigue en el buffer del proceso para el chequeo de presupuesto.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _totals(self):
+        return (
+            func.count(LLMUsage.id),
+            func.sum(LLMUsage.prompt_tokens),
+            func.sum(LLMUsage.completion_tokens),
+            func.sum(LLMUsage.cost_usd),
+            func.sum(LLMUsage.duration_ms),
+        )
+
+    @staticmethod
+    def _row(calls, prompt_tokens, completion_tokens, cost, duration_ms) -> Dict[str, Any]:
+        prompt_tokens = int(prompt_tokens or 0)
+        completion_tokens = int(completion_tokens or 0)
+        return {
+            "calls": int(calls or 0),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cost_usd": round(cost, 6) if cost is not None else None,
+            "avg_duration_ms": int((duration_ms or 0) / calls) if calls else 0,
+        }
+
+    def _since(self, days: int) -> datetime:
+        return datetime.utcnow() - timedelta(days=days)
+
+    def tokens_for_case(self, case_id: int) -> int:
+        total = (
+            self.db.query(func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens))
+            .filter(LLMUsage.case_id == case_id)
+            .scalar()
+        )
+        return int(total or 0) + usage_recorder.pending_tokens(case_id)
+
+    def case_usage(self, case_id: int) -> Dict[str, Any]:
+        """Totales de un caso con desglose por tipo de tarea, fase y proveedor/modelo."""
+        base = self.db.query(*self._totals()).filter(LLMUsage.case_id == case_id)
+        result = {"case_id": case_id, **self._row(*base.one())}
+        for key, columns in (
+            ("by_task_type", (LLMUsage.task_type,)),
+            ("by_phase", (LLMUsage.phase,)),
+            ("by_model", (LLMUsage.provider, LLMUsage.model)),
+        ):
+            rows = (
+                self.db.query(*columns, *self._totals())
+                .filter(LLMUsage.case_id == case_id)
+                .group_by(*columns)
+                .all()
+            )
+            result[key] = [
+                {**dict(zip([c.key for c in columns], row[:len(columns)])), **self._row(*row[len(columns):])}
+                for row in rows
+            ]
+        return result
+
+    def top_cases(self, days: int = 30, limit: int = 20) -> List[Dict[str, Any]]:
+        """Casos con más tokens consumidos en los últimos N días."""
+        total = func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens)
+        rows = (
+            self.db.query(LLMUsage.case_id, *self._totals())
+            .filter(LLMUsage.case_id.isnot(None), LLMUsage.created_at >= self._since(days))
+            .group_by(LLMUsage.case_id)
+            .order_by(total.desc())
+            .limit(limit)
+            .all()
+        )
+        return [{"case_id": row[0], **self._row(*row[1:])} for row in rows]
+
+    def daily(self, days: int = 30) -> List[Dict[str, Any]]:
+        day = func.date(LLMUsage.created_at)
+        rows = (
+            self.db.query(day, *self._totals())
+            .filter(LLMUsage.created_at >= self._since(days))
+            .group_by(day)
+            .order_by(day)
+            .all()
+        )
+        return [{"date": str(row[0]), **self._row(*row[1:])} for row in rows]
+
+    def by_phase(self, days: int = 30) -> List[Dict[str, Any]]:
+        rows = (
+            self.db.query(LLMUsage.phase, *self._totals())
+            .filter(LLMUsage.created_at >= self._since(days))
+            .group_by(LLMUsage.phase)
+            .all()
+        )
+        items = [{"phase": row[0], **self._row(*row[1:])} for row in rows]
+        return sorted(items, key=lambda item: -item["total_tokens"])
+
+    def by_provider(self, days: int = 30, task_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Por proveedor/modelo/tarea, con la tasa de intentos fallidos."""
+        columns = (LLMUsage.provider, LLMUsage.model, LLMUsage.task_type)
+        query = (
+            self.db.query(*columns, *self._totals(), func.sum(case((LLMUsage.success.is_(False), 1), else_=0)))
+            .filter(LLMUsage.created_at >= self._since(days))
+        )
+        if task_type:
+            query = query.filter(LLMUsage.task_type == task_type)
+        items = []
+        for row in query.group_by(*columns).all():
+            item = {"provider": row[0], "model": row[1], "task_type": row[2], **self._row(*row[3:8])}
+            item["error_rate"] = round((row[8] or 0) / item["calls"], 4) if item["calls"] else 0.0
+            items.append(item)
+        return sorted(items, key=lambda item: -item["total_tokens"])
@@ -0,0 +1,71 @@
+from typing import Optional
+
+import structlog
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from application.interfaces.storage.media_store import MediaStore
+from infrastructure.persistence.models import MediaObject
+from infrastructure.storage.local_media_store import LocalMediaStore
+from infrastructure.storage.mime import sniff_mime
+
+logger = structlog.get_logger()
+
+
+class MediaService:
+    """
+    Persistencia de archivos de WhatsApp en el media store.
+
+    Los archivos se guardan al llegar (`save`); las vistas del dashboard los
+    leen del store sin volver a WAHA. `fetch` cubre archivos recibidos antes
+    de existir el store: los baja de WAHA una única vez y los guarda.
+    """
+
+    def __init__(self, db: Session, store: Optional[MediaStore] = None, whatsapp=None):
+        self.db = db
+        self.store = store or LocalMediaStore()
+        self._whatsapp = whatsapp
+
+    @property
+    def whatsapp(self):
+        if self._whatsapp is None:
+            from infrastructure.messaging.waha_service_impl import WAHAWhatsAppService
+            self._whatsapp = WAHAWhatsAppService()
+        return self._whatsapp
+
+    def get(self, media_id: str) -> Optional[MediaObject]:
+        return self.db.query(MediaObject).filter(MediaObject.media_id == media_id).first()
+
+    def save(self, media_id: str, data: bytes, declared_mime: Optional[str] = None) -> MediaObject:
+        digest = self.store.put(data)
+        mime_type = sniff_mime(data) or declared_mime or "application/octet-stream"
+        # Sesión propia: el registro queda confirmado (el worker de previews lo busca
+        # enseguida) sin confirmar ni deshacer lo que el llamador tenga pendiente
+        with Session(bind=self.db.get_bind(), autoflush=False) as db:
+            record = db.query(MediaObject).filter(MediaObject.media_id == media_id).first()
+            if record is None:
+                record = MediaObject(media_id=media_id)
+                db.add(record)
+            record.sha256 = digest
+            record.mime_type = mime_type
+            record.size = len(data)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Otro proceso guardó el mismo media_id en paralelo: mismo contenido
+                db.rollback()
+        # populate_existing: la sesión del llamador pudo tener cargada la versión anterior
+        return (
+            self.db.query(MediaObject)
+            .filter(MediaObject.media_id == media_id)
+            .populate_existing()
+            .one()
+        )
+
+    async def fetch(self, media_id: str) -> MediaObject:
+        record = self.get(media_id)
+        if record is not None and self.store.exists(record.sha256):
+            return record
+        logger.info("media_store_miss", media_id=media_id)
+        data = await self.whatsapp.download_media(media_id)
+        return self.save(media_id, data, record.mime_type if record else None)
@@ -1,13 +1,29 @@
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from infrastructure.persistence.models import Memory, SemanticKnowledge
+from infrastructure.persistence.models import Memory
 from infrastructure.persistence.repositories import MemoryRepository
 from infrastructure.ai.router import LLMRouter
-from sqlalchemy import text
+from infrastructure.observability.tracing import set_attributes, traced
+from application.services.context_assembler import (
+    AssembledContext,
+    ContextAssembler,
+    ContextSection,
+    budget_for,
+    compact_json,
+)
+from application.services.knowledge_retriever import KnowledgeRetriever
+from infrastructure.persistence.vector_index import episodic_vector_search
+from opentelemetry import trace
 import structlog
 
 logger = structlog.get_logger()
 
+
+def _citation(knowledge: Dict[str, Any]) -> str:
+    """Referencia al documento de origen para que la respuesta pueda citarlo."""
+    return f" (fuente: {knowledge['source']})" if knowledge.get("source") else ""
+
+
 class MemoryService:
     """
     Servicio de memoria contextual avanzada
@@ -25,18 +41,28 @@ class MemoryService:
     
     async def store_immediate_memory(self, case_id: int, content: str):
         """Almacena memoria inmediata (últimos mensajes)"""
-        self.memory_repo.add_memory(case_id, "immediate", content)
-        
-        # Mantener solo últimos 10
-        memories = self.db.query(Memory).filter(
+        await self.store_immediate_memories(case_id, [content])
+
+    async def store_immediate_memories(self, case_id: int, contents: List[str]):
+        """Almacena varias memorias inmediatas con un INSERT y un solo commit"""
+        self.memory_repo.add_memories_bulk(
+            [{"case_id": case_id, "kind": "immediate", "content": content} for content in contents],
+            commit=False,
+        )
+        # Mantener solo últimos 10, sin traer las filas
+        keep = (
+            self.db.query(Memory.id)
+            .filter(Memory.case_id == case_id, Memory.kind == "immediate")
+            .order_by(Memory.created_at.desc(), Memory.id.desc())
+            .limit(10)
+            .subquery()
+        )
+        self.db.query(Memory).filter(
             Memory.case_id == case_id,
-            Memory.kind == "immediate"
-        ).order_by(Memory.created_at.desc()).all()
-        
-        if len(memories) > 10:
-            for mem in memories[10:]:
-                self.db.delete(mem)
-            self.db.commit()
+            Memory.kind == "immediate",
+            Memory.id.notin_(self.db.query(keep.c.id)),
+        ).delete(synchronize_session=False)
+        self.db.commit()
     
     async def store_session_memory(self, case_id: int, key: str, value: Any):
         """Almacena datos de sesión como JSON"""
@@ -58,7 +84,7 @@ class MemoryService:
         else:
             self.memory_repo.add_memory(case_id, "session", content)
     
-    async def store_episodic_memory(self, case_id: int, summary: str):
+    async def store_episodic_memory(self, case_id: int, summary: str, commit: bool = True):
         """Almacena resumen episódico con embedding para búsqueda semántica"""
         # Generar embedding
         embeddings = await self.llm.embed([summary])
@@ -77,18 +103,23 @@ class MemoryService:
             embedding=embedding
         )
         self.db.add(mem)
-        self.db.commit()
+        if commit:
+            self.db.commit()
+        else:
+            self.db.flush()
         logger.info("episodic_memory_stored", case_id=case_id, summary_length=len(summary))
     
+    @traced("memory.retrieve", {"memory.kind": "immediate"})
     async def retrieve_immediate_memory(self, case_id: int) -> List[str]:
         """Recupera memoria inmediata (últimos 10 mensajes)"""
         memories = self.db.query(Memory).filter(
             Memory.case_id == case_id,
             Memory.kind == "immediate"
-        ).order_by(Memory.created_at.desc()).limit(10).all()
+        ).order_by(Memory.created_at.desc(), Memory.id.desc()).limit(10).all()
         
         return [m.content for m in reversed(memories)]
     
+    @traced("memory.retrieve", {"memory.kind": "session"})
     async def retrieve_session_data(self, case_id: int) -> Dict[str, Any]:
         """Recupera todos los datos de sesión"""
         import json
@@ -107,159 +138,94 @@ class MemoryService:
         
         return result
     
-    async def search_episodic_memory(self, case_id: int, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Búsqueda semántica en memoria episódica usando embeddings.
-
-        En PostgreSQL se usa pgvector; en otros motores (SQLite en tests) se degrada a un ORDER BY simple.
-        """
-        # Generar embedding de la query
+    async def _embed_query(self, query: str) -> List[float]:
+        """Embedding de la consulta (vacío si el proveedor no está disponible)."""
         embeddings = await self.llm.embed([query])
         if not embeddings or not embeddings[0]:
             return []
-
         query_embedding = embeddings[0]
-
         # Si el embedding viene anidado [[...]], aplanarlo
         if isinstance(query_embedding[0], list):
             query_embedding = query_embedding[0]
+        return query_embedding
 
-        # Si no estamos en PostgreSQL, evitar sintaxis pgvector incompatible (como en SQLite)
-        if self.db.bind and self.db.bind.dialect.name != "postgresql":  # type: ignore[attr-defined]
-            rows = (
-                self.db.query(Memory)
-                .filter(Memory.case_id == case_id, Memory.kind == "episodic")
-                .order_by(Memory.created_at.desc())
-                .limit(limit)
-                .all()
-            )
-            return [
-                {"id": m.id, "content": m.content, "distance": None}
-                for m in rows
-            ]
-
-        # Búsqueda vectorial usando pgvector
-        # Formato: <-> es el operador de distancia euclidiana
-        # Convertir embedding a formato string de PostgreSQL: '[1,2,3]'
-        embedding_str = str(query_embedding).replace(' ', '')
-
-        result = self.db.execute(
-            text("""
-                SELECT id, content,
-                       embedding <-> CAST(:query_embedding AS vector) AS distance
-                FROM memories
-                WHERE case_id = :case_id AND kind = 'episodic'
-                ORDER BY distance
-                LIMIT :limit
-            """),
-            {
-                "query_embedding": embedding_str,
-                "case_id": case_id,
-                "limit": limit,
-            },
-        ).fetchall()
-
-        # Mapear todas las filas devueltas, no solo una. Evita NameError y
-        # permite retornar múltiples recuerdos ordenados por distancia.
-        return [
-            {"id": r[0], "content": r[1], "distance": r[2]}
-            for r in result
-        ]
-
-    async def search_semantic_knowledge(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
-        """Búsqueda en base de conocimiento legal semántico.
+    @traced("memory.retrieve", {"memory.kind": "episodic"})
+    async def search_episodic_memory(
+        self, case_id: int, query: str, limit: int = 5, query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Búsqueda semántica en memoria episódica usando embeddings.
 
-        En PostgreSQL se usa pgvector; en otros motores se degrada a un ORDER BY simple.
+        pgvector o índice en memoria según el motor (ver vector_index).
+        `query_embedding` evita recalcular el embedding si el llamador ya lo tiene.
         """
-        embeddings = await self.llm.embed([query])
-        if not embeddings or not embeddings[0]:
+        query_embedding = query_embedding or await self._embed_query(query)
+        if not query_embedding:
             return []
 
-        query_embedding = embeddings[0]
-
-        # Si el embedding viene anidado [[...]], aplanarlo
-        if isinstance(query_embedding[0], list):
-            query_embedding = query_embedding[0]
-
-        # Si no estamos en PostgreSQL, usar un orden simple sin operador vectorial
-        if self.db.bind and self.db.bind.dialect.name != "postgresql":  # type: ignore[attr-defined]
-            rows = (
-                self.db.query(SemanticKnowledge)
-                .order_by(SemanticKnowledge.id.desc())
-                .limit(limit)
-                .all()
-            )
-            return [
-                {"id": r.id, "title": r.title, "content": r.content, "distance": None}
-                for r in rows
-            ]
-
-        # Convertir embedding a formato string de PostgreSQL: '[1,2,3]'
-        embedding_str = str(query_embedding).replace(' ', '')
+        return episodic_vector_search(self.db, case_id, query_embedding, limit)
 
-        result = self.db.execute(
-            text("""
-                SELECT id, title, content,
-                       embedding <-> CAST(:query_embedding AS vector) AS distance
-                FROM semantic_knowledge
-                ORDER BY distance
-                LIMIT :limit
-            """),
-            {
-                "query_embedding": embedding_str,
-                "limit": limit,
-            },
-        ).fetchall()
+    @traced("memory.retrieve", {"memory.kind": "semantic"})
+    async def search_semantic_knowledge(
+        self, query: str, limit: int = 3, query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Búsqueda híbrida (texto completo + vectorial) en la base de conocimiento legal.
 
-        return [
-            {"id": row[0], "title": row[1], "content": row[2], "distance": row[3]}
-            for row in result
-        ]
+        Ver KnowledgeRetriever. Sin embedding (proveedor caído o `[]` explícito)
+        queda solo la parte léxica, que igual encuentra referencias exactas.
+        """
+        if query_embedding is None:
+            query_embedding = await self._embed_query(query)
+        return await KnowledgeRetriever(self.db).search(query, query_embedding, limit=limit)
     
-    async def build_context_for_llm(self, case_id: int, current_question: str) -> str:
+    @traced("memory.build_context")
+    async def build_context_for_llm(self, case_id: int, current_question: str, task_type: str = "chat") -> str:
         """
-        Construye contexto completo para el LLM combinando todos los tipos de memoria
+        Construye el contexto para el LLM combinando todos los tipos de memoria,
+        dentro del presupuesto de tokens de `task_type`
+        """
+        return (await self.assemble_context(case_id, current_question, task_type)).text
+
+    async def assemble_context(self, case_id: int, current_question: str, task_type: str = "chat") -> AssembledContext:
+        """
+        Arma el contexto priorizando datos del caso y conversación reciente sobre
+        conocimiento legal y episodios (ver ContextAssembler); informa los tokens finales.
         """
-        context_parts = []
-        
-        # 1. Memoria inmediata (últimos mensajes)
         immediate = await self.retrieve_immediate_memory(case_id)
-        if immediate:
-            context_parts.append("## Conversación reciente:\n" + "\n".join(immediate))
-        
-        # 2. Datos de sesión
         session_data = await self.retrieve_session_data(case_id)
-        if session_data:
-            import json
-            context_parts.append(f"## Datos del caso:\n{json.dumps(session_data, indent=2, ensure_ascii=False)}")
-        
-        # 3. Memoria episódica relevante
-        episodic = await self.search_episodic_memory(case_id, current_question, limit=3)
-        if episodic:
-            episodes = "\n".join([f"- {ep['content']}" for ep in episodic])
-            context_parts.append(f"## Conversaciones anteriores relevantes:\n{episodes}")
-        
-        # 4. Conocimiento legal relevante
-        knowledge = await self.search_semantic_knowledge(current_question, limit=2)
-        if knowledge:
-            docs = "\n\n".join([f"**{k['title']}**\n{k['content']}" for k in knowledge])
-            context_parts.append(f"## Conocimiento legal aplicable:\n{docs}")
-        
-        return "\n\n".join(context_parts)
-    
-    async def summarize_conversation(self, case_id: int) -> str:
-        """Genera resumen de conversación para almacenar en memoria episódica"""
-        immediate = await self.retrieve_immediate_memory(case_id)
-        if not immediate:
-            return ""
-        
-        conversation = "\n".join(immediate)
-        
-        prompt = f"""Resume la siguiente conversación en 2-3 oraciones clave, 
-enfocándote en los datos recopilados y el progreso del trámite:
-
-{conversation}
-
-Resumen:"""
-        
-        summary = await self.llm.chat([{"role": "user", "content": prompt}])
-        return summary.strip()
+        # Un solo embedding de la consulta para las dos búsquedas
+        query_embedding = await self._embed_query(current_question)
+        episodic = await self.search_episodic_memory(case_id, current_question, limit=3, query_embedding=query_embedding) \
+            if query_embedding else []
+        knowledge = await self.search_semantic_knowledge(current_question, limit=2, query_embedding=query_embedding)
+
+        sections = [
+            ContextSection("session", "Datos del caso", [compact_json(session_data)] if session_data else [], share=0.25),
+            ContextSection("immediate", "Conversación reciente", immediate, share=0.35, mode="recent"),
+            ContextSection(
+                "knowledge", "Conocimiento legal aplicable",
+                [f"**{k['title']}**{_citation(k)}\n{k['content']}" for k in knowledge],
+                share=0.25, mode="extractive", joiner="\n\n",
+            ),
+            ContextSection(
+                "episodic", "Conversaciones anteriores relevantes",
+                [f"- {ep['content']}" for ep in episodic], share=0.15, mode="extractive",
+            ),
+        ]
+        budget = budget_for(task_type)
+        assembled = ContextAssembler(budget, current_question).assemble(sections)
+        set_attributes(trace.get_current_span(), {
+            "context.task_type": task_type,
+            "context.tokens": assembled.tokens,
+            "context.budget": budget,
+            "context.trimmed": ",".join(assembled.trimmed),
+        })
+        logger.info(
+            "llm_context_assembled",
+            case_id=case_id,
+            task_type=task_type,
+            tokens=assembled.tokens,
+            budget=budget,
+            sections=assembled.sections,
+            trimmed=assembled.trimmed,
+        )
+        return assembled
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from infrastructure.persistence.models import Case, CaseDailyStat
+from infrastructure.persistence.rollups import metrics_cache
+
+
+class CaseMetricsService:
+    """
+    Consultas de métricas de casos para el dashboard.
+
+    Lee de la tabla de rollups `case_daily_stats` (mantenida incrementalmente),
+    cuyo tamaño depende de días × estados × tipos y no de la cantidad de casos.
+    Las respuestas se cachean con TTL corto; el cache se invalida ante cambios
+    de casos en este proceso.
+
+    Es la única fuente de agregados para los routers de metrics y cases.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _cached(self, key, factory):
+        return metrics_cache.get_or_set(key, factory)
+
+    def _counts_by(self, column) -> Dict[Any, int]:
+        rows = (
+            self.db.query(column, func.sum(CaseDailyStat.count))
+            .group_by(column)
+            .all()
+        )
+        return {key: int(total or 0) for key, total in rows if total}
+
+    def _total_since(self, since: datetime) -> int:
+        """Casos con created_at >= since.
+
+        Los días completos salen de los rollups; el día parcial de `since` se
+        cuenta sobre cases (acotado a ese día por ix_cases_created_at_id).
+        """
+        next_day = datetime.combine(since.date() + timedelta(days=1), datetime.min.time())
+        whole_days = (
+            self.db.query(func.sum(CaseDailyStat.count))
+            .filter(CaseDailyStat.day >= next_day.date())
+            .scalar()
+        )
+        partial_day = (
+            self.db.query(func.count(Case.id))
+            .filter(Case.created_at >= since, Case.created_at < next_day)
+            .scalar()
+        )
+        return int(whole_days or 0) + int(partial_day or 0)
+
+    def summary(self) -> Dict[str, Any]:
+        def compute():
+            by_status = {
+                (status or None): count for status, count in self._counts_by(CaseDailyStat.status).items()
+            }
+            by_type = {type_: count for type_, count in self._counts_by(CaseDailyStat.type).items() if type_}
+            now = datetime.utcnow()
+            return {
+                "total_cases": sum(by_status.values()),
+                "recent_cases_7d": self._total_since(now - timedelta(days=7)),
+                "recent_cases_30d": self._total_since(now - timedelta(days=30)),
+                "cases_by_status": by_status,
+                "cases_by_type": by_type,
+            }
+        return self._cached("summary", compute)
+
+    def by_status(self) -> List[Dict[str, Any]]:
+        counts = self.summary()["cases_by_status"]
+        total = sum(counts.values())
+        return [
+            {"status": status, "count": count, "percent": count / total if total > 0 else 0}
+            for status, count in counts.items()
+        ]
+
+    def by_type(self) -> List[Dict[str, Any]]:
+        return [
+            {"type": type_, "count": count}
+            for type_, count in self.summary()["cases_by_type"].items()
+        ]
+
+    def timeline(self, days: int = 30) -> List[Dict[str, Any]]:
+        def compute():
+            since = (datetime.utcnow() - timedelta(days=days)).date()
+            rows = (
+                self.db.query(CaseDailyStat.day, func.sum(CaseDailyStat.count))
+                .filter(CaseDailyStat.day >= since)
+                .group_by(CaseDailyStat.day)
+                .order_by(CaseDailyStat.day)
+                .all()
+            )
+            return [
+                {"date": day.isoformat(), "count": int(count)}
+                for day, count in rows if count
+            ]
+        return self._cached(("timeline", days), compute)
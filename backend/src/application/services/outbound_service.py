@@ -0,0 +1,329 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+import structlog
+from opentelemetry import trace
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from infrastructure.concurrency.executors import run_blocking
+from infrastructure.messaging.rate_limiter import ChatSendLock, SendRateLimiter, chat_lock, rate_limiter
+from infrastructure.observability.tracing import set_attributes, traced
+from infrastructure.persistence.models import Message, OutboundMessage
+
+logger = structlog.get_logger()
+
+# ack de WAHA -> estado del mensaje (0/1: pendiente/servidor ya es "sent")
+_ACK_STATUS = {2: "delivered", 3: "read", 4: "read"}
+# Espera máxima en proceso por el limitador; más que esto se reprograma
+_MAX_INLINE_WAIT_SECONDS = 2.0
+
+# Sin broker, los reintentos quedan en el loop de este proceso: un timer por chat
+# y referencias a las tareas en curso (el loop solo guarda referencias débiles)
+_inline_retries: Dict[str, asyncio.TimerHandle] = {}
+_inline_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def _wa_message_id(result: Any) -> Optional[str]:
+    """Id del mensaje enviado según la respuesta de WAHA (string o dict serializado)."""
+    if not isinstance(result, dict):
+        return None
+    value = result.get("id")
+    if isinstance(value, dict):
+        value = value.get("_serialized") or value.get("id")
+    return str(value)[:128] if value else None
+
+
+def _is_permanent(error: Exception) -> bool:
+    """4xx de WAHA (salvo 408/429) no se arregla reintentando: chat inexistente, payload inválido."""
+    if isinstance(error, httpx.HTTPStatusError):
+        code = error.response.status_code
+        return 400 <= code < 500 and code not in (408, 429)
+    return False
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff exponencial con jitter: mitad fija + mitad aleatoria del escalón."""
+    step = min(settings.outbound_retry_max_seconds, settings.outbound_retry_base_seconds * 2 ** max(0, attempts - 1))
+    return step / 2 + random.uniform(0, step / 2)
+
+
+class OutboundMessageService:
+    """
+    Cola de salida de WhatsApp persistida en `outbound_messages`.
+
+    `enqueue` registra el mensaje (y su fila de historial en estado queued);
+    `dispatch` lo programa en el worker o, sin broker, lo entrega en este
+    proceso (y los reintentos quedan programados en su loop). `drain` vacía la cola de un chat en orden, de a un proceso por
+    chat, respetando el límite global y por chat; los errores transitorios se
+    reintentan con backoff y los definitivos o agotados pasan a `dead`.
+    """
+
+    def __init__(self, db: Session, whatsapp=None, limiter: Optional[SendRateLimiter] = None,
+                 lock: Optional[ChatSendLock] = None, session_factory=None):
+        self.db = db
+        self._whatsapp = whatsapp
+        self.limiter = limiter or rate_limiter
+        self.lock = lock or chat_lock
+        self._session_factory = session_factory
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from infrastructure.persistence.db import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    @property
+    def whatsapp(self):
+        if self._whatsapp is None:
+            from infrastructure.messaging.waha_service_impl import WAHAWhatsAppService
+            self._whatsapp = WAHAWhatsAppService()
+        return self._whatsapp
+
+    # --- Encolado ---------------------------------------------------------
+
+    def enqueue(self, chat_id: str, text: str, case_id: Optional[int] = None, message_id: Optional[int] = None,
+                role: Optional[str] = None, idempotency_key: Optional[str] = None) -> OutboundMessage:
+        """Agrega un mensaje a la cola del chat.
+
+        Con `role` (y sin `message_id`) también crea la fila del historial.
+        Con `idempotency_key` repetida retorna el mensaje ya encolado.
+        """
+        if idempotency_key:
+            existing = self.db.query(OutboundMessage).filter(OutboundMessage.idempotency_key == idempotency_key).first()
+            if existing:
+                return existing
+        if message_id is None and role and case_id:
+            message = Message(case_id=case_id, role=role, content=text, status="queued")
+            self.db.add(message)
+            self.db.flush()
+            message_id = message.id
+        elif message_id is not None:
+            message = self.db.query(Message).get(message_id)
+            if message is not None:
+                message.status = "queued"
+        outbound = OutboundMessage(
+            case_id=case_id,
+            message_id=message_id,
+            chat_id=chat_id,
+            text=text,
+            status="queued",
+            idempotency_key=idempotency_key,
+        )
+        self.db.add(outbound)
+        self.db.commit()
+        self.db.refresh(outbound)
+        return outbound
+
+    async def dispatch(self, outbound: OutboundMessage) -> OutboundMessage:
+        """Programa la entrega en el worker; sin broker, la hace acá mismo."""
+        if not await self.dispatch_chat(outbound.chat_id):
+            await run_blocking(self.db.refresh, outbound)
+        return outbound
+
+    async def dispatch_chat(self, chat_id: str) -> bool:
+        """Como `dispatch` pero por chat. True si quedó programado en el worker."""
+        from infrastructure.tasks.client import JobSubmitError
+        try:
+            await asyncio.to_thread(self.schedule, chat_id)
+            return True
+        except JobSubmitError:
+            stats = await self.drain(chat_id)
+            if stats["retry_in"] is not None:
+                self._retry_inline(chat_id, stats["retry_in"])
+            return False
+
+    def _retry_inline(self, chat_id: str, delay: float) -> None:
+        """Sin broker nadie más va a volver por este chat: se reprograma en este proceso."""
+        loop = asyncio.get_running_loop()
+        pending = _inline_retries.get(chat_id)
+        if pending is not None:
+            if pending.when() <= loop.time() + delay:
+                return  # ya hay uno que llega antes
+            pending.cancel()
+
+        def fire() -> None:
+            _inline_retries.pop(chat_id, None)
+            task = loop.create_task(self._redispatch(chat_id))
+            _inline_tasks.add(task)
+            task.add_done_callback(_inline_tasks.discard)
+
+        _inline_retries[chat_id] = loop.call_later(max(0.0, delay), fire)
+        logger.warning("outbound_inline_retry_scheduled", chat_id=chat_id, retry_in=round(delay, 3))
+
+    async def _redispatch(self, chat_id: str) -> None:
+        # Sesión propia: la del request que originó el envío ya se cerró
+        db = self.session_factory()
+        try:
+            service = OutboundMessageService(db, whatsapp=self._whatsapp, limiter=self.limiter, lock=self.lock,
+                                             session_factory=self._session_factory)
+            await service.dispatch_chat(chat_id)
+        except Exception as e:
+            logger.error("outbound_inline_retry_failed", chat_id=chat_id, error=str(e))
+        finally:
+            db.close()
+
+    @staticmethod
+    def schedule(chat_id: str, countdown: Optional[float] = None) -> str:
+        from infrastructure.tasks.client import jobs
+        from infrastructure.tasks.jobs import deliver_outbound
+        return jobs.submit(deliver_outbound, chat_id, countdown=countdown)
+
+    # --- Entrega ----------------------------------------------------------
+
+    def _next_pending(self, chat_id: str) -> Optional[OutboundMessage]:
+        return (
+            self.db.query(OutboundMessage)
+            .filter(OutboundMessage.chat_id == chat_id, OutboundMessage.status == "queued")
+            .order_by(OutboundMessage.id)
+            .first()
+        )
+
+    def _set_status(self, outbound: OutboundMessage, status: str, message_status: str) -> None:
+        outbound.status = status
+        if outbound.message_id:
+            # Vía ORM (no UPDATE masivo) para que el cambio llegue al canal en tiempo real
+            message = self.db.query(Message).get(outbound.message_id)
+            if message is not None:
+                message.status = message_status
+        self.db.commit()
+
+    async def drain(self, chat_id: str, max_messages: int = 50) -> Dict[str, Any]:
+        """Envía en orden los pendientes de un chat.
+
+        Retorna {"sent", "dead", "retry_in"}; retry_in (segundos) indica que
+        quedó trabajo y cuándo conviene volver a intentar.
+        """
+        stats = {"sent": 0, "dead": 0, "retry_in": None}
+        # Redis y la base son síncronos: fuera del loop (sin broker, drain corre en la API)
+        token = await run_blocking(self.lock.acquire, chat_id)
+        if token is None:
+            return stats  # otro proceso está vaciando este chat
+        try:
+            for _ in range(max_messages):
+                outbound = await run_blocking(self._next_pending, chat_id)
+                if outbound is None:
+                    break
+                now = datetime.utcnow()
+                if outbound.next_attempt_at and outbound.next_attempt_at > now:
+                    stats["retry_in"] = (outbound.next_attempt_at - now).total_seconds()
+                    break
+                wait = await run_blocking(self.limiter.acquire, chat_id)
+                while 0 < wait <= _MAX_INLINE_WAIT_SECONDS:
+                    await asyncio.sleep(wait)
+                    wait = await run_blocking(self.limiter.acquire, chat_id)
+                if wait:
+                    stats["retry_in"] = wait
+                    break
+                status, retry_in = await self._deliver(outbound)
+                if status == "sent":
+                    stats["sent"] += 1
+                elif status == "dead":
+                    stats["dead"] += 1
+                else:
+                    # Reintento pendiente: los siguientes del chat esperan para no desordenarse
+                    stats["retry_in"] = retry_in
+                    break
+                if not await run_blocking(self.lock.extend, chat_id, token):
+                    # El TTL venció durante los envíos y otro proceso tomó el chat: seguir desordenaría
+                    logger.warning("outbound_lock_lost", chat_id=chat_id, sent=stats["sent"])
+                    break
+            else:
+                stats["retry_in"] = 0.0
+        finally:
+            await run_blocking(self.lock.release, chat_id, token)
+        if stats["retry_in"] is None and await run_blocking(self._next_pending, chat_id) is not None:
+            # Llegó un mensaje mientras teníamos el lock: su tarea lo encontró tomado
+            stats["retry_in"] = 0.0
+        logger.info("outbound_drained", chat_id=chat_id, **stats)
+        return stats
+
+    @traced("outbound.deliver")
+    async def _deliver(self, outbound: OutboundMessage) -> Tuple[str, Optional[float]]:
+        """Un intento de envío: ("sent" | "dead", None) o ("retry", segundos hasta el próximo)."""
+        outbound.attempts = (outbound.attempts or 0) + 1
+        # Datos para logs antes del commit (después los atributos quedan expirados)
+        outbound_id, chat_id, attempts = outbound.id, outbound.chat_id, outbound.attempts
+        set_attributes(trace.get_current_span(), {
+            "outbound.id": outbound_id,
+            "outbound.attempt": attempts,
+            "outbound.retries": attempts - 1,
+            "outbound.text_chars": len(outbound.text or ""),
+        })
+        try:
+            result = await self.whatsapp.send_message(chat_id, outbound.text)
+        except Exception as e:
+            error = outbound.last_error = str(e)[:1000]
+            if _is_permanent(e) or attempts >= settings.outbound_max_attempts:
+                outbound.next_attempt_at = None
+                await run_blocking(self._set_status, outbound, "dead", "failed")
+                logger.error("outbound_dead_lettered", outbound_id=outbound_id, chat_id=chat_id,
+                             attempts=attempts, error=error)
+                return "dead", None
+            delay = retry_delay(attempts)
+            outbound.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            await run_blocking(self.db.commit)
+            logger.warning("outbound_send_retry", outbound_id=outbound_id, chat_id=chat_id,
+                           attempts=attempts, error=error)
+            return "retry", delay
+        outbound.wa_message_id = _wa_message_id(result)
+        outbound.sent_at = datetime.utcnow()
+        outbound.last_error = None
+        await run_blocking(self._set_status, outbound, "sent", "sent")
+        return "sent", None
+
+    # --- Estado y dead-letter queue --------------------------------------
+
+    def apply_ack(self, wa_message_id: str, ack: Optional[int]) -> bool:
+        """Actualiza el estado del historial con el ack de WhatsApp (entregado/leído)."""
+        status = _ACK_STATUS.get(ack or 0)
+        if not status or not wa_message_id:
+            return False
+        outbound = self.db.query(OutboundMessage).filter(OutboundMessage.wa_message_id == wa_message_id).first()
+        if outbound is None or not outbound.message_id:
+            return False
+        message = self.db.query(Message).get(outbound.message_id)
+        # No retroceder: un ack "delivered" tardío no pisa "read"
+        if message is None or (message.status == "read" and status == "delivered"):
+            return False
+        message.status = status
+        self.db.commit()
+        return True
+
+    def due_chats(self, limit: int = 500) -> List[str]:
+        """Chats con mensajes pendientes cuyo próximo intento ya venció."""
+        now = datetime.utcnow()
+        rows = (
+            self.db.query(OutboundMessage.chat_id)
+            .filter(
+                OutboundMessage.status == "queued",
+                (OutboundMessage.next_attempt_at.is_(None)) | (OutboundMessage.next_attempt_at <= now),
+            )
+            .distinct()
+            .limit(limit)
+            .all()
+        )
+        return [chat_id for (chat_id,) in rows]
+
+    def dead_letters(self, limit: int = 100) -> List[OutboundMessage]:
+        return (
+            self.db.query(OutboundMessage)
+            .filter(OutboundMessage.status == "dead")
+            .order_by(OutboundMessage.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    def requeue(self, outbound_id: int) -> Optional[OutboundMessage]:
+        """Devuelve un mensaje de la dead-letter queue a la cola (intentos en cero)."""
+        outbound = self.db.query(OutboundMessage).get(outbound_id)
+        if outbound is None or outbound.status != "dead":
+            return None
+        outbound.attempts = 0
+        outbound.next_attempt_at = None
+        self._set_status(outbound, "queued", "queued")
+        return outbound
@@ -0,0 +1,86 @@
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from infrastructure.persistence.models import PhaseMonthlyStat
+from infrastructure.persistence.phase_events import TERMINAL_PHASES, recent_months
+
+# Orden del flujo conversacional (ver ProcessIncomingMessageUseCase._handle_phase).
+# Fases ramificadas (cónyuge, hijos, bienes) aparecen solo si el caso las recorrió.
+FUNNEL_PHASES = [
+    "inicio", "tipo_divorcio", "apellido", "nombres", "cuit", "fecha_nacimiento", "domicilio",
+    "apellido_conyuge", "nombres_conyuge",
+    "econ_intro", "econ_situacion", "econ_ingreso", "econ_vivienda", "econ_alquiler",
+    "econ_patrimonio_inmuebles", "econ_patrimonio_registrables", "econ_cierre",
+    "doc_conyuge", "fecha_nacimiento_conyuge", "domicilio_conyuge",
+    "info_matrimonio", "ultimo_domicilio_conyugal",
+    "hijos", "hijos_cuantos", "hijo_nombre", "hijo_fecha", "hijo_mayor_eval",
+    "bienes", "bienes_detalle", "documentacion",
+]
+
+
+class PhaseFunnelService:
+    """
+    Embudo de conversión por fase a partir de los agregados mensuales.
+
+    Solo lee `phase_monthly_stats` (decenas de filas por mes), que calculan
+    los jobs batch sobre `phase_events`; nunca escanea los eventos crudos.
+    Con más de un mes, la mediana informada es el promedio de las medianas
+    mensuales ponderado por casos que avanzaron (aproximación).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def funnel(self, months: int = 3, reference: Optional[date] = None) -> Dict[str, Any]:
+        window = recent_months(months, reference)
+        rows = (
+            self.db.query(PhaseMonthlyStat)
+            .filter(PhaseMonthlyStat.month >= window[0])
+            .all()
+        )
+
+        totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for row in rows:
+            bucket = totals[row.phase]
+            bucket["reached"] += row.reached
+            bucket["advanced"] += row.advanced
+            bucket["abandoned"] += row.abandoned
+            if row.median_seconds is not None and row.advanced:
+                bucket["median_weighted"] += row.median_seconds * row.advanced
+                bucket["median_weight"] += row.advanced
+
+        order = {phase: index for index, phase in enumerate(FUNNEL_PHASES)}
+        phases = sorted(totals, key=lambda phase: (order.get(phase, len(order)), phase))
+        start_reached = max((totals[phase]["reached"] for phase in phases), default=0)
+
+        items: List[Dict[str, Any]] = []
+        for phase in phases:
+            bucket = totals[phase]
+            reached = int(bucket["reached"])
+            items.append({
+                "phase": phase,
+                "reached": reached,
+                "advanced": int(bucket["advanced"]),
+                "abandoned": int(bucket["abandoned"]),
+                "abandonment_rate": bucket["abandoned"] / reached if reached else 0,
+                "conversion_from_start": reached / start_reached if start_reached else 0,
+                "median_seconds": (
+                    bucket["median_weighted"] / bucket["median_weight"] if bucket["median_weight"] else None
+                ),
+                "terminal": phase in TERMINAL_PHASES,
+            })
+
+        computed_at = (
+            self.db.query(func.max(PhaseMonthlyStat.computed_at))
+            .filter(PhaseMonthlyStat.month >= window[0])
+            .scalar()
+        )
+        return {
+            "months": [month.isoformat() for month in window],
+            "computed_at": computed_at.isoformat() if computed_at else None,
+            "phases": items,
+        }
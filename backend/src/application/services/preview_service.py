@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional
+
+import structlog
+from sqlalchemy.orm import Session
+
+from application.interfaces.storage.media_store import MediaStore
+from application.services.media_service import MediaService
+from infrastructure.persistence.models import Case, MediaObject, SupportDocument
+from infrastructure.storage.previews import (
+    PREVIEW_FORMATS,
+    PREVIEW_SIZES,
+    PreviewUnavailableError,
+    render_previews,
+    variant_name,
+)
+
+logger = structlog.get_logger()
+
+
+class PreviewService:
+    """
+    Previews de documentos guardadas junto al original en el media store.
+
+    El worker las genera todas al llegar el archivo (`generate`); el endpoint
+    usa `ensure`, que solo renderiza si falta la variante pedida (archivos
+    previos al pipeline o worker caído). Renderizar es CPU: desde código async
+    llamar en un threadpool.
+    """
+
+    def __init__(self, db: Session, store: Optional[MediaStore] = None):
+        self.db = db
+        self.media = MediaService(db, store=store)
+        self.store = self.media.store
+
+    def _missing(self, media: MediaObject) -> List[str]:
+        return [
+            variant_name(size, fmt)
+            for size in PREVIEW_SIZES
+            for fmt in PREVIEW_FORMATS
+            if not self.store.exists(media.sha256, variant_name(size, fmt))
+        ]
+
+    def generate(self, media: MediaObject) -> int:
+        """Genera las variantes faltantes. Retorna cuántas se escribieron."""
+        if not self._missing(media):
+            return 0
+        with self.store.open(media.sha256) as handle:
+            data = handle.read()
+        rendered = render_previews(data, media.mime_type)
+        for variant, content in rendered.items():
+            self.store.put_variant(media.sha256, variant, content)
+        logger.info("media_previews_generated", media_id=media.media_id, variants=len(rendered))
+        return len(rendered)
+
+    def ensure(self, media: MediaObject, size: str, fmt: str) -> str:
+        """Retorna el nombre de la variante, renderizándola si hace falta."""
+        variant = variant_name(size, fmt)
+        if not self.store.exists(media.sha256, variant):
+            with self.store.open(media.sha256) as handle:
+                data = handle.read()
+            rendered = render_previews(data, media.mime_type, sizes=[size], formats=[fmt])
+            self.store.put_variant(media.sha256, variant, rendered[variant])
+        return variant
+
+    def historical_media_ids(self) -> List[str]:
+        """media_id de todos los documentos de casos y de respaldo."""
+        ids = set()
+        for column in (Case.dni_image_url, Case.dni_back_url, Case.marriage_cert_url):
+            ids.update(value for (value,) in self.db.query(column).filter(column.isnot(None)).all() if value)
+        ids.update(value for (value,) in self.db.query(SupportDocument.media_id).all() if value)
+        return sorted(ids)
+
+    async def warm(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """Completa previews de documentos históricos (bajando de WAHA si no están en el store)."""
+        stats = {"checked": 0, "generated": 0, "unavailable": 0, "failed": 0}
+        for media_id in self.historical_media_ids()[:limit]:
+            stats["checked"] += 1
+            try:
+                media = await self.media.fetch(media_id)
+                if self.generate(media):
+                    stats["generated"] += 1
+            except PreviewUnavailableError:
+                stats["unavailable"] += 1
+            except Exception as e:
+                stats["failed"] += 1
+                logger.warning("media_preview_warm_failed", media_id=media_id, error=str(e))
+        logger.info("media_previews_warmed", **stats)
+        return stats
@@ -5,11 +5,14 @@ Procesa documentos legales y los almacena en la base de conocimiento
 con sus embeddings para búsqueda semántica.
 """
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import structlog
 from dataclasses import dataclass
 
+from application.services.document_chunker import DocumentChunk, chunk_document
+from core.config import settings
 from infrastructure.persistence.models import SemanticKnowledge
+from infrastructure.persistence.vector_index import refresh_knowledge_index, uses_memory_index
 from infrastructure.ai.router import LLMRouter
 
 logger = structlog.get_logger()
@@ -21,6 +24,8 @@ class IngestedDocument:
     title: str
     chunks_created: int
     success: bool
+    chunks_unchanged: int = 0
+    chunks_deleted: int = 0
 
 
 class IngestLegalDocumentUseCase:
@@ -28,62 +33,106 @@ class IngestLegalDocumentUseCase:
     Ingesta documentos legales en la base de conocimiento.
     
     Proceso:
-    1. Divide el contenido en chunks de tamaño adecuado
-    2. Genera embeddings para cada chunk
-    3. Almacena en la base de datos con metadata
+    1. Divide el contenido siguiendo su estructura (encabezados Markdown,
+       claves JSON o párrafos) con límite y solapamiento en tokens
+    2. Compara el hash de cada fragmento con los ya guardados del mismo `source`
+    3. Genera embeddings solo para los fragmentos nuevos o modificados y
+       borra los que ya no están en el documento
+    4. Recarga el índice vectorial en memoria, si este proceso lo usa
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, llm: Optional[LLMRouter] = None):
         self.db = db
-        self.llm = LLMRouter()
-        self.max_chunk_size = 500  # tokens aproximados
+        self.llm = llm or LLMRouter()
+        self.max_chunk_tokens = settings.knowledge_chunk_max_tokens
+        self.overlap_tokens = settings.knowledge_chunk_overlap_tokens
     
-    async def execute(self, title: str, content: str, category: str = "legislacion") -> IngestedDocument:
+    async def execute(
+        self,
+        title: str,
+        content: str,
+        category: str = "legislacion",
+        source: Optional[str] = None,
+        content_format: str = "text",
+    ) -> IngestedDocument:
         """
-        Ingesta un documento legal.
+        Ingesta (o re-ingesta) un documento legal.
         
         Args:
             title: Título del documento
             content: Contenido completo del documento
             category: Categoría (legislacion, jurisprudencia, doctrina)
+            source: Identificador estable del documento (p. ej. nombre de archivo);
+                default: el título. Las re-ingestas del mismo source son incrementales.
+            content_format: markdown | json | text
         
         Returns:
             IngestedDocument con resultado de la operación
         """
+        source = source or title
         try:
-            logger.info("ingest_document_started", title=title, category=category)
+            logger.info("ingest_document_started", title=title, category=category, source=source)
             
-            # 1. Dividir en chunks
-            chunks = self._chunk_text(content)
+            # 1. Dividir en fragmentos (deduplicados por hash)
+            chunks = {}
+            for chunk in self.chunk(content, content_format):
+                chunks.setdefault(chunk.content_hash(settings.llm_embedding_model), chunk)
             logger.info("document_chunked", chunks=len(chunks))
             
-            # 2. Generar embeddings
-            embeddings = await self.llm.embed(chunks)
+            # 2. Comparar con lo ya guardado de este documento
+            existing = {
+                row.content_hash: row.id
+                for row in self.db.query(SemanticKnowledge.id, SemanticKnowledge.content_hash)
+                .filter(SemanticKnowledge.source == source)
+            }
+            new = [(h, c) for h, c in chunks.items() if h not in existing]
+            stale = [row_id for h, row_id in existing.items() if h not in chunks]
+            
+            # 3. Embeddings solo de lo nuevo
+            embeddings = await self.llm.embed([c.content for _, c in new]) if new else []
+            if len(embeddings) != len(new):
+                raise ValueError(f"embeddings incompletos: {len(embeddings)} de {len(new)}")
             logger.info("embeddings_generated", count=len(embeddings))
             
-            # 3. Almacenar en la base de datos
-            chunks_created = 0
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                knowledge = SemanticKnowledge(
-                    title=f"{title} - Parte {i+1}/{len(chunks)}",
-                    content=chunk,
-                    embedding=embedding
-                )
-                self.db.add(knowledge)
-                chunks_created += 1
+            for (content_hash, chunk), embedding in zip(new, embeddings):
+                self.db.add(SemanticKnowledge(
+                    title=self._chunk_title(title, chunk),
+                    content=chunk.content,
+                    embedding=embedding,
+                    source=source,
+                    section=chunk.section[:512] or None,
+                    content_hash=content_hash,
+                ))
+            deleted = 0
+            if stale:
+                deleted += self.db.query(SemanticKnowledge).filter(
+                    SemanticKnowledge.id.in_(stale)
+                ).delete(synchronize_session=False)
+            # Fragmentos de la ingesta anterior (sin source): "<título> - Parte i/n"
+            deleted += self.db.query(SemanticKnowledge).filter(
+                SemanticKnowledge.source.is_(None),
+                SemanticKnowledge.title.like(f"{title} - Parte %"),
+            ).delete(synchronize_session=False)
             
             self.db.commit()
+            if (new or deleted) and uses_memory_index(self.db):
+                refresh_knowledge_index(self.db)
             
             logger.info(
                 "ingest_document_completed",
                 title=title,
-                chunks=chunks_created
+                source=source,
+                chunks=len(new),
+                unchanged=len(chunks) - len(new),
+                deleted=deleted,
             )
             
             return IngestedDocument(
                 title=title,
-                chunks_created=chunks_created,
-                success=True
+                chunks_created=len(new),
+                success=True,
+                chunks_unchanged=len(chunks) - len(new),
+                chunks_deleted=deleted,
             )
             
         except Exception as e:
@@ -95,48 +144,10 @@ class IngestLegalDocumentUseCase:
                 success=False
             )
     
-    def _chunk_text(self, text: str) -> List[str]:
-        """
-        Divide el texto en chunks manejables.
-        
-        Estrategia:
-        - Divide por párrafos primero
-        - Si un párrafo es muy largo, lo divide por oraciones
-        - Mantiene tamaño máximo de ~500 tokens (aprox 2000 caracteres)
-        """
-        chunks = []
-        paragraphs = text.split('\n\n')
-        
-        current_chunk = ""
-        max_chars = 2000  # Aproximadamente 500 tokens
-        
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
-                continue
-            
-            # Si el párrafo es muy largo, dividirlo
-            if len(paragraph) > max_chars:
-                # Dividir por oraciones
-                sentences = paragraph.replace('. ', '.|').split('|')
-                for sentence in sentences:
-                    if len(current_chunk) + len(sentence) > max_chars:
-                        if current_chunk:
-                            chunks.append(current_chunk.strip())
-                        current_chunk = sentence
-                    else:
-                        current_chunk += " " + sentence
-            else:
-                # Si agregar este párrafo excede el límite, guardar el chunk actual
-                if len(current_chunk) + len(paragraph) > max_chars:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = paragraph
-                else:
-                    current_chunk += "\n\n" + paragraph
-        
-        # Agregar el último chunk
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        return chunks
+    def chunk(self, content: str, content_format: str = "text") -> List[DocumentChunk]:
+        """Fragmentos del documento según su formato (ver document_chunker)."""
+        return chunk_document(content, content_format, self.max_chunk_tokens, self.overlap_tokens)
+
+    @staticmethod
+    def _chunk_title(title: str, chunk: DocumentChunk) -> str:
+        return (f"{title} — {chunk.section}" if chunk.section else title)[:256]
@@ -1,7 +1,9 @@
+import time
 from typing import Optional, List, Dict, Any
 from dataclasses import dataclass, field
 from sqlalchemy.orm import Session
 import structlog
+from opentelemetry import trace
 
 from infrastructure.persistence.repositories import CaseRepository, MessageRepository
 from infrastructure.ai.router import LLMRouter
@@ -10,11 +12,22 @@ from infrastructure.validation.address_validation_service_impl import SimpleAddr
 from infrastructure.validation.date_validation_service_impl import SimpleDateValidationService
 from application.services.memory_service import MemoryService
 from application.services.hallucination_detection_service import HallucinationDetectionService
+from application.services.media_service import MediaService
+from application.services.llm_usage_service import LLMUsageService
+from application.services.conversation_summarizer import ConversationSummarizer
 from infrastructure.ocr.ocr_service_impl import MultiProviderOCRService
 from infrastructure.messaging.waha_service_impl import WAHAWhatsAppService
 from infrastructure.ai.safety_layer import SafetyLayer
+from infrastructure.ai.usage import begin_case_usage, end_case_usage
+from infrastructure.concurrency.executors import run_cpu
+from infrastructure.storage.previews import rasterize_first_page
+from infrastructure.tasks.jobs import enqueue_background, enqueue_media_previews, summarize_case_conversation
+from infrastructure.observability.metrics import TURN_SECONDS
+from infrastructure.observability.tracing import set_attributes, traced
+from core.config import settings
 
 logger = structlog.get_logger()
+tracer = trace.get_tracer(__name__)
 
 @dataclass
 class IncomingMessageRequest:
@@ -48,6 +61,9 @@ class MessageResponse:
     list_data: Optional[Dict[str, Any]] = None
     header: Optional[str] = None
     footer: Optional[str] = None
+    # Fila del historial de la respuesta (para seguir su estado de entrega)
+    case_id: Optional[int] = None
+    message_id: Optional[int] = None
 
 class ProcessIncomingMessageUseCase:
     """
@@ -67,25 +83,54 @@ class ProcessIncomingMessageUseCase:
         self.validator_date = SimpleDateValidationService()
         self.ocr = MultiProviderOCRService()
         self.whatsapp = WAHAWhatsAppService()
+        self.media = MediaService(db, whatsapp=self.whatsapp)
         self.safety = SafetyLayer()
         # Estado temporal para datos interactivos (se resetea en cada execute)
         self._pending_interactive: Dict[str, Any] = {}
     
+    @traced("turn.execute")
     async def execute(self, request: IncomingMessageRequest) -> MessageResponse:
         """Ejecuta el caso de uso"""
+        started = time.perf_counter()
+        self._turn_phase = None
+        self._usage_token = None
+        try:
+            return await self._execute(request)
+        finally:
+            if self._usage_token is not None:
+                end_case_usage(self._usage_token)
+            TURN_SECONDS.labels(
+                phase=self._turn_phase or "unknown",
+                kind="media" if request.media_id else "text",
+            ).observe(time.perf_counter() - started)
+
+    async def _execute(self, request: IncomingMessageRequest) -> MessageResponse:
         phone = request.phone
         text = request.text
         media_id = request.media_id
         mime_type = request.mime_type
+        turn_span = trace.get_current_span()
         
         # 1. Obtener o crear caso
-        case = self.cases.get_or_create_by_phone(phone)
+        with tracer.start_as_current_span("turn.case_load"):
+            case = self.cases.get_or_create_by_phone(phone)
+        self._turn_phase = case.phase
+        # Contabilidad de tokens del turno (y presupuesto del caso, si está configurado)
+        tokens_used = LLMUsageService(self.db).tokens_for_case(case.id) if settings.llm_case_token_budget else 0
+        self._usage_token = begin_case_usage(case.id, case.phase, tokens_used)
+        set_attributes(turn_span, {
+            "case.id": case.id,
+            "turn.phase": case.phase,
+            "turn.has_media": bool(media_id),
+            "turn.text_chars": len(text or ""),
+        })
         
         logger.info("processing_message", case_id=case.id, phone=phone, phase=case.phase, has_media=bool(media_id))
         
         # 2. Si hay media, procesar imagen (pasar caption/texto si lo hubiera)
         if media_id:
-            return await self._handle_media(case, media_id, mime_type, text)
+            with tracer.start_as_current_span("turn.media", attributes={"media.mime_type": mime_type or ""}):
+                return await self._handle_media(case, media_id, mime_type, text)
         
         # 3. Almacenar mensaje del usuario en DB y memoria
         self.messages.add_message(case.id, "user", text)
@@ -96,14 +141,23 @@ class ProcessIncomingMessageUseCase:
         self._is_template_response = True  # Por defecto, las fases usan templates deterministas
         
         # 5. Procesar según fase del caso (máquina de estados)
-        reply = await self._handle_phase(case, text)
+        phase_before = case.phase
+        with tracer.start_as_current_span("turn.phase_handler", attributes={"turn.phase": phase_before or ""}) as span:
+            reply = await self._handle_phase(case, text)
+            set_attributes(span, {"turn.phase_after": case.phase, "turn.llm_generated": not self._is_template_response})
         
         # 6. Validar respuesta contra alucinaciones
         #    Solo para respuestas generadas por LLM (no para plantillas deterministas ni interactivas)
         is_interactive = bool(self._pending_interactive)
         if not is_interactive and not self._is_template_response:
-            context = await self.memory.build_context_for_llm(case.id, text)
-            hallucination_check = await self.hallucination.check_response(reply, context, text)
+            with tracer.start_as_current_span("turn.hallucination_check") as span:
+                context = await self.memory.build_context_for_llm(case.id, text, task_type="hallucination_check")
+                hallucination_check = await self.hallucination.check_response(reply, context, text)
+                set_attributes(span, {
+                    "hallucination.valid": hallucination_check.is_valid,
+                    "hallucination.confidence": hallucination_check.confidence,
+                    "hallucination.context_chars": len(context or ""),
+                })
             
             if not hallucination_check.is_valid:
                 logger.warning(
@@ -116,8 +170,17 @@ class ProcessIncomingMessageUseCase:
                 self._pending_interactive = {}  # Limpiar interactive si hubo error
         
         # 7. Almacenar respuesta del asistente
-        self.messages.add_message(case.id, "assistant", reply)
-        await self.memory.store_immediate_memory(case.id, f"Asistente: {reply}")
+        with tracer.start_as_current_span("turn.store_reply", attributes={"turn.reply_chars": len(reply or "")}):
+            stored_reply = self.messages.add_message(case.id, "assistant", reply)
+            await self.memory.store_immediate_memory(case.id, f"Asistente: {reply}")
+        
+        # Resumen incremental en el worker (cola bulk): al terminar la entrevista se pliega todo lo
+        # pendiente; después, cada N turnos o al superar el umbral de tokens
+        if case.phase == "documentacion" and phase_before != "documentacion":
+            enqueue_background(summarize_case_conversation, case.id, True,
+                               idempotency_key=f"summary:documentacion:{case.id}")
+        else:
+            self._maybe_enqueue_summary(case)
         
         # 8. Guardar datos en memoria de sesión
         await self._update_session_memory(case)
@@ -129,6 +192,8 @@ class ProcessIncomingMessageUseCase:
             list_data=self._pending_interactive.get("list_data"),
             header=self._pending_interactive.get("header"),
             footer=self._pending_interactive.get("footer"),
+            case_id=case.id,
+            message_id=getattr(stored_reply, "id", None),
         )
     
     async def _handle_phase(self, case, text: str) -> str:
@@ -863,6 +928,16 @@ class ProcessIncomingMessageUseCase:
         # Usar LLM con contexto para otras consultas
         return await self._llm_fallback(case, text)
     
+    def _maybe_enqueue_summary(self, case) -> None:
+        """Encola el resumen si hay suficientes mensajes viejos sin resumir (una query por turno)."""
+        summarizer = ConversationSummarizer(self.db, self.memory)
+        stats = summarizer.pending_stats(case.id, case.summarized_through_message_id)
+        if summarizer.is_due(stats):
+            # La clave cambia con la marca y con cada tramo nuevo de turnos pendientes
+            step = stats["messages"] // (2 * settings.summary_every_turns)
+            key = f"summary:{case.id}:{case.summarized_through_message_id or 0}:{step}"
+            enqueue_background(summarize_case_conversation, case.id, idempotency_key=key)
+
     async def _llm_fallback(self, case, text: str) -> str:
         """Fallback: usar LLM con contexto completo"""
         self._is_template_response = False  # Respuesta generada por LLM, requiere hallucination check
@@ -1131,20 +1206,6 @@ Respuesta:"""
                 await self.memory.store_session_memory(case.id, key, value)
     
     async def _handle_media(self, case, media_id: str, mime_type: Optional[str], caption: Optional[str] = None) -> MessageResponse:
-        def _rasterize_pdf_first_image(pdf_bytes: bytes, dpi: int = 200) -> Optional[bytes]:
-            try:
-                import fitz  # PyMuPDF
-                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-                if doc.page_count == 0:
-                    return None
-                page = doc.load_page(0)
-                mat = fitz.Matrix(dpi/72, dpi/72)
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                img_bytes = pix.tobytes("jpeg")
-                return img_bytes
-            except Exception as e:
-                logger.warning("pdf_rasterize_failed", error=str(e))
-                return None
         """Procesa imagen enviada por el usuario (DNI, acta, ANSES, etc.)"""
         
         try:
@@ -1152,9 +1213,23 @@ Respuesta:"""
             logger.info("downloading_media", case_id=case.id, media_id=media_id)
             image_bytes = await self.whatsapp.download_media(media_id)
             
+            # Persistir al llegar: el dashboard lo sirve desde el media store sin volver a WAHA
+            try:
+                stored = self.media.save(media_id, image_bytes, mime_type)
+                if stored.mime_type != "application/octet-stream":
+                    mime_type = stored.mime_type
+                enqueue_media_previews(media_id)
+            except Exception as e:
+                logger.warning("media_store_save_failed", case_id=case.id, media_id=media_id, error=str(e))
+            
             # Si es PDF u otro no-imagen, intentar rasterizar
             if mime_type and not mime_type.startswith('image/'):
-                img_from_pdf = _rasterize_pdf_first_image(image_bytes) if (mime_type.startswith('application/pdf')) else None
+                img_from_pdf = None
+                if mime_type.startswith('application/pdf'):
+                    # PyMuPDF retiene el GIL: se rasteriza en el pool de procesos
+                    img_from_pdf = await run_cpu(rasterize_first_page, image_bytes)
+                    if img_from_pdf is None:
+                        logger.warning("pdf_rasterize_failed", case_id=case.id, media_id=media_id)
                 if img_from_pdf:
                     image_bytes = img_from_pdf  # Usar la imagen rasterizada para OCR
                 else:
@@ -29,8 +29,81 @@ class Settings(BaseSettings):
     llm_hallucination_model: str = Field(default="glm-4.6:cloud")
     llm_embedding_model: str = Field(default="nomic-embed-text:latest")
 
+    # Contabilidad de tokens: escritura por lotes en llm_usage
+    llm_usage_batch_size: int = Field(default=50)
+    llm_usage_flush_seconds: float = Field(default=5.0)
+    # Precios por modelo en JSON: {"modelo": [usd por 1M tokens de entrada, usd por 1M de salida]}
+    llm_token_prices: str = Field(default="")
+    # Presupuesto de tokens por caso (0 = sin límite); al superarlo Ollama Cloud usa llm_budget_model
+    llm_case_token_budget: int = Field(default=0)
+    llm_budget_model: str = Field(default="gpt-oss:20b-cloud")
+    # Presupuesto de tokens del contexto de memoria por task_type (JSON) y default
+    context_token_budgets: str = Field(default='{"chat": 1500, "reasoning": 2500, "hallucination_check": 1200}')
+    context_token_budget_default: int = Field(default=1500)
+    # Resumen incremental: cada N turnos sin resumir o al superar el umbral de tokens
+    summary_every_turns: int = Field(default=10)
+    summary_token_threshold: int = Field(default=1500)
+    summary_keep_recent_messages: int = Field(default=10)  # ventana de la memoria inmediata
+    summary_max_messages_per_chunk: int = Field(default=40)
+    # Ingesta de la base de conocimiento: tamaño de fragmento y solapamiento, en tokens
+    knowledge_chunk_max_tokens: int = Field(default=350)
+    knowledge_chunk_overlap_tokens: int = Field(default=40)
+    # Búsqueda híbrida en la base de conocimiento (texto completo + vectorial, fusión RRF)
+    knowledge_candidates: int = Field(default=20)  # candidatos por recuperador antes de fusionar
+    knowledge_rrf_k: int = Field(default=60)
+    # Re-ranker cross-encoder local opcional (sentence-transformers); vacío = desactivado
+    knowledge_reranker_model: str = Field(default="")
+    knowledge_rerank_timeout_ms: int = Field(default=300)
+    # Búsqueda vectorial: auto (pgvector en PostgreSQL, índice en memoria en otros motores) | pgvector | memory
+    vector_search_backend: str = Field(default="auto")
+    vector_index_refresh_seconds: float = Field(default=30.0)  # cada cuánto verificar si cambió la tabla
+    vector_index_snapshot_path: str = Field(default="")  # snapshot .npy compartido entre procesos (opcional)
+
+    # Paquetes de reglas de seguridad adicionales (JSON, rutas separadas por coma, relativas a backend/)
+    safety_pattern_packs: str = Field(default="")
+
+    # Pools para sacar trabajo bloqueante del event loop
+    executor_blocking_workers: int = Field(default=16)  # hilos: SDKs síncronos, bcrypt, archivos
+    executor_cpu_workers: int = Field(default=0)  # procesos: PDF, rasterizado, imágenes (0 = cantidad de CPUs)
+    executor_cpu_backend: str = Field(default="process")  # process | thread
+    # Monitor del event loop: loguea los callbacks que lo bloquean más de N ms (0 = desactivado)
+    loop_lag_threshold_ms: int = Field(default=200)
+    loop_lag_interval_ms: int = Field(default=50)
+
     allowed_jurisdictions: str = Field(default="San Rafael,Mendoza")
 
+    # Dashboard: TTL (segundos) del cache de respuestas de métricas
+    metrics_cache_ttl_seconds: int = Field(default=15)
+    # Embudo de fases: días sin transición para considerar un caso abandonado
+    phase_abandonment_days: int = Field(default=7)
+    # Stream de eventos (SSE): intervalo de keep-alive en segundos
+    realtime_heartbeat_seconds: int = Field(default=15)
+    # Vigencia del token de stream (?token=): solo se valida al conectar/reconectar
+    realtime_stream_token_seconds: int = Field(default=60)
+
+    # Media store local (relativo a backend/ si no es absoluto)
+    media_store_path: str = Field(default="media_store")
+
+    # Cola de salida de WhatsApp: ritmo de envío y reintentos
+    outbound_global_rate_per_second: int = Field(default=5)
+    outbound_chat_min_interval_ms: int = Field(default=1000)
+    outbound_max_attempts: int = Field(default=6)
+    outbound_retry_base_seconds: float = Field(default=5.0)
+    outbound_retry_max_seconds: float = Field(default=300.0)
+    # Envíos masivos: destinatarios por segundo que se pasan a la cola (deja margen a las respuestas)
+    broadcast_rate_per_second: float = Field(default=2.0)
+    broadcast_max_recipients: int = Field(default=2000)
+
+    # Trazas OpenTelemetry: none | console | file | otlp
+    tracing_exporter: str = Field(default="none")
+    tracing_file_path: str = Field(default="traces/spans.jsonl")
+    tracing_otlp_endpoint: str = Field(default="http://localhost:4318/v1/traces")
+    tracing_sample_ratio: float = Field(default=1.0)
+    tracing_service_name: str = Field(default="defensoria-backend")
+
+    # Exposición Prometheus en GET /metrics; si hay token, se exige "Authorization: Bearer <token>"
+    prometheus_token: str = Field(default="")
+
     class Config:
         # Buscar .env en la raíz del proyecto (dos niveles arriba desde core/)
         import os
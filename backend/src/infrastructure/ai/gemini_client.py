@@ -2,6 +2,8 @@ import google.generativeai as genai
 from typing import List, Dict, Any, Optional
 from application.interfaces.ai.llm_client import LLMClient
 from core.config import settings
+from infrastructure.concurrency.executors import run_blocking
+from .usage import report_usage
 
 class GeminiClient(LLMClient):
     def __init__(self):
@@ -21,11 +23,14 @@ class GeminiClient(LLMClient):
             parts.append(f"{m['role'].upper()}: {m['content']}")
         prompt = "\n".join(parts)
         resp = await self.model.generate_content_async(prompt)
+        meta = getattr(resp, "usage_metadata", None)
+        if meta is not None:
+            report_usage(getattr(meta, "prompt_token_count", None), getattr(meta, "candidates_token_count", None))
         return resp.text or ""
 
     async def embed(self, texts: List[str]) -> List[List[float]]:
-        # La API de Gemini no tiene método asíncrono para embeddings
-        resp = genai.embed_content(model=self.embed_model, content=texts)
+        # La API de Gemini no tiene método asíncrono para embeddings: la llamada HTTP va al pool de hilos
+        resp = await run_blocking(genai.embed_content, model=self.embed_model, content=texts)
         
         # API retorna un dict con clave 'embedding' que contiene una lista de floats
         if isinstance(resp, dict) and 'embedding' in resp:
@@ -2,6 +2,7 @@ import httpx
 from typing import List, Dict, Any, Optional
 from application.interfaces.ai.llm_client import LLMClient
 from core.config import settings
+from .usage import report_usage
 
 class OllamaClient(LLMClient):
     def __init__(self, model: str = "nomic-embed-text"):
@@ -16,6 +17,7 @@ class OllamaClient(LLMClient):
             )
             resp.raise_for_status()
             data = resp.json()
+            report_usage(data.get("prompt_eval_count"), data.get("eval_count"), data.get("model"))
             return data.get("message", {}).get("content", "")
 
     async def embed(self, texts: List[str]) -> List[List[float]]:
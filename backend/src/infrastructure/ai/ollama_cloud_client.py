@@ -3,6 +3,7 @@ import structlog
 from typing import List, Dict, Any, Optional
 from application.interfaces.ai.llm_client import LLMClient
 from core.config import settings
+from .usage import report_usage
 
 logger = structlog.get_logger()
 
@@ -83,6 +84,7 @@ class OllamaCloudClient(LLMClient):
                 
                 data = response.json()
                 content = data.get('message', {}).get('content', '')
+                report_usage(data.get('prompt_eval_count'), data.get('eval_count'), data.get('model'))
                 
                 logger.info(
                     "ollama_cloud_chat_success",
@@ -140,7 +142,9 @@ class OllamaCloudClient(LLMClient):
                     )
                     response.raise_for_status()
                     
-                    embedding = response.json().get('embedding', [])
+                    data = response.json()
+                    report_usage(data.get('prompt_eval_count'), 0)
+                    embedding = data.get('embedding', [])
                     embeddings.append(embedding)
                 
                 logger.info(
@@ -2,7 +2,9 @@ import base64
 import httpx
 import structlog
 from typing import List, Dict, Optional
+from opentelemetry import trace
 from core.config import settings
+from infrastructure.observability.tracing import set_attributes, traced
 
 logger = structlog.get_logger()
 
@@ -46,6 +48,7 @@ class OllamaVisionClient:
         """
         return base64.b64encode(image_bytes).decode('utf-8')
     
+    @traced("llm.vision")
     async def analyze_image(
         self,
         image_bytes: bytes,
@@ -67,6 +70,12 @@ class OllamaVisionClient:
             httpx.HTTPError: Si hay error en la request HTTP
         """
         model_name = model or self.default_vision_model
+        set_attributes(trace.get_current_span(), {
+            "llm.provider": "ollama_cloud",
+            "llm.model": model_name,
+            "llm.image_bytes": len(image_bytes),
+            "llm.prompt_chars": len(prompt),
+        })
         
         # Convertir imagen a base64
         image_b64 = self._encode_image(image_bytes)
@@ -107,6 +116,7 @@ class OllamaVisionClient:
                     model=model_name,
                     response_length=len(content)
                 )
+                trace.get_current_span().set_attribute("llm.response_chars", len(content))
                 
                 return content
                 
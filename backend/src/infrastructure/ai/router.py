@@ -1,12 +1,19 @@
+import time
 import structlog
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional, Literal
+from opentelemetry import trace
 from application.interfaces.ai.llm_client import LLMClient
 from .ollama_cloud_client import OllamaCloudClient
 from .ollama_client import OllamaClient
 from .gemini_client import GeminiClient
+from .usage import capture_usage, cost_usd, current_case_usage, estimate_tokens, over_budget, usage_recorder
 from core.config import settings
+from infrastructure.observability.metrics import LLM_FALLBACKS, LLM_SECONDS, timed
+from infrastructure.observability.tracing import set_attributes, traced
 
 logger = structlog.get_logger()
+tracer = trace.get_tracer(__name__)
 
 # Tipos de tareas soportadas
 TaskType = Literal['chat', 'reasoning', 'hallucination_check', 'vision_ocr', 'embeddings']
@@ -46,6 +53,7 @@ class LLMRouter(LLMClient):
         # Orden de fallback por defecto
         self.fallback_order = ['ollama_cloud', 'ollama_local', 'gemini']
     
+    @traced("llm.chat")
     async def chat(
         self,
         messages: List[Dict[str, str]],
@@ -64,9 +72,17 @@ class LLMRouter(LLMClient):
             Respuesta del modelo como string
         """
         model = self.model_map.get(task_type, settings.llm_chat_model)
+        chat_span = trace.get_current_span()
+        prompt_chars = sum(len(str(m.get("content") or "")) for m in messages)
+        if over_budget() and model != settings.llm_budget_model:
+            # Caso que superó su presupuesto de tokens: modelo más barato en Ollama Cloud
+            logger.info("llm_router_budget_downgrade", task_type=task_type, model=model,
+                        budget_model=settings.llm_budget_model)
+            chat_span.set_attribute("llm.budget_downgrade", True)
+            model = settings.llm_budget_model
         
         # Intentar con cada proveedor en orden hasta que uno funcione
-        for provider_name in self.fallback_order:
+        for attempt, provider_name in enumerate(self.fallback_order, 1):
             try:
                 provider = self.providers[provider_name]
                 
@@ -77,17 +93,33 @@ class LLMRouter(LLMClient):
                     model=model
                 )
                 
-                # Ollama Cloud usa parámetro model, otros no
-                if provider_name == 'ollama_cloud':
-                    response = await provider.chat(messages, tools=tools, model=model)
-                else:
-                    response = await provider.chat(messages, tools=tools)
+                with tracer.start_as_current_span("llm.attempt", attributes={
+                    "llm.provider": provider_name,
+                    "llm.model": model if provider_name == 'ollama_cloud' else provider_name,
+                    "llm.task_type": task_type,
+                    "llm.attempt": attempt,
+                }) as span, timed(LLM_SECONDS, provider=provider_name, task_type=task_type), \
+                        self._accounting(provider_name, model, task_type, prompt_chars) as usage:
+                    # Ollama Cloud usa parámetro model, otros no
+                    if provider_name == 'ollama_cloud':
+                        response = await provider.chat(messages, tools=tools, model=model)
+                    else:
+                        response = await provider.chat(messages, tools=tools)
+                    usage["response_chars"] = len(response or "")
+                    span.set_attribute("llm.response_chars", len(response or ""))
                 
                 logger.info(
                     "llm_router_success",
                     provider=provider_name,
                     task_type=task_type
                 )
+                set_attributes(chat_span, {
+                    "llm.provider": provider_name,
+                    "llm.attempts": attempt,
+                    "llm.fallbacks": attempt - 1,
+                    "llm.prompt_chars": prompt_chars,
+                    "llm.response_chars": len(response or ""),
+                })
                 
                 return response
                 
@@ -108,11 +140,55 @@ class LLMRouter(LLMClient):
                     raise
                 
                 # Si no, continuar con siguiente proveedor
+                LLM_FALLBACKS.labels(provider=provider_name, task_type=task_type).inc()
                 continue
         
         # Este código no debería alcanzarse, pero por seguridad
         raise Exception("Todos los proveedores de LLM fallaron")
+
+    @contextmanager
+    def _accounting(self, provider_name: str, model: str, task_type: str, prompt_chars: int):
+        """
+        Registra tokens, duración y costo del intento (también si falla).
+
+        Usa los conteos que informa el proveedor; si no vienen, los estima por
+        caracteres. Suma los tokens al caso en curso para el presupuesto.
+        """
+        started = time.perf_counter()
+        success = False
+        with capture_usage() as usage:
+            try:
+                yield usage
+                success = True
+            finally:
+                reported = "prompt_tokens" in usage or "completion_tokens" in usage
+                if reported:
+                    prompt_tokens = usage.get("prompt_tokens", 0)
+                    completion_tokens = usage.get("completion_tokens", 0)
+                else:
+                    prompt_tokens = estimate_tokens(prompt_chars) if success else 0
+                    completion_tokens = estimate_tokens(usage.get("response_chars", 0))
+                model_name = usage.get("model") or (
+                    model if provider_name == 'ollama_cloud' or task_type == "embeddings" else provider_name
+                )
+                scope = current_case_usage() or {}
+                if "tokens" in scope:
+                    scope["tokens"] += prompt_tokens + completion_tokens
+                usage_recorder.record(
+                    case_id=scope.get("case_id"),
+                    phase=scope.get("phase"),
+                    task_type=task_type,
+                    provider=provider_name,
+                    model=model_name,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    estimated=not reported,
+                    duration_ms=int((time.perf_counter() - started) * 1000),
+                    success=success,
+                    cost_usd=cost_usd(model_name, prompt_tokens, completion_tokens),
+                )
     
+    @traced("llm.embed")
     async def embed(
         self,
         texts: List[str],
@@ -137,7 +213,7 @@ class LLMRouter(LLMClient):
         # Orden actual: solo Ollama Local. Si falla, devolvemos lista vacía.
         embed_fallback_order = ['ollama_local']
         
-        for provider_name in embed_fallback_order:
+        for attempt, provider_name in enumerate(embed_fallback_order, 1):
             try:
                 provider = self.providers[provider_name]
                 
@@ -148,11 +224,20 @@ class LLMRouter(LLMClient):
                     texts_count=len(texts)
                 )
                 
-                # Ollama Cloud soporta parámetro model
-                if provider_name == 'ollama_cloud':
-                    embeddings = await provider.embed(texts, model=embedding_model)
-                else:
-                    embeddings = await provider.embed(texts)
+                with tracer.start_as_current_span("llm.attempt", attributes={
+                    "llm.provider": provider_name,
+                    "llm.model": embedding_model,
+                    "llm.task_type": "embeddings",
+                    "llm.attempt": attempt,
+                    "llm.texts": len(texts),
+                    "llm.prompt_chars": sum(len(t or "") for t in texts),
+                }), timed(LLM_SECONDS, provider=provider_name, task_type="embeddings"), \
+                        self._accounting(provider_name, embedding_model, "embeddings", sum(len(t or "") for t in texts)):
+                    # Ollama Cloud soporta parámetro model
+                    if provider_name == 'ollama_cloud':
+                        embeddings = await provider.embed(texts, model=embedding_model)
+                    else:
+                        embeddings = await provider.embed(texts)
                 
                 logger.info(
                     "llm_router_embed_success",
@@ -175,6 +260,7 @@ class LLMRouter(LLMClient):
                     logger.error("llm_router_embed_all_providers_failed")
                     return []
                 
+                LLM_FALLBACKS.labels(provider=provider_name, task_type="embeddings").inc()
                 continue
         
         # Seguridad extra: si por alguna razón se sale del bucle, devolver lista vacía.
@@ -3,28 +3,22 @@
 Por ahora implementa:
 - Detección muy simple de prompt injection basada en patrones.
 - Hooks para filtro de entrada y salida que se pueden enriquecer más adelante.
+
+Los patrones (y los paquetes extra configurados) se evalúan con el escáner
+unificado de safety_scanner, en una sola pasada por texto.
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Tuple, Dict, List, Set
+from typing import Tuple, Set
 
-import re
 import structlog
 
-
-logger = structlog.get_logger()
+from .safety_scanner import INJECTION_PATTERNS, PII_PATTERNS, get_safety_scanner  # noqa: F401 (re-export)
 
 
-INJECTION_PATTERNS = [
-    "ignore previous instructions",
-    "ignore all previous instructions",
-    "you are now",
-    "act as",
-    "SYSTEM:",
-    "system:",
-]
+logger = structlog.get_logger()
 
 
 @dataclass
@@ -34,18 +28,6 @@ class SafetyResult:
     reason: str | None = None
 
 
-# Patrones muy simples para detección/redacción de PII.
-# Nota: en un sistema real convendría usar una librería dedicada o
-# integrar con un servicio de DLP; aquí mantenemos la lógica acotada.
-PII_PATTERNS: Dict[str, re.Pattern[str]] = {
-    "cuit": re.compile(r"\b\d{2}-?\d{7,8}-?\d\b"),
-    "dni": re.compile(r"\b\d{7,8}\b"),
-    # Teléfonos tipo +5492604..., o secuencias largas de dígitos
-    "phone": re.compile(r"\+?\d{10,15}"),
-    "email": re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
-}
-
-
 class SafetyLayer:
     """Safety layer mínima.
 
@@ -60,19 +42,19 @@ class SafetyLayer:
         Devuelve un SafetyResult con allowed=False si se detecta algo sospechoso.
         """
 
-        lowered = text.lower()
-        for pattern in INJECTION_PATTERNS:
-            if pattern.lower() in lowered:
-                logger.warning(
-                    "safety_layer_prompt_injection_detected",
-                    pattern=pattern,
-                    text_preview=text[:200],
-                )
-                return SafetyResult(
-                    allowed=False,
-                    text=text,
-                    reason=f"Posible prompt injection detectado: '{pattern}'",
-                )
+        hits = get_safety_scanner().scan(text, {"injection"})
+        if hits:
+            pattern = hits[0].rule
+            logger.warning(
+                "safety_layer_prompt_injection_detected",
+                pattern=pattern,
+                text_preview=text[:200],
+            )
+            return SafetyResult(
+                allowed=False,
+                text=text,
+                reason=f"Posible prompt injection detectado: '{pattern}'",
+            )
 
         # En esta primera versión no modificamos el texto
         return SafetyResult(allowed=True, text=text, reason=None)
@@ -82,14 +64,8 @@ class SafetyLayer:
 
         Devuelve el texto redaccionado y el conjunto de tipos de PII encontrados.
         """
-        found: Set[str] = set()
-        redacted = text
-
-        for name, pattern in PII_PATTERNS.items():
-            if pattern.search(redacted):
-                found.add(name)
-                placeholder = f"<{name.upper()}>"
-                redacted = pattern.sub(placeholder, redacted)
+        redacted, hits = get_safety_scanner().redact(text, {"pii"})
+        found: Set[str] = {hit.rule for hit in hits}
 
         if found:
             logger.info(
@@ -0,0 +1,282 @@
+"""Escáner de seguridad unificado: frases de inyección, palabras y PII en una pasada.
+
+La capa de seguridad (SafetyLayer) y la validación de respuestas del
+usuario (SimpleResponseValidationService) tenían cada una sus listas y las
+recorrían patrón por patrón. Acá todas las reglas se compilan juntas:
+
+- Literales (frases de inyección, palabras inapropiadas, humor): un autómata
+  Aho-Corasick sobre el texto en minúsculas, que encuentra todas las
+  apariciones (incluso solapadas) en un solo recorrido. Usa pyahocorasick si
+  está instalado; si no, una alternancia con lookahead que da los mismos
+  resultados.
+- Regex estructuradas (DNI, CUIT, teléfono, email): una sola alternancia con
+  grupos con nombre, sin solapamientos (gana la primera regla que coincide
+  en cada posición, como al redactar patrón por patrón).
+
+Se pueden sumar paquetes de reglas en JSON con `safety_pattern_packs`
+(rutas separadas por coma, relativas a backend/), que tienen prioridad
+sobre las reglas por defecto:
+
+    {"name": "extra", "rules": [
+        {"category": "injection", "literal": "olvidá tus instrucciones"},
+        {"category": "answer_injection", "literal": "prompt", "whole_word": true},
+        {"category": "pii", "name": "cbu", "regex": "\\\\b\\\\d{22}\\\\b"}
+    ]}
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import structlog
+
+from core.config import settings
+
+
+logger = structlog.get_logger()
+
+_BACKEND_ROOT = Path(__file__).resolve().parents[3]
+
+# Frases de prompt injection en la entrada al LLM (SafetyLayer.filter_input)
+INJECTION_PATTERNS = [
+    "ignore previous instructions",
+    "ignore all previous instructions",
+    "you are now",
+    "act as",
+    "SYSTEM:",
+    "system:",
+]
+
+# Validación de respuestas del usuario (SimpleResponseValidationService)
+JOKE_WORDS = ["jaja", "jeje", "jiji", "xd", "a molestar", "broma"]
+INAPPROPRIATE = ["insulto", "tonto", "idiota", "mierda"]
+ANSWER_INJECTION_WORDS = ["ignora", "olvida", "asistente", "sistema"]
+ANSWER_INJECTION_PREFIXES = ["system:", "assistant:", "user:"]
+ANSWER_INJECTION_MARKERS = ["```", "###"]
+
+# Patrones muy simples para detección/redacción de PII, en orden de prioridad.
+# Nota: en un sistema real convendría usar una librería dedicada o
+# integrar con un servicio de DLP; aquí mantenemos la lógica acotada.
+PII_PATTERNS: Dict[str, re.Pattern[str]] = {
+    "cuit": re.compile(r"\b\d{2}-?\d{7,8}-?\d\b"),
+    "dni": re.compile(r"\b\d{7,8}\b"),
+    # Teléfonos tipo +5492604..., o secuencias largas de dígitos
+    "phone": re.compile(r"\+?\d{10,15}"),
+    "email": re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+}
+
+
+@dataclass(frozen=True)
+class SafetyRule:
+    """Una regla: literal (sin distinguir mayúsculas) o regex.
+
+    - whole_word: el literal no puede estar pegado a letras/dígitos.
+    - anchored: el literal debe estar al comienzo del texto.
+    """
+
+    category: str
+    name: str
+    literal: Optional[str] = None
+    regex: Optional[str] = None
+    whole_word: bool = False
+    anchored: bool = False
+
+
+@dataclass(frozen=True)
+class SafetyHit:
+    category: str
+    rule: str
+    start: int
+    end: int
+    text: str
+
+
+def default_rules() -> List[SafetyRule]:
+    rules = [SafetyRule("injection", p, literal=p) for p in INJECTION_PATTERNS]
+    rules += [SafetyRule("humor", w, literal=w) for w in JOKE_WORDS]
+    rules += [SafetyRule("inappropriate", w, literal=w) for w in INAPPROPRIATE]
+    rules += [SafetyRule("answer_injection", w, literal=w, whole_word=True) for w in ANSWER_INJECTION_WORDS]
+    rules += [SafetyRule("answer_injection", p, literal=p, anchored=True) for p in ANSWER_INJECTION_PREFIXES]
+    rules += [SafetyRule("answer_injection", m, literal=m) for m in ANSWER_INJECTION_MARKERS]
+    rules += [SafetyRule("pii", name, regex=pattern.pattern) for name, pattern in PII_PATTERNS.items()]
+    return rules
+
+
+def load_pattern_pack(path: str) -> List[SafetyRule]:
+    """Reglas de un paquete JSON ({"name", "rules": [...]}); ValueError si está mal formado."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    rules = []
+    for i, item in enumerate(data.get("rules", [])):
+        literal, regex = item.get("literal"), item.get("regex")
+        if not item.get("category") or (literal is None) == (regex is None):
+            raise ValueError(f"regla {i} de {path}: se requiere category y literal o regex")
+        if regex is not None:
+            re.compile(regex)
+            if item.get("ignore_case"):
+                regex = f"(?i:{regex})"
+        rules.append(SafetyRule(
+            category=item["category"],
+            name=item.get("name") or literal or f"{data.get('name', Path(path).stem)}:{i}",
+            literal=literal,
+            regex=regex,
+            whole_word=bool(item.get("whole_word")),
+            anchored=bool(item.get("anchored")),
+        ))
+    return rules
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class _LiteralMatcher:
+    """Todas las apariciones (start, end, clave) de un conjunto de literales, en un recorrido."""
+
+    def __init__(self, keys: Iterable[str]):
+        keys = sorted(set(keys), key=len, reverse=True)
+        self._automaton = None
+        self._pattern = None
+        if not keys:
+            return
+        try:
+            import ahocorasick
+
+            automaton = ahocorasick.Automaton()
+            for key in keys:
+                automaton.add_word(key, key)
+            automaton.make_automaton()
+            self._automaton = automaton
+        except ImportError:
+            # Lookahead: prueba cada posición sin consumir; en una posición gana el literal
+            # más largo y los demás que empiezan ahí son prefijos suyos (precalculados)
+            alternation = "|".join(re.escape(k) for k in keys)
+            self._pattern = re.compile(f"(?=({alternation}))")
+            # La alternancia sin lookahead es varias veces más rápida: ubica la primera coincidencia
+            # (la mayoría de los textos no tiene ninguna) y desde ahí se sigue posición por posición
+            self._first = re.compile(alternation)
+            self._prefixes = {k: [p for p in keys if p != k and k.startswith(p)] for k in keys}
+
+    @property
+    def backend(self) -> str:
+        return "ahocorasick" if self._automaton is not None else "regex"
+
+    def iter(self, lowered: str) -> Iterable[Tuple[int, int, str]]:
+        if self._automaton is not None:
+            for end, key in self._automaton.iter(lowered):
+                yield end - len(key) + 1, end + 1, key
+        elif self._pattern is not None:
+            first = self._first.search(lowered)
+            if first is None:
+                return
+            for match in self._pattern.finditer(lowered, first.start()):
+                start, key = match.start(), match.group(1)
+                yield start, start + len(key), key
+                for prefix in self._prefixes[key]:
+                    yield start, start + len(prefix), prefix
+
+
+class SafetyScanner:
+    """Todas las reglas compiladas: `scan` devuelve cada coincidencia en un solo llamado."""
+
+    def __init__(self, rules: Sequence[SafetyRule]):
+        self.rules = list(rules)
+        self._literal_rules: Dict[str, List[Tuple[int, SafetyRule]]] = {}
+        regexes = []
+        self._regex_rules: Dict[str, Tuple[int, SafetyRule]] = {}
+        for order, rule in enumerate(self.rules):
+            if rule.literal is not None:
+                self._literal_rules.setdefault(rule.literal.lower(), []).append((order, rule))
+            else:
+                group = f"r{order}"
+                self._regex_rules[group] = (order, rule)
+                regexes.append(f"(?P<{group}>{rule.regex})")
+        self._literals = _LiteralMatcher(self._literal_rules)
+        self._regex = re.compile("|".join(regexes)) if regexes else None
+
+    @property
+    def literal_backend(self) -> str:
+        return self._literals.backend
+
+    def scan(self, text: str, categories: Optional[Set[str]] = None) -> List[SafetyHit]:
+        """Coincidencias de todas las reglas (o solo de `categories`), en orden de regla y posición."""
+        text = text or ""
+        hits: List[Tuple[int, SafetyHit]] = []
+        lowered = text.lower()
+        source = text if len(lowered) == len(text) else lowered  # lower() puede cambiar el largo (p. ej. "İ")
+        for start, end, key in self._literals.iter(lowered):
+            for order, rule in self._literal_rules[key]:
+                if categories is not None and rule.category not in categories:
+                    continue
+                if rule.anchored and start != 0:
+                    continue
+                if rule.whole_word and (
+                    (start > 0 and _is_word_char(lowered[start - 1]))
+                    or (end < len(lowered) and _is_word_char(lowered[end]))
+                ):
+                    continue
+                hits.append((order, SafetyHit(rule.category, rule.name, start, end, source[start:end])))
+        if self._regex is not None:
+            for match in self._regex.finditer(text):
+                order, rule = self._regex_rules[match.lastgroup or ""]
+                if categories is None or rule.category in categories:
+                    hits.append((order, SafetyHit(rule.category, rule.name, match.start(), match.end(), match.group())))
+        hits.sort(key=lambda item: (item[0], item[1].start))
+        return [hit for _, hit in hits]
+
+    def redact(self, text: str, categories: Set[str]) -> Tuple[str, List[SafetyHit]]:
+        """Reemplaza cada coincidencia de `categories` por <NOMBRE_DE_REGLA>; devuelve el texto y los hits."""
+        hits = sorted(self.scan(text, categories), key=lambda hit: hit.start)
+        parts, cursor, redacted = [], 0, []
+        for hit in hits:
+            if hit.start < cursor:
+                continue  # solapada con una ya redactada
+            parts += [text[cursor:hit.start], f"<{hit.rule.upper()}>"]
+            cursor = hit.end
+            redacted.append(hit)
+        parts.append(text[cursor:])
+        return "".join(parts), redacted
+
+
+_scanner: Optional[SafetyScanner] = None
+_scanner_lock = threading.Lock()
+
+
+def _configured_packs() -> List[SafetyRule]:
+    rules: List[SafetyRule] = []
+    for raw in (settings.safety_pattern_packs or "").split(","):
+        if not raw.strip():
+            continue
+        path = Path(raw.strip())
+        path = path if path.is_absolute() else _BACKEND_ROOT / path
+        try:
+            pack = load_pattern_pack(str(path))
+        except (OSError, ValueError, re.error) as e:
+            logger.warning("safety_pattern_pack_invalid", path=str(path), error=str(e))
+            continue
+        logger.info("safety_pattern_pack_loaded", path=str(path), rules=len(pack))
+        rules += pack
+    return rules
+
+
+def get_safety_scanner() -> SafetyScanner:
+    """Escáner compartido del proceso: paquetes configurados + reglas por defecto."""
+    global _scanner
+    with _scanner_lock:
+        if _scanner is None:
+            # Los paquetes van primero: reglas más específicas (p. ej. CBU) ganan a las genéricas (teléfono)
+            _scanner = SafetyScanner(_configured_packs() + default_rules())
+            logger.info("safety_scanner_ready", rules=len(_scanner.rules), literal_backend=_scanner.literal_backend)
+        return _scanner
+
+
+def reset_safety_scanner() -> None:
+    """Fuerza a recompilar en el próximo uso (p. ej. tras cambiar `safety_pattern_packs`)."""
+    global _scanner
+    with _scanner_lock:
+        _scanner = None
+
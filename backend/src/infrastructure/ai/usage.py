@@ -0,0 +1,208 @@
+"""
+Contabilidad de tokens y costo de las llamadas a LLMs.
+
+- Los clientes informan los tokens que devuelve el proveedor con
+  `report_usage` (prompt_eval_count/eval_count de Ollama, usage_metadata de
+  Gemini); el router los toma con `capture_usage` alrededor de cada intento.
+- El caso en curso (case_id, fase y tokens ya consumidos) se fija con
+  `case_usage_scope`; el router lo usa para etiquetar cada fila y para bajar
+  de modelo cuando el caso superó `llm_case_token_budget`.
+- `usage_recorder` acumula las filas en memoria y las escribe en `llm_usage`
+  por lotes, fuera del loop (hilo), cuando se llena el lote o pasa
+  `llm_usage_flush_seconds`; `flush()` al apagar escribe lo pendiente.
+"""
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from core.config import settings
+
+logger = structlog.get_logger()
+
+# Tokens informados por el proveedor en la llamada en curso
+_call_usage: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_call_usage", default=None)
+# Caso del turno en curso: {"case_id", "phase", "tokens"}
+_case_usage: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_case_usage", default=None)
+
+
+def report_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int], model: Optional[str] = None) -> None:
+    """Lo llaman los clientes con los conteos de la respuesta (None si no vinieron)."""
+    usage = _call_usage.get()
+    if usage is None:
+        return
+    if prompt_tokens is not None:
+        usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + int(prompt_tokens)
+    if completion_tokens is not None:
+        usage["completion_tokens"] = usage.get("completion_tokens", 0) + int(completion_tokens)
+    if model:
+        usage["model"] = model
+
+
+@contextmanager
+def capture_usage():
+    """Recolecta lo que informen los clientes dentro del bloque."""
+    usage: Dict[str, Any] = {}
+    token = _call_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _call_usage.reset(token)
+
+
+def begin_case_usage(case_id: Optional[int], phase: Optional[str] = None, tokens_used: int = 0):
+    """Asocia las llamadas siguientes a un caso (y fase); retorna el token para `end_case_usage`."""
+    return _case_usage.set({"case_id": case_id, "phase": phase, "tokens": tokens_used})
+
+
+def end_case_usage(token) -> None:
+    _case_usage.reset(token)
+
+
+@contextmanager
+def case_usage_scope(case_id: Optional[int], phase: Optional[str] = None, tokens_used: int = 0):
+    """Como begin/end_case_usage, para un bloque."""
+    token = begin_case_usage(case_id, phase, tokens_used)
+    try:
+        yield
+    finally:
+        end_case_usage(token)
+
+
+def current_case_usage() -> Optional[Dict[str, Any]]:
+    return _case_usage.get()
+
+
+def over_budget() -> bool:
+    """True si el caso en curso ya consumió su presupuesto de tokens."""
+    scope = _case_usage.get()
+    budget = settings.llm_case_token_budget
+    return bool(budget and scope and scope.get("case_id") is not None and scope["tokens"] >= budget)
+
+
+def estimate_tokens(chars: int) -> int:
+    """Aproximación cuando el proveedor no informa tokens (~4 caracteres por token)."""
+    return (chars + 3) // 4
+
+
+_prices_cache: Optional[Dict[str, List[float]]] = None
+
+
+def _prices() -> Dict[str, List[float]]:
+    global _prices_cache
+    if _prices_cache is None:
+        try:
+            _prices_cache = json.loads(settings.llm_token_prices) if settings.llm_token_prices else {}
+        except ValueError:
+            logger.warning("llm_token_prices_invalid")
+            _prices_cache = {}
+    return _prices_cache
+
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Costo según `llm_token_prices` ({"modelo": [usd por 1M de entrada, usd por 1M de salida]})."""
+    price = _prices().get(model)
+    if not price:
+        return None
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+
+class UsageRecorder:
+    """Buffer de filas de `llm_usage` con escritura por lotes."""
+
+    def __init__(self, session_factory=None, batch_size: Optional[int] = None, flush_seconds: Optional[float] = None):
+        self._session_factory = session_factory
+        self.batch_size = batch_size or settings.llm_usage_batch_size
+        self.flush_seconds = flush_seconds if flush_seconds is not None else settings.llm_usage_flush_seconds
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._timer_loop = None
+        self._tasks = set()
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from infrastructure.persistence.db import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def record(self, **row) -> None:
+        row.setdefault("created_at", datetime.utcnow())
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._flush_in_background()
+        else:
+            self._arm_timer()
+
+    def pending_tokens(self, case_id: int) -> int:
+        """Tokens del caso todavía en el buffer (para el chequeo de presupuesto)."""
+        with self._lock:
+            return sum(
+                r["prompt_tokens"] + r["completion_tokens"] for r in self._pending if r.get("case_id") == case_id
+            )
+
+    def flush(self) -> int:
+        """Escribe lo pendiente en forma sincrónica (apagado, fin de scripts y tests)."""
+        rows = self._take()
+        if rows:
+            self._write(rows)
+        return len(rows)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows, self._pending = self._pending, []
+        return rows
+
+    def _arm_timer(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # sin loop: se escribe al completar el lote o con flush()
+        if self._timer_loop is loop:
+            return
+        self._timer_loop = loop
+        loop.call_later(self.flush_seconds, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer_loop = None
+        self._flush_in_background()
+
+    def _flush_in_background(self) -> None:
+        rows = self._take()
+        if not rows:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(rows)
+            return
+        task = loop.create_task(asyncio.to_thread(self._write, rows))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        from sqlalchemy import insert
+        from infrastructure.persistence.models import LLMUsage
+
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            db.execute(insert(LLMUsage), rows)
+            db.commit()
+            logger.debug("llm_usage_flushed", rows=len(rows), ms=round((time.perf_counter() - started) * 1000, 1))
+        except Exception as e:
+            db.rollback()
+            logger.warning("llm_usage_write_failed", rows=len(rows), error=str(e))
+        finally:
+            db.close()
+
+
+usage_recorder = UsageRecorder()
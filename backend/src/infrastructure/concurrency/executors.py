@@ -0,0 +1,115 @@
+"""
+Pools gestionados para sacar trabajo bloqueante del event loop.
+
+Dos pools con tamaños independientes:
+- blocking (hilos, `executor_blocking_workers`): I/O bloqueante y código que
+  suelta el GIL mientras trabaja: SDKs síncronos (genai.embed_content),
+  bcrypt, lectura de archivos. También es el executor por defecto del loop,
+  así que `asyncio.to_thread` y `run_in_executor(None, ...)` caen acá.
+- cpu (procesos, `executor_cpu_workers`): trabajo de CPU en Python que
+  retiene el GIL y frenaría al loop aunque corriera en un hilo: PDF con
+  reportlab, rasterizado con PyMuPDF, conversión de imágenes. Función y
+  argumentos tienen que ser picklables (funciones de módulo, bytes, dicts).
+  Con `executor_cpu_backend=thread` usa hilos (tests, entornos sin fork).
+
+Los procesos se crean con "spawn" (el proceso de la API ya tiene hilos) y
+recién con la primera tarea. Si el pool se rompe (un worker murió) se
+recrea y esa tarea se reintenta en el pool de hilos.
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+import structlog
+
+from core.config import settings
+from infrastructure.observability.metrics import EXECUTOR_SECONDS
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_blocking: Optional[ThreadPoolExecutor] = None
+_cpu: Optional[Executor] = None
+
+
+def cpu_workers() -> int:
+    return settings.executor_cpu_workers or os.cpu_count() or 2
+
+
+def blocking_executor() -> ThreadPoolExecutor:
+    global _blocking
+    with _lock:
+        if _blocking is None:
+            _blocking = ThreadPoolExecutor(
+                max_workers=settings.executor_blocking_workers, thread_name_prefix="blocking"
+            )
+        return _blocking
+
+
+def cpu_executor() -> Executor:
+    global _cpu
+    with _lock:
+        if _cpu is None:
+            if (settings.executor_cpu_backend or "process").lower() == "thread":
+                _cpu = ThreadPoolExecutor(max_workers=cpu_workers(), thread_name_prefix="cpu")
+            else:
+                _cpu = ProcessPoolExecutor(max_workers=cpu_workers(), mp_context=multiprocessing.get_context("spawn"))
+            logger.info("cpu_executor_started", backend=type(_cpu).__name__, workers=cpu_workers())
+        return _cpu
+
+
+async def _timed(pool: str, future: "asyncio.Future[T]") -> T:
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        return await future
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        EXECUTOR_SECONDS.labels(pool=pool, outcome=outcome).observe(time.perf_counter() - start)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Corre `func` en el pool de hilos, con el contexto actual (trazas, contabilidad de tokens)."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await _timed("blocking", loop.run_in_executor(blocking_executor(), call))
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Corre `func` en el pool de CPU (otro proceso): sin contexto, argumentos picklables."""
+    global _cpu
+    loop = asyncio.get_running_loop()
+    executor = cpu_executor()
+    try:
+        return await _timed("cpu", loop.run_in_executor(executor, functools.partial(func, *args, **kwargs)))
+    except BrokenProcessPool as e:
+        logger.warning("cpu_executor_broken", error=str(e), func=getattr(func, "__name__", repr(func)))
+        with _lock:
+            if _cpu is executor:
+                _cpu = None
+        executor.shutdown(wait=False)
+        return await run_blocking(func, *args, **kwargs)
+
+
+def install_default_executor(loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+    """Usa el pool de hilos gestionado como executor por defecto del loop (to_thread, etc.)."""
+    (loop or asyncio.get_running_loop()).set_default_executor(blocking_executor())
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    global _blocking, _cpu
+    with _lock:
+        pools, _blocking, _cpu = [p for p in (_blocking, _cpu) if p is not None], None, None
+    for pool in pools:
+        pool.shutdown(wait=wait, cancel_futures=True)
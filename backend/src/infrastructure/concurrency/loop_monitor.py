@@ -0,0 +1,96 @@
+"""
+Monitor de lag del event loop.
+
+Una tarea en el loop duerme `interval` y mide cuánto se atrasó al despertar
+(histograma `event_loop_lag_seconds`). Eso dice que el loop estuvo
+bloqueado, pero no por quién: para eso un hilo vigía revisa el último
+latido y, si el loop lleva más de `threshold` sin latir, toma la pila del
+hilo del loop (sys._current_frames), que en ese momento está ejecutando el
+callback culpable. Al recuperarse se loguea `event_loop_blocked` con la
+duración total y esa pila.
+
+Un bloqueo que no termina (más de `_STALL_LOG_SECONDS`) se loguea desde el
+vigía como `event_loop_stalled`, porque el loop no va a poder hacerlo.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import List, Optional
+
+import structlog
+
+from infrastructure.observability.metrics import LOOP_LAG_SECONDS
+
+logger = structlog.get_logger()
+
+_STALL_LOG_SECONDS = 5.0
+_STACK_FRAMES = 8
+
+
+def _stack_of(thread_id: int) -> List[str]:
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return []
+    return [f"{f.filename}:{f.lineno} {f.name}" for f in traceback.extract_stack(frame)[-_STACK_FRAMES:]]
+
+
+class LoopLagMonitor:
+    """Latido en el loop + hilo vigía que identifica al callback que lo bloquea."""
+
+    def __init__(self, threshold_ms: float = 200, interval_ms: float = 50):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.blocked = 0  # bloqueos por encima del umbral desde que arrancó
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id = 0
+        self._last_beat = 0.0
+        self._stack: List[str] = []
+        self._stall_logged = False
+
+    def start(self) -> None:
+        """Arranca desde el loop a monitorear (p. ej. en el startup de la app)."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _beat(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            lag = max(0.0, now - start - self.interval)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                self.blocked += 1
+                logger.warning("event_loop_blocked", lag_ms=round(lag * 1000, 1), stack=self._stack)
+            self._stack, self._stall_logged = [], False
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            stalled = time.monotonic() - self._last_beat - self.interval
+            if stalled < self.threshold:
+                continue
+            if not self._stack:
+                self._stack = _stack_of(self._loop_thread_id)
+            if stalled >= _STALL_LOG_SECONDS and not self._stall_logged:
+                self._stall_logged = True
+                logger.error("event_loop_stalled", stalled_ms=round(stalled * 1000), stack=self._stack)
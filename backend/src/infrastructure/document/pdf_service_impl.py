@@ -412,3 +412,8 @@ class TemplatePDFService(DocumentService):
         # En documentos legales argentinos, NO se usa sangría de primera línea
         # Los párrafos se separan con espaciado
         return False
+
+
+def render_divorce_petition_pdf(case_data: dict) -> bytes:
+    """Renderiza la demanda; función de módulo para poder correrla en el pool de CPU (run_cpu)."""
+    return TemplatePDFService().generate_divorce_petition_pdf(case_data)
@@ -0,0 +1,64 @@
+"""
+Datos del caso que usa la plantilla de la demanda de divorcio.
+
+Compartido por la descarga directa del PDF y por la tarea que lo renderiza
+en el worker.
+"""
+from typing import Any, Dict
+
+from infrastructure.persistence.models import Case
+
+
+def build_petition_case_data(case: Case) -> Dict[str, Any]:
+    """Diccionario completo con TODOS los datos del caso para la plantilla."""
+    return {
+        # Tipo de divorcio
+        "type": case.type,
+        
+        # Datos personales del solicitante
+        "apellido": case.apellido,
+        "nombres": case.nombres,
+        "nombre": case.nombre,  # Mantener por compatibilidad
+        "dni": case.dni,
+        "cuit": case.cuit,
+        "fecha_nacimiento": case.fecha_nacimiento,
+        "nacionalidad": case.nacionalidad,
+        "ocupacion": case.ocupacion,
+        "domicilio": case.domicilio,
+        "phone": case.phone,
+        "email": case.email,
+        
+        # Datos del cónyuge
+        "apellido_conyuge": case.apellido_conyuge,
+        "nombres_conyuge": case.nombres_conyuge,
+        "nombre_conyuge": case.nombre_conyuge,  # Mantener por compatibilidad
+        "dni_conyuge": case.dni_conyuge,
+        "cuit_conyuge": case.cuit_conyuge,
+        "fecha_nacimiento_conyuge": case.fecha_nacimiento_conyuge,
+        "nacionalidad_conyuge": case.nacionalidad_conyuge,
+        "ocupacion_conyuge": case.ocupacion_conyuge,
+        "domicilio_conyuge": case.domicilio_conyuge,
+        "phone_conyuge": case.phone_conyuge,
+        "email_conyuge": case.email_conyuge,
+        
+        # Datos del matrimonio
+        "fecha_matrimonio": case.fecha_matrimonio,
+        "lugar_matrimonio": case.lugar_matrimonio,
+        "fecha_separacion": case.fecha_separacion,
+        "ultimo_domicilio_conyugal": case.ultimo_domicilio_conyugal or case.domicilio,
+        
+        # Datos del acta de matrimonio
+        "acta_numero": case.acta_numero,
+        "acta_libro": case.acta_libro,
+        "acta_anio": case.acta_anio,
+        "acta_foja": case.acta_foja,
+        "acta_oficina": case.acta_oficina,
+        
+        # Hijos
+        "tiene_hijos": case.tiene_hijos,
+        "info_hijos": case.info_hijos,
+        
+        # Bienes
+        "tiene_bienes": case.tiene_bienes,
+        "info_bienes": case.info_bienes,
+    }
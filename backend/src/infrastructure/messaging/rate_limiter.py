@@ -0,0 +1,167 @@
+"""
+Ritmo y exclusión de envíos a WhatsApp, compartidos entre procesos vía Redis.
+
+- Global: ventana fija de 1 segundo (INCR + EXPIRE) con tope
+  `outbound_global_rate_per_second`, para no saturar WAHA.
+- Por chat: intervalo mínimo entre mensajes al mismo chat (SET NX PX), que es
+  lo que WhatsApp penaliza como spam.
+
+`acquire(chat_id)` retorna 0 si se puede enviar ya, o los segundos a esperar.
+`ChatSendLock` asegura un único proceso vaciando la cola de cada chat, que es
+lo que garantiza el orden de entrega; quien lo tiene renueva el TTL tras cada
+envío (`extend`) y deja de enviar si lo perdió.
+
+Si Redis no responde el limitador se abre (deja pasar) durante un rato: se
+prefiere enviar sin control de ritmo a no enviar. El lock en cambio cae a
+uno en proceso, que mantiene el orden por chat dentro del proceso pero no
+entre workers; mientras dure se loguea `outbound_lock_process_only`.
+"""
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import redis
+import structlog
+
+from core.config import settings
+
+logger = structlog.get_logger()
+
+_GLOBAL_KEY = "outbound:rate:global:"
+_CHAT_KEY = "outbound:rate:chat:"
+_LOCK_KEY = "outbound:lock:"
+_BACKOFF_SECONDS = 30.0
+
+# Renovar el TTL solo si el lock sigue siendo nuestro (comparar y expirar en un paso)
+_EXTEND_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class _RedisBacked:
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self._redis = redis_client
+        self._disabled_until = 0.0
+
+    def _client(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5,
+            )
+        return self._redis
+
+    def _fail_open(self, event: str, error: Exception) -> None:
+        self._disabled_until = time.monotonic() + _BACKOFF_SECONDS
+        logger.warning(event, error=str(error))
+
+
+class SendRateLimiter(_RedisBacked):
+    def __init__(self, redis_client: Optional[redis.Redis] = None,
+                 global_per_second: Optional[int] = None, chat_interval_ms: Optional[int] = None):
+        super().__init__(redis_client)
+        self.global_per_second = global_per_second or settings.outbound_global_rate_per_second
+        self.chat_interval_ms = chat_interval_ms if chat_interval_ms is not None else settings.outbound_chat_min_interval_ms
+
+    def acquire(self, chat_id: str) -> float:
+        if time.monotonic() < self._disabled_until:
+            return 0.0
+        try:
+            client = self._client()
+            now = time.time()
+            window = _GLOBAL_KEY + str(int(now))
+            pipe = client.pipeline(transaction=False)
+            pipe.incr(window)
+            pipe.expire(window, 2)
+            count = pipe.execute()[0]
+            if count > self.global_per_second:
+                return max(0.01, 1.0 - (now % 1.0))
+            if self.chat_interval_ms and not client.set(_CHAT_KEY + chat_id, "1", nx=True, px=self.chat_interval_ms):
+                remaining = client.pttl(_CHAT_KEY + chat_id)
+                return max(0.01, (remaining if remaining and remaining > 0 else self.chat_interval_ms) / 1000)
+            return 0.0
+        except Exception as e:
+            self._fail_open("outbound_rate_limiter_unavailable", e)
+            return 0.0
+
+
+class ChatSendLock(_RedisBacked):
+    """Lock con expiración por chat. `acquire` retorna un token, o None si otro lo tiene.
+
+    Se toma siempre también en proceso (dict con expiración): sin Redis el
+    orden se sigue garantizando entre las tareas de este proceso, aunque no
+    entre workers distintos.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, ttl_seconds: int = 120):
+        super().__init__(redis_client)
+        self.ttl_seconds = ttl_seconds
+        self._local: Dict[str, Tuple[str, float]] = {}
+        self._local_lock = threading.Lock()
+
+    def _hold_local(self, chat_id: str, token: str) -> bool:
+        """Toma o renueva el lock en proceso; False si lo tiene otro token vigente."""
+        now = time.monotonic()
+        with self._local_lock:
+            held = self._local.get(chat_id)
+            if held and held[0] != token and held[1] > now:
+                return False
+            self._local[chat_id] = (token, now + self.ttl_seconds)
+            return True
+
+    def _release_local(self, chat_id: str, token: str) -> None:
+        with self._local_lock:
+            if self._local.get(chat_id, ("", 0.0))[0] == token:
+                del self._local[chat_id]
+
+    def acquire(self, chat_id: str) -> Optional[str]:
+        token = uuid.uuid4().hex
+        if not self._hold_local(chat_id, token):
+            return None
+        if time.monotonic() < self._disabled_until:
+            # Sin Redis: exclusión solo dentro de este proceso
+            logger.warning("outbound_lock_process_only", chat_id=chat_id)
+            return token
+        try:
+            if self._client().set(_LOCK_KEY + chat_id, token, nx=True, ex=self.ttl_seconds):
+                return token
+        except Exception as e:
+            self._fail_open("outbound_lock_unavailable", e)
+            logger.warning("outbound_lock_process_only", chat_id=chat_id)
+            return token
+        self._release_local(chat_id, token)
+        return None
+
+    def extend(self, chat_id: str, token: str) -> bool:
+        """Renueva el TTL; False si el lock expiró y lo tomó otro (hay que dejar de enviar)."""
+        if not self._hold_local(chat_id, token):
+            return False
+        if time.monotonic() < self._disabled_until:
+            return True
+        try:
+            return bool(self._client().eval(_EXTEND_SCRIPT, 1, _LOCK_KEY + chat_id, token, self.ttl_seconds))
+        except Exception as e:
+            self._fail_open("outbound_lock_unavailable", e)
+            return True
+
+    def release(self, chat_id: str, token: str) -> None:
+        self._release_local(chat_id, token)
+        if time.monotonic() < self._disabled_until:
+            return
+        try:
+            client = self._client()
+            # Solo liberar si sigue siendo nuestro (pudo expirar y tomarlo otro)
+            if client.get(_LOCK_KEY + chat_id) == token:
+                client.delete(_LOCK_KEY + chat_id)
+        except Exception as e:
+            self._fail_open("outbound_lock_unavailable", e)
+
+
+rate_limiter = SendRateLimiter()
+chat_lock = ChatSendLock()
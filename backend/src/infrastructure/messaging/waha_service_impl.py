@@ -1,8 +1,11 @@
 import httpx
 import structlog
 from typing import Optional
+from opentelemetry import trace
 from application.interfaces.messaging.whatsapp_service import WhatsAppService
 from core.config import settings
+from infrastructure.observability.metrics import WHATSAPP_SECONDS, measured
+from infrastructure.observability.tracing import set_attributes, traced
 
 logger = structlog.get_logger()
 
@@ -20,6 +23,8 @@ class WAHAWhatsAppService(WhatsAppService):
             "Content-Type": "application/json"
         }
     
+    @traced("whatsapp.send_text")
+    @measured(WHATSAPP_SECONDS, operation="send_text")
     async def send_message(self, phone_or_chat: str, message: str) -> dict:
         """Envía un mensaje de texto. Acepta MSISDN o JID (chatId).
         Reglas:
@@ -60,16 +65,20 @@ class WAHAWhatsAppService(WhatsAppService):
             "text": message
         }
         # Para LID no intentamos fallback por phone, ya que WAHA requiere chatId
+        span = trace.get_current_span()
+        set_attributes(span, {"whatsapp.is_lid": is_lid, "whatsapp.text_chars": len(message), "whatsapp.requests": 1})
         
         try:
             async with httpx.AsyncClient(timeout=30, verify=False) as client:
                 response = await client.post(url, json=payload, headers=self._headers())
+                span.set_attribute("http.status_code", response.status_code)
                 if response.status_code >= 400:
                     body = response.text
                     logger.warning("whatsapp_send_primary_failed", status=response.status_code, body=body)
                     # Fallback solo si NO es LID; con LID WAHA requiere chatId
                     if not is_lid:
                         alt_payload = {"session": self.session_name, "phone": msisdn, "text": message}
+                        span.set_attribute("whatsapp.requests", 2)
                         alt_resp = await client.post(url, json=alt_payload, headers=self._headers())
                         alt_resp.raise_for_status()
                         result = alt_resp.json()
@@ -85,6 +94,8 @@ class WAHAWhatsAppService(WhatsAppService):
             logger.error("whatsapp_send_error", phone=msisdn, chat_id=chat_id, error=str(e))
             raise
     
+    @traced("whatsapp.send_file")
+    @measured(WHATSAPP_SECONDS, operation="send_file")
     async def send_document(self, phone_or_chat: str, file_content: bytes, filename: str, caption: Optional[str] = None) -> dict:
         """Envía un documento (PDF, JPG, PNG). Acepta MSISDN o JID (chatId)."""
         raw = phone_or_chat.strip()
@@ -125,14 +136,19 @@ class WAHAWhatsAppService(WhatsAppService):
             "caption": caption or ""
         }
         
+        span = trace.get_current_span()
+        set_attributes(span, {"whatsapp.is_lid": is_lid, "whatsapp.file_bytes": len(file_content), "whatsapp.requests": 1})
+        
         try:
             async with httpx.AsyncClient(timeout=60, verify=False) as client:
                 response = await client.post(url, json=payload, headers=self._headers())
+                span.set_attribute("http.status_code", response.status_code)
                 if response.status_code >= 400:
                     body = response.text
                     logger.warning("whatsapp_send_file_primary_failed", status=response.status_code, body=body)
                     # Fallback: usar 'phone' en lugar de 'chatId' solo si NO es LID
                     if not is_lid:
+                        span.set_attribute("whatsapp.requests", 2)
                         alt_payload = dict(payload)
                         alt_payload.pop("chatId", None)
                         alt_payload["phone"] = msisdn
@@ -151,6 +167,8 @@ class WAHAWhatsAppService(WhatsAppService):
             logger.error("whatsapp_send_document_error", phone=msisdn, chat_id=chat_id, filename=filename, error=str(e))
             raise
     
+    @traced("whatsapp.download_media")
+    @measured(WHATSAPP_SECONDS, operation="download_media")
     async def download_media(self, media_id: str) -> bytes:
         """Descarga un archivo multimedia enviado por el usuario"""
         url = f"{self.base_url}/api/files/{media_id}"
@@ -159,6 +177,7 @@ class WAHAWhatsAppService(WhatsAppService):
             async with httpx.AsyncClient(timeout=60, verify=False) as client:
                 response = await client.get(url, headers=self._headers())
                 response.raise_for_status()
+                trace.get_current_span().set_attribute("whatsapp.media_bytes", len(response.content))
                 logger.info("whatsapp_media_downloaded", media_id=media_id, size=len(response.content))
                 return response.content
         except Exception as e:
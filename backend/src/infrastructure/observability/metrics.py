@@ -0,0 +1,149 @@
+"""
+Métricas Prometheus de latencia y confiabilidad del pipeline.
+
+Histogramas de turno por fase, intentos del router de LLMs por proveedor y
+tipo de tarea, OCR (latencia y confianza por extractor), WAHA (envío y
+descarga), requests HTTP, queries a la base por request, tareas en los pools
+de hilos/procesos y lag del event loop; contadores de fallback del router y
+de resultados del webhook (tasa de duplicados).
+
+Multi-proceso: si PROMETHEUS_MULTIPROC_DIR está definido antes de arrancar
+(workers de uvicorn/gunicorn y de Celery), cada proceso escribe sus valores
+en ese directorio y GET /metrics agrega todos con MultiProcessCollector. El
+directorio tiene que existir, estar vacío al arrancar y ser compartido por
+los procesos que se quieran ver juntos (en docker-compose, un volumen común
+entre api y workers).
+"""
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+
+# Latencias de LLM y OCR van de cientos de ms a minutos; las de WAHA/DB son cortas
+_SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+_FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+TURN_SECONDS = Histogram(
+    "turn_latency_seconds", "Duración de un turno del caso de uso por fase de entrada",
+    ["phase", "kind"], buckets=_SLOW_BUCKETS,
+)
+LLM_SECONDS = Histogram(
+    "llm_request_seconds", "Duración de cada intento del router de LLMs",
+    ["provider", "task_type", "outcome"], buckets=_SLOW_BUCKETS,
+)
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total", "Intentos fallidos que pasaron al siguiente proveedor",
+    ["provider", "task_type"],
+)
+OCR_SECONDS = Histogram(
+    "ocr_seconds", "Duración de una extracción OCR (incluye fallbacks)",
+    ["extractor", "outcome"], buckets=_SLOW_BUCKETS,
+)
+OCR_CONFIDENCE = Histogram(
+    "ocr_confidence", "Confianza de las extracciones OCR",
+    ["extractor"], buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+WHATSAPP_SECONDS = Histogram(
+    "whatsapp_request_seconds", "Duración de llamadas a WAHA",
+    ["operation", "outcome"], buckets=_FAST_BUCKETS,
+)
+WEBHOOK_MESSAGES = Counter(
+    "webhook_messages_total", "Eventos recibidos por el webhook de WhatsApp según resultado",
+    ["result"],
+)
+HTTP_SECONDS = Histogram(
+    "http_request_seconds", "Duración de requests HTTP por ruta",
+    ["method", "route", "status"], buckets=_FAST_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "db_queries_per_request", "Sentencias SQL ejecutadas por request HTTP",
+    ["route"], buckets=(0, 1, 2, 5, 10, 20, 30, 50, 100, 200),
+)
+EXECUTOR_SECONDS = Histogram(
+    "executor_task_seconds", "Duración de tareas en los pools (espera en cola + ejecución)",
+    ["pool", "outcome"], buckets=_FAST_BUCKETS,
+)
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "Atraso del event loop respecto del intervalo del monitor",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+# Contador de sentencias del request en curso (lo fija el middleware)
+_query_counter: ContextVar[Optional[List[int]]] = ContextVar("metrics_query_counter", default=None)
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    """Observa la duración del bloque con outcome="ok" o "error" si sale por excepción."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - start)
+
+
+def measured(histogram: Histogram, **labels):
+    """Decorador de funciones async equivalente a `timed`."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with timed(histogram, **labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Queries por request ----------------------------------------------------------
+
+def start_query_count():
+    """Empieza a contar las sentencias del contexto actual; retorna (contador, token)."""
+    counter = [0]
+    return counter, _query_counter.set(counter)
+
+
+def stop_query_count(token) -> None:
+    _query_counter.reset(token)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def instrument_queries() -> None:
+    """Cuenta las sentencias de cualquier Engine (el de la app y los de tests/scripts)."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not event.contains(Engine, "before_cursor_execute", _count_query):
+        event.listen(Engine, "before_cursor_execute", _count_query)
+
+
+# --- Exposición -------------------------------------------------------------------
+
+def render_latest() -> Tuple[bytes, str]:
+    """Texto de exposición para /metrics (agregando procesos si corresponde)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Al terminar un proceso en modo multi-proceso (hook de Celery/gunicorn)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,197 @@
+"""
+Trazas por turno con OpenTelemetry.
+
+Cada etapa del pipeline (webhook, deduplicación, carga del caso, handler de
+fase, memoria, intentos del router de LLMs, OCR, chequeo de alucinaciones,
+commits y envío por WhatsApp) abre su span; así un turno lento se puede
+desarmar etapa por etapa.
+
+El exportador se elige con `tracing_exporter`:
+- "none" (default): no se instala proveedor y los spans son no-op.
+- "console": imprime cada span (desarrollo).
+- "file": una línea JSON por span en `tracing_file_path` (ver scripts/trace_report.py).
+- "otlp": OTLP/HTTP a `tracing_otlp_endpoint` (Jaeger, Tempo, collector local);
+  requiere opentelemetry-exporter-otlp-proto-http.
+"""
+import asyncio
+import functools
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+import structlog
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from core.config import settings
+
+logger = structlog.get_logger()
+tracer = trace.get_tracer(__name__)
+
+_configured = False
+_lock = threading.Lock()
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Escribe cada span como una línea JSON (append), fácil de filtrar con jq o trace_report.py."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def to_record(span: ReadableSpan) -> Dict[str, Any]:
+        parent = span.parent
+        return {
+            "name": span.name,
+            "trace_id": format(span.context.trace_id, "032x"),
+            "span_id": format(span.context.span_id, "016x"),
+            "parent_id": format(parent.span_id, "016x") if parent else None,
+            "start_ns": span.start_time,
+            "duration_ms": round((span.end_time - span.start_time) / 1e6, 3) if span.end_time else None,
+            "status": span.status.status_code.name,
+            "attributes": dict(span.attributes or {}),
+            "events": [{"name": e.name, "attributes": dict(e.attributes or {})} for e in span.events],
+        }
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(self.to_record(s), ensure_ascii=False, default=str) + "\n" for s in spans)
+        try:
+            with self._lock, self.path.open("a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning("tracing_file_export_failed", path=str(self.path), error=str(e))
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _exporter_from_settings() -> Optional[SpanExporter]:
+    kind = (settings.tracing_exporter or "none").lower()
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "file":
+        return JsonLinesSpanExporter(settings.tracing_file_path)
+    if kind == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("tracing_otlp_unavailable", hint="pip install opentelemetry-exporter-otlp-proto-http")
+            return None
+        return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    if kind != "none":
+        logger.warning("tracing_exporter_unknown", exporter=kind)
+    return None
+
+
+def configure_tracing(exporter: Optional[SpanExporter] = None) -> bool:
+    """Instala el proveedor global de trazas (una vez por proceso).
+
+    Con `exporter` explícito (tests, scripts) los spans se exportan en forma
+    sincrónica; si no, se usa el de la configuración con envío por lotes.
+    Retorna True si las trazas quedaron activas.
+    """
+    global _configured
+    with _lock:
+        if _configured:
+            return True
+        explicit = exporter is not None
+        exporter = exporter or _exporter_from_settings()
+        if exporter is None:
+            return False
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": settings.tracing_service_name}),
+            sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+        )
+        provider.add_span_processor(SimpleSpanProcessor(exporter) if explicit else BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _instrument_sessions()
+        _configured = True
+    logger.info("tracing_configured", exporter=type(exporter).__name__, sample_ratio=settings.tracing_sample_ratio)
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Exporta los spans pendientes del lote (al apagar la app o al final de un script)."""
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
+
+
+def set_attributes(span, attributes: Dict[str, Any]) -> None:
+    """Como span.set_attributes pero ignora valores None (OTel los rechaza con warning)."""
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def record_span(name: str, start_time_ns: int, attributes: Optional[Dict[str, Any]] = None) -> None:
+    """Registra a posteriori un span que empezó en `start_time_ns` y termina ahora.
+
+    Para etapas cuyo código tiene varios return intermedios (parseo del
+    webhook) o que se observan por eventos (commits).
+    """
+    span = tracer.start_span(name, start_time=start_time_ns)
+    set_attributes(span, attributes or {})
+    span.end()
+
+
+def traced(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """Decorador: ejecuta la función (sync o async) dentro de un span.
+
+    Dentro de la función, `trace.get_current_span()` devuelve ese span para
+    agregar atributos que se conocen recién durante la ejecución.
+    """
+    def decorator(func):
+        func_tracer = trace.get_tracer(func.__module__)
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with func_tracer.start_as_current_span(name, attributes=attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with func_tracer.start_as_current_span(name, attributes=attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# --- Commits de SQLAlchemy ------------------------------------------------------
+
+def _before_commit(session) -> None:
+    session.info["_trace_commit_start"] = time.time_ns()
+
+
+def _after_commit(session) -> None:
+    start = session.info.pop("_trace_commit_start", None)
+    if start is not None:
+        record_span("db.commit", start)
+
+
+def _instrument_sessions() -> None:
+    """Un span "db.commit" por commit de cualquier Session, hijo del span activo."""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    if not event.contains(Session, "before_commit", _before_commit):
+        event.listen(Session, "before_commit", _before_commit)
+        event.listen(Session, "after_commit", _after_commit)
@@ -4,6 +4,7 @@ import google.generativeai as genai
 from typing import Dict, Any
 from application.interfaces.ocr.ocr_service import OCRService, OCRResult
 from core.config import settings
+from infrastructure.ocr.image_parts import gemini_image_part
 
 logger = structlog.get_logger()
 
@@ -40,11 +41,9 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
         try:
             # Preparar imagen para Gemini
             import base64
-            from PIL import Image
-            from io import BytesIO
             
-            # Convertir bytes a imagen PIL
-            image = Image.open(BytesIO(image_bytes))
+            # Bytes originales como blob (sin decodificar en el event loop)
+            image = await gemini_image_part(image_bytes)
             
             # Generar contenido con visión
             response = await self.vision_model.generate_content_async([prompt, image])
@@ -121,11 +120,9 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
 
         try:
             import base64
-            from PIL import Image
-            from io import BytesIO
             import json
             
-            image = Image.open(BytesIO(image_bytes))
+            image = await gemini_image_part(image_bytes)
             response = await self.vision_model.generate_content_async([prompt, image])
             raw_text = response.text.strip()
             
@@ -175,10 +172,7 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
         prompt = "Extrae TODO el texto visible en esta imagen de documento. Responde solo con el texto extraído, manteniendo el formato original lo más posible."
         
         try:
-            from PIL import Image
-            from io import BytesIO
-            
-            image = Image.open(BytesIO(image_bytes))
+            image = await gemini_image_part(image_bytes)
             response = await self.vision_model.generate_content_async([prompt, image])
             raw_text = response.text.strip()
             
@@ -0,0 +1,34 @@
+"""
+Imágenes para Gemini Vision sin decodificar en el event loop.
+
+Pasarle a `generate_content_async` un `PIL.Image` obliga a decodificarla y
+a que el SDK la vuelva a codificar, todo en el hilo del loop. Los formatos
+que Gemini acepta tal cual (JPEG, PNG, WebP, HEIC) se mandan como blob con
+sus bytes originales; el resto (GIF, BMP, TIFF) se convierte a JPEG en el
+pool de CPU.
+"""
+from io import BytesIO
+from typing import Dict
+
+from infrastructure.concurrency.executors import run_cpu
+from infrastructure.storage.mime import sniff_mime
+
+_GEMINI_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic"}
+
+
+def to_jpeg(image_bytes: bytes) -> bytes:
+    """Decodifica con Pillow y re-codifica como JPEG (corre en el pool de CPU)."""
+    from PIL import Image
+
+    with Image.open(BytesIO(image_bytes)) as image:
+        buffer = BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=90)
+        return buffer.getvalue()
+
+
+async def gemini_image_part(image_bytes: bytes) -> Dict[str, object]:
+    """Parte inline_data ({"mime_type", "data"}) lista para generate_content_async."""
+    mime_type = sniff_mime(image_bytes)
+    if mime_type in _GEMINI_MIME_TYPES:
+        return {"mime_type": mime_type, "data": image_bytes}
+    return {"mime_type": "image/jpeg", "data": await run_cpu(to_jpeg, image_bytes)}
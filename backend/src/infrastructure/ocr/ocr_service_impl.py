@@ -1,14 +1,37 @@
 import re
 import json
+import time
+import functools
 import structlog
 from typing import Dict, Any
 from application.interfaces.ocr.ocr_service import OCRService, OCRResult
 from infrastructure.ai.ollama_vision_client import OllamaVisionClient
+from infrastructure.ocr.image_parts import gemini_image_part
+from infrastructure.observability.metrics import OCR_CONFIDENCE, OCR_SECONDS
+from infrastructure.observability.tracing import traced
 from core.config import settings
 
 logger = structlog.get_logger()
 
 
+def _measured(extractor: str):
+    """Latencia (outcome success/failed/error) y confianza de una extracción completa."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await func(*args, **kwargs)
+                outcome = "success" if result.success else "failed"
+                OCR_CONFIDENCE.labels(extractor=extractor).observe(result.confidence or 0.0)
+                return result
+            finally:
+                OCR_SECONDS.labels(extractor=extractor, outcome=outcome).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
 class MultiProviderOCRService(OCRService):
     """
     Servicio OCR con múltiples proveedores y fallback automático.
@@ -132,6 +155,8 @@ class MultiProviderOCRService(OCRService):
             
         return errors, max(0.0, confidence)
 
+    @traced("ocr.extract", {"ocr.document": "dni"})
+    @_measured("dni")
     async def extract_dni_data(self, image_bytes: bytes) -> OCRResult:
         """
         Extrae datos estructurados de un DNI argentino.
@@ -206,6 +231,7 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
                     raw_text=None
                 )
     
+    @traced("ocr.provider", {"ocr.document": "dni", "ocr.provider": "gemini_vision"})
     async def _extract_dni_gemini_fallback(
         self,
         image_bytes: bytes,
@@ -213,12 +239,9 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
     ) -> OCRResult:
         """Fallback a Gemini Vision para extracción de DNI"""
         try:
-            from PIL import Image
-            from io import BytesIO
-            
             logger.info("dni_ocr_attempt", provider="gemini_vision")
             
-            image = Image.open(BytesIO(image_bytes))
+            image = await gemini_image_part(image_bytes)
             response = await self.gemini_model.generate_content_async([prompt, image])
             raw_text = response.text.strip()
             
@@ -251,6 +274,8 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
                 raw_text=None
             )
 
+    @traced("ocr.extract", {"ocr.document": "anses"})
+    @_measured("anses")
     async def extract_anses_data(self, image_bytes: bytes) -> OCRResult:
         """
         Extrae datos de una Certificación Negativa de ANSES.
@@ -288,11 +313,10 @@ Responde SOLO con el JSON."""
                 return await self._extract_anses_gemini_fallback(image_bytes, prompt)
             return OCRResult(success=False, data={}, confidence=0.0, errors=[str(e)], raw_text=None)
 
+    @traced("ocr.provider", {"ocr.document": "anses", "ocr.provider": "gemini_vision"})
     async def _extract_anses_gemini_fallback(self, image_bytes: bytes, prompt: str) -> OCRResult:
         try:
-            from PIL import Image
-            from io import BytesIO
-            image = Image.open(BytesIO(image_bytes))
+            image = await gemini_image_part(image_bytes)
             response = await self.gemini_model.generate_content_async([prompt, image])
             raw_text = response.text.strip()
             data = self._parse_json_response(raw_text)
@@ -302,6 +326,8 @@ Responde SOLO con el JSON."""
         except Exception as e:
             return OCRResult(success=False, data={}, confidence=0.0, errors=[str(e)], raw_text=None)
     
+    @traced("ocr.extract", {"ocr.document": "acta"})
+    @_measured("acta")
     async def extract_marriage_certificate_data(self, image_bytes: bytes) -> OCRResult:
         """
         Extrae datos de un acta de matrimonio argentina.
@@ -379,6 +405,7 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
                     raw_text=None
                 )
     
+    @traced("ocr.provider", {"ocr.document": "acta", "ocr.provider": "gemini_vision"})
     async def _extract_marriage_gemini_fallback(
         self,
         image_bytes: bytes,
@@ -386,12 +413,9 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
     ) -> OCRResult:
         """Fallback a Gemini Vision para extracción de acta matrimonial"""
         try:
-            from PIL import Image
-            from io import BytesIO
-            
             logger.info("marriage_cert_ocr_attempt", provider="gemini_vision")
             
-            image = Image.open(BytesIO(image_bytes))
+            image = await gemini_image_part(image_bytes)
             response = await self.gemini_model.generate_content_async([prompt, image])
             raw_text = response.text.strip()
             
@@ -424,6 +448,8 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
                 raw_text=None
             )
     
+    @traced("ocr.extract", {"ocr.document": "generic"})
+    @_measured("generic")
     async def extract_generic_document(self, image_bytes: bytes) -> OCRResult:
         """
         Extrae texto completo de cualquier documento.
@@ -476,6 +502,7 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
                     raw_text=None
                 )
     
+    @traced("ocr.provider", {"ocr.document": "generic", "ocr.provider": "gemini_vision"})
     async def _extract_generic_gemini_fallback(
         self,
         image_bytes: bytes,
@@ -483,12 +510,9 @@ Responde SOLO con el JSON, sin explicaciones adicionales."""
     ) -> OCRResult:
         """Fallback a Gemini Vision para OCR genérico"""
         try:
-            from PIL import Image
-            from io import BytesIO
-            
             logger.info("generic_ocr_attempt", provider="gemini_vision")
             
-            image = Image.open(BytesIO(image_bytes))
+            image = await gemini_image_part(image_bytes)
             response = await self.gemini_model.generate_content_async([prompt, image])
             raw_text = response.text.strip()
             
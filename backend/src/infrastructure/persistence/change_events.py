@@ -0,0 +1,105 @@
+"""
+Captura de cambios de casos para el canal en tiempo real.
+
+En cada flush se arman eventos compactos para mensajes nuevos (y cambios de su
+estado de entrega), documentos de respaldo nuevos y cambios de fase/estado de
+casos; se acumulan en la sesión y se publican recién en after_commit (se
+descartan si hay rollback). Cubre
+MessageRepository.add_message y cualquier otro camino que escriba vía ORM; los
+INSERT masivos (add_messages_bulk) encolan sus eventos con `queue_events`.
+"""
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from infrastructure.realtime.case_events import publisher
+from .models import Case, Message, SupportDocument
+
+_PENDING_KEY = "case_events"
+
+
+def _iso(value) -> str:
+    return (value or datetime.utcnow()).isoformat()
+
+
+def _events_for_flush(session: Session) -> list:
+    events = []
+    for obj in session.new:
+        if isinstance(obj, Message):
+            events.append({
+                "type": "message.created",
+                "case_id": obj.case_id,
+                "message_id": obj.id,
+                "role": obj.role,
+                "at": _iso(obj.created_at),
+            })
+        elif isinstance(obj, SupportDocument):
+            events.append({
+                "type": "support_document.created",
+                "case_id": obj.case_id,
+                "document_id": obj.id,
+                "doc_type": obj.doc_type,
+                "at": _iso(obj.created_at),
+            })
+        elif isinstance(obj, Case):
+            events.append({
+                "type": "case.created",
+                "case_id": obj.id,
+                "phase": obj.phase,
+                "status": obj.status,
+                "at": _iso(obj.created_at),
+            })
+    for obj in session.dirty:
+        if isinstance(obj, Message):
+            if inspect(obj).attrs.status.history.has_changes():
+                events.append({
+                    "type": "message.status_changed",
+                    "case_id": obj.case_id,
+                    "message_id": obj.id,
+                    "status": obj.status,
+                    "at": _iso(None),
+                })
+            continue
+        if not isinstance(obj, Case):
+            continue
+        state = inspect(obj)
+        phase_hist = state.attrs.phase.history
+        status_hist = state.attrs.status.history
+        if not (phase_hist.has_changes() or status_hist.has_changes()):
+            continue
+        events.append({
+            "type": "case.phase_changed" if phase_hist.has_changes() else "case.status_changed",
+            "case_id": obj.id,
+            "from_phase": phase_hist.deleted[0] if phase_hist.deleted else obj.phase,
+            "phase": obj.phase,
+            "status": obj.status,
+            "at": _iso(None),
+        })
+    return events
+
+
+def queue_events(session: Session, events: list) -> None:
+    """Agrega eventos a publicar con el próximo commit de la sesión.
+
+    Para escrituras que no pasan por el flush del ORM (INSERT masivos).
+    """
+    if events:
+        session.info.setdefault(_PENDING_KEY, []).extend(events)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session, flush_context):
+    queue_events(session, _events_for_flush(session))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session):
+    events = session.info.pop(_PENDING_KEY, None)
+    if events:
+        publisher.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop(_PENDING_KEY, None)
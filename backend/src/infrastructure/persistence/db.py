@@ -1,6 +1,7 @@
 import os
 os.environ['PGCLIENTENCODING'] = 'UTF8'
 
+import structlog
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import settings
@@ -8,6 +9,7 @@ from core.config import settings
 engine = create_engine(settings.database_url, future=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
+logger = structlog.get_logger()
 
 def get_db():
     """Dependency para obtener sesión de base de datos"""
@@ -28,13 +30,82 @@ def init_db():
             pass
     # Import models to register metadata
     from . import models  # noqa: F401
+    if engine.dialect.name == "postgresql":
+        # Tablas particionadas: deben existir antes de que create_all cree versiones comunes
+        from .phase_events import PHASE_EVENTS_DDL
+        _run_statements(PHASE_EVENTS_DDL)
     Base.metadata.create_all(bind=engine)
 
-    # Lightweight idempotent migrations
+    # Lightweight idempotent migrations: una por sentencia, para que un fallo
+    # (p. ej. un dialecto sin IF NOT EXISTS) no deje sin aplicar las siguientes
+    _run_statements(MIGRATIONS)
+
+    _backfill_rollups_if_empty()
+
+    if engine.dialect.name == "postgresql":
+        from .fulltext import FULLTEXT_DDL
+        _run_statements(POSTGRES_INDEXES)
+        _run_statements(FULLTEXT_DDL)
+        _ensure_phase_partitions()
+
+
+MIGRATIONS = [
+    "ALTER TABLE cases ADD COLUMN IF NOT EXISTS dni_back_url VARCHAR(255)",
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS status VARCHAR(16)",
+    "ALTER TABLE cases ADD COLUMN IF NOT EXISTS summarized_through_message_id INTEGER",
+    "ALTER TABLE semantic_knowledge ADD COLUMN IF NOT EXISTS source VARCHAR(256)",
+    "ALTER TABLE semantic_knowledge ADD COLUMN IF NOT EXISTS section VARCHAR(512)",
+    "ALTER TABLE semantic_knowledge ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS ix_semantic_knowledge_source_hash ON semantic_knowledge (source, content_hash)",
+    "ALTER TABLE outbound_messages ADD COLUMN IF NOT EXISTS broadcast_id INTEGER REFERENCES broadcasts(id)",
+    "CREATE INDEX IF NOT EXISTS ix_outbound_messages_broadcast_id ON outbound_messages (broadcast_id)",
+]
+
+
+# Índices específicos de PostgreSQL. create_all solo crea índices en tablas nuevas,
+# por eso se aplican también aquí (idempotentes) para bases ya existentes.
+POSTGRES_INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_cases_created_at_id ON cases (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_cases_status_created_at ON cases (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_case_created_id ON messages (case_id, created_at, id)",
+    # Trigramas para búsquedas ILIKE '%term%' del listado de casos
+    "CREATE INDEX IF NOT EXISTS ix_cases_nombre_trgm ON cases USING gin (nombre gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_cases_dni_trgm ON cases USING gin (dni gin_trgm_ops)",
+]
+
+
+def _backfill_rollups_if_empty():
+    """Primer arranque con rollups: poblarlos desde los casos existentes."""
+    from .models import Case, CaseDailyStat
+    from .rollups import metrics_cache, rebuild_case_daily_stats
     try:
-        with engine.connect() as conn:
-            conn.execute(text("ALTER TABLE cases ADD COLUMN IF NOT EXISTS dni_back_url VARCHAR(255)"))
-            conn.commit()
+        with engine.begin() as conn:
+            has_rollups = conn.execute(CaseDailyStat.__table__.select().limit(1)).first()
+            has_cases = conn.execute(Case.__table__.select().limit(1)).first()
+            if has_cases and not has_rollups:
+                rebuild_case_daily_stats(conn)
+        metrics_cache.invalidate()
     except Exception:
-        # Ignore migration errors in init; assume managed elsewhere
         pass
+
+
+def _ensure_phase_partitions():
+    from .phase_events import ensure_phase_event_partitions
+    try:
+        with engine.begin() as conn:
+            ensure_phase_event_partitions(conn)
+    except Exception as e:
+        logger.warning("init_db_phase_partitions_failed", error=str(e)[:200])
+
+
+def _run_statements(statements):
+    """Ejecuta sentencias DDL una por una; un fallo (p.ej. permisos) no bloquea el resto, pero se loguea."""
+    for statement in statements:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text(statement))
+                conn.commit()
+        except Exception as e:
+            # Sin estos índices/columnas la búsqueda falla recién al consultar: que quede en los logs
+            logger.warning("init_db_statement_failed", statement=statement[:200], error=str(e)[:200])
@@ -0,0 +1,157 @@
+"""
+Búsqueda de texto completo (PostgreSQL) sobre casos, mensajes y la base de
+conocimiento legal.
+
+Se agrega una columna `search_vector` (tsvector) a `cases`, `messages` y
+`semantic_knowledge`,
+mantenida por triggers con una configuración `es_unaccent` (stemming en
+español + unaccent), e indexada con GIN.
+
+Las columnas no se mapean en los modelos ORM: solo existen en PostgreSQL y
+el resto del código no necesita leerlas. En otros motores (SQLite en tests)
+la búsqueda degrada a ILIKE (ver CaseSearchService) o a BM25 en Python
+(ver KnowledgeRetriever).
+"""
+import time
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = structlog.get_logger()
+
+SEARCH_CONFIG = "es_unaccent"
+
+# Campos del caso indexados y su peso (A: identidad, B: domicilios/lugares)
+CASE_WEIGHTED_FIELDS = {
+    "A": [
+        "nombre", "apellido", "nombres", "dni", "cuit",
+        "nombre_conyuge", "apellido_conyuge", "nombres_conyuge", "dni_conyuge", "cuit_conyuge",
+    ],
+    "B": ["domicilio", "domicilio_conyuge", "ultimo_domicilio_conyugal", "lugar_matrimonio", "email"],
+}
+
+# Concatenación usada en ts_headline para resaltar coincidencias en el caso
+CASE_HEADLINE_SOURCE = " || ' ' || ".join(
+    f"coalesce({field}, '')" for fields in CASE_WEIGHTED_FIELDS.values() for field in fields
+)
+
+
+def _case_vector_expression(prefix: str = "NEW.") -> str:
+    parts = []
+    for weight, fields in CASE_WEIGHTED_FIELDS.items():
+        joined = " || ' ' || ".join(f"coalesce({prefix}{f}, '')" for f in fields)
+        parts.append(f"setweight(to_tsvector('{SEARCH_CONFIG}', {joined}), '{weight}')")
+    return " || ".join(parts)
+
+
+def _knowledge_vector_expression(prefix: str = "NEW.") -> str:
+    # Título con peso A: ahí están "Art. 438 - Requisitos", "Ley 9120", etc.
+    return (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({prefix}title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({prefix}content, '')), 'B')"
+    )
+
+
+_CASE_FIELDS_SQL = ", ".join(f for fields in CASE_WEIGHTED_FIELDS.values() for f in fields)
+
+FULLTEXT_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{SEARCH_CONFIG}') THEN
+            CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = spanish);
+            ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+        END IF;
+    END
+    $$
+    """,
+    "ALTER TABLE cases ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "ALTER TABLE semantic_knowledge ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    f"""
+    CREATE OR REPLACE FUNCTION cases_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {_case_vector_expression()};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION messages_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.content, ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION semantic_knowledge_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {_knowledge_vector_expression()};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_cases_search_vector ON cases",
+    f"""
+    CREATE TRIGGER trg_cases_search_vector
+        BEFORE INSERT OR UPDATE OF {_CASE_FIELDS_SQL} ON cases
+        FOR EACH ROW EXECUTE FUNCTION cases_search_vector_update()
+    """,
+    "DROP TRIGGER IF EXISTS trg_messages_search_vector ON messages",
+    """
+    CREATE TRIGGER trg_messages_search_vector
+        BEFORE INSERT OR UPDATE OF content ON messages
+        FOR EACH ROW EXECUTE FUNCTION messages_search_vector_update()
+    """,
+    "DROP TRIGGER IF EXISTS trg_semantic_knowledge_search_vector ON semantic_knowledge",
+    """
+    CREATE TRIGGER trg_semantic_knowledge_search_vector
+        BEFORE INSERT OR UPDATE OF title, content ON semantic_knowledge
+        FOR EACH ROW EXECUTE FUNCTION semantic_knowledge_search_vector_update()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_cases_search_vector ON cases USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_search_vector ON messages USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_semantic_knowledge_search_vector ON semantic_knowledge USING gin (search_vector)",
+]
+
+
+def backfill_search_vectors(engine: Engine, batch_size: int = 5000) -> dict:
+    """Completa `search_vector` en filas previas a los triggers, por lotes.
+
+    Se procesa en lotes cortos con commit para no bloquear la tabla de mensajes
+    durante minutos en bases grandes. Es idempotente: solo toca filas con NULL.
+    """
+    totals = {"cases": 0, "messages": 0, "semantic_knowledge": 0}
+    statements = {
+        "cases": f"""
+            UPDATE cases SET search_vector = {_case_vector_expression(prefix="")}
+            WHERE id IN (SELECT id FROM cases WHERE search_vector IS NULL LIMIT :batch)
+        """,
+        "messages": f"""
+            UPDATE messages SET search_vector = to_tsvector('{SEARCH_CONFIG}', coalesce(content, ''))
+            WHERE id IN (SELECT id FROM messages WHERE search_vector IS NULL LIMIT :batch)
+        """,
+        "semantic_knowledge": f"""
+            UPDATE semantic_knowledge SET search_vector = {_knowledge_vector_expression(prefix="")}
+            WHERE id IN (SELECT id FROM semantic_knowledge WHERE search_vector IS NULL LIMIT :batch)
+        """,
+    }
+    for table, sql in statements.items():
+        while True:
+            start = time.perf_counter()
+            with engine.begin() as conn:
+                updated = conn.execute(text(sql), {"batch": batch_size}).rowcount
+            totals[table] += updated
+            logger.info(
+                "fulltext_backfill_batch",
+                table=table,
+                updated=updated,
+                duration_ms=int((time.perf_counter() - start) * 1000),
+            )
+            if updated < batch_size:
+                break
+    return totals
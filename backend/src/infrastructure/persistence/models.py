@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Date, DateTime, ForeignKey, Text, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
 from datetime import datetime
@@ -6,6 +6,12 @@ from .db import Base
 
 class Case(Base):
     __tablename__ = "cases"
+    __table_args__ = (
+        # Paginación keyset del listado: ORDER BY created_at DESC, id DESC
+        Index("ix_cases_created_at_id", "created_at", "id"),
+        # Filtro por estado del dashboard ordenado por fecha
+        Index("ix_cases_status_created_at", "status", "created_at"),
+    )
     id = Column(Integer, primary_key=True)
     phone = Column(String(32), index=True, nullable=False)
     status = Column(String(32), default="new")
@@ -15,6 +21,8 @@ class Case(Base):
 
     # simple progress tracking
     phase = Column(String(32), default="inicio")
+    # último mensaje plegado en un resumen episódico (ver ConversationSummarizer)
+    summarized_through_message_id = Column(Integer, nullable=True)
 
     # collected data (denormalized for speed; also stored in Persons)
     nombre = Column(String(120), nullable=True)  # Nombre completo (deprecado, usar apellido + nombres)
@@ -93,10 +101,16 @@ class Case(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Historial paginado por cursor: WHERE case_id = ? ORDER BY created_at DESC, id DESC
+        Index("ix_messages_case_created_id", "case_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True)
     case_id = Column(Integer, ForeignKey("cases.id"), index=True)
     role = Column(String(16))  # user|assistant|system
     content = Column(Text)
+    # Solo salientes: queued|sent|delivered|read|failed (NULL en mensajes entrantes)
+    status = Column(String(16), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     case = relationship("Case", back_populates="messages")
@@ -112,10 +126,18 @@ class Memory(Base):
 
 class SemanticKnowledge(Base):
     __tablename__ = "semantic_knowledge"
+    __table_args__ = (
+        # Re-ingesta incremental: fragmentos existentes de un documento por hash
+        Index("ix_semantic_knowledge_source_hash", "source", "content_hash"),
+    )
     id = Column(Integer, primary_key=True)
     title = Column(String(256))
     content = Column(Text)
     embedding = Column(Vector(768))
+    # Documento de origen (p. ej. nombre de archivo) y ruta de encabezados/claves, para citar
+    source = Column(String(256), nullable=True)
+    section = Column(String(512), nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 de sección + contenido + modelo de embeddings
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class SupportDocument(Base):
@@ -130,6 +152,153 @@ class SupportDocument(Base):
 
     case = relationship("Case", back_populates="support_documents")
 
+class MediaObject(Base):
+    """Archivo recibido por WhatsApp, persistido en el media store.
+
+    media_id es el identificador de WAHA (el que guardan Case.*_url y
+    SupportDocument.media_id); sha256 es la clave en el store. El MIME type se
+    detecta por firma una sola vez al guardar.
+    """
+    __tablename__ = "media_objects"
+    id = Column(Integer, primary_key=True)
+    media_id = Column(String(255), unique=True, nullable=False, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    mime_type = Column(String(128), nullable=False, default="application/octet-stream")
+    size = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class OutboundMessage(Base):
+    """Cola de salida de WhatsApp (outbox).
+
+    Se entrega en orden de id por chat_id; un mensaje en reintento demora a
+    los siguientes del mismo chat. status: queued (incluye reintentos
+    pendientes, ver next_attempt_at) | sent | dead (agotó reintentos o error
+    definitivo: es la dead-letter queue). message_id enlaza la fila del
+    historial cuyo `status` se actualiza con la entrega.
+    """
+    __tablename__ = "outbound_messages"
+    __table_args__ = (
+        # Próximo mensaje pendiente de un chat: WHERE chat_id = ? AND status = 'queued' ORDER BY id
+        Index("ix_outbound_chat_status_id", "chat_id", "status", "id"),
+    )
+    id = Column(Integer, primary_key=True)
+    case_id = Column(Integer, ForeignKey("cases.id"), nullable=True, index=True)
+    message_id = Column(Integer, ForeignKey("messages.id"), nullable=True)
+    chat_id = Column(String(64), nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default="queued", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    wa_message_id = Column(String(128), nullable=True, index=True)
+    idempotency_key = Column(String(128), nullable=True, unique=True)
+    broadcast_id = Column(Integer, ForeignKey("broadcasts.id"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class Broadcast(Base):
+    """Envío masivo del operador: una plantilla para todos los casos de un filtro.
+
+    Cada destinatario es una fila de outbound_messages con este broadcast_id.
+    status: pending | running | done | failed. `dispatched` cuenta los
+    destinatarios ya entregados a la cola (permite retomar el job).
+    """
+    __tablename__ = "broadcasts"
+    id = Column(Integer, primary_key=True)
+    template = Column(Text, nullable=False)
+    filters = Column(Text, nullable=True)  # JSON con los filtros de casos
+    status = Column(String(16), nullable=False, default="pending")
+    total = Column(Integer, nullable=False, default=0)
+    dispatched = Column(Integer, nullable=False, default=0)
+    job_id = Column(String(64), nullable=True)
+    idempotency_key = Column(String(128), nullable=True, unique=True)
+    created_by = Column(String(120), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class CaseDailyStat(Base):
+    """Rollup de casos por día de creación, estado y tipo actuales.
+
+    Se mantiene incrementalmente desde los eventos ORM de Case (ver rollups.py),
+    de modo que las métricas del dashboard no escanean la tabla cases.
+    Estado/tipo nulos se guardan como cadena vacía para que la clave única aplique.
+    """
+    __tablename__ = "case_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("day", "status", "type", name="uq_case_daily_stats_key"),
+    )
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False, index=True)
+    status = Column(String(32), nullable=False, default="")
+    type = Column(String(16), nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+
+class PhaseEvent(Base):
+    """Evento append-only de transición de fase de un caso.
+
+    Lo registran los listeners de phase_events.py ante cualquier cambio de
+    Case.phase. En PostgreSQL la tabla se crea particionada por mes
+    (ver PHASE_EVENTS_DDL); aquí solo se describe para el ORM y SQLite.
+    """
+    __tablename__ = "phase_events"
+    __table_args__ = (
+        Index("ix_phase_events_case_occurred", "case_id", "occurred_at"),
+        Index("ix_phase_events_occurred_at", "occurred_at"),
+    )
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    case_id = Column(Integer, nullable=False)
+    from_phase = Column(String(32))  # None en el alta del caso
+    to_phase = Column(String(32), nullable=False)
+    occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class PhaseMonthlyStat(Base):
+    """Agregados del embudo de fases por mes (calculados por job batch).
+
+    month es el primer día del mes en que los casos entraron a la fase.
+    """
+    __tablename__ = "phase_monthly_stats"
+    __table_args__ = (
+        UniqueConstraint("month", "phase", name="uq_phase_monthly_stats_key"),
+    )
+    id = Column(Integer, primary_key=True)
+    month = Column(Date, nullable=False, index=True)
+    phase = Column(String(32), nullable=False)
+    reached = Column(Integer, nullable=False, default=0)  # casos distintos que entraron
+    advanced = Column(Integer, nullable=False, default=0)  # casos que salieron hacia otra fase
+    abandoned = Column(Integer, nullable=False, default=0)  # casos estancados en la fase
+    median_seconds = Column(Float)  # mediana de permanencia (solo visitas cerradas)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class LLMUsage(Base):
+    """Una llamada (intento) del router de LLMs: tokens, duración y costo.
+
+    La escribe por lotes `infrastructure.ai.usage.usage_recorder`. phase es la
+    fase del caso al inicio del turno; estimated indica que el proveedor no
+    informó tokens y se aproximaron por caracteres.
+    """
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        Index("ix_llm_usage_case_created", "case_id", "created_at"),
+        Index("ix_llm_usage_created_at", "created_at"),
+    )
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    case_id = Column(Integer, ForeignKey("cases.id"), nullable=True)
+    phase = Column(String(32), nullable=True)
+    task_type = Column(String(32), nullable=False)
+    provider = Column(String(32), nullable=False)
+    model = Column(String(128), nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    estimated = Column(Boolean, nullable=False, default=False)
+    duration_ms = Column(Integer, nullable=False, default=0)
+    success = Column(Boolean, nullable=False, default=True)
+    cost_usd = Column(Float, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
 class User(Base):
     """Modelo de usuario para autenticación y autorización"""
     __tablename__ = "users"
@@ -143,3 +312,8 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Registrar listeners de rollups, eventos de fase y tiempo real (requiere los modelos ya definidos)
+from . import rollups  # noqa: E402,F401
+from . import phase_events  # noqa: E402,F401
+from . import change_events  # noqa: E402,F401
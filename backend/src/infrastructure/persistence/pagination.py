@@ -0,0 +1,86 @@
+"""
+Helpers de paginación por cursor (keyset) y conteos aproximados.
+
+La paginación OFFSET/LIMIT obliga a la base a recorrer y descartar todas las
+filas previas, por lo que cada página es más lenta que la anterior. Con keyset
+pagination se filtra directamente por la última clave vista `(created_at, id)`,
+apoyándose en un índice compuesto, y el costo de cada página es constante.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Query, Session
+
+
+class InvalidCursorError(ValueError):
+    """El cursor recibido no tiene el formato esperado"""
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Codifica la clave `(created_at, id)` como cursor opaco URL-safe."""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodifica un cursor generado por `encode_cursor`.
+
+    Raises:
+        InvalidCursorError: si el cursor está corrupto o fue manipulado
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_raw, id_raw = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_raw), int(id_raw)
+    except Exception as e:
+        raise InvalidCursorError(f"Cursor inválido: {cursor}") from e
+
+
+def apply_keyset(query: Query, created_col, id_col, cursor: Optional[str], descending: bool = True) -> Query:
+    """Aplica filtro y orden keyset sobre `(created_col, id_col)`.
+
+    Se expresa como OR/AND en lugar de comparar tuplas para que funcione
+    igual en PostgreSQL y en SQLite (tests).
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(
+                or_(
+                    created_col < created_at,
+                    and_(created_col == created_at, id_col < row_id),
+                )
+            )
+        else:
+            query = query.filter(
+                or_(
+                    created_col > created_at,
+                    and_(created_col == created_at, id_col > row_id),
+                )
+            )
+    if descending:
+        return query.order_by(created_col.desc(), id_col.desc())
+    return query.order_by(created_col.asc(), id_col.asc())
+
+
+def estimate_table_rows(db: Session, table_name: str) -> Optional[int]:
+    """Estimación de filas desde las estadísticas del planner (pg_class.reltuples).
+
+    Es O(1) y se actualiza con ANALYZE/autovacuum. Retorna None si el motor no
+    es PostgreSQL o si la tabla todavía no fue analizada (reltuples = -1).
+    """
+    if not db.bind or db.bind.dialect.name != "postgresql":  # type: ignore[attr-defined]
+        return None
+    try:
+        value = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"),
+            {"name": table_name},
+        ).scalar()
+    except Exception:
+        return None
+    if value is None or value < 0:
+        return None
+    return int(value)
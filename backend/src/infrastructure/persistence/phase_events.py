@@ -0,0 +1,241 @@
+"""
+Registro de transiciones de fase y cálculo batch del embudo.
+
+Cada cambio de Case.phase (alta incluida) agrega una fila a `phase_events`
+en la misma transacción, desde listeners ORM, igual que los rollups de
+métricas. La tabla es append-only; en PostgreSQL está particionada por mes
+para que los jobs solo lean las particiones del período que recalculan y
+la retención se resuelva con DROP de particiones viejas.
+
+`compute_phase_month_stats` calcula alcance, avance, abandono y mediana de
+permanencia por fase de un mes y los guarda en `phase_monthly_stats`, que es
+lo que lee el endpoint. Los meses cerrados no cambian, por lo que el job
+periódico solo recalcula el mes actual y el anterior.
+"""
+import statistics
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import structlog
+from sqlalchemy import and_, case as sql_case, distinct, event, func, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from core.config import settings
+from .models import Case, PhaseEvent, PhaseMonthlyStat
+
+logger = structlog.get_logger()
+
+# Fases finales del flujo: llegar es la conversión, no se cuentan como abandono
+TERMINAL_PHASES = frozenset({"documentacion"})
+
+# PostgreSQL: tabla particionada por rango mensual. Se crea antes de
+# create_all para que el ORM no genere una tabla común con el mismo nombre.
+# La PK debe incluir la clave de partición.
+PHASE_EVENTS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS phase_events (
+        id BIGSERIAL,
+        case_id INTEGER NOT NULL,
+        from_phase VARCHAR(32),
+        to_phase VARCHAR(32) NOT NULL,
+        occurred_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+        PRIMARY KEY (id, occurred_at)
+    ) PARTITION BY RANGE (occurred_at)
+    """,
+    # Red de seguridad: si falta la partición del mes, el INSERT no falla
+    "CREATE TABLE IF NOT EXISTS phase_events_default PARTITION OF phase_events DEFAULT",
+    "CREATE INDEX IF NOT EXISTS ix_phase_events_case_occurred ON phase_events (case_id, occurred_at)",
+    "CREATE INDEX IF NOT EXISTS ix_phase_events_occurred_at ON phase_events (occurred_at)",
+]
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month: date, delta: int) -> date:
+    index = month.year * 12 + (month.month - 1) + delta
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _record(connection: Connection, case_id: int, from_phase: Optional[str], to_phase: Optional[str]) -> None:
+    if not to_phase or from_phase == to_phase:
+        return
+    connection.execute(
+        PhaseEvent.__table__.insert().values(
+            case_id=case_id,
+            from_phase=from_phase,
+            to_phase=to_phase,
+            occurred_at=datetime.utcnow(),
+        )
+    )
+
+
+@event.listens_for(Case, "after_insert")
+def _case_inserted(mapper, connection, target):
+    _record(connection, target.id, None, target.phase)
+
+
+@event.listens_for(Case, "after_update")
+def _case_updated(mapper, connection, target):
+    history = inspect(target).attrs.phase.history
+    if not history.has_changes():
+        return
+    old_phase = history.deleted[0] if history.deleted else None
+    _record(connection, target.id, old_phase, target.phase)
+
+
+def _create_month_partition(connection: Connection, name: str, start: date, end: date) -> None:
+    """Crea la partición de un mes moviendo las filas que ya cayeron en la DEFAULT.
+
+    PostgreSQL rechaza el CREATE ... PARTITION OF si `phase_events_default`
+    tiene filas de ese rango. En ese caso, en la misma transacción, se
+    desengancha la DEFAULT, se crea la partición, se mueven las filas y se
+    vuelve a enganchar.
+    """
+    exists = connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+    if exists:
+        return
+    bounds = {"start": start, "end": end}
+    in_range = "occurred_at >= :start AND occurred_at < :end"
+    create = (
+        f"CREATE TABLE {name} PARTITION OF phase_events "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    stranded = connection.execute(
+        text(f"SELECT 1 FROM phase_events_default WHERE {in_range} LIMIT 1"), bounds
+    ).first()
+    if not stranded:
+        connection.execute(text(create))
+        return
+    columns = "id, case_id, from_phase, to_phase, occurred_at"
+    connection.execute(text("ALTER TABLE phase_events DETACH PARTITION phase_events_default"))
+    connection.execute(text(create))
+    moved = connection.execute(
+        text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM phase_events_default WHERE {in_range}"),
+        bounds,
+    ).rowcount
+    connection.execute(text(f"DELETE FROM phase_events_default WHERE {in_range}"), bounds)
+    connection.execute(text("ALTER TABLE phase_events ATTACH PARTITION phase_events_default DEFAULT"))
+    logger.info("phase_partition_rows_moved", partition=name, rows=moved)
+
+
+def ensure_phase_event_partitions(connection: Connection, months_ahead: int = 2,
+                                  reference: Optional[date] = None) -> List[str]:
+    """Crea (idempotente) las particiones mensuales desde el mes actual.
+
+    Solo aplica a PostgreSQL; en otros motores no hace nada. Cada mes va en
+    su propio savepoint: si uno falla se loguea y se sigue con el resto.
+    Retorna los nombres de las particiones aseguradas.
+    """
+    if connection.dialect.name != "postgresql":
+        return []
+    first = _month_start(reference or datetime.utcnow().date())
+    names = []
+    for offset in range(months_ahead + 1):
+        start = _add_months(first, offset)
+        end = _add_months(start, 1)
+        name = f"phase_events_y{start.year}m{start.month:02d}"
+        try:
+            with connection.begin_nested():
+                _create_month_partition(connection, name, start, end)
+        except Exception as e:
+            logger.warning("phase_partition_failed", partition=name, error=str(e)[:200])
+            continue
+        names.append(name)
+    return names
+
+
+def _visits_subquery(month: date):
+    """Visitas a fases: cada evento con el instante de la siguiente transición del caso.
+
+    La ventana empieza en el mes pedido (poda de particiones) pero no termina
+    en él, para ver salidas que ocurrieron después del fin de mes.
+    """
+    events = PhaseEvent.__table__
+    next_at = func.lead(events.c.occurred_at, type_=events.c.occurred_at.type).over(
+        partition_by=events.c.case_id,
+        order_by=(events.c.occurred_at, events.c.id),
+    )
+    return (
+        select(
+            events.c.case_id,
+            events.c.to_phase.label("phase"),
+            events.c.occurred_at,
+            next_at.label("next_at"),
+        )
+        .where(events.c.occurred_at >= month)
+        .subquery()
+    )
+
+
+def _median_by_phase_python(connection: Connection, visits, month_end: date) -> Dict[str, float]:
+    durations = defaultdict(list)
+    rows = connection.execute(
+        select(visits.c.phase, visits.c.occurred_at, visits.c.next_at)
+        .where(visits.c.occurred_at < month_end, visits.c.next_at.isnot(None))
+    )
+    for phase, entered, left in rows:
+        durations[phase].append((left - entered).total_seconds())
+    return {phase: statistics.median(values) for phase, values in durations.items()}
+
+
+def compute_phase_month_stats(connection: Connection, month: date, now: Optional[datetime] = None) -> int:
+    """Recalcula los agregados del embudo para un mes y reemplaza sus filas.
+
+    Un caso cuenta como abandonado en una fase si fue su última transición y
+    lleva más de `phase_abandonment_days` sin moverse. Retorna filas escritas.
+    """
+    month = _month_start(month)
+    month_end = _add_months(month, 1)
+    now = now or datetime.utcnow()
+    stale_before = now - timedelta(days=settings.phase_abandonment_days)
+    visits = _visits_subquery(month)
+    is_postgres = connection.dialect.name == "postgresql"
+
+    stale = and_(
+        visits.c.next_at.is_(None),
+        visits.c.occurred_at < stale_before,
+        visits.c.phase.notin_(TERMINAL_PHASES),
+    )
+    columns = [
+        visits.c.phase,
+        func.count(distinct(visits.c.case_id)),
+        func.count(distinct(sql_case((visits.c.next_at.isnot(None), visits.c.case_id)))),
+        func.count(distinct(sql_case((stale, visits.c.case_id)))),
+    ]
+    if is_postgres:
+        duration = func.extract("epoch", visits.c.next_at - visits.c.occurred_at)
+        columns.append(func.percentile_cont(0.5).within_group(duration))
+    rows = connection.execute(
+        select(*columns).where(visits.c.occurred_at < month_end).group_by(visits.c.phase)
+    ).all()
+    medians = {} if is_postgres else _median_by_phase_python(connection, visits, month_end)
+
+    table = PhaseMonthlyStat.__table__
+    connection.execute(table.delete().where(table.c.month == month))
+    if rows:
+        connection.execute(
+            table.insert(),
+            [
+                {
+                    "month": month,
+                    "phase": row[0],
+                    "reached": row[1],
+                    "advanced": row[2],
+                    "abandoned": row[3],
+                    "median_seconds": float(row[4]) if is_postgres and row[4] is not None else medians.get(row[0]),
+                    "computed_at": now,
+                }
+                for row in rows
+            ],
+        )
+    logger.info("phase_month_stats_computed", month=month.isoformat(), phases=len(rows))
+    return len(rows)
+
+
+def recent_months(count: int, reference: Optional[date] = None) -> Iterable[date]:
+    """Primeros días de los últimos `count` meses, del más viejo al actual."""
+    current = _month_start(reference or datetime.utcnow().date())
+    return [_add_months(current, -offset) for offset in range(count - 1, -1, -1)]
@@ -1,5 +1,8 @@
+from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Sequence
+from .change_events import queue_events
 from .models import Case, Message, Memory, User
 from passlib.context import CryptContext
 
@@ -34,6 +37,35 @@ class MessageRepository:
         self.db.refresh(m)
         return m
 
+    def add_messages_bulk(self, rows: Sequence[Dict[str, Any]], commit: bool = True) -> List[int]:
+        """
+        Inserta varios mensajes con un INSERT ... RETURNING (executemany en lotes).
+
+        Cada fila: case_id, role, content y opcionalmente status/created_at.
+        Retorna los ids en el mismo orden que `rows`. Con commit=False queda en
+        la transacción del llamador (p. ej. junto con otras tablas del mismo lote).
+        """
+        if not rows:
+            return []
+        now = datetime.utcnow()
+        values = [{"created_at": now, **row} for row in rows]
+        ids = self.db.scalars(
+            insert(Message).returning(Message.id, sort_by_parameter_order=True), values
+        ).all()
+        queue_events(self.db, [
+            {
+                "type": "message.created",
+                "case_id": value["case_id"],
+                "message_id": message_id,
+                "role": value["role"],
+                "at": value["created_at"].isoformat(),
+            }
+            for value, message_id in zip(values, ids)
+        ])
+        if commit:
+            self.db.commit()
+        return list(ids)
+
     def last_messages(self, case_id: int, limit: int = 10) -> List[Message]:
         return (
             self.db.query(Message)
@@ -47,13 +79,34 @@ class MemoryRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def add_memory(self, case_id: int, kind: str, content: str):
+    def add_memory(self, case_id: int, kind: str, content: str, commit: bool = True):
         mem = Memory(case_id=case_id, kind=kind, content=content)
         self.db.add(mem)
-        self.db.commit()
-        self.db.refresh(mem)
+        if commit:
+            self.db.commit()
+            self.db.refresh(mem)
+        else:
+            self.db.flush()
         return mem
 
+    def add_memories_bulk(self, rows: Sequence[Dict[str, Any]], commit: bool = True) -> List[int]:
+        """
+        Inserta varias memorias con un INSERT ... RETURNING.
+
+        Cada fila: case_id, kind, content y opcionalmente embedding/created_at.
+        Retorna los ids en el mismo orden que `rows`.
+        """
+        if not rows:
+            return []
+        now = datetime.utcnow()
+        ids = self.db.scalars(
+            insert(Memory).returning(Memory.id, sort_by_parameter_order=True),
+            [{"created_at": now, **row} for row in rows],
+        ).all()
+        if commit:
+            self.db.commit()
+        return list(ids)
+
 class UserRepository:
     """
     Repositorio para gestión de usuarios y autenticación.
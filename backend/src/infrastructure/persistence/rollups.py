@@ -0,0 +1,147 @@
+"""
+Mantenimiento incremental de rollups de métricas de casos.
+
+Cada alta, cambio de estado/tipo o baja de un Case ajusta el contador de
+`case_daily_stats` en la misma transacción (listeners ORM after_insert /
+after_update / after_delete). Así el dashboard lee unas pocas filas por día
+en lugar de hacer COUNT/GROUP BY sobre toda la tabla cases.
+
+El cache de respuestas de métricas se invalida recién en after_commit: los
+listeners solo marcan la sesión, así una lectura concurrente entre el flush
+y el commit no vuelve a cachear los valores viejos.
+
+Las actualizaciones masivas con query.update()/delete() no disparan estos
+eventos; tras una operación de ese tipo correr `rebuild_case_daily_stats`.
+"""
+from datetime import date, datetime
+from typing import Optional
+
+import structlog
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, object_session
+
+from core.config import settings
+from infrastructure.utils.ttl_cache import TTLCache
+from .models import Case, CaseDailyStat
+
+logger = structlog.get_logger()
+
+# Respuestas de métricas ya calculadas; se invalida ante cualquier cambio de casos
+metrics_cache = TTLCache(ttl_seconds=settings.metrics_cache_ttl_seconds)
+
+_DIRTY_KEY = "case_metrics_dirty"
+
+
+def _mark_dirty(target: Case) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info[_DIRTY_KEY] = True
+
+
+def _key(created_at: Optional[datetime], status: Optional[str], type_: Optional[str]) -> tuple:
+    day = (created_at or datetime.utcnow()).date()
+    return day, status or "", type_ or ""
+
+
+def _bump(connection: Connection, day: date, status: str, type_: str, delta: int) -> None:
+    table = CaseDailyStat.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(day=day, status=status, type=type_, count=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["day", "status", "type"],
+            set_={"count": table.c.count + delta},
+        )
+        connection.execute(stmt)
+        return
+    # Otros motores: UPDATE y, si no existía la fila, INSERT
+    result = connection.execute(
+        update(table)
+        .where(table.c.day == day, table.c.status == status, table.c.type == type_)
+        .values(count=table.c.count + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(day=day, status=status, type=type_, count=delta))
+
+
+@event.listens_for(Case, "after_insert")
+def _case_inserted(mapper, connection, target):
+    _bump(connection, *_key(target.created_at, target.status, target.type), 1)
+    _mark_dirty(target)
+
+
+@event.listens_for(Case, "after_update")
+def _case_updated(mapper, connection, target):
+    state = inspect(target)
+    status_hist = state.attrs.status.history
+    type_hist = state.attrs.type.history
+    created_hist = state.attrs.created_at.history
+    if not (status_hist.has_changes() or type_hist.has_changes() or created_hist.has_changes()):
+        return
+    old_status = status_hist.deleted[0] if status_hist.deleted else target.status
+    old_type = type_hist.deleted[0] if type_hist.deleted else target.type
+    old_created = created_hist.deleted[0] if created_hist.deleted else target.created_at
+    old_key = _key(old_created, old_status, old_type)
+    new_key = _key(target.created_at, target.status, target.type)
+    if old_key == new_key:
+        return
+    _bump(connection, *old_key, -1)
+    _bump(connection, *new_key, 1)
+    _mark_dirty(target)
+
+
+@event.listens_for(Case, "after_delete")
+def _case_deleted(mapper, connection, target):
+    _bump(connection, *_key(target.created_at, target.status, target.type), -1)
+    _mark_dirty(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        metrics_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+def rebuild_case_daily_stats(connection: Connection) -> int:
+    """Recalcula los rollups desde cero a partir de la tabla cases.
+
+    Se usa para el backfill inicial y para reconciliar tras cargas masivas.
+    No toca metrics_cache: el llamador lo invalida después del commit.
+    Retorna la cantidad de filas de rollup generadas.
+    """
+    table = CaseDailyStat.__table__
+    day_expr = func.date(Case.created_at)
+    rows = connection.execute(
+        select(
+            day_expr,
+            func.coalesce(Case.status, ""),
+            func.coalesce(Case.type, ""),
+            func.count(Case.id),
+        ).group_by(day_expr, func.coalesce(Case.status, ""), func.coalesce(Case.type, ""))
+    ).all()
+    connection.execute(table.delete())
+    if rows:
+        connection.execute(
+            table.insert(),
+            [
+                {
+                    "day": d if isinstance(d, date) else date.fromisoformat(str(d)),
+                    "status": s,
+                    "type": t,
+                    "count": c,
+                }
+                for d, s, t, c in rows
+            ],
+        )
+    logger.info("case_daily_stats_rebuilt", rows=len(rows))
+    return len(rows)
@@ -0,0 +1,274 @@
+"""
+Búsqueda vectorial con el mismo API sobre pgvector o un índice en memoria.
+
+`semantic_knowledge` tiene unos pocos cientos de fragmentos: entra en RAM y
+un producto matricial con NumPy resuelve el top-k en microsegundos, sin ida
+y vuelta a la base. Fuera de PostgreSQL (SQLite en tests, despliegues
+livianos) es además la única búsqueda vectorial disponible.
+
+- `VectorIndex`: matriz de embeddings normalizados (similitud coseno por
+  producto punto), top-k por lotes con argpartition; se puede guardar como
+  snapshot .npy y abrir con memory-map.
+- `knowledge_vector_search` / `episodic_vector_search`: búsqueda para los
+  servicios, que eligen el backend según `vector_search_backend`
+  (auto = pgvector en PostgreSQL, memoria en otros motores).
+
+El índice de conocimiento se carga al arrancar (`warm_knowledge_index`), se
+recarga tras cada ingesta en el mismo proceso y, en los demás procesos,
+cuando cambia la firma de la tabla (cantidad de filas y último id), que se
+consulta como mucho cada `vector_index_refresh_seconds`.
+"""
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+logger = structlog.get_logger()
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _vector_literal(embedding: Sequence[float]) -> str:
+    """Embedding como literal de pgvector: '[0.1,0.2,...]'."""
+    return "[" + ",".join(str(float(x)) for x in embedding) + "]"
+
+
+def cosine_to_distance(similarity: float) -> float:
+    """Distancia L2 entre vectores unitarios, comparable entre backends."""
+    return float(np.sqrt(max(0.0, 2.0 - 2.0 * similarity)))
+
+
+class VectorIndex:
+    """Índice exacto en memoria: ids + matriz (n, d) de embeddings normalizados.
+
+    `replace` cambia ids y matriz juntos (una sola asignación), así que las
+    búsquedas concurrentes ven el índice viejo o el nuevo, nunca una mezcla.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._data: Tuple[np.ndarray, np.ndarray] = (np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32))
+        self.signature: Optional[Tuple[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._data[0])
+
+    @property
+    def dim(self) -> int:
+        return self._data[1].shape[1] if len(self) else 0
+
+    def replace(self, ids: Sequence[int], vectors: Any, signature: Optional[Tuple[int, int]] = None,
+                normalized: bool = False) -> None:
+        ids_array = np.asarray(ids, dtype=np.int64)
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids_array), -1) if len(ids_array) \
+            else np.zeros((0, 0), dtype=np.float32)
+        self._data = (ids_array, matrix if normalized else _normalize_rows(matrix))
+        self.signature = signature
+
+    def search_many(self, queries: Any, k: int) -> List[List[Tuple[int, float]]]:
+        """Top-k (id, similitud coseno) para cada consulta, en un solo producto matricial."""
+        ids, matrix = self._data
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(ids) or k <= 0 or queries.shape[1] != matrix.shape[1]:
+            if len(ids) and queries.shape[1] != matrix.shape[1]:
+                logger.warning("vector_index_dim_mismatch", index=self.name, expected=matrix.shape[1],
+                               got=queries.shape[1])
+            return [[] for _ in range(len(queries))]
+        scores = _normalize_rows(queries) @ matrix.T
+        k = min(k, len(ids))
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+            top = top[np.lexsort((ids[top], -row[top]))]  # empates: menor id primero
+            results.append([(int(ids[i]), float(row[i])) for i in top])
+        return results
+
+    def search(self, query: Any, k: int) -> List[Tuple[int, float]]:
+        return self.search_many([query], k)[0]
+
+    def save(self, path: str) -> None:
+        """Snapshot en `path/` (ids.npy, vectors.npy, meta.json); se escribe a temporales y se renombra."""
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        ids, matrix = self._data
+        for name, array in (("ids", ids), ("vectors", matrix)):
+            tmp = directory / f"{name}.tmp.npy"
+            np.save(tmp, array)
+            tmp.replace(directory / f"{name}.npy")
+        meta = {"name": self.name, "signature": list(self.signature or []), "model": settings.llm_embedding_model}
+        (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    def load(self, path: str, mmap: bool = True) -> bool:
+        """Abre un snapshot (memory-mapped por defecto). False si no existe o es de otro modelo."""
+        directory = Path(path)
+        try:
+            meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+            if meta.get("model") != settings.llm_embedding_model:
+                return False
+            mode = "r" if mmap else None
+            ids = np.load(directory / "ids.npy", mmap_mode=mode)
+            matrix = np.load(directory / "vectors.npy", mmap_mode=mode)
+        except (OSError, ValueError):
+            return False
+        self._data = (np.asarray(ids), matrix)
+        self.signature = tuple(meta["signature"]) if meta.get("signature") else None
+        return True
+
+
+knowledge_index = VectorIndex("semantic_knowledge")
+_refresh_lock = threading.Lock()
+_last_check = 0.0
+
+
+def uses_memory_index(db: Session) -> bool:
+    backend = (settings.vector_search_backend or "auto").lower()
+    if backend == "memory":
+        return True
+    if backend == "pgvector":
+        return False
+    return not (db.bind and db.bind.dialect.name == "postgresql")  # type: ignore[attr-defined]
+
+
+def _knowledge_signature(db: Session) -> Tuple[int, int]:
+    from .models import SemanticKnowledge
+
+    count, max_id = db.query(func.count(SemanticKnowledge.id), func.max(SemanticKnowledge.id)).one()
+    return int(count or 0), int(max_id or 0)
+
+
+def refresh_knowledge_index(db: Session, signature: Optional[Tuple[int, int]] = None) -> int:
+    """Recarga el índice desde `semantic_knowledge` (y guarda el snapshot si está configurado)."""
+    from .models import SemanticKnowledge
+
+    global _last_check
+    with _refresh_lock:
+        start = time.perf_counter()
+        signature = signature or _knowledge_signature(db)
+        rows = (
+            db.query(SemanticKnowledge.id, SemanticKnowledge.embedding)
+            .filter(SemanticKnowledge.embedding.isnot(None))
+            .order_by(SemanticKnowledge.id)
+            .all()
+        )
+        dims = {len(row[1]) for row in rows}
+        if len(dims) > 1:
+            # Embeddings de modelos distintos: se indexa la dimensión mayoritaria
+            common = max(dims, key=lambda d: sum(1 for row in rows if len(row[1]) == d))
+            rows = [row for row in rows if len(row[1]) == common]
+        knowledge_index.replace([row[0] for row in rows], [row[1] for row in rows], signature=signature)
+        _last_check = time.monotonic()
+        if settings.vector_index_snapshot_path:
+            try:
+                knowledge_index.save(settings.vector_index_snapshot_path)
+            except OSError as e:
+                logger.warning("vector_index_snapshot_failed", error=str(e))
+        logger.info(
+            "vector_index_refreshed",
+            index=knowledge_index.name,
+            vectors=len(knowledge_index),
+            dim=knowledge_index.dim,
+            duration_ms=int((time.perf_counter() - start) * 1000),
+        )
+        return len(knowledge_index)
+
+
+def ensure_knowledge_index(db: Session) -> VectorIndex:
+    """El índice de conocimiento al día: verifica la firma como mucho cada `vector_index_refresh_seconds`."""
+    global _last_check
+    if knowledge_index.signature is not None and time.monotonic() - _last_check < settings.vector_index_refresh_seconds:
+        return knowledge_index
+    signature = _knowledge_signature(db)
+    _last_check = time.monotonic()
+    if signature == knowledge_index.signature:
+        return knowledge_index
+    # Otro proceso (worker de ingesta) pudo dejar un snapshot con esta misma firma
+    if settings.vector_index_snapshot_path and knowledge_index.load(settings.vector_index_snapshot_path) \
+            and knowledge_index.signature == signature:
+        logger.info("vector_index_snapshot_loaded", index=knowledge_index.name, vectors=len(knowledge_index))
+        return knowledge_index
+    refresh_knowledge_index(db, signature)
+    return knowledge_index
+
+
+def warm_knowledge_index(db: Session) -> None:
+    """Carga inicial al arrancar (solo si este proceso va a usar el índice en memoria)."""
+    if not uses_memory_index(db):
+        return
+    try:
+        ensure_knowledge_index(db)
+    except Exception as e:
+        logger.warning("vector_index_warm_failed", error=str(e))
+
+
+def knowledge_vector_search(db: Session, query_embedding: List[float], limit: int) -> Dict[int, float]:
+    """{id: distancia} de los fragmentos más cercanos, del mejor al peor."""
+    if uses_memory_index(db):
+        hits = ensure_knowledge_index(db).search(query_embedding, limit)
+        return {doc_id: cosine_to_distance(score) for doc_id, score in hits}
+    rows = db.execute(
+        text("""
+            SELECT id, embedding <-> CAST(:query_embedding AS vector) AS distance
+            FROM semantic_knowledge
+            WHERE embedding IS NOT NULL
+            ORDER BY distance
+            LIMIT :limit
+        """),
+        {"query_embedding": _vector_literal(query_embedding), "limit": limit},
+    ).fetchall()
+    return {row[0]: float(row[1]) for row in rows}
+
+
+def episodic_vector_search(
+    db: Session, case_id: int, query_embedding: List[float], limit: int
+) -> List[Dict[str, Any]]:
+    """Memorias episódicas del caso más cercanas a la consulta: [{id, content, distance}]."""
+    if uses_memory_index(db):
+        from .models import Memory
+
+        # Pocas filas por caso: índice efímero con las del caso
+        rows = (
+            db.query(Memory.id, Memory.content, Memory.embedding)
+            .filter(Memory.case_id == case_id, Memory.kind == "episodic")
+            .order_by(Memory.created_at.desc(), Memory.id.desc())
+            .all()
+        )
+        ranked = [row for row in rows if row[2] is not None and len(row[2]) == len(query_embedding)]
+        index = VectorIndex("episodic")
+        index.replace([row[0] for row in ranked], [row[2] for row in ranked])
+        contents = {row[0]: row[1] for row in rows}
+        hits = [
+            {"id": memory_id, "content": contents[memory_id], "distance": cosine_to_distance(score)}
+            for memory_id, score in index.search(query_embedding, limit)
+        ]
+        # Sin embedding (proveedor caído al guardarlas) van al final, las más nuevas primero,
+        # como los NULL de pgvector en ORDER BY distance
+        seen = {hit["id"] for hit in hits}
+        hits.extend(
+            {"id": row[0], "content": row[1], "distance": None}
+            for row in rows if row[0] not in seen and row[2] is None
+        )
+        return hits[:limit]
+    result = db.execute(
+        text("""
+            SELECT id, content,
+                   embedding <-> CAST(:query_embedding AS vector) AS distance
+            FROM memories
+            WHERE case_id = :case_id AND kind = 'episodic'
+            ORDER BY distance
+            LIMIT :limit
+        """),
+        {"query_embedding": _vector_literal(query_embedding), "case_id": case_id, "limit": limit},
+    ).fetchall()
+    return [{"id": r[0], "content": r[1], "distance": r[2]} for r in result]
@@ -0,0 +1,200 @@
+"""
+Eventos de casos en tiempo real sobre Redis pub/sub.
+
+Publicación (sync): `publisher.publish(events)` se llama después del commit de
+la sesión (ver persistence/change_events.py), así que nunca se anuncia un
+cambio que luego se revierte. Solo encola: un hilo del proceso los manda a
+Redis, para que un Redis lento no demore al request que hizo el commit. Si
+Redis no responde se descartan los eventos y se deja de intentar durante un
+rato (circuito abierto): el dashboard sigue funcionando con recargas normales.
+
+Suscripción (async): cada proceso de la API mantiene UNA sola suscripción al
+canal y reparte los eventos a las colas de los dashboards conectados, de modo
+que sumar operadores no suma conexiones a Redis ni consultas a Postgres.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis
+import structlog
+
+from core.config import settings
+
+logger = structlog.get_logger()
+
+CASE_EVENTS_CHANNEL = "case_events"
+
+# Segundos sin intentar publicar tras un error de Redis
+_PUBLISH_BACKOFF_SECONDS = 30.0
+# Lotes de eventos esperando al hilo publicador; lleno, se descarta
+_PUBLISH_QUEUE_SIZE = 1000
+
+
+class CaseEventPublisher:
+    """Publica eventos compactos de casos (solo ids y metadatos, sin contenido)."""
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, queue_size: int = _PUBLISH_QUEUE_SIZE):
+        self._redis = redis_client
+        self._disabled_until = 0.0
+        self._pending: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def _client(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5,
+            )
+        return self._redis
+
+    def publish(self, events: List[Dict[str, Any]]) -> None:
+        """Encola para el hilo publicador; nunca espera a Redis."""
+        if not events or time.monotonic() < self._disabled_until:
+            return
+        try:
+            self._pending.put_nowait(list(events))
+        except queue.Full:
+            logger.warning("case_events_publish_dropped", reason="queue_full", dropped=len(events))
+            return
+        self._ensure_thread()
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        """Espera a que se publique lo encolado (tests, apagado). False si no llegó a tiempo."""
+        deadline = time.monotonic() + timeout
+        while self._pending.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_thread(self) -> None:
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="case-events-publisher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batches = [self._pending.get()]
+            # Lo acumulado mientras se publicaba el lote anterior va en un solo pipeline
+            while True:
+                try:
+                    batches.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._send([event for batch in batches for event in batch])
+            finally:
+                for _ in batches:
+                    self._pending.task_done()
+
+    def _send(self, events: List[Dict[str, Any]]) -> None:
+        if time.monotonic() < self._disabled_until:
+            return
+        try:
+            pipe = self._client().pipeline(transaction=False)
+            for event in events:
+                pipe.publish(CASE_EVENTS_CHANNEL, json.dumps(event, default=str))
+            pipe.execute()
+        except Exception as e:
+            self._disabled_until = time.monotonic() + _PUBLISH_BACKOFF_SECONDS
+            logger.warning("case_events_publish_failed", error=str(e), dropped=len(events))
+
+
+publisher = CaseEventPublisher()
+
+
+class _Subscription:
+    def __init__(self, case_ids: Set[int], types: Set[str], maxsize: int):
+        self.case_ids = case_ids
+        self.types = types
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        if self.case_ids and event.get("case_id") not in self.case_ids:
+            return False
+        if self.types and event.get("type") not in self.types:
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        # Dashboard lento: se descarta el evento más viejo en lugar de bloquear al resto
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(event)
+
+
+class CaseEventHub:
+    """Fan-out en proceso de los eventos de Redis a los suscriptores SSE."""
+
+    def __init__(self, queue_size: int = 100):
+        self._queue_size = queue_size
+        self._subscriptions: Set[_Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    @asynccontextmanager
+    async def subscribe(self, case_ids: Iterable[int] = (), types: Iterable[str] = ()):
+        subscription = _Subscription(set(case_ids), set(types), self._queue_size)
+        self._subscriptions.add(subscription)
+        self._ensure_listener()
+        try:
+            yield subscription.queue
+        finally:
+            self._subscriptions.discard(subscription)
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        for subscription in list(self._subscriptions):
+            if subscription.wants(event):
+                subscription.offer(event)
+
+    def _ensure_listener(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        import redis.asyncio as aioredis
+
+        delay = 1.0
+        while self._subscriptions:
+            client = aioredis.from_url(settings.redis_url, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(CASE_EVENTS_CHANNEL)
+                delay = 1.0
+                while self._subscriptions:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        try:
+                            self.dispatch(json.loads(message["data"]))
+                        except ValueError:
+                            logger.warning("case_event_invalid_payload")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("case_events_listener_error", error=str(e), retry_in=delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.close()
+                    await client.close()
+                except Exception:
+                    pass
+
+
+case_event_hub = CaseEventHub()
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+import structlog
+
+from application.interfaces.storage.media_store import MediaStore
+from core.config import settings
+
+logger = structlog.get_logger()
+
+# backend/src/infrastructure/storage -> backend
+_BACKEND_ROOT = Path(__file__).resolve().parents[3]
+_VARIANT_RE = re.compile(r"^[a-z0-9][a-z0-9.-]{0,63}$")
+
+
+class LocalMediaStore(MediaStore):
+    """
+    Media store en disco local: <root>/ab/cd/abcdef... (SHA-256); las
+    variantes quedan al lado del original como <digest>.<variante>.
+
+    Al ser direccionado por contenido, el mismo archivo recibido varias veces
+    ocupa un solo lugar y nunca se sobreescribe con otro contenido. La
+    escritura es atómica (archivo temporal + rename) para que un lector nunca
+    vea un archivo a medio escribir.
+    """
+
+    def __init__(self, root: str = None):
+        root_path = Path(root or settings.media_store_path)
+        self.root = root_path if root_path.is_absolute() else _BACKEND_ROOT / root_path
+
+    def _path(self, digest: str, variant: Optional[str] = None) -> Path:
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Digest inválido: {digest}")
+        name = digest
+        if variant is not None:
+            if not _VARIANT_RE.match(variant):
+                raise ValueError(f"Variante inválida: {variant}")
+            name = f"{digest}.{variant}"
+        return self.root / digest[:2] / digest[2:4] / name
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, path)
+        except Exception:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if path.exists():
+            return digest
+        self._write_atomic(path, data)
+        logger.info("media_stored", digest=digest, size=len(data))
+        return digest
+
+    def put_variant(self, digest: str, variant: str, data: bytes) -> None:
+        self._write_atomic(self._path(digest, variant), data)
+
+    def exists(self, digest: str, variant: Optional[str] = None) -> bool:
+        return self._path(digest, variant).exists()
+
+    def open(self, digest: str, variant: Optional[str] = None) -> BinaryIO:
+        return open(self._path(digest, variant), "rb")
+
+    def size(self, digest: str, variant: Optional[str] = None) -> int:
+        return self._path(digest, variant).stat().st_size
@@ -0,0 +1,35 @@
+"""
+Detección de MIME type por firma (magic bytes).
+
+Reemplaza a imghdr (deprecado y sin soporte de PDF/WebP/HEIC). Se ejecuta una
+sola vez al guardar el archivo; el resultado queda en media_objects.mime_type.
+"""
+from typing import Optional
+
+_SIGNATURES = [
+    (b"%PDF", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"OggS", "audio/ogg"),
+]
+
+
+def sniff_mime(data: bytes) -> Optional[str]:
+    """Retorna el MIME type detectado o None si la firma no es conocida."""
+    head = data[:32]
+    for signature, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"heic", b"heix", b"mif1", b"msf1"):
+            return "image/heic"
+        return "video/mp4"
+    return None
@@ -0,0 +1,99 @@
+"""
+Generación de previews de documentos (miniaturas WebP/JPEG).
+
+Imágenes: se corrige la orientación EXIF y se reduce con LANCZOS a cada
+tamaño. PDFs: se renderiza solo la primera página con PyMuPDF a la
+resolución justa para el tamaño más grande, en lugar de rasterizar a DPI fijo.
+"""
+import io
+from typing import Dict, Iterable, Optional, Tuple
+
+# Nombre -> lado mayor en píxeles
+PREVIEW_SIZES: Dict[str, int] = {"thumb": 160, "small": 480, "large": 1280}
+# Formato -> (formato Pillow, MIME type, opciones de guardado)
+PREVIEW_FORMATS: Dict[str, Tuple[str, str, dict]] = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+class PreviewUnavailableError(Exception):
+    """El contenido no es una imagen ni un PDF que se pueda renderizar"""
+
+
+def variant_name(size: str, fmt: str) -> str:
+    return f"preview-{size}.{fmt}"
+
+
+def preview_mime(fmt: str) -> str:
+    return PREVIEW_FORMATS[fmt][1]
+
+
+def _open_source(data: bytes, mime_type: Optional[str], max_side: int):
+    from PIL import Image, ImageOps
+
+    if mime_type == "application/pdf" or data[:4] == b"%PDF":
+        import fitz  # PyMuPDF
+
+        try:
+            doc = fitz.open(stream=data, filetype="pdf")
+            if doc.page_count == 0:
+                raise PreviewUnavailableError("PDF sin páginas")
+            page = doc.load_page(0)
+            zoom = max_side / max(page.rect.width, page.rect.height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        except PreviewUnavailableError:
+            raise
+        except Exception as e:
+            raise PreviewUnavailableError(f"PDF no renderizable: {e}") from e
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+        return image.convert("RGB")
+    except Exception as e:
+        raise PreviewUnavailableError(f"Imagen no soportada: {e}") from e
+
+
+def rasterize_first_page(pdf_bytes: bytes, dpi: int = 200) -> Optional[bytes]:
+    """Primera página del PDF como JPEG para OCR (None si no se puede); pensada para el pool de CPU."""
+    try:
+        import fitz  # PyMuPDF: sin la librería en el worker también es "no se puede"
+
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        if doc.page_count == 0:
+            return None
+        page = doc.load_page(0)
+        pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False)
+        return pix.tobytes("jpeg")
+    except Exception:
+        return None
+
+
+def render_previews(
+    data: bytes,
+    mime_type: Optional[str],
+    sizes: Iterable[str] = PREVIEW_SIZES,
+    formats: Iterable[str] = PREVIEW_FORMATS,
+) -> Dict[str, bytes]:
+    """Renderiza las variantes pedidas. Retorna {nombre_de_variante: bytes}.
+
+    Raises:
+        PreviewUnavailableError: si el contenido no se puede renderizar
+    """
+    sizes = list(sizes)
+    formats = list(formats)
+    source = _open_source(data, mime_type, max(PREVIEW_SIZES[size] for size in sizes))
+    from PIL import Image
+
+    rendered = {}
+    for size in sizes:
+        image = source.copy()
+        side = PREVIEW_SIZES[size]
+        image.thumbnail((side, side), Image.LANCZOS)
+        for fmt in formats:
+            pil_format, _, options = PREVIEW_FORMATS[fmt]
+            buffer = io.BytesIO()
+            image.save(buffer, format=pil_format, **options)
+            rendered[variant_name(size, fmt)] = buffer.getvalue()
+    return rendered
@@ -0,0 +1,21 @@
+"""
+Clase base de las tareas de Celery del sistema.
+
+Reintenta automáticamente con backoff exponencial y jitter (30s, 60s, 120s...
+hasta 10 minutos) cualquier excepción salvo `PermanentJobError`, que marca
+errores que no se arreglan reintentando (caso inexistente, archivo ilegible).
+"""
+from celery import Task
+
+
+class PermanentJobError(Exception):
+    """Error definitivo: la tarea falla sin reintentos"""
+
+
+class JobTask(Task):
+    autoretry_for = (Exception,)
+    dont_autoretry_for = (PermanentJobError,)
+    max_retries = 5
+    retry_backoff = 30
+    retry_backoff_max = 10 * 60
+    retry_jitter = True
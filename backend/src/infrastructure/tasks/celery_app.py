@@ -1,13 +1,79 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from kombu import Queue
 
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 app = Celery("def_civil", broker=redis_url, backend=redis_url, include=["infrastructure.tasks.jobs"])
 
+# Colas por prioridad: "interactive" para trabajo que un usuario/operador está
+# esperando (OCR, envíos, PDF a demanda) y "bulk" para lo diferible (resúmenes,
+# ingesta, previews, jobs periódicos). Cada una tiene su propio worker en
+# docker-compose, así un lote grande nunca demora al trabajo interactivo.
+INTERACTIVE_QUEUE = "interactive"
+BULK_QUEUE = "bulk"
+
 app.conf.update(
     task_serializer="json",
     result_serializer="json",
     accept_content=["json"],
     timezone="America/Argentina/Mendoza",
     enable_utc=True,
+    task_queues=(Queue(INTERACTIVE_QUEUE), Queue(BULK_QUEUE)),
+    task_default_queue=INTERACTIVE_QUEUE,
+    # Los resultados quedan en Redis para consultar el estado (GET /api/jobs/{id})
+    result_expires=int(os.getenv("JOB_RESULT_TTL_SECONDS", 24 * 60 * 60)),
+    result_extended=True,
+    task_track_started=True,
+    # ack al terminar: si el worker muere a mitad de una tarea, se re-entrega
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    # Fallar rápido si Redis no responde: el cliente de jobs tiene su propio camino alternativo
+    broker_connection_timeout=2,
+    redis_socket_connect_timeout=1,
+    redis_socket_timeout=5,
+    result_backend_transport_options={"retry_policy": {"max_retries": 1, "interval_start": 0, "interval_step": 0.5}},
+    broker_transport_options={"visibility_timeout": 60 * 60},
+    # Desarrollo sin worker/Redis: ejecutar las tareas en el mismo proceso
+    task_always_eager=os.getenv("JOBS_EAGER", "").lower() in ("1", "true", "yes"),
 )
+
+app.conf.beat_schedule = {
+    "sweep-outbound": {
+        "task": "infrastructure.tasks.jobs.sweep_outbound",
+        "schedule": 60,
+    },
+    "compute-phase-analytics": {
+        "task": "infrastructure.tasks.jobs.compute_phase_analytics",
+        "schedule": 15 * 60,
+    },
+    "ensure-phase-partitions": {
+        "task": "infrastructure.tasks.jobs.ensure_phase_partitions",
+        "schedule": 24 * 60 * 60,
+    },
+    # Red de seguridad: previews que no se encolaron (broker caído) o archivos viejos
+    "warm-media-previews": {
+        "task": "infrastructure.tasks.jobs.warm_media_previews",
+        "schedule": 6 * 60 * 60,
+        "kwargs": {"limit": 200},
+    },
+}
+
+
+@worker_process_init.connect
+def _configure_worker_tracing(**_):
+    # Por proceso: el BatchSpanProcessor usa un hilo que no sobrevive al fork del worker
+    from infrastructure.observability.tracing import configure_tracing
+    configure_tracing()
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(pid=None, **_):
+    from infrastructure.ai.usage import usage_recorder
+    from infrastructure.observability.metrics import mark_process_dead
+
+    # Filas de llm_usage que siguen en el buffer del proceso
+    usage_recorder.flush()
+    # Modo multi-proceso de Prometheus: descarta los gauges "live" del proceso que termina
+    mark_process_dead(pid or os.getpid())
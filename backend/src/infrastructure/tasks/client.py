@@ -0,0 +1,119 @@
+"""
+Encolado y seguimiento de tareas desde la API y los casos de uso.
+
+`jobs.submit(...)` publica una tarea y retorna su job_id; `jobs.status(job_id)`
+lee el estado/resultado guardado en el backend de resultados (lo consulta el
+cliente vía GET /api/jobs/{job_id}).
+
+Idempotencia: con `idempotency_key` el job_id es determinístico (uuid5 de
+tarea + clave) y se reserva en Redis con SET NX, así un reintento del cliente
+(doble click, reenvío del webhook) devuelve el mismo job en lugar de encolar
+otra vez. Si el broker no responde se lanza `JobSubmitError` rápido (y durante
+un rato sin volver a intentar) para que el llamador use su camino inline.
+"""
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import redis
+import structlog
+from celery.result import AsyncResult
+
+from core.config import settings
+from .celery_app import app
+
+logger = structlog.get_logger()
+
+_IDEMPOTENCY_PREFIX = "jobs:idem:"
+_JOB_ID_NAMESPACE = uuid.UUID("6f1c2a4e-3b7d-4c61-9a0e-5d2f8b9c1e47")
+# Segundos sin intentar publicar tras un error del broker
+_SUBMIT_BACKOFF_SECONDS = 30.0
+
+
+class JobSubmitError(Exception):
+    """No se pudo encolar la tarea (broker no disponible)"""
+
+
+def job_id_for(task_name: str, idempotency_key: str) -> str:
+    return str(uuid.uuid5(_JOB_ID_NAMESPACE, f"{task_name}:{idempotency_key}"))
+
+
+class JobClient:
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self._redis = redis_client
+        self._disabled_until = 0.0
+        # Modo eager (JOBS_EAGER): no hay backend de resultados, se guardan acá
+        self._eager_results: "OrderedDict[str, Any]" = OrderedDict()
+
+    def _client(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5,
+            )
+        return self._redis
+
+    def _reserve(self, job_id: str) -> bool:
+        """True si la clave es nueva; False si ya hay un job con ese id."""
+        expires = app.conf.result_expires
+        ttl = int(expires.total_seconds() if hasattr(expires, "total_seconds") else expires)
+        return bool(self._client().set(_IDEMPOTENCY_PREFIX + job_id, "1", nx=True, ex=ttl))
+
+    def submit(self, task, *args, idempotency_key: Optional[str] = None, queue: Optional[str] = None,
+               countdown: Optional[float] = None, **kwargs) -> str:
+        """Encola `task(*args, **kwargs)` y retorna el job_id."""
+        if time.monotonic() < self._disabled_until:
+            raise JobSubmitError("broker no disponible")
+        job_id = job_id_for(task.name, idempotency_key) if idempotency_key else str(uuid.uuid4())
+        options = {"task_id": job_id, "retry": False}
+        if queue:
+            options["queue"] = queue
+        if countdown:
+            options["countdown"] = countdown
+        try:
+            if idempotency_key and not self._reserve(job_id):
+                logger.info("job_duplicate_skipped", task=task.name, job_id=job_id)
+                return job_id
+            result = task.apply_async(args=list(args), kwargs=kwargs, **options)
+        except Exception as e:
+            self._disabled_until = time.monotonic() + _SUBMIT_BACKOFF_SECONDS
+            if idempotency_key:
+                try:
+                    self._client().delete(_IDEMPOTENCY_PREFIX + job_id)
+                except Exception:
+                    pass
+            logger.warning("job_submit_failed", task=task.name, error=str(e))
+            raise JobSubmitError(str(e)) from e
+        if app.conf.task_always_eager:
+            self._eager_results[job_id] = result
+            while len(self._eager_results) > 1000:
+                self._eager_results.popitem(last=False)
+        logger.info("job_submitted", task=task.name, job_id=job_id, queue=queue or getattr(task, "queue", None))
+        return job_id
+
+    def _result(self, job_id: str):
+        return self._eager_results.get(job_id) or AsyncResult(job_id, app=app)
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """Estado de un job. PENDING también cubre ids desconocidos o expirados."""
+        result = self._result(job_id)
+        state = result.state
+        payload: Dict[str, Any] = {
+            "job_id": job_id,
+            "task": getattr(result, "name", None),
+            "state": state,
+            "result": None,
+            "error": None,
+            "date_done": result.date_done.isoformat() if getattr(result, "date_done", None) else None,
+        }
+        if state == "SUCCESS":
+            payload["result"] = result.result
+        elif state in ("FAILURE", "RETRY"):
+            payload["error"] = str(result.result)
+        return payload
+
+
+jobs = JobClient()
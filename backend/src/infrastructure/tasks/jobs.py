@@ -1,6 +1,214 @@
-from .celery_app import app
+"""
+Tareas de Celery.
 
-@app.task
-def example_ocr_task(file_path: str) -> dict:
-    # Placeholder for OCR processing
-    return {"status": "processed", "file": file_path}
+Todas usan `JobTask` (reintentos con backoff exponencial salvo
+`PermanentJobError`) y van a la cola "interactive" o "bulk" según si alguien
+está esperando el resultado. Para encolar desde la API o los casos de uso usar
+`infrastructure.tasks.client.jobs` (idempotencia y estado).
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Optional
+
+import structlog
+
+from infrastructure.concurrency.executors import blocking_executor
+
+from .base import JobTask, PermanentJobError
+from .celery_app import BULK_QUEUE, INTERACTIVE_QUEUE, app
+
+logger = structlog.get_logger()
+
+
+@contextmanager
+def _session():
+    from infrastructure.persistence.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _get_case(db, case_id: int):
+    from infrastructure.persistence.models import Case
+
+    case = db.query(Case).get(case_id)
+    if case is None:
+        raise PermanentJobError(f"Caso {case_id} inexistente")
+    return case
+
+
+# --- Interactivas -----------------------------------------------------------
+
+@app.task(base=JobTask, bind=True, queue=INTERACTIVE_QUEUE, max_retries=2)
+def render_petition_pdf(self, case_id: int) -> dict:
+    """Renderiza la demanda y la deja en el media store como `job:<job_id>`."""
+    from application.services.media_service import MediaService
+    from infrastructure.document.pdf_service_impl import TemplatePDFService
+    from infrastructure.document.petition_data import build_petition_case_data
+
+    with _session() as db:
+        case = _get_case(db, case_id)
+        pdf = TemplatePDFService().generate_divorce_petition_pdf(build_petition_case_data(case))
+        media = MediaService(db).save(f"job:{self.request.id}", pdf, "application/pdf")
+        return {"case_id": case_id, "media_id": media.media_id, "sha256": media.sha256, "size": media.size}
+
+
+@app.task(base=JobTask, queue=INTERACTIVE_QUEUE)
+def deliver_outbound(chat_id: str) -> dict:
+    """Vacía en orden la cola de salida de un chat; se reprograma si quedó trabajo."""
+    from application.services.outbound_service import OutboundMessageService
+
+    with _session() as db:
+        stats = asyncio.run(OutboundMessageService(db).drain(chat_id))
+    if stats["retry_in"] is not None:
+        deliver_outbound.apply_async(args=[chat_id], countdown=max(stats["retry_in"], 0.1))
+    return stats
+
+
+# --- Bulk -------------------------------------------------------------------
+
+@app.task(base=JobTask, queue=BULK_QUEUE)
+def summarize_case_conversation(case_id: int, force: bool = False) -> dict:
+    """Pliega los mensajes fuera de la ventana inmediata en resúmenes episódicos con embedding.
+
+    Sin `force` solo resume si se alcanzó algún umbral (turnos o tokens pendientes).
+    """
+    from application.services.conversation_summarizer import ConversationSummarizer
+    from infrastructure.ai.usage import case_usage_scope
+
+    with _session() as db:
+        case = _get_case(db, case_id)
+        with case_usage_scope(case_id, case.phase):
+            return asyncio.run(ConversationSummarizer(db).summarize_pending(case_id, force=force))
+
+
+@app.task(base=JobTask, queue=BULK_QUEUE)
+def ingest_legal_document(
+    title: str,
+    content: str,
+    category: str = "legislacion",
+    source: Optional[str] = None,
+    content_format: str = "text",
+) -> dict:
+    """Divide, genera embeddings y guarda (o actualiza) un documento en la base de conocimiento."""
+    from application.use_cases.ingest_legal_document import IngestLegalDocumentUseCase
+
+    with _session() as db:
+        result = asyncio.run(IngestLegalDocumentUseCase(db).execute(
+            title=title, content=content, category=category, source=source, content_format=content_format
+        ))
+    if not result.success:
+        # El caso de uso ya hizo rollback y logueó el motivo: reintentar
+        raise RuntimeError(f"Ingesta fallida: {title}")
+    return {
+        "title": result.title,
+        "chunks": result.chunks_created,
+        "unchanged": result.chunks_unchanged,
+        "deleted": result.chunks_deleted,
+    }
+
+
+@app.task(base=JobTask, queue=BULK_QUEUE, max_retries=1)
+def sweep_outbound() -> dict:
+    """Red de seguridad de la cola de salida: reprograma chats con pendientes vencidos."""
+    from application.services.outbound_service import OutboundMessageService
+
+    with _session() as db:
+        chats = OutboundMessageService(db).due_chats()
+    for chat_id in chats:
+        deliver_outbound.apply_async(args=[chat_id])
+    return {"scheduled": len(chats)}
+
+
+@app.task(base=JobTask, queue=BULK_QUEUE, max_retries=3)
+def send_broadcast(broadcast_id: int) -> dict:
+    """Envío masivo: escribe los destinatarios por lotes y los pasa a la cola de salida a ritmo controlado."""
+    from application.services.broadcast_service import BroadcastService
+
+    with _session() as db:
+        service = BroadcastService(db)
+        broadcast = service.get(broadcast_id)
+        if broadcast is None:
+            raise PermanentJobError(f"Envío masivo {broadcast_id} inexistente")
+        return asyncio.run(service.run(broadcast))
+
+
+@app.task(base=JobTask, queue=BULK_QUEUE)
+def compute_phase_analytics(months: int = 2) -> dict:
+    """Recalcula el embudo de fases de los últimos meses (por defecto actual y anterior)."""
+    from infrastructure.persistence.db import engine
+    from infrastructure.persistence.phase_events import compute_phase_month_stats, recent_months
+
+    computed = {}
+    for month in recent_months(months):
+        with engine.begin() as conn:
+            computed[month.isoformat()] = compute_phase_month_stats(conn, month)
+    return {"status": "computed", "months": computed}
+
+
+@app.task(base=JobTask, queue=BULK_QUEUE)
+def ensure_phase_partitions(months_ahead: int = 2) -> dict:
+    """Crea por adelantado las particiones mensuales de phase_events."""
+    from infrastructure.persistence.db import engine
+    from infrastructure.persistence.phase_events import ensure_phase_event_partitions
+
+    with engine.begin() as conn:
+        names = ensure_phase_event_partitions(conn, months_ahead=months_ahead)
+    return {"status": "ok", "partitions": names}
+
+
+@app.task(base=JobTask, queue=BULK_QUEUE, max_retries=3, ignore_result=True)
+def generate_media_previews(media_id: str) -> dict:
+    """Genera las miniaturas/previews de un archivo recién guardado en el media store."""
+    from application.services.preview_service import PreviewService
+    from infrastructure.storage.previews import PreviewUnavailableError
+
+    with _session() as db:
+        service = PreviewService(db)
+        media = service.media.get(media_id)
+        if media is None:
+            return {"status": "missing", "media_id": media_id}
+        try:
+            generated = service.generate(media)
+        except PreviewUnavailableError as e:
+            return {"status": "unavailable", "media_id": media_id, "reason": str(e)}
+        return {"status": "generated", "media_id": media_id, "variants": generated}
+
+
+@app.task(base=JobTask, queue=BULK_QUEUE, max_retries=1)
+def warm_media_previews(limit: Optional[int] = None) -> dict:
+    """Completa previews de documentos históricos (dni/acta/respaldo)."""
+    from application.services.preview_service import PreviewService
+
+    with _session() as db:
+        return asyncio.run(PreviewService(db).warm(limit))
+
+
+# --- Encolado sin bloquear --------------------------------------------------
+
+def _enqueue(task, *args, idempotency_key: Optional[str] = None) -> None:
+    from .client import JobSubmitError, jobs
+
+    try:
+        jobs.submit(task, *args, idempotency_key=idempotency_key)
+    except JobSubmitError:
+        pass  # ya logueado por el cliente
+
+
+def enqueue_background(task, *args, idempotency_key: Optional[str] = None) -> None:
+    """Encola sin esperar ni fallar: para trabajo que tiene otra red de seguridad."""
+    # Publicar en el broker puede demorar segundos si Redis no responde (reintentos de
+    # conexión); se hace en el pool bloqueante para no frenar el webhook.
+    blocking_executor().submit(_enqueue, task, *args, idempotency_key=idempotency_key)
+
+
+def enqueue_media_previews(media_id: str) -> None:
+    """Encola la generación de previews sin bloquear ni fallar si el broker no responde.
+
+    Si no se encola, el endpoint de preview la genera a demanda y el job
+    warm_media_previews la completa después.
+    """
+    enqueue_background(generate_media_previews, media_id, idempotency_key=f"previews:{media_id}")
@@ -0,0 +1,57 @@
+"""
+Cache en memoria con expiración por entrada (TTL).
+
+Pensado para valores baratos de recalcular pero costosos de consultar en cada
+request (conteos, agregados del dashboard). Es por proceso: cada worker de
+uvicorn mantiene su propia copia, lo cual es aceptable para TTLs cortos.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Diccionario thread-safe cuyas entradas expiran luego de `ttl_seconds`."""
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor si existe y no expiró; None en caso contrario."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._data.pop(key, None)
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Guarda un valor; si se supera max_entries se descarta la entrada más próxima a expirar."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if len(self._data) >= self.max_entries and key not in self._data:
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                self._data.pop(oldest, None)
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Retorna el valor cacheado o lo calcula con `factory` y lo guarda."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Elimina una clave, o todo el cache si no se indica clave."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
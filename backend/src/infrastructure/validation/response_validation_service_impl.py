@@ -1,13 +1,10 @@
 import re
 from application.interfaces.validation.response_validation_service import ResponseValidationService
 from application.dtos.validation_results import ResponseValidationResult
+# Humor, palabras inapropiadas e inyección se buscan juntos con el escáner unificado
+from infrastructure.ai.safety_scanner import JOKE_WORDS, INAPPROPRIATE, get_safety_scanner  # noqa: F401
 
-JOKE_WORDS = ["jaja", "jeje", "jiji", "xd", "a molestar", "broma"]
-INAPPROPRIATE = ["insulto", "tonto", "idiota", "mierda"]
-INJECTION_PATTERNS = [
-    r"\bignora\b", r"\bolvida\b", r"\basistente\b", r"\bsistema\b",
-    r"^system:", r"^assistant:", r"^user:", r"```", r"###"
-]
+_SCAN_CATEGORIES = {"humor", "inappropriate", "answer_injection"}
 
 class SimpleResponseValidationService(ResponseValidationService):
     def validate_user_response(self, response_text: str, field_name: str, question_context: str) -> ResponseValidationResult:
@@ -17,16 +14,17 @@ class SimpleResponseValidationService(ResponseValidationService):
         if not text:
             errors.append("Respuesta vacía.")
         low = text.lower()
+        found = {hit.category for hit in get_safety_scanner().scan(text, _SCAN_CATEGORIES)}
 
-        if any(w in low for w in JOKE_WORDS):
+        if "humor" in found:
             flags.append("humor")
             errors.append("Respuesta no seria detectada.")
 
-        if any(w in low for w in INAPPROPRIATE):
+        if "inappropriate" in found:
             flags.append("inapropiada")
             errors.append("Contenido inapropiado detectado.")
 
-        if any(re.search(p, low) for p in INJECTION_PATTERNS):
+        if "answer_injection" in found:
             flags.append("posible_inyeccion")
             errors.append("Posible intento de inyección de prompt.")
 
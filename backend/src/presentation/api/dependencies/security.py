@@ -1,16 +1,54 @@
+from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from fastapi import Depends, HTTPException
+from typing import Optional
+from fastapi import Depends, HTTPException, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from core.config import settings
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 SECRET_KEY = settings.secret_key
 ALGORITHM = "HS256"
+# Alcance de los tokens que viajan en la URL del stream de eventos
+STREAM_SCOPE = "events:stream"
 
-def get_current_operator(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+def _decode(token: str) -> dict:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
+
+def get_current_operator(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = _decode(credentials.credentials)
+    if payload.get("scope") == STREAM_SCOPE:
+        # Un token de stream puede quedar en logs de proxies: no sirve como sesión
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return payload
+
+def create_stream_token(operator: dict) -> str:
+    """Token corto, solo para el stream de eventos, a partir de la sesión del operador."""
+    claims = {key: operator[key] for key in ("sub", "role", "user_id") if key in operator}
+    claims.update({
+        "scope": STREAM_SCOPE,
+        "exp": datetime.utcnow() + timedelta(seconds=settings.realtime_stream_token_seconds),
+    })
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+def get_current_operator_stream(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = Query(None),
+):
+    """Igual que get_current_operator, pero acepta en ?token= un token de stream.
+
+    EventSource del navegador no permite enviar el header Authorization; la
+    URL queda en logs e historial, por eso ahí no se acepta el JWT de sesión
+    sino uno de `create_stream_token` (POST /api/events/token).
+    """
+    if credentials is not None:
+        return get_current_operator(credentials)
+    if not token:
+        raise HTTPException(status_code=403, detail="Not authenticated")
+    payload = _decode(token)
+    if payload.get("scope") != STREAM_SCOPE:
+        raise HTTPException(status_code=401, detail="Se requiere un token de stream")
     return payload
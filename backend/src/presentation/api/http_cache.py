@@ -0,0 +1,35 @@
+"""
+Respuestas JSON con ETag para los endpoints que el dashboard consulta por polling.
+
+El ETag es un hash del cuerpo serializado: si el cliente envía el mismo valor en
+`If-None-Match`, se responde 304 sin cuerpo y el navegador reutiliza su copia.
+"""
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil según RFC 9110 (ignora el prefijo W/)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def etag_json_response(request: Request, payload: Any) -> Response:
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    etag = make_etag(body)
+    # no-cache: el navegador guarda la respuesta pero revalida siempre con el ETag
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -6,16 +6,32 @@ from presentation.api.routes.cases import router as cases_router
 from presentation.api.routes.metrics import router as metrics_router
 from presentation.api.routes.auth import router as auth_router
 from presentation.api.routes.users import router as users_router
+from presentation.api.routes.events import router as events_router
+from presentation.api.routes.jobs import router as jobs_router
+from presentation.api.routes.outbound import router as outbound_router
+from presentation.api.routes.broadcasts import router as broadcasts_router
+from presentation.api.routes.prometheus import router as prometheus_router
 from presentation.api.middleware.rate_limit import (
     RateLimitMiddleware,
     SecurityHeadersMiddleware,
     RequestLoggingMiddleware
 )
-from infrastructure.persistence.db import init_db
+from presentation.api.middleware.metrics import MetricsMiddleware
+from infrastructure.persistence.db import SessionLocal, init_db
+from infrastructure.persistence.vector_index import warm_knowledge_index
+from infrastructure.observability.tracing import configure_tracing, shutdown_tracing
+from infrastructure.ai.usage import usage_recorder
+from infrastructure.realtime.case_events import publisher as case_event_publisher
+from infrastructure.concurrency.executors import install_default_executor, shutdown_executors
+from infrastructure.concurrency.loop_monitor import LoopLagMonitor
+from core.config import settings
 import structlog
 
 logger = structlog.get_logger()
 
+# Trazas por turno (no-op salvo que TRACING_EXPORTER lo active)
+configure_tracing()
+
 app = FastAPI(
     title="Defensoría Civil - LLM Intelligence System",
     version="0.1.0",
@@ -37,10 +53,31 @@ app.add_middleware(
 app.add_middleware(RequestLoggingMiddleware)
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+loop_monitor = LoopLagMonitor(settings.loop_lag_threshold_ms, settings.loop_lag_interval_ms)
 
 @app.on_event("startup")
 def on_startup():
+    # Pool de hilos gestionado también para asyncio.to_thread; monitor de callbacks que bloquean el loop
+    install_default_executor()
+    if settings.loop_lag_threshold_ms > 0:
+        loop_monitor.start()
     init_db()
+    # Índice vectorial en memoria de la base de conocimiento (si corresponde al backend)
+    db = SessionLocal()
+    try:
+        warm_knowledge_index(db)
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    loop_monitor.stop()
+    usage_recorder.flush()
+    case_event_publisher.flush(timeout=1.0)
+    shutdown_tracing()
+    shutdown_executors(wait=False)
 
 app.include_router(health_router, prefix="/health", tags=["health"])
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
@@ -48,3 +85,8 @@ app.include_router(webhook_router, prefix="/webhook", tags=["webhook"])
 app.include_router(cases_router, prefix="/api/cases", tags=["cases"])
 app.include_router(metrics_router, prefix="/api/metrics", tags=["metrics"])
 app.include_router(users_router, prefix="/api/users", tags=["users"])
+app.include_router(events_router, prefix="/api/events", tags=["events"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(outbound_router, prefix="/api/outbound", tags=["outbound"])
+app.include_router(broadcasts_router, prefix="/api/broadcasts", tags=["broadcasts"])
+app.include_router(prometheus_router, tags=["observability"])
@@ -0,0 +1,99 @@
+"""
+Respuestas de archivos del media store: streaming, rangos HTTP y ETag.
+
+El ETag es el SHA-256 del contenido (fuerte), así que el navegador puede
+revalidar con If-None-Match y recibir 304 sin transferir el archivo. Se
+soporta un único rango `bytes=` (visores de PDF, reanudación de descargas);
+con varios rangos se responde el archivo completo.
+"""
+import re
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from application.interfaces.storage.media_store import MediaStore
+from infrastructure.persistence.models import MediaObject
+from presentation.api.http_cache import etag_matches
+
+CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Retorna (inicio, fin) inclusivos; None si hay que servir todo; ValueError si es insatisfacible."""
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start_raw, end_raw = match.groups()
+    if not start_raw and not end_raw:
+        return None
+    if not start_raw:
+        length = int(end_raw)
+        if length == 0:
+            raise ValueError("rango vacío")
+        return max(size - length, 0), size - 1
+    start = int(start_raw)
+    end = min(int(end_raw), size - 1) if end_raw else size - 1
+    if start >= size or start > end:
+        raise ValueError("rango fuera del archivo")
+    return start, end
+
+
+def _iter_file(handle: BinaryIO, start: int, length: int) -> Iterator[bytes]:
+    try:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+def media_response(
+    request: Request,
+    store: MediaStore,
+    media: MediaObject,
+    filename: Optional[str] = None,
+    cache_control: str = "private, no-cache",
+    variant: Optional[str] = None,
+    media_type: Optional[str] = None,
+) -> Response:
+    """Sirve el original o una variante (preview) de `media`."""
+    size = store.size(media.sha256, variant)
+    etag = f'"{media.sha256}-{variant}"' if variant else f'"{media.sha256}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if range_header and size > 0:
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = end - start + 1 if size else 0
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_file(store.open(media.sha256, variant), start, length),
+        status_code=status_code,
+        media_type=media_type or media.mime_type,
+        headers=headers,
+    )
@@ -0,0 +1,42 @@
+import time
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from infrastructure.observability.metrics import (
+    DB_QUERIES,
+    HTTP_SECONDS,
+    instrument_queries,
+    start_query_count,
+    stop_query_count,
+)
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware de métricas Prometheus por request.
+    Registra latencia y cantidad de queries SQL usando la plantilla de la ruta
+    (/api/cases/{case_id}) como label para acotar la cardinalidad.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        instrument_queries()
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+
+        start_time = time.perf_counter()
+        counter, token = start_query_count()
+        status = "500"
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            stop_query_count(token)
+            route = request.scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_SECONDS.labels(method=request.method, route=template, status=status).observe(
+                time.perf_counter() - start_time
+            )
+            DB_QUERIES.labels(route=template).observe(counter[0])
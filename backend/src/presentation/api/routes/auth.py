@@ -13,6 +13,7 @@ from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 from typing import Optional
 
+from infrastructure.concurrency.executors import run_blocking
 from infrastructure.persistence.db import get_db
 from infrastructure.persistence.repositories import UserRepository
 from application.use_cases.authenticate_user import (
@@ -82,7 +83,8 @@ async def login(
         password=credentials.password
     )
     
-    response = use_case.execute(login_request)
+    # bcrypt (verify) tarda decenas de ms a propósito: fuera del event loop
+    response = await run_blocking(use_case.execute, login_request)
     
     return response
 
@@ -132,8 +134,9 @@ async def register(
             detail="La contraseña debe tener al menos 6 caracteres"
         )
     
-    # Crear usuario
-    user = users_repo.create_user(
+    # Crear usuario (bcrypt hash en el pool de hilos)
+    user = await run_blocking(
+        users_repo.create_user,
         username=data.username,
         email=data.email,
         password=data.password,
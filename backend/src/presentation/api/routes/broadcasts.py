@@ -0,0 +1,136 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Optional
+import structlog
+
+from application.services.broadcast_service import BroadcastError, BroadcastService
+from infrastructure.persistence.db import get_db
+from infrastructure.persistence.models import Broadcast, Case, Message, OutboundMessage
+from infrastructure.persistence.pagination import InvalidCursorError, apply_keyset, encode_cursor
+from presentation.api.dependencies.security import get_current_operator
+from presentation.api.schemas.broadcasts import BroadcastCreate
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+
+@router.post("/", status_code=202)
+async def create_broadcast(
+    body: BroadcastCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+    operator: dict = Depends(get_current_operator)
+):
+    """
+    Envía una plantilla por WhatsApp a todos los casos que cumplen el filtro.
+
+    Con `dry_run` solo informa cuántos destinatarios hay y cómo queda el texto
+    para algunos. Si no, encola el envío y retorna `broadcast_id` y `job_id`;
+    el avance y el resultado por destinatario se consultan en
+    /api/broadcasts/{broadcast_id}. `Idempotency-Key` evita duplicar el envío
+    ante un reintento del cliente.
+    """
+    from infrastructure.tasks.client import JobSubmitError, jobs
+    from infrastructure.tasks.jobs import send_broadcast
+
+    service = BroadcastService(db)
+    filters = body.filters.model_dump()
+    try:
+        if body.dry_run:
+            response.status_code = 200
+            return service.preview(filters, body.template)
+        broadcast = service.create(
+            filters, body.template, created_by=operator.get("sub"), idempotency_key=idempotency_key
+        )
+    except BroadcastError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if broadcast.job_id is None:
+        try:
+            job_id = await run_in_threadpool(
+                jobs.submit, send_broadcast, broadcast.id, idempotency_key=f"broadcast:{broadcast.id}"
+            )
+        except JobSubmitError:
+            service.mark_failed(broadcast, "Cola de trabajos no disponible")
+            raise HTTPException(status_code=503, detail="Cola de trabajos no disponible; reintentar más tarde")
+        broadcast.job_id = job_id
+        broadcast.status = "pending" if broadcast.status == "failed" else broadcast.status
+        broadcast.error = None
+        db.commit()
+    logger.info("broadcast_enqueued", broadcast_id=broadcast.id, job_id=broadcast.job_id, total=broadcast.total)
+    return {
+        "broadcast_id": broadcast.id,
+        "job_id": broadcast.job_id,
+        "total": broadcast.total,
+        "status_url": f"/api/broadcasts/{broadcast.id}",
+    }
+
+
+@router.get("/")
+def list_broadcasts(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """Últimos envíos masivos con su avance"""
+    service = BroadcastService(db)
+    broadcasts = db.query(Broadcast).order_by(Broadcast.id.desc()).limit(limit).all()
+    return {"items": [service.progress(b) for b in broadcasts]}
+
+
+@router.get("/{broadcast_id}")
+def get_broadcast(
+    broadcast_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Avance del envío y resultado por destinatario.
+
+    `counts` agrupa por estado de entrega (queued, sent, delivered, read,
+    failed). `recipients` se pagina con `cursor` (next_cursor de la respuesta
+    anterior).
+    """
+    service = BroadcastService(db)
+    broadcast = service.get(broadcast_id)
+    if broadcast is None:
+        raise HTTPException(status_code=404, detail="Envío masivo no encontrado")
+
+    query = (
+        db.query(OutboundMessage, Message.status, Case.nombre)
+        .outerjoin(Message, Message.id == OutboundMessage.message_id)
+        .outerjoin(Case, Case.id == OutboundMessage.case_id)
+        .filter(OutboundMessage.broadcast_id == broadcast_id)
+    )
+    try:
+        query = apply_keyset(query, OutboundMessage.created_at, OutboundMessage.id, cursor, descending=False)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = (
+        encode_cursor(page[-1][0].created_at, page[-1][0].id)
+        if len(rows) > limit else None
+    )
+    return {
+        **service.progress(broadcast),
+        "recipients": [
+            {
+                "case_id": outbound.case_id,
+                "nombre": nombre,
+                "chat_id": outbound.chat_id,
+                "message_id": outbound.message_id,
+                "status": outbound.status,
+                "message_status": message_status,
+                "attempts": outbound.attempts,
+                "last_error": outbound.last_error,
+                "sent_at": outbound.sent_at.isoformat() if outbound.sent_at else None,
+            }
+            for outbound, message_status, nombre in page
+        ],
+        "next_cursor": next_cursor,
+    }
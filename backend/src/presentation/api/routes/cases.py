@@ -1,19 +1,67 @@
-from fastapi import APIRouter, Depends, Response, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, Request, Response, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import List, Optional
-from datetime import datetime, timedelta
+import hashlib
 import structlog
 
 from presentation.api.schemas.cases import CaseOut
 from infrastructure.persistence.db import get_db
 from infrastructure.persistence.models import Case, Message
 from presentation.api.dependencies.security import get_current_operator
-from infrastructure.document.pdf_service_impl import TemplatePDFService
+from infrastructure.concurrency.executors import run_blocking, run_cpu
+from infrastructure.document.pdf_service_impl import render_divorce_petition_pdf
+from infrastructure.document.petition_data import build_petition_case_data
+from infrastructure.persistence.pagination import (
+    InvalidCursorError,
+    apply_keyset,
+    encode_cursor,
+    estimate_table_rows,
+)
+from infrastructure.utils.ttl_cache import TTLCache
+from presentation.api.http_cache import etag_json_response
+from presentation.api.media_responses import media_response
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Conteos por combinación de filtros; evita un COUNT(*) completo en cada request del dashboard
+_count_cache = TTLCache(ttl_seconds=30)
+
+
+def _serialize_case_list_item(case: Case) -> dict:
+    return {
+        "id": case.id,
+        "phone": case.phone,
+        "status": case.status,
+        "type": case.type,
+        "phase": case.phase,
+        "nombre": case.nombre,
+        "dni": case.dni,
+        "fecha_nacimiento": case.fecha_nacimiento.isoformat() if case.fecha_nacimiento else None,
+        "domicilio": case.domicilio,
+        "fecha_matrimonio": case.fecha_matrimonio.isoformat() if case.fecha_matrimonio else None,
+        "lugar_matrimonio": case.lugar_matrimonio,
+        "created_at": case.created_at.isoformat(),
+        "updated_at": case.updated_at.isoformat(),
+    }
+
+
+def _count_cases(db: Session, query, count_mode: str, filters: tuple) -> tuple[Optional[int], bool]:
+    """Calcula el total según el modo pedido. Retorna (total, es_estimado)."""
+    if count_mode == "none":
+        return None, False
+    if count_mode == "exact":
+        return query.count(), False
+    # estimate: estadísticas del planner si no hay filtros; si no, conteo cacheado
+    if not any(filters):
+        estimated = estimate_table_rows(db, Case.__tablename__)
+        if estimated is not None:
+            return estimated, True
+    return _count_cache.get_or_set(filters, query.count), True
+
+
 @router.get("/")
 def list_cases(
     page: int = Query(1, ge=1),
@@ -21,6 +69,8 @@ def list_cases(
     status: Optional[str] = None,
     type: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count_mode: Optional[str] = Query(None, pattern="^(exact|estimate|none)$"),
     db: Session = Depends(get_db),
     _: dict = Depends(get_current_operator)
 ):
@@ -28,11 +78,14 @@ def list_cases(
     Lista todos los casos con paginación y filtros
     
     Query params:
-    - page: número de página (default: 1)
+    - page: número de página (default: 1). Ignorado si se envía cursor
     - page_size: tamaño de página (default: 50, max: 100)
     - status: filtrar por estado
     - type: filtrar por tipo (unilateral, conjunta)
     - search: buscar por nombre o DNI
+    - cursor: cursor opaco (next_cursor de la respuesta anterior) para paginación keyset.
+      Enviar cursor vacío (`cursor=`) para pedir la primera página en modo keyset
+    - count_mode: exact | estimate | none. Default: exact con page, estimate con cursor
     """
     query = db.query(Case)
     
@@ -50,40 +103,48 @@ def list_cases(
             (Case.dni.ilike(search_term))
         )
     
-    # Contar total
-    total = query.count()
+    keyset_mode = cursor is not None
+    count_mode = count_mode or ("estimate" if keyset_mode else "exact")
+    total, total_is_estimate = _count_cases(db, query, count_mode, (status, type, search))
     
-    # Paginación
+    if keyset_mode:
+        try:
+            paged = apply_keyset(query, Case.created_at, Case.id, cursor or None)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        # Pedimos una fila extra para saber si hay página siguiente sin contar
+        rows = paged.limit(page_size + 1).all()
+        cases = rows[:page_size]
+        next_cursor = (
+            encode_cursor(cases[-1].created_at, cases[-1].id)
+            if len(rows) > page_size else None
+        )
+        result = [_serialize_case_list_item(case) for case in cases]
+        logger.info("cases_listed", count=len(result), total=total, mode="keyset")
+        return {
+            "items": result,
+            "total": total,
+            "total_is_estimate": total_is_estimate,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+        }
+    
+    # Paginación por offset (compatibilidad con clientes existentes)
     offset = (page - 1) * page_size
-    cases = query.order_by(desc(Case.created_at)).offset(offset).limit(page_size).all()
+    cases = query.order_by(desc(Case.created_at), desc(Case.id)).offset(offset).limit(page_size).all()
     
     # Convertir a dict con fechas como strings
-    result = []
-    for case in cases:
-        result.append({
-            "id": case.id,
-            "phone": case.phone,
-            "status": case.status,
-            "type": case.type,
-            "phase": case.phase,
-            "nombre": case.nombre,
-            "dni": case.dni,
-            "fecha_nacimiento": case.fecha_nacimiento.isoformat() if case.fecha_nacimiento else None,
-            "domicilio": case.domicilio,
-            "fecha_matrimonio": case.fecha_matrimonio.isoformat() if case.fecha_matrimonio else None,
-            "lugar_matrimonio": case.lugar_matrimonio,
-            "created_at": case.created_at.isoformat(),
-            "updated_at": case.updated_at.isoformat(),
-        })
+    result = [_serialize_case_list_item(case) for case in cases]
     
     logger.info("cases_listed", count=len(result), total=total, page=page)
     
     return {
         "items": result,
         "total": total,
+        "total_is_estimate": total_is_estimate,
         "page": page,
         "page_size": page_size,
-        "pages": (total + page_size - 1) // page_size
+        "pages": (total + page_size - 1) // page_size if total is not None else None
     }
 
 @router.get("/stats/summary")
@@ -94,66 +155,60 @@ def get_summary_stats(
     """
     Obtiene estadísticas resumen de todos los casos
     """
-    total = db.query(func.count(Case.id)).scalar()
-    
-    # Casos por estado
-    by_status = db.query(
-        Case.status,
-        func.count(Case.id)
-    ).group_by(Case.status).all()
-    
-    # Casos por tipo
-    by_type = db.query(
-        Case.type,
-        func.count(Case.id)
-    ).filter(Case.type.isnot(None)).group_by(Case.type).all()
-    
-    # Casos nuevos en últimos 7 días
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent = db.query(func.count(Case.id)).filter(
-        Case.created_at >= seven_days_ago
-    ).scalar()
-    
+    from application.services.metrics_service import CaseMetricsService
+
+    summary = CaseMetricsService(db).summary()
     return {
-        "total_cases": total or 0,
-        "recent_cases_7d": recent or 0,
-        "by_status": {status: count for status, count in by_status},
-        "by_type": {type_: count for type_, count in by_type if type_}
+        "total_cases": summary["total_cases"],
+        "recent_cases_7d": summary["recent_cases_7d"],
+        "by_status": summary["cases_by_status"],
+        "by_type": summary["cases_by_type"]
     }
 
+@router.get("/search")
+def search_cases(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    include_messages: bool = True,
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Búsqueda de texto completo en datos del caso y en el historial de mensajes.
+
+    Query params:
+    - q: texto a buscar (admite sintaxis web: "frase exacta", -excluir, OR)
+    - limit: máximo de casos a devolver (default: 20, max: 100)
+    - include_messages: buscar también en la conversación (default: true)
+
+    Los fragmentos resaltan las coincidencias con <mark>...</mark>.
+    """
+    from application.services.case_search_service import CaseSearchService
+
+    results = CaseSearchService(db).search(q, limit=limit, include_messages=include_messages)
+    return {"query": q, "items": results}
+
 @router.get("/{case_id}")
 def get_case(
     case_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     _: dict = Depends(get_current_operator)
 ):
     """
-    Obtiene detalle completo de un caso incluyendo mensajes
+    Obtiene la cabecera del caso (datos y perfil económico, sin historial).
+
+    Los mensajes se piden paginados a /{case_id}/messages y los documentos de
+    respaldo a /{case_id}/support-documents. Responde 304 si If-None-Match
+    coincide con el ETag actual.
     """
     case = db.query(Case).filter(Case.id == case_id).first()
     
     if not case:
         raise HTTPException(status_code=404, detail="Caso no encontrado")
     
-    # Obtener mensajes del caso
-    messages = db.query(Message).filter(
-        Message.case_id == case_id
-    ).order_by(Message.created_at).all()
-    
-    # Construir lista de documentos de respaldo
-    support_docs = []
-    try:
-        from infrastructure.persistence.models import SupportDocument
-        docs = db.query(SupportDocument).filter(SupportDocument.case_id == case.id).order_by(SupportDocument.created_at).all()
-        for d in docs:
-            support_docs.append({
-                "id": d.id,
-                "doc_type": d.doc_type,
-                "mime_type": d.mime_type,
-                "created_at": d.created_at.isoformat(),
-            })
-    except Exception:
-        pass
+    # Conteo por índice (case_id); el dashboard lo muestra sin cargar mensajes
+    message_count = db.query(func.count(Message.id)).filter(Message.case_id == case_id).scalar()
 
     result = {
         "id": case.id,
@@ -189,22 +244,87 @@ def get_case(
         "dni_image_url": case.dni_image_url,
         "dni_back_url": getattr(case, 'dni_back_url', None),
         "marriage_cert_url": case.marriage_cert_url,
-        "support_documents": support_docs,
+        "message_count": message_count,
         "created_at": case.created_at.isoformat(),
         "updated_at": case.updated_at.isoformat(),
-        "messages": [
+    }
+    
+    logger.info("case_retrieved", case_id=case_id, message_count=message_count)
+    return etag_json_response(request, result)
+
+@router.get("/{case_id}/messages")
+def get_case_messages(
+    case_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Historial de conversación paginado por cursor, del más nuevo al más viejo.
+
+    Query params:
+    - cursor: next_cursor de la respuesta anterior para traer mensajes más viejos
+    - limit: mensajes por página (default: 50, max: 200)
+    """
+    if not db.query(Case.id).filter(Case.id == case_id).first():
+        raise HTTPException(status_code=404, detail="Caso no encontrado")
+
+    query = db.query(Message).filter(Message.case_id == case_id)
+    try:
+        query = apply_keyset(query, Message.created_at, Message.id, cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    rows = query.limit(limit + 1).all()
+    messages = rows[:limit]
+    next_cursor = (
+        encode_cursor(messages[-1].created_at, messages[-1].id)
+        if len(rows) > limit else None
+    )
+    return etag_json_response(request, {
+        "items": [
             {
                 "id": msg.id,
                 "role": msg.role,
                 "content": msg.content,
+                "status": msg.status,
                 "created_at": msg.created_at.isoformat()
             }
             for msg in messages
+        ],
+        "next_cursor": next_cursor,
+    })
+
+@router.get("/{case_id}/support-documents")
+def get_case_support_documents(
+    case_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Documentos de respaldo del caso (metadatos; el archivo se descarga aparte)
+    """
+    from infrastructure.persistence.models import SupportDocument
+
+    if not db.query(Case.id).filter(Case.id == case_id).first():
+        raise HTTPException(status_code=404, detail="Caso no encontrado")
+
+    docs = db.query(SupportDocument).filter(
+        SupportDocument.case_id == case_id
+    ).order_by(SupportDocument.created_at).all()
+    return etag_json_response(request, {
+        "items": [
+            {
+                "id": d.id,
+                "doc_type": d.doc_type,
+                "mime_type": d.mime_type,
+                "created_at": d.created_at.isoformat(),
+            }
+            for d in docs
         ]
-    }
-    
-    logger.info("case_retrieved", case_id=case_id, message_count=len(messages))
-    return result
+    })
 
 @router.patch("/{case_id}")
 def update_case(case_id: int, updates: dict, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
@@ -240,18 +360,21 @@ def update_case(case_id: int, updates: dict, db: Session = Depends(get_db), _: d
     # Acción opcional: si el operador aprueba el informe del bot,
     # almacenarlo como conocimiento semántico
     if updates.get("econ_bot_report_approved") and updates.get("econ_bot_report_text"):
+        from infrastructure.tasks.client import JobSubmitError, jobs
+        from infrastructure.tasks.jobs import ingest_legal_document
+        # Título con referencia de caso
+        ingest_args = (f"BLSG - Informe aprobado Caso #{case_id}", str(updates.get("econ_bot_report_text")), "blsg")
         try:
-            from application.use_cases.ingest_legal_document import IngestLegalDocumentUseCase
-            use_case = IngestLegalDocumentUseCase(db)
-            # Título con referencia de caso
-            import asyncio
-            asyncio.run(use_case.execute(
-                title=f"BLSG - Informe aprobado Caso #{case_id}",
-                content=str(updates.get("econ_bot_report_text")),
-                category="blsg"
-            ))
-        except Exception as e:
-            logger.error("econ_bot_report_ingest_failed", case_id=case_id, error=str(e))
+            # Embeddings + chunks en el worker (cola bulk); la misma aprobación no se ingesta dos veces
+            report_key = hashlib.sha256(ingest_args[1].encode("utf-8")).hexdigest()[:16]
+            jobs.submit(ingest_legal_document, *ingest_args, idempotency_key=f"econ-report:{case_id}:{report_key}")
+        except JobSubmitError:
+            try:
+                from application.use_cases.ingest_legal_document import IngestLegalDocumentUseCase
+                import asyncio
+                asyncio.run(IngestLegalDocumentUseCase(db).execute(*ingest_args))
+            except Exception as e:
+                logger.error("econ_bot_report_ingest_failed", case_id=case_id, error=str(e))
 
     for field, value in updates.items():
         if field in allowed_fields and hasattr(case, field):
@@ -375,9 +498,24 @@ def validate_case_data(case_id: int, db: Session = Depends(get_db), _: dict = De
         "completion_percentage": int((len(complete) / len(required_fields["common"])) * 100)
     }
 
-@router.get("/{case_id}/documents/support/{doc_id}")
-async def get_support_document(case_id: int, doc_id: int, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
-    from infrastructure.messaging.waha_service_impl import WAHAWhatsAppService
+# doc_type -> (atributo del caso con el media_id de WAHA, nombre base del archivo)
+CASE_DOCUMENTS = {
+    "dni": ("dni_image_url", "dni_frente_caso"),
+    "dni_back": ("dni_back_url", "dni_dorso_caso"),
+    "marriage_cert": ("marriage_cert_url", "acta_matrimonio_caso"),
+}
+
+
+def _case_document_media_id(case: Case, doc_type: str) -> str:
+    if doc_type not in CASE_DOCUMENTS:
+        raise HTTPException(status_code=400, detail="Tipo de documento inválido. Usar: dni, dni_back o marriage_cert")
+    media_id = getattr(case, CASE_DOCUMENTS[doc_type][0], None)
+    if not media_id:
+        raise HTTPException(status_code=404, detail=f"No se encontró {doc_type} para este caso")
+    return media_id
+
+
+def _get_support_doc(db: Session, case_id: int, doc_id: int):
     from infrastructure.persistence.models import SupportDocument
     case = db.query(Case).get(case_id)
     if not case:
@@ -385,66 +523,109 @@ async def get_support_document(case_id: int, doc_id: int, db: Session = Depends(
     doc = db.query(SupportDocument).filter(SupportDocument.id == doc_id, SupportDocument.case_id == case_id).first()
     if not doc:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
+    return doc
+
+
+async def _preview_response(request: Request, db: Session, media_id: str, size: str, fmt: str, cache_control: str) -> Response:
+    from application.services.preview_service import PreviewService
+    from infrastructure.storage.previews import PreviewUnavailableError, preview_mime
+
+    previews = PreviewService(db)
     try:
-        whatsapp = WAHAWhatsAppService()
-        file_bytes = await whatsapp.download_media(doc.media_id)
-        # Detect mimetype
-        import imghdr
-        if file_bytes[:4] == b"%PDF":
-            mimetype = "application/pdf"
-        else:
-            image_type = imghdr.what(None, h=file_bytes)
-            mimetype = f"image/{image_type}" if image_type else (doc.mime_type or "application/octet-stream")
-        return Response(content=file_bytes, media_type=mimetype)
+        media = await previews.media.fetch(media_id)
+    except Exception as e:
+        logger.error("document_preview_download_error", media_id=media_id, error=str(e))
+        raise HTTPException(status_code=500, detail=f"Error al descargar documento: {str(e)}")
+    try:
+        # Normalmente ya la generó el worker; si no, se renderiza una vez y queda guardada
+        variant = await run_in_threadpool(previews.ensure, media, size, fmt)
+    except PreviewUnavailableError as e:
+        raise HTTPException(status_code=415, detail=f"Documento sin vista previa: {str(e)}")
+    return media_response(
+        request, previews.store, media, cache_control=cache_control, variant=variant, media_type=preview_mime(fmt)
+    )
+
+
+@router.get("/{case_id}/documents/support/{doc_id}")
+async def get_support_document(case_id: int, doc_id: int, request: Request, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+    from application.services.media_service import MediaService
+    doc = _get_support_doc(db, case_id, doc_id)
+    media_service = MediaService(db)
+    try:
+        media = await media_service.fetch(doc.media_id)
     except Exception as e:
         logger.error("support_document_download_error", case_id=case_id, doc_id=doc_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Error al descargar documento: {str(e)}")
+    # El media_id de un documento de respaldo no cambia: el navegador puede cachearlo
+    return media_response(request, media_service.store, media, cache_control="private, max-age=86400")
+
+@router.get("/{case_id}/documents/support/{doc_id}/preview")
+async def get_support_document_preview(
+    case_id: int,
+    doc_id: int,
+    request: Request,
+    size: str = Query("small", pattern="^(thumb|small|large)$"),
+    fmt: str = Query("webp", alias="format", pattern="^(webp|jpeg)$"),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Vista previa de un documento de respaldo (imagen reducida o 1ª página del PDF)
+    """
+    doc = _get_support_doc(db, case_id, doc_id)
+    return await _preview_response(request, db, doc.media_id, size, fmt, "private, max-age=86400")
 
 @router.get("/{case_id}/documents/{doc_type}")
-async def get_document_image(case_id: int, doc_type: str, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+async def get_document_image(case_id: int, doc_type: str, request: Request, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
     """
     Descarga la imagen de un documento (DNI frente, DNI dorso o acta de matrimonio)
     doc_type: 'dni' | 'dni_back' | 'marriage_cert'
+
+    Se sirve desde el media store (con Range y ETag); solo se consulta WAHA si
+    el archivo se recibió antes de que existiera el store.
     """
-    from infrastructure.messaging.waha_service_impl import WAHAWhatsAppService
+    from application.services.media_service import MediaService
     
     case = db.query(Case).get(case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Caso no encontrado")
     
-    # Determinar qué documento descargar
-    if doc_type == 'dni':
-        media_id = case.dni_image_url
-        filename = f"dni_frente_caso_{case_id}.jpg"
-    elif doc_type == 'dni_back':
-        media_id = getattr(case, 'dni_back_url', None)
-        filename = f"dni_dorso_caso_{case_id}.jpg"
-    elif doc_type == 'marriage_cert':
-        media_id = case.marriage_cert_url
-        filename = f"acta_matrimonio_caso_{case_id}.jpg"
-    else:
-        raise HTTPException(status_code=400, detail="Tipo de documento inválido. Usar: dni, dni_back o marriage_cert")
-    
-    if not media_id:
-        raise HTTPException(status_code=404, detail=f"No se encontró {doc_type} para este caso")
+    media_id = _case_document_media_id(case, doc_type)
+    filename = f"{CASE_DOCUMENTS[doc_type][1]}_{case_id}"
     
+    media_service = MediaService(db)
     try:
-        # Descargar imagen desde WhatsApp
-        whatsapp = WAHAWhatsAppService()
-        image_bytes = await whatsapp.download_media(media_id)
-        
-        # Detectar mimetype (imagen o PDF)
-        import imghdr
-        if image_bytes[:4] == b"%PDF":
-            mimetype = "application/pdf"
-        else:
-            image_type = imghdr.what(None, h=image_bytes)
-            mimetype = f"image/{image_type}" if image_type else "image/jpeg"
-        
-        return Response(content=image_bytes, media_type=mimetype)
+        media = await media_service.fetch(media_id)
     except Exception as e:
         logger.error("document_download_error", case_id=case_id, doc_type=doc_type, error=str(e))
         raise HTTPException(status_code=500, detail=f"Error al descargar documento: {str(e)}")
+    
+    extension = {"application/pdf": "pdf", "image/png": "png", "image/webp": "webp"}.get(media.mime_type, "jpg")
+    # El caso puede reemplazar el documento: revalidar siempre (304 si no cambió)
+    return media_response(request, media_service.store, media, filename=f"{filename}.{extension}")
+
+@router.get("/{case_id}/documents/{doc_type}/preview")
+async def get_document_preview(
+    case_id: int,
+    doc_type: str,
+    request: Request,
+    size: str = Query("small", pattern="^(thumb|small|large)$"),
+    fmt: str = Query("webp", alias="format", pattern="^(webp|jpeg)$"),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Vista previa de DNI (frente/dorso) o acta de matrimonio
+
+    Query params:
+    - size: thumb (160px) | small (480px) | large (1280px). Default: small
+    - format: webp | jpeg. Default: webp
+    """
+    case = db.query(Case).get(case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail="Caso no encontrado")
+    media_id = _case_document_media_id(case, doc_type)
+    return await _preview_response(request, db, media_id, size, fmt, "private, no-cache")
 
 def _build_docs_request_message(case: Case) -> str:
     parts = []
@@ -483,14 +664,40 @@ async def request_documents_preview(case_id: int, db: Session = Depends(get_db),
     return {"text": text_msg}
 
 
+async def _send_operator_message(db: Session, case: Case, text_msg: str, idempotency_key: Optional[str]) -> dict:
+    """Encola el mensaje del operador en la cola de salida y lo registra en historial y memoria.
+
+    El estado de entrega queda en el mensaje del historial (queued → sent →
+    delivered/read, o failed si agotó reintentos).
+    """
+    from application.services.memory_service import MemoryService
+    from application.services.outbound_service import OutboundMessageService
+    from infrastructure.persistence.models import OutboundMessage
+
+    key = f"operator:{case.id}:{idempotency_key}" if idempotency_key else None
+    is_retry = bool(key) and db.query(OutboundMessage.id).filter(OutboundMessage.idempotency_key == key).first() is not None
+    outbound = OutboundMessageService(db)
+    queued = outbound.enqueue(case.phone, text_msg, case_id=case.id, role="operator", idempotency_key=key)
+    if not is_retry:
+        await MemoryService(db).store_immediate_memory(case.id, f"Operador: {text_msg}")
+        queued = await outbound.dispatch(queued)
+    if queued.status == "dead":
+        raise RuntimeError(queued.last_error or "envío rechazado por WhatsApp")
+    return {"sent": queued.status == "sent", "queued": queued.status == "queued", "message_id": queued.message_id}
+
+
 @router.post("/{case_id}/request-docs")
-async def request_documents(case_id: int, body: dict | None = None, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+async def request_documents(
+    case_id: int,
+    body: dict | None = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
     """Envía al usuario por WhatsApp el pedido de documentación. Permite override del texto.
     Además: registra el mensaje del operador en la conversación y ajusta la fase a 'documentacion'.
+    Con `Idempotency-Key` un reintento del mismo pedido no se envía dos veces.
     """
-    from infrastructure.persistence.repositories import MessageRepository
-    from application.services.memory_service import MemoryService
-
     case = db.query(Case).get(case_id)
     if not case:
         raise HTTPException(status_code=404, detail="Caso no encontrado")
@@ -502,16 +709,8 @@ async def request_documents(case_id: int, body: dict | None = None, db: Session
     text_msg = text_override or _build_docs_request_message(case)
 
     try:
-        from infrastructure.messaging.waha_service_impl import WAHAWhatsAppService
-        whatsapp = WAHAWhatsAppService()
-        to = case.phone
-        # En endpoints async, usar await en lugar de asyncio.run()
-        await whatsapp.send_message(to, text_msg)
-
-        # Guardar en historial y memoria para que el bot tenga contexto
-        MessageRepository(db).add_message(case.id, "operator", text_msg)
-        memory = MemoryService(db)
-        await memory.store_immediate_memory(case.id, f"Operador: {text_msg}")
+        # El envío (y su registro en historial/memoria) corre en la cola interactiva
+        result = await _send_operator_message(db, case, text_msg, idempotency_key)
 
         # Ajustar fase a 'documentacion'
         if case.phase != "documentacion":
@@ -519,85 +718,62 @@ async def request_documents(case_id: int, body: dict | None = None, db: Session
             db.add(case)
             db.commit()
 
-        logger.info("docs_request_sent", case_id=case_id)
-        return {"sent": True}
+        logger.info("docs_request_sent", case_id=case_id, queued=not result["sent"])
+        return result
     except Exception as e:
         logger.error("docs_request_failed", case_id=case_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"No se pudo enviar el pedido de documentación: {str(e)}")
 
 
-@router.get("/{case_id}/petition.pdf")
-def download_petition(case_id: int, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+def _petition_case_data(db: Session, case_id: int) -> Optional[dict]:
     case = db.query(Case).get(case_id)
-    if not case:
+    return build_petition_case_data(case) if case else None
+
+
+@router.get("/{case_id}/petition.pdf")
+async def download_petition(case_id: int, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+    # La consulta (y la carga perezosa de relaciones) es I/O bloqueante: fuera del loop
+    case_data = await run_blocking(_petition_case_data, db, case_id)
+    if case_data is None:
         raise HTTPException(status_code=404, detail="Caso no encontrado")
-    
-    # Construir diccionario completo con TODOS los datos del caso
-    case_data = {
-        # Tipo de divorcio
-        "type": case.type,
-        
-        # Datos personales del solicitante
-        "apellido": case.apellido,
-        "nombres": case.nombres,
-        "nombre": case.nombre,  # Mantener por compatibilidad
-        "dni": case.dni,
-        "cuit": case.cuit,
-        "fecha_nacimiento": case.fecha_nacimiento,
-        "nacionalidad": case.nacionalidad,
-        "ocupacion": case.ocupacion,
-        "domicilio": case.domicilio,
-        "phone": case.phone,
-        "email": case.email,
-        
-        # Datos del cónyuge
-        "apellido_conyuge": case.apellido_conyuge,
-        "nombres_conyuge": case.nombres_conyuge,
-        "nombre_conyuge": case.nombre_conyuge,  # Mantener por compatibilidad
-        "dni_conyuge": case.dni_conyuge,
-        "cuit_conyuge": case.cuit_conyuge,
-        "fecha_nacimiento_conyuge": case.fecha_nacimiento_conyuge,
-        "nacionalidad_conyuge": case.nacionalidad_conyuge,
-        "ocupacion_conyuge": case.ocupacion_conyuge,
-        "domicilio_conyuge": case.domicilio_conyuge,
-        "phone_conyuge": case.phone_conyuge,
-        "email_conyuge": case.email_conyuge,
-        
-        # Datos del matrimonio
-        "fecha_matrimonio": case.fecha_matrimonio,
-        "lugar_matrimonio": case.lugar_matrimonio,
-        "fecha_separacion": case.fecha_separacion,
-        "ultimo_domicilio_conyugal": case.ultimo_domicilio_conyugal or case.domicilio,
-        
-        # Datos del acta de matrimonio
-        "acta_numero": case.acta_numero,
-        "acta_libro": case.acta_libro,
-        "acta_anio": case.acta_anio,
-        "acta_foja": case.acta_foja,
-        "acta_oficina": case.acta_oficina,
-        
-        # Hijos
-        "tiene_hijos": case.tiene_hijos,
-        "info_hijos": case.info_hijos,
-        
-        # Bienes
-        "tiene_bienes": case.tiene_bienes,
-        "info_bienes": case.info_bienes,
-    }
-    
-    pdf = TemplatePDFService().generate_divorce_petition_pdf(case_data)
+    # ReportLab es Python puro y retiene el GIL: en un hilo también frenaría al loop
+    pdf = await run_cpu(render_divorce_petition_pdf, case_data)
     return Response(content=pdf, media_type="application/pdf")
 
 
+@router.post("/{case_id}/petition/jobs", status_code=202)
+def enqueue_petition(case_id: int, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+    """
+    Encola el renderizado de la demanda en el worker.
+
+    Retorna el job_id; el estado se consulta en /api/jobs/{job_id} y, al
+    terminar, el PDF se descarga de /api/jobs/{job_id}/file.
+    """
+    from infrastructure.tasks.client import JobSubmitError, jobs
+    from infrastructure.tasks.jobs import render_petition_pdf
+
+    if not db.query(Case.id).filter(Case.id == case_id).first():
+        raise HTTPException(status_code=404, detail="Caso no encontrado")
+    try:
+        job_id = jobs.submit(render_petition_pdf, case_id)
+    except JobSubmitError:
+        raise HTTPException(status_code=503, detail="Cola de trabajos no disponible; usar GET /petition.pdf")
+    return {"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}
+
+
 @router.post("/{case_id}/send-message")
-async def operator_send_message(case_id: int, body: dict, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+async def operator_send_message(
+    case_id: int,
+    body: dict,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
     """Permite al operador enviar un mensaje libre por WhatsApp.
     También registra el mensaje en el historial y memoria inmediata.
-    Body: {"text": str}
+    Body: {"text": str}. Header opcional `Idempotency-Key` para reintentos seguros.
+    Si todavía no se entregó responde {"sent": false, "queued": true, "message_id": ...}.
     """
-    from infrastructure.persistence.repositories import MessageRepository
-    from application.services.memory_service import MemoryService
-    
     if not isinstance(body, dict) or not body.get("text"):
         raise HTTPException(status_code=400, detail="Falta el campo 'text'")
     
@@ -610,15 +786,9 @@ async def operator_send_message(case_id: int, body: dict, db: Session = Depends(
         raise HTTPException(status_code=400, detail="El mensaje está vacío")
     
     try:
-        from infrastructure.messaging.waha_service_impl import WAHAWhatsAppService
-        whatsapp = WAHAWhatsAppService()
-        await whatsapp.send_message(case.phone, text_msg)
-        # registrar historial y memoria
-        MessageRepository(db).add_message(case.id, "operator", text_msg)
-        memory = MemoryService(db)
-        await memory.store_immediate_memory(case.id, f"Operador: {text_msg}")
-        logger.info("operator_message_sent", case_id=case_id)
-        return {"sent": True}
+        result = await _send_operator_message(db, case, text_msg, idempotency_key)
+        logger.info("operator_message_sent", case_id=case_id, queued=not result["sent"])
+        return result
     except Exception as e:
         logger.error("operator_message_failed", case_id=case_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"No se pudo enviar el mensaje: {str(e)}")
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+import structlog
+
+from core.config import settings
+from infrastructure.realtime.case_events import case_event_hub
+from presentation.api.dependencies.security import (
+    create_stream_token,
+    get_current_operator,
+    get_current_operator_stream,
+)
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+EVENT_TYPES = {
+    "case.created",
+    "case.phase_changed",
+    "case.status_changed",
+    "message.created",
+    "message.status_changed",
+    "support_document.created",
+}
+
+@router.post("/token")
+def issue_stream_token(operator: dict = Depends(get_current_operator)):
+    """Token de corta duración para abrir el stream con EventSource (?token=)."""
+    return {"token": create_stream_token(operator), "expires_in": settings.realtime_stream_token_seconds}
+
+
+@router.get("/cases")
+async def stream_case_events(
+    request: Request,
+    case_id: Optional[List[int]] = Query(None),
+    types: Optional[str] = None,
+    operator: dict = Depends(get_current_operator_stream)
+):
+    """
+    Stream (Server-Sent Events) de cambios de casos para el dashboard.
+
+    Query params:
+    - case_id: limitar a uno o más casos (repetible). Sin valor: todos los casos
+    - types: tipos de evento separados por coma (default: todos); uno desconocido es 400
+    - token: token de stream (POST /token), para clientes EventSource que no
+      pueden enviar Authorization; vence rápido, pedir uno nuevo al reconectar
+
+    Los eventos son avisos compactos (ids, fase, rol); el cliente vuelve a pedir
+    la parte afectada, que responde 304 si no cambió. No hay replay: al
+    reconectar conviene refrescar una vez.
+    """
+    wanted_types = {t.strip() for t in types.split(",") if t.strip()} if types else set()
+    unknown = wanted_types - EVENT_TYPES
+    if unknown:
+        # Descartarlos en silencio dejaría el filtro vacío, que significa "todos los tipos"
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipos de evento desconocidos: {', '.join(sorted(unknown))}",
+        )
+    operator_id = operator.get("sub")
+
+    async def event_stream():
+        async with case_event_hub.subscribe(case_ids=case_id or (), types=wanted_types) as queue:
+            logger.info("case_events_subscribed", operator=operator_id, case_ids=case_id,
+                        subscribers=case_event_hub.subscriber_count)
+            yield "retry: 3000\n\n"
+            try:
+                while not await request.is_disconnected():
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=settings.realtime_heartbeat_seconds)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                logger.info("case_events_unsubscribed", operator=operator_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
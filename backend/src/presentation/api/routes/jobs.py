@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import structlog
+
+from infrastructure.persistence.db import get_db
+from infrastructure.tasks.client import jobs
+from presentation.api.dependencies.security import get_current_operator
+from presentation.api.media_responses import media_response
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str, _: dict = Depends(get_current_operator)):
+    """
+    Estado de un job encolado (PENDING, STARTED, RETRY, SUCCESS, FAILURE).
+
+    PENDING también se informa para ids desconocidos o cuyo resultado expiró.
+    Si el job generó un archivo, `file_url` apunta a su descarga.
+    """
+    try:
+        status = await run_in_threadpool(jobs.status, job_id)
+    except Exception as e:
+        logger.error("job_status_error", job_id=job_id, error=str(e))
+        raise HTTPException(status_code=503, detail="Backend de resultados no disponible")
+    result = status.get("result")
+    if isinstance(result, dict) and result.get("media_id") == f"job:{job_id}":
+        status["file_url"] = f"/api/jobs/{job_id}/file"
+    return status
+
+
+@router.get("/{job_id}/file")
+def get_job_file(job_id: str, request: Request, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+    """Archivo generado por un job (p. ej. el PDF de la demanda), servido desde el media store."""
+    from application.services.media_service import MediaService
+
+    media_service = MediaService(db)
+    media = media_service.get(f"job:{job_id}")
+    if media is None:
+        raise HTTPException(status_code=404, detail="El job no generó un archivo (o todavía no terminó)")
+    return media_response(
+        request, media_service.store, media,
+        filename=f"{job_id}.pdf" if media.mime_type == "application/pdf" else None,
+        cache_control="private, max-age=86400",
+    )
@@ -1,12 +1,11 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy import func, Date, cast
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
 import structlog
 
 from infrastructure.persistence.db import get_db
 from presentation.api.dependencies.security import get_current_operator
-from infrastructure.persistence.models import Case
+from application.services.metrics_service import CaseMetricsService
 
 logger = structlog.get_logger()
 router = APIRouter()
@@ -19,39 +18,7 @@ def metrics_summary(
     """
     Resumen general de métricas del sistema
     """
-    total = db.query(func.count(Case.id)).scalar() or 0
-    
-    # Casos nuevos en últimos 7 días
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_7d = db.query(func.count(Case.id)).filter(
-        Case.created_at >= seven_days_ago
-    ).scalar() or 0
-    
-    # Casos nuevos en últimos 30 días
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_30d = db.query(func.count(Case.id)).filter(
-        Case.created_at >= thirty_days_ago
-    ).scalar() or 0
-    
-    # Casos por estado
-    by_status = db.query(
-        Case.status,
-        func.count(Case.id)
-    ).group_by(Case.status).all()
-    
-    # Casos por tipo
-    by_type = db.query(
-        Case.type,
-        func.count(Case.id)
-    ).filter(Case.type.isnot(None)).group_by(Case.type).all()
-    
-    return {
-        "total_cases": total,
-        "recent_cases_7d": recent_7d,
-        "recent_cases_30d": recent_30d,
-        "cases_by_status": {status: count for status, count in by_status},
-        "cases_by_type": {type_: count for type_, count in by_type if type_}
-    }
+    return CaseMetricsService(db).summary()
 
 @router.get("/by_status")
 def metrics_by_status(
@@ -61,21 +28,7 @@ def metrics_by_status(
     """
     Distribución de casos por estado
     """
-    results = db.query(
-        Case.status,
-        func.count(Case.id).label('count')
-    ).group_by(Case.status).all()
-    
-    total = sum(count for _, count in results)
-    
-    return [
-        {
-            "status": status,
-            "count": count,
-            "percent": count / total if total > 0 else 0
-        }
-        for status, count in results
-    ]
+    return CaseMetricsService(db).by_status()
 
 @router.get("/by_type")
 def metrics_by_type(
@@ -85,15 +38,7 @@ def metrics_by_type(
     """
     Distribución de casos por tipo (unilateral vs conjunta)
     """
-    results = db.query(
-        Case.type,
-        func.count(Case.id).label('count')
-    ).filter(Case.type.isnot(None)).group_by(Case.type).all()
-    
-    return [
-        {"type": type_, "count": count}
-        for type_, count in results
-    ]
+    return CaseMetricsService(db).by_type()
 
 @router.get("/timeline")
 def metrics_timeline(
@@ -107,21 +52,92 @@ def metrics_timeline(
     Query params:
     - days: número de días hacia atrás (default: 30)
     """
-    since = datetime.utcnow() - timedelta(days=days)
-    
-    results = db.query(
-        cast(Case.created_at, Date).label('date'),
-        func.count(Case.id).label('count')
-    ).filter(
-        Case.created_at >= since
-    ).group_by(
-        cast(Case.created_at, Date)
-    ).order_by('date').all()
-    
-    return [
-        {
-            "date": date.isoformat(),
-            "count": count
-        }
-        for date, count in results
-    ]
+    return CaseMetricsService(db).timeline(days)
+
+@router.get("/funnel")
+def metrics_funnel(
+    months: int = Query(3, ge=1, le=24),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Embudo de fases: alcance, abandono y mediana de permanencia por fase
+
+    Datos precalculados por el job batch de analítica de fases.
+
+    Query params:
+    - months: cantidad de meses hacia atrás, incluyendo el actual (default: 3)
+    """
+    from application.services.phase_analytics_service import PhaseFunnelService
+
+    return PhaseFunnelService(db).funnel(months)
+
+@router.get("/llm_usage/daily")
+def llm_usage_daily(
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Tokens, llamadas y costo de LLMs por día
+
+    Query params:
+    - days: número de días hacia atrás (default: 30)
+    """
+    from application.services.llm_usage_service import LLMUsageService
+
+    return LLMUsageService(db).daily(days)
+
+@router.get("/llm_usage/by_phase")
+def llm_usage_by_phase(
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Tokens de LLMs por fase de la conversación (fase del caso al inicio del turno)
+    """
+    from application.services.llm_usage_service import LLMUsageService
+
+    return LLMUsageService(db).by_phase(days)
+
+@router.get("/llm_usage/by_provider")
+def llm_usage_by_provider(
+    days: int = Query(30, ge=1, le=365),
+    task_type: Optional[str] = None,
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Tokens, duración media y tasa de error por proveedor, modelo y tipo de tarea
+    """
+    from application.services.llm_usage_service import LLMUsageService
+
+    return LLMUsageService(db).by_provider(days, task_type)
+
+@router.get("/llm_usage/cases")
+def llm_usage_top_cases(
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Casos con mayor consumo de tokens en los últimos N días
+    """
+    from application.services.llm_usage_service import LLMUsageService
+
+    return LLMUsageService(db).top_cases(days, limit)
+
+@router.get("/llm_usage/cases/{case_id}")
+def llm_usage_case(
+    case_id: int,
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """
+    Consumo total de un caso, desglosado por tipo de tarea, fase y modelo
+    """
+    from application.services.llm_usage_service import LLMUsageService
+
+    return LLMUsageService(db).case_usage(case_id)
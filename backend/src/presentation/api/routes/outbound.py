@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import structlog
+
+from application.services.outbound_service import OutboundMessageService
+from infrastructure.persistence.db import get_db
+from infrastructure.persistence.models import OutboundMessage
+from presentation.api.dependencies.security import get_current_operator
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+
+def _serialize(outbound: OutboundMessage) -> dict:
+    return {
+        "id": outbound.id,
+        "case_id": outbound.case_id,
+        "message_id": outbound.message_id,
+        "chat_id": outbound.chat_id,
+        "text": outbound.text,
+        "status": outbound.status,
+        "attempts": outbound.attempts,
+        "last_error": outbound.last_error,
+        "next_attempt_at": outbound.next_attempt_at.isoformat() if outbound.next_attempt_at else None,
+        "created_at": outbound.created_at.isoformat() if outbound.created_at else None,
+        "sent_at": outbound.sent_at.isoformat() if outbound.sent_at else None,
+    }
+
+
+@router.get("/stats")
+def outbound_stats(db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+    """Mensajes en la cola de salida por estado (queued incluye reintentos pendientes)"""
+    rows = db.query(OutboundMessage.status, func.count(OutboundMessage.id)).group_by(OutboundMessage.status).all()
+    retrying = (
+        db.query(func.count(OutboundMessage.id))
+        .filter(OutboundMessage.status == "queued", OutboundMessage.attempts > 0)
+        .scalar()
+    )
+    return {"by_status": {status: count for status, count in rows}, "retrying": retrying or 0}
+
+
+@router.get("/dead-letters")
+def list_dead_letters(
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    _: dict = Depends(get_current_operator)
+):
+    """Mensajes que agotaron reintentos o fueron rechazados por WhatsApp"""
+    return {"items": [_serialize(o) for o in OutboundMessageService(db).dead_letters(limit)]}
+
+
+@router.post("/{outbound_id}/requeue")
+async def requeue_dead_letter(outbound_id: int, db: Session = Depends(get_db), _: dict = Depends(get_current_operator)):
+    """Vuelve a encolar un mensaje de la dead-letter queue"""
+    service = OutboundMessageService(db)
+    outbound = service.requeue(outbound_id)
+    if outbound is None:
+        raise HTTPException(status_code=404, detail="Mensaje no encontrado en la dead-letter queue")
+    outbound = await service.dispatch(outbound)
+    logger.info("outbound_requeued", outbound_id=outbound_id, status=outbound.status)
+    return _serialize(outbound)
@@ -0,0 +1,22 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from core.config import settings
+from infrastructure.observability.metrics import render_latest
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """
+    Métricas en formato de exposición Prometheus (latencias del pipeline,
+    fallbacks del router, duplicados del webhook, queries por request).
+    """
+    if settings.prometheus_token:
+        expected = f"Bearer {settings.prometheus_token}"
+        if not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+            raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
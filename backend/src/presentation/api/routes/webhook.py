@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
 from presentation.api.schemas.webhook import WhatsAppInbound, WhatsAppMessage
 from sqlalchemy.orm import Session
+import time
+import functools
 import structlog
 import redis
+from opentelemetry import trace
 from application.use_cases.process_incoming_message import (
     ProcessIncomingMessageUseCase,
     IncomingMessageRequest
 )
 from infrastructure.persistence.db import SessionLocal
-from infrastructure.messaging.waha_service_impl import WAHAWhatsAppService
+from application.services.outbound_service import OutboundMessageService
 from infrastructure.utils.phone_utils import normalize_whatsapp_phone
+from infrastructure.observability.metrics import WEBHOOK_MESSAGES
+from infrastructure.observability.tracing import record_span, traced
 from core.config import settings
 
 logger = structlog.get_logger()
@@ -32,12 +37,44 @@ def get_db():
     finally:
         db.close()
 
+tracer = trace.get_tracer(__name__)
+
+
+def _count_result(func):
+    """Cuenta los eventos por `status` de la respuesta (processed, duplicate_ignored, ack...)."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        result = "exception"
+        try:
+            response = await func(*args, **kwargs)
+            result = response.get("status", "unknown") if isinstance(response, dict) else "unknown"
+            return response
+        except HTTPException:
+            result = "invalid"
+            raise
+        finally:
+            WEBHOOK_MESSAGES.labels(result=result).inc()
+    return wrapper
+
+
 @router.post("/whatsapp")
+@_count_result
+@traced("webhook.whatsapp")
 async def whatsapp_webhook(payload: WhatsAppInbound, request: Request, db: Session = Depends(get_db)):
     """Endpoint para webhooks de WhatsApp (WAHA)"""
+    parse_started = time.time_ns()
     raw = await request.json()
     logger.info("whatsapp_inbound", payload=payload.model_dump(), raw=raw)
 
+    # Confirmaciones de entrega/lectura de mensajes enviados por el bot u operadores
+    if isinstance(raw, dict) and raw.get("event") == "message.ack":
+        ack_payload = raw.get("payload") if isinstance(raw.get("payload"), dict) else {}
+        ack_id = ack_payload.get("id")
+        if isinstance(ack_id, dict):
+            ack_id = ack_id.get("_serialized") or ack_id.get("id")
+        updated = OutboundMessageService(db).apply_ack(str(ack_id or ""), ack_payload.get("ack"))
+        return {"received": True, "status": "ack", "updated": updated}
+
     # Ignorar eventos generados por el propio bot (fromMe == True).
     # WAHA dispara eventos "message.any" tanto para mensajes entrantes como para
     # los mensajes enviados vía API. Si no filtramos, procesamos también los
@@ -144,6 +181,11 @@ async def whatsapp_webhook(payload: WhatsAppInbound, request: Request, db: Sessi
     # Normalizar el número de teléfono (remover @lid, @c.us, etc.)
     phone = normalize_whatsapp_phone(phone_raw)
     text = msg.body or msg.caption or ""  # Usar caption si es imagen
+    record_span("webhook.parse", parse_started, {
+        "webhook.messages": len(messages),
+        "webhook.body_chars": len(text),
+        "webhook.has_media": bool(extracted_media_id or msg.mediaId),
+    })
     
     # DEDUPLICACIÓN: Evitar procesar el mismo mensaje dos veces.
     # WAHA puede enviar múltiples eventos (message.any, message) para el mismo mensaje.
@@ -163,24 +205,27 @@ async def whatsapp_webhook(payload: WhatsAppInbound, request: Request, db: Sessi
     if message_id:
         redis_client = get_redis()
         dedup_key = f"whatsapp:processed:{message_id}"
-        try:
-            # Intentar marcar como procesado. Si ya existe, significa que ya lo procesamos.
-            was_set = redis_client.set(dedup_key, "1", ex=300, nx=True)  # TTL 5 minutos
-            if not was_set:
-                logger.info(
-                    "whatsapp_message_duplicate_ignored",
-                    message_id=message_id,
-                    phone=phone,
-                    text_preview=text[:50] if text else None
-                )
-                return {
-                    "received": True,
-                    "status": "duplicate_ignored",
-                    "message_id": message_id
-                }
-        except Exception as e:
-            # Si Redis falla, loggear pero continuar (fail-open para no bloquear el flujo)
-            logger.warning("whatsapp_dedup_redis_error", error=str(e), message_id=message_id)
+        with tracer.start_as_current_span("webhook.dedup") as dedup_span:
+            try:
+                # Intentar marcar como procesado. Si ya existe, significa que ya lo procesamos.
+                was_set = redis_client.set(dedup_key, "1", ex=300, nx=True)  # TTL 5 minutos
+                dedup_span.set_attribute("webhook.duplicate", not was_set)
+                if not was_set:
+                    logger.info(
+                        "whatsapp_message_duplicate_ignored",
+                        message_id=message_id,
+                        phone=phone,
+                        text_preview=text[:50] if text else None
+                    )
+                    return {
+                        "received": True,
+                        "status": "duplicate_ignored",
+                        "message_id": message_id
+                    }
+            except Exception as e:
+                # Si Redis falla, loggear pero continuar (fail-open para no bloquear el flujo)
+                dedup_span.set_attribute("webhook.dedup_error", str(e))
+                logger.warning("whatsapp_dedup_redis_error", error=str(e), message_id=message_id)
     
     # NUEVO: Detectar si hay media adjunto (imagen)
     media_id = extracted_media_id or None
@@ -212,16 +257,24 @@ async def whatsapp_webhook(payload: WhatsAppInbound, request: Request, db: Sessi
         should_send = getattr(response, "should_send", True)
         text_out = getattr(response, "text", None)
 
+        delivery = None
         if should_send and text_out:
-            # Enviar respuesta via WhatsApp (usar el ID original con @lid)
-            whatsapp = WAHAWhatsAppService()
-            await whatsapp.send_message(phone_raw, text_out)
+            # Cola de salida (usar el ID original con @lid): orden por chat, reintentos y ritmo controlado
+            outbound = OutboundMessageService(db)
+            queued = outbound.enqueue(
+                phone_raw,
+                text_out,
+                case_id=getattr(response, "case_id", None),
+                message_id=getattr(response, "message_id", None),
+            )
+            delivery = (await outbound.dispatch(queued)).status
 
         return {
             "received": True,
             "status": "processed",
             "reply": text_out,
-            "sent": bool(should_send and text_out),
+            "sent": delivery == "sent",
+            "delivery": delivery,
         }
         
     except Exception as e:
@@ -229,13 +282,14 @@ async def whatsapp_webhook(payload: WhatsAppInbound, request: Request, db: Sessi
         
         # Enviar mensaje de error al usuario (usar el ID original con @lid)
         try:
-            whatsapp = WAHAWhatsAppService()
-            await whatsapp.send_message(
+            db.rollback()
+            outbound = OutboundMessageService(db)
+            await outbound.dispatch(outbound.enqueue(
                 phone_raw,
                 "Disculpá, tuve un problema técnico. Por favor, intentá de nuevo en unos minutos."
-            )
-        except:
-            pass
+            ))
+        except Exception as send_error:
+            logger.error("webhook_error_reply_failed", error=str(send_error), phone=phone)
         
         return {
             "received": True,
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class BroadcastFilters(BaseModel):
+    status: Optional[str] = None
+    type: Optional[str] = None  # unilateral | conjunta
+    phase: Optional[str] = None
+    search: Optional[str] = None  # nombre o DNI, como en el listado de casos
+
+class BroadcastCreate(BaseModel):
+    # Campos disponibles: {nombre}, {apellido}, {caso}, {fase}
+    template: str = Field(..., min_length=1, max_length=4000)
+    filters: BroadcastFilters
+    dry_run: bool = False
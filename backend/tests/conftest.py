@@ -106,6 +106,17 @@ def db_session(test_engine):
     Base.metadata.drop_all(bind=test_engine)
 
 
+@pytest.fixture(scope="function")
+def session_factory(test_engine):
+    """
+    Fábrica de sesiones sobre las tablas del test, para código que abre
+    sesiones propias (hilos, tareas en segundo plano).
+    """
+    Base.metadata.create_all(bind=test_engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    Base.metadata.drop_all(bind=test_engine)
+
+
 @pytest.fixture(scope="function", autouse=False)
 def clean_database(test_engine):
     """
@@ -119,6 +130,17 @@ def clean_database(test_engine):
     Base.metadata.drop_all(bind=test_engine)
 
 
+@pytest.fixture(scope="session", autouse=True)
+def isolated_media_store(tmp_path_factory):
+    """Media store en un directorio temporal para no escribir en backend/media_store."""
+    from core.config import settings
+
+    original = settings.media_store_path
+    settings.media_store_path = str(tmp_path_factory.mktemp("media_store"))
+    yield settings.media_store_path
+    settings.media_store_path = original
+
+
 # ==================== Fixtures de Usuario ====================
 
 @pytest.fixture
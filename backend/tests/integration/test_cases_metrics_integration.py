@@ -6,7 +6,7 @@ Prueba los endpoints de gestión de casos y métricas del sistema.
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, date
 
 from infrastructure.persistence.db import Base
 from infrastructure.persistence.models import User, Case, Message
@@ -153,6 +153,159 @@ class TestCasesEndpoints:
         assert data["id"] == case_id
         assert data["nombre"] == "Juan Pérez"
 
+    def test_get_case_etag_not_modified(self, client: TestClient, test_user_with_token, test_cases):
+        """Test: La cabecera del caso responde 304 si el ETag no cambió"""
+        headers = {"Authorization": f"Bearer {test_user_with_token['token']}"}
+        case_id = test_cases[0].id
+
+        response = client.get(f"/api/cases/{case_id}", headers=headers)
+        assert response.status_code == 200
+        assert "messages" not in response.json()
+        etag = response.headers["etag"]
+
+        cached = client.get(f"/api/cases/{case_id}", headers={**headers, "If-None-Match": etag})
+        assert cached.status_code == 304
+
+        client.patch(f"/api/cases/{case_id}", json={"domicilio": "Otra calle 456"}, headers=headers)
+        changed = client.get(f"/api/cases/{case_id}", headers={**headers, "If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    def test_get_case_messages_paginated_newest_first(self, client: TestClient, test_user_with_token, test_cases, db_session_for_cases):
+        """Test: Historial paginado por cursor, del más nuevo al más viejo"""
+        headers = {"Authorization": f"Bearer {test_user_with_token['token']}"}
+        case_id = test_cases[0].id
+        db = db_session_for_cases
+        for i in range(5):
+            db.add(Message(case_id=case_id, role="user", content=f"mensaje {i}", created_at=datetime(2025, 1, 1, 10, i)))
+        db.commit()
+
+        first = client.get(f"/api/cases/{case_id}/messages?limit=3", headers=headers)
+        assert first.status_code == 200
+        data = first.json()
+        assert [m["content"] for m in data["items"]] == ["mensaje 4", "mensaje 3", "mensaje 2"]
+        assert data["next_cursor"]
+
+        second = client.get(
+            f"/api/cases/{case_id}/messages", params={"limit": 3, "cursor": data["next_cursor"]}, headers=headers
+        ).json()
+        assert [m["content"] for m in second["items"]] == ["mensaje 1", "mensaje 0"]
+        assert second["next_cursor"] is None
+
+        cached = client.get(
+            f"/api/cases/{case_id}/messages?limit=3", headers={**headers, "If-None-Match": first.headers["etag"]}
+        )
+        assert cached.status_code == 304
+
+        docs = client.get(f"/api/cases/{case_id}/support-documents", headers=headers)
+        assert docs.status_code == 200
+        assert docs.json() == {"items": []}
+
+    def test_document_served_from_media_store(self, client: TestClient, test_user_with_token, test_cases, db_session_for_cases):
+        """Test: Documento servido desde el media store con MIME detectado, Range y ETag"""
+        from application.services.media_service import MediaService
+
+        headers = {"Authorization": f"Bearer {test_user_with_token['token']}"}
+        db = db_session_for_cases
+        case = db.query(Case).filter(Case.id == test_cases[0].id).first()
+        case.dni_image_url = "waha-media-dni-1"
+        db.commit()
+        png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+        MediaService(db, whatsapp=object()).save("waha-media-dni-1", png, "image/jpeg")
+
+        url = f"/api/cases/{case.id}/documents/dni"
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.content == png
+        etag = response.headers["etag"]
+
+        partial = client.get(url, headers={**headers, "Range": "bytes=0-7"})
+        assert partial.status_code == 206
+        assert partial.content == png[:8]
+        assert partial.headers["content-range"] == f"bytes 0-7/{len(png)}"
+
+        assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+        assert client.get(url, headers={**headers, "Range": "bytes=500-"}).status_code == 416
+
+    def test_document_preview_generated_on_demand(self, client: TestClient, test_user_with_token, test_cases, db_session_for_cases):
+        """Test: Preview WebP reducida del documento, con ETag propio de la variante"""
+        import io
+        from PIL import Image
+        from application.services.media_service import MediaService
+
+        headers = {"Authorization": f"Bearer {test_user_with_token['token']}"}
+        db = db_session_for_cases
+        case = db.query(Case).filter(Case.id == test_cases[0].id).first()
+        case.dni_image_url = "waha-media-dni-preview"
+        db.commit()
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 800), (200, 30, 30)).save(buffer, format="PNG")
+        MediaService(db, whatsapp=object()).save("waha-media-dni-preview", buffer.getvalue(), "image/png")
+
+        url = f"/api/cases/{case.id}/documents/dni/preview?size=thumb"
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert max(Image.open(io.BytesIO(response.content)).size) == 160
+        etag = response.headers["etag"]
+        assert etag.endswith('-preview-thumb.webp"')
+
+        assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+        jpeg = client.get(f"{url}&format=jpeg", headers=headers)
+        assert jpeg.headers["content-type"] == "image/jpeg"
+        assert client.get(f"/api/cases/{case.id}/documents/dni/preview?size=huge", headers=headers).status_code == 422
+
+    def test_operator_message_goes_through_outbound_queue(self, client: TestClient, test_user_with_token, test_cases):
+        """Test: Mensaje del operador encolado, entregado y con estado en el historial"""
+        from unittest.mock import AsyncMock, patch
+
+        headers = {"Authorization": f"Bearer {test_user_with_token['token']}", "Idempotency-Key": "op-msg-1"}
+        case_id = test_cases[0].id
+        with patch(
+            "infrastructure.messaging.waha_service_impl.WAHAWhatsAppService.send_message",
+            new=AsyncMock(return_value={"id": "true_chat_ABC"}),
+        ) as send:
+            first = client.post(f"/api/cases/{case_id}/send-message", json={"text": "Hola"}, headers=headers)
+            retry = client.post(f"/api/cases/{case_id}/send-message", json={"text": "Hola"}, headers=headers)
+
+        assert first.status_code == 200
+        assert first.json()["sent"] is True
+        assert retry.json()["message_id"] == first.json()["message_id"]
+        assert send.await_count == 1
+
+        items = client.get(f"/api/cases/{case_id}/messages", headers=headers).json()["items"]
+        sent = [m for m in items if m["id"] == first.json()["message_id"]]
+        assert sent and sent[0]["status"] == "sent" and sent[0]["role"] == "operator"
+
+    def test_broadcast_preview_and_enqueue(self, client: TestClient, test_user_with_token, test_cases):
+        """Test: Envío masivo con dry run, validación de plantilla y encolado idempotente"""
+        from unittest.mock import patch
+        from infrastructure.tasks.client import JobSubmitError
+
+        headers = {"Authorization": f"Bearer {test_user_with_token['token']}", "Idempotency-Key": "bc-1"}
+        body = {"template": "Hola {nombre}, cambió el horario", "filters": {"status": "in_progress"}}
+
+        preview = client.post("/api/broadcasts/", json={**body, "dry_run": True}, headers=headers)
+        assert preview.status_code == 200
+        assert preview.json()["samples"][0]["text"] == "Hola Juan, cambió el horario"
+
+        bad = client.post("/api/broadcasts/", json={**body, "template": "Hola {dni}"}, headers=headers)
+        assert bad.status_code == 400
+
+        with patch("infrastructure.tasks.client.jobs.submit", side_effect=JobSubmitError("sin broker")):
+            assert client.post("/api/broadcasts/", json=body, headers=headers).status_code == 503
+        with patch("infrastructure.tasks.client.jobs.submit", return_value="job-1") as submit:
+            created = client.post("/api/broadcasts/", json=body, headers=headers)
+            again = client.post("/api/broadcasts/", json=body, headers=headers)
+        assert created.status_code == 202 and created.json()["job_id"] == "job-1"
+        assert again.json()["broadcast_id"] == created.json()["broadcast_id"]
+        assert submit.call_count == 1
+
+        status = client.get(created.json()["status_url"], headers=headers).json()
+        assert status["status"] == "pending" and status["total"] == preview.json()["total"]
+        assert status["recipients"] == []
+
     def test_get_nonexistent_case(self, client: TestClient, test_user_with_token):
         """Test: Error al buscar caso inexistente"""
         token = test_user_with_token["token"]
@@ -253,6 +406,90 @@ class TestCasesEndpoints:
         data = response.json()
         assert len(data["items"]) <= 2
 
+    def test_keyset_pagination_of_cases(self, client: TestClient, test_user_with_token, test_cases):
+        """Test: Paginación por cursor recorre todos los casos sin repetir"""
+        token = test_user_with_token["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        first = client.get("/api/cases/?page_size=2&cursor=", headers=headers)
+        assert first.status_code == 200
+        first_data = first.json()
+        assert len(first_data["items"]) == 2
+        assert first_data["next_cursor"]
+
+        second = client.get(
+            f"/api/cases/?page_size=2&cursor={first_data['next_cursor']}",
+            headers=headers
+        )
+        assert second.status_code == 200
+        second_data = second.json()
+        assert len(second_data["items"]) == 1
+        assert second_data["next_cursor"] is None
+
+        ids = [c["id"] for c in first_data["items"] + second_data["items"]]
+        assert sorted(ids) == sorted(c.id for c in test_cases)
+
+    def test_keyset_pagination_invalid_cursor(self, client: TestClient, test_user_with_token):
+        """Test: Un cursor corrupto devuelve 400"""
+        token = test_user_with_token["token"]
+
+        response = client.get(
+            "/api/cases/?cursor=no-es-un-cursor",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 400
+
+    def test_search_cases_fulltext_in_messages(self, client: TestClient, test_user_with_token, test_cases, db_session_for_cases):
+        """Test: La búsqueda encuentra casos por lo dicho en la conversación"""
+        token = test_user_with_token["token"]
+        db = db_session_for_cases
+        db.add(Message(case_id=test_cases[2].id, role="user", content="Vivo en calle Belgrano 450"))
+        db.commit()
+
+        response = client.get(
+            "/api/cases/search?q=belgrano",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert [item["case_id"] for item in items] == [test_cases[2].id]
+        match = items[0]["matches"][0]
+        assert match["source"] == "message"
+        assert "<mark>Belgrano</mark>" in match["snippet"]
+
+    def test_search_snippets_escape_message_html(self, client: TestClient, test_user_with_token, test_cases, db_session_for_cases):
+        """Test: El snippet solo trae <mark> como HTML; el texto del mensaje va escapado"""
+        token = test_user_with_token["token"]
+        db = db_session_for_cases
+        db.add(Message(case_id=test_cases[2].id, role="user", content='<img src=x onerror="alert(1)"> Belgrano & Mitre'))
+        db.commit()
+
+        response = client.get(
+            "/api/cases/search?q=belgrano",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        snippet = response.json()["items"][0]["matches"][0]["snippet"]
+        assert "<img" not in snippet
+        assert "&lt;img" in snippet and "<mark>Belgrano</mark> &amp; Mitre" in snippet
+
+    def test_search_cases_fulltext_in_case_fields(self, client: TestClient, test_user_with_token, test_cases):
+        """Test: La búsqueda encuentra casos por datos del caso"""
+        token = test_user_with_token["token"]
+
+        response = client.get(
+            "/api/cases/search?q=López",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert len(items) == 1
+        assert items[0]["nombre"] == "María López"
+
 
 class TestMetricsEndpoints:
     """Tests para endpoints de métricas"""
@@ -315,6 +552,105 @@ class TestMetricsEndpoints:
         assert type_counts["unilateral"] == 2
         assert type_counts["conjunta"] == 1
 
+    def test_metrics_follow_case_status_changes(self, client: TestClient, test_user_with_token, test_cases, db_session_for_cases):
+        """Test: Los rollups de métricas se ajustan al cambiar estado o borrar un caso"""
+        token = test_user_with_token["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        db = db_session_for_cases
+
+        before = client.get("/api/metrics/summary", headers=headers).json()
+        assert before["cases_by_status"]["pending"] == 1
+
+        case = db.query(Case).filter(Case.id == test_cases[2].id).first()
+        case.status = "completed"
+        db.commit()
+
+        after = client.get("/api/metrics/summary", headers=headers).json()
+        assert "pending" not in after["cases_by_status"]
+        assert after["cases_by_status"]["completed"] == before["cases_by_status"]["completed"] + 1
+        assert after["total_cases"] == before["total_cases"]
+
+        db.delete(case)
+        db.commit()
+
+        final = client.get("/api/cases/stats/summary", headers=headers).json()
+        assert final["total_cases"] == before["total_cases"] - 1
+        assert final["by_type"]["unilateral"] == before["cases_by_type"]["unilateral"] - 1
+
+    def test_metrics_cache_invalidated_on_commit_only(self, test_cases, db_session_for_cases):
+        """Test: Un flush sin commit no invalida el cache; el commit sí, y el rollback lo descarta"""
+        from application.services.metrics_service import CaseMetricsService
+
+        db = db_session_for_cases
+        service = CaseMetricsService(db)
+        before = service.summary()["total_cases"]
+
+        db.add(Case(phone="+5491100000001", status="pending", type="unilateral"))
+        db.flush()
+        assert service.summary()["total_cases"] == before
+        db.rollback()
+        assert service.summary()["total_cases"] == before
+
+        db.add(Case(phone="+5491100000002", status="pending", type="unilateral"))
+        db.commit()
+        assert service.summary()["total_cases"] == before + 1
+
+    def test_metrics_recent_cases_use_exact_cutoff(self, db_session_for_cases):
+        """Test: recent_cases_7d corta por fecha y hora, no por día completo"""
+        from datetime import timedelta
+        from application.services.metrics_service import CaseMetricsService
+
+        db = db_session_for_cases
+        service = CaseMetricsService(db)
+        base = service._total_since(datetime.utcnow() - timedelta(days=7))
+
+        now = datetime.utcnow()
+        db.add_all([
+            Case(phone="+5491100000003", status="pending", created_at=now - timedelta(days=7, hours=-1)),
+            Case(phone="+5491100000004", status="pending", created_at=now - timedelta(days=7, hours=1)),
+            Case(phone="+5491100000005", status="pending", created_at=now - timedelta(days=2)),
+        ])
+        db.commit()
+
+        assert service._total_since(now - timedelta(days=7)) == base + 2
+
+    def test_metrics_phase_funnel(self, client: TestClient, test_user_with_token, db_session_for_cases):
+        """Test: Embudo de fases calculado desde los eventos de transición"""
+        from infrastructure.persistence.models import PhaseEvent
+        from infrastructure.persistence.phase_events import compute_phase_month_stats
+        from application.services.phase_analytics_service import PhaseFunnelService
+
+        db = db_session_for_cases
+        transitions = [
+            (9001, None, "inicio", datetime(2025, 3, 1, 10, 0)),
+            (9001, "inicio", "tipo_divorcio", datetime(2025, 3, 1, 10, 2)),
+            (9001, "tipo_divorcio", "apellido", datetime(2025, 3, 1, 10, 12)),
+            (9002, None, "inicio", datetime(2025, 3, 2, 9, 0)),
+            (9002, "inicio", "tipo_divorcio", datetime(2025, 3, 2, 9, 4)),
+            (9002, "tipo_divorcio", "apellido", datetime(2025, 3, 2, 9, 10)),
+            (9002, "apellido", "nombres", datetime(2025, 3, 3, 9, 10)),
+        ]
+        for case_id, from_phase, to_phase, occurred_at in transitions:
+            db.add(PhaseEvent(case_id=case_id, from_phase=from_phase, to_phase=to_phase, occurred_at=occurred_at))
+        db.commit()
+
+        with db.get_bind().begin() as conn:
+            compute_phase_month_stats(conn, date(2025, 3, 1), now=datetime(2025, 4, 15))
+
+        funnel = PhaseFunnelService(db).funnel(months=1, reference=date(2025, 3, 1))
+        phases = {item["phase"]: item for item in funnel["phases"]}
+        assert [item["phase"] for item in funnel["phases"]] == ["inicio", "tipo_divorcio", "apellido", "nombres"]
+        assert phases["inicio"]["median_seconds"] == 180
+        assert phases["tipo_divorcio"]["median_seconds"] == 480
+        assert phases["apellido"]["abandoned"] == 1
+        assert phases["apellido"]["abandonment_rate"] == 0.5
+        assert phases["nombres"]["conversion_from_start"] == 0.5
+
+        token = test_user_with_token["token"]
+        response = client.get("/api/metrics/funnel?months=2", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert "phases" in response.json()
+
     def test_metrics_time_range(self, client: TestClient, test_user_with_token, test_cases):
         """Test: Métricas con rango de fechas"""
         token = test_user_with_token["token"]
@@ -0,0 +1,99 @@
+"""
+Tests unitarios de envíos masivos del operador.
+
+Verifica validación de plantilla y filtro, conteo de destinatarios (un mensaje
+por teléfono), escritura por lotes de historial/memoria/cola de salida,
+paso de los chats a la cola y que un reintento del job no duplique envíos.
+"""
+import pytest
+
+from application.services.broadcast_service import BroadcastError, BroadcastService, validate_template
+from infrastructure.persistence.models import Case, Memory, Message, OutboundMessage
+
+
+class FakeOutbound:
+    def __init__(self):
+        self.dispatched = []
+
+    async def dispatch_chat(self, chat_id):
+        self.dispatched.append(chat_id)
+        return True
+
+
+@pytest.fixture
+def cases(db_session):
+    rows = [
+        Case(phone="5492604000001", status="new", nombres="Ana", phase="documentacion"),
+        Case(phone="5492604000002", status="new", nombre="Juan Pérez", phase="documentacion"),
+        # Mismo teléfono que el primero: no recibe dos veces
+        Case(phone="5492604000001", status="new", nombres="Ana", phase="inicio"),
+        Case(phone="5492604000003", status="completed", nombres="Otro"),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return rows
+
+
+def test_template_only_accepts_known_fields():
+    validate_template("Hola {nombre}, tu caso {caso} cambió de horario")
+    for bad in ("Hola {dni}", "Hola {nombre:>10}", "Hola {nombre!r}", "Hola {}", "Hola {nombre"):
+        with pytest.raises(BroadcastError):
+            validate_template(bad)
+
+
+def test_create_requires_filter_and_counts_unique_phones(db_session, cases):
+    service = BroadcastService(db_session, outbound=FakeOutbound())
+    with pytest.raises(BroadcastError):
+        service.create({"status": "  "}, "Hola")
+    with pytest.raises(BroadcastError):
+        service.create({"status": "archivado"}, "Hola")
+
+    broadcast = service.create({"status": "new"}, "Hola {nombre}", idempotency_key="k1")
+    assert broadcast.total == 2
+    assert service.create({"status": "new"}, "Hola {nombre}", idempotency_key="k1").id == broadcast.id
+
+    preview = service.preview({"status": "new"}, "Hola {nombre}")
+    assert preview["total"] == 2
+    assert [s["text"] for s in preview["samples"]][:2] == ["Hola Ana", "Hola Juan Pérez"]
+
+
+async def test_run_writes_batches_and_dispatches_each_chat(db_session, cases):
+    outbound = FakeOutbound()
+    service = BroadcastService(db_session, outbound=outbound)
+    broadcast = service.create({"status": "new"}, "Hola {nombre}, nuevo horario")
+
+    progress = await service.run(broadcast, rate_per_second=1000)
+
+    assert progress["status"] == "done" and progress["dispatched"] == 2
+    assert progress["counts"]["queued"] == 2
+    assert outbound.dispatched == ["5492604000001", "5492604000002"]
+    rows = db_session.query(OutboundMessage).filter(OutboundMessage.broadcast_id == broadcast.id).all()
+    assert [r.case_id for r in rows] == [cases[0].id, cases[1].id]
+    message = db_session.query(Message).get(rows[1].message_id)
+    assert (message.role, message.status, message.content) == ("operator", "queued", "Hola Juan Pérez, nuevo horario")
+    assert db_session.query(Memory).filter(Memory.kind == "immediate").count() == 2
+
+    # Un resultado entregado y otro fallido se reflejan en el avance
+    rows[0].status = "sent"
+    db_session.query(Message).get(rows[0].message_id).status = "read"
+    rows[1].status = "dead"
+    db_session.commit()
+    counts = service.progress(broadcast)["counts"]
+    assert (counts["read"], counts["failed"], counts["queued"]) == (1, 1, 0)
+
+
+async def test_retry_resumes_without_duplicates(db_session, cases):
+    outbound = FakeOutbound()
+    service = BroadcastService(db_session, outbound=outbound)
+    broadcast = service.create({"status": "new"}, "Hola {nombre}")
+    service._materialize(broadcast)
+    # El job se cortó después de pasar el primer chat a la cola
+    broadcast.dispatched = 1
+    db_session.commit()
+
+    await service.run(broadcast, rate_per_second=1000)
+
+    assert db_session.query(OutboundMessage).filter(OutboundMessage.broadcast_id == broadcast.id).count() == 2
+    assert outbound.dispatched == ["5492604000002"]
+    assert (await service.run(broadcast))["status"] == "done"
+    assert outbound.dispatched == ["5492604000002"]
@@ -0,0 +1,57 @@
+"""
+Tests unitarios de escrituras por lotes de mensajes y memorias.
+
+Verifica que los INSERT ... RETURNING devuelvan los ids en el orden de
+entrada, que los eventos en tiempo real se publiquen recién con el commit
+(y se descarten con rollback) y el recorte de la memoria inmediata.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from application.services.memory_service import MemoryService
+from infrastructure.persistence.models import Case, Memory, Message
+from infrastructure.persistence.repositories import MemoryRepository, MessageRepository
+
+
+@pytest.fixture
+def case(db_session):
+    case = Case(phone="5492604000020")
+    db_session.add(case)
+    db_session.commit()
+    return case
+
+
+def test_add_messages_bulk_returns_ids_in_order_and_publishes_on_commit(db_session, case):
+    rows = [{"case_id": case.id, "role": "user" if i % 2 else "assistant", "content": f"m{i}"} for i in range(5)]
+    with patch("infrastructure.persistence.change_events.publisher") as publisher:
+        ids = MessageRepository(db_session).add_messages_bulk(rows, commit=False)
+        publisher.publish.assert_not_called()
+        db_session.commit()
+
+    assert [db_session.query(Message).get(i).content for i in ids] == [f"m{i}" for i in range(5)]
+    events = publisher.publish.call_args[0][0]
+    assert [e["message_id"] for e in events] == ids
+    assert all(e["type"] == "message.created" and e["case_id"] == case.id for e in events)
+
+
+def test_add_messages_bulk_rollback_discards_rows_and_events(db_session, case):
+    with patch("infrastructure.persistence.change_events.publisher") as publisher:
+        MessageRepository(db_session).add_messages_bulk([{"case_id": case.id, "role": "user", "content": "x"}], commit=False)
+        db_session.rollback()
+    publisher.publish.assert_not_called()
+    assert db_session.query(Message).count() == 0
+    assert MessageRepository(db_session).add_messages_bulk([]) == []
+
+
+async def test_immediate_memories_bulk_keeps_last_ten(db_session, case):
+    MemoryRepository(db_session).add_memories_bulk(
+        [{"case_id": case.id, "kind": "session", "content": "{}"}]
+    )
+    service = MemoryService(db_session, llm=object())
+    await service.store_immediate_memories(case.id, [f"m{i}" for i in range(8)])
+    await service.store_immediate_memory(case.id, "m8")
+    await service.store_immediate_memories(case.id, ["m9", "m10", "m11"])
+
+    assert await service.retrieve_immediate_memory(case.id) == [f"m{i}" for i in range(2, 12)]
+    assert db_session.query(Memory).filter(Memory.kind == "session").count() == 1
@@ -0,0 +1,146 @@
+"""
+Tests unitarios de eventos de casos en tiempo real.
+
+Verifica que los cambios vía ORM se publiquen solo después del commit y que
+el hub reparta cada evento solo a los suscriptores que lo pidieron.
+"""
+import json
+import time
+
+import pytest
+import redis
+
+from infrastructure.persistence.models import Case, Message
+from infrastructure.realtime import case_events
+from infrastructure.realtime.case_events import CaseEventHub
+
+
+class FakeRedis:
+    """Registra los PUBLISH en memoria"""
+
+    def __init__(self):
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def publish(self, channel, payload):
+        self.published.append((channel, json.loads(payload)))
+
+    def execute(self):
+        return []
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(case_events.publisher, "_redis", fake)
+    monkeypatch.setattr(case_events.publisher, "_disabled_until", 0.0)
+    return fake
+
+
+def test_message_and_phase_change_published_after_commit(db_session, fake_redis):
+    case = Case(phone="+5492604000001")
+    db_session.add(case)
+    db_session.commit()
+
+    db_session.add(Message(case_id=case.id, role="user", content="hola"))
+    case.phase = "tipo_divorcio"
+    db_session.flush()
+    assert case_events.publisher.flush()
+    assert len(fake_redis.published) == 1  # solo el alta ya confirmada
+    db_session.commit()
+    assert case_events.publisher.flush()
+
+    types = [event["type"] for _, event in fake_redis.published]
+    assert types == ["case.created", "message.created", "case.phase_changed"]
+    phase_event = fake_redis.published[-1][1]
+    assert phase_event["from_phase"] == "inicio"
+    assert phase_event["phase"] == "tipo_divorcio"
+    assert "content" not in fake_redis.published[1][1]
+
+
+def test_rolled_back_changes_are_not_published(db_session, fake_redis):
+    case = Case(phone="+5492604000002")
+    db_session.add(case)
+    db_session.commit()
+    assert case_events.publisher.flush()
+    fake_redis.published.clear()
+
+    db_session.add(Message(case_id=case.id, role="user", content="borrador"))
+    db_session.flush()
+    db_session.rollback()
+
+    assert case_events.publisher.flush()
+    assert fake_redis.published == []
+
+
+def test_slow_redis_does_not_block_commit_and_opens_circuit():
+    class SlowRedis(FakeRedis):
+        def execute(self):
+            time.sleep(0.3)
+            raise redis.TimeoutError("Redis no responde")
+
+    publisher = case_events.CaseEventPublisher(redis_client=SlowRedis())
+
+    start = time.monotonic()
+    publisher.publish([{"type": "case.created", "case_id": 1}])
+    assert time.monotonic() - start < 0.1
+    assert publisher.flush()
+
+    # Circuito abierto: los siguientes ni se encolan
+    publisher.publish([{"type": "case.created", "case_id": 2}])
+    assert publisher._pending.qsize() == 0
+
+
+async def test_hub_dispatches_only_to_matching_subscribers():
+    hub = CaseEventHub(queue_size=2)
+    hub._ensure_listener = lambda: None  # sin Redis: se alimenta el hub directamente
+
+    async with hub.subscribe(case_ids=[1]) as only_case_1, hub.subscribe(types=["message.created"]) as only_messages:
+        hub.dispatch({"type": "case.phase_changed", "case_id": 1})
+        hub.dispatch({"type": "message.created", "case_id": 2})
+        for i in range(3):
+            hub.dispatch({"type": "message.created", "case_id": 1, "message_id": i})
+
+        assert only_case_1.qsize() == 2  # cola acotada: se descartan los más viejos
+        assert [only_case_1.get_nowait()["message_id"] for _ in range(2)] == [1, 2]
+        assert only_messages.qsize() == 2
+
+    assert hub.subscriber_count == 0
+
+
+async def test_stream_rejects_unknown_event_types():
+    from fastapi import HTTPException
+
+    from presentation.api.routes.events import stream_case_events
+
+    with pytest.raises(HTTPException) as error:
+        await stream_case_events(request=None, case_id=None, types="message.created,mesage.created", operator={})
+    assert error.value.status_code == 400 and "mesage.created" in error.value.detail
+
+
+def test_stream_accepts_only_stream_scoped_tokens_in_query():
+    from fastapi import HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+    from jose import jwt
+
+    from presentation.api.dependencies.security import (
+        ALGORITHM,
+        SECRET_KEY,
+        create_stream_token,
+        get_current_operator,
+        get_current_operator_stream,
+    )
+
+    session_token = jwt.encode({"sub": "ana", "role": "operator", "user_id": 7}, SECRET_KEY, algorithm=ALGORITHM)
+    stream_token = create_stream_token(get_current_operator(HTTPAuthorizationCredentials(
+        scheme="Bearer", credentials=session_token)))
+
+    assert get_current_operator_stream(credentials=None, token=stream_token)["sub"] == "ana"
+    with pytest.raises(HTTPException) as error:
+        get_current_operator_stream(credentials=None, token=session_token)
+    assert error.value.status_code == 401
+    # Y al revés: el token de stream no sirve como sesión
+    with pytest.raises(HTTPException):
+        get_current_operator(HTTPAuthorizationCredentials(scheme="Bearer", credentials=stream_token))
@@ -0,0 +1,85 @@
+"""
+Tests unitarios del armado de contexto con presupuesto de tokens.
+
+Verifica la estimación de tokens, el reparto por prioridad entre niveles de
+memoria (mensajes más nuevos, resumen extractivo del conocimiento) y que
+MemoryService respete el presupuesto de cada task_type con un solo embedding.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from application.services.context_assembler import (
+    ContextAssembler,
+    ContextSection,
+    compact_json,
+    count_tokens,
+    truncate_to_tokens,
+)
+from application.services.memory_service import MemoryService
+from core.config import settings
+from infrastructure.persistence.models import Case, Memory, SemanticKnowledge
+
+LEY = (
+    "El divorcio puede ser pedido por uno solo de los cónyuges. "
+    "La propuesta reguladora debe acompañar la petición. "
+    "Los alimentos de los hijos se fijan según las necesidades y los ingresos. "
+    "La vivienda familiar puede atribuirse a uno de los cónyuges. "
+) * 6
+
+
+def test_token_estimate_and_truncation():
+    assert count_tokens("") == 0
+    assert count_tokens("divorcio unilateral, 2024.") == count_tokens("divorcio") + count_tokens("unilateral") + 4
+    text = "palabra " * 200
+    cut = truncate_to_tokens(text, 50)
+    assert count_tokens(cut) <= 50 and cut.endswith("…")
+    assert truncate_to_tokens("corto", 50) == "corto"
+    assert compact_json({"nombre": "Ana", "cuit": None, "hijos": []}) == '{"nombre":"Ana"}'
+
+
+def test_assembler_respects_budget_and_priorities():
+    messages = [f"Usuario: mensaje número {i} con algo de texto adicional para ocupar espacio" for i in range(10)]
+    sections = [
+        ContextSection("session", "Datos del caso", ['{"nombre":"Ana","tipo":"unilateral"}'], share=0.25),
+        ContextSection("immediate", "Conversación reciente", messages, share=0.35, mode="recent"),
+        ContextSection("knowledge", "Conocimiento legal aplicable", [LEY], share=0.25, mode="extractive"),
+        ContextSection("episodic", "Conversaciones anteriores relevantes", ["- " + LEY], share=0.15, mode="extractive"),
+    ]
+
+    result = ContextAssembler(150, "¿Cómo se fijan los alimentos de los hijos?").assemble(sections)
+
+    assert result.tokens <= 150
+    assert result.tokens == count_tokens(result.text)
+    assert '{"nombre":"Ana","tipo":"unilateral"}' in result.text
+    assert "mensaje número 9" in result.text and "mensaje número 0" not in result.text
+    assert "Los alimentos de los hijos se fijan" in result.text
+    assert {"immediate", "knowledge"} <= set(result.trimmed) and "session" not in result.trimmed
+
+    roomy = ContextAssembler(10_000).assemble(sections)
+    assert roomy.trimmed == [] and all(m in roomy.text for m in messages)
+
+
+async def test_memory_service_context_uses_task_budget_and_one_embedding(db_session):
+    case = Case(phone="5492604000043")
+    db_session.add(case)
+    db_session.commit()
+    db_session.add_all([Memory(case_id=case.id, kind="immediate", content=f"Usuario: respuesta {i} " * 8) for i in range(10)])
+    db_session.add(Memory(case_id=case.id, kind="session", content=json.dumps({"apellido": "Pérez", "cuit": None})))
+    db_session.add(Memory(case_id=case.id, kind="episodic", content="Consultó por la cuota alimentaria."))
+    db_session.add(SemanticKnowledge(title="Código Civil", content=LEY))
+    db_session.commit()
+
+    llm = MagicMock()
+    llm.embed = AsyncMock(return_value=[[0.1, 0.2]])
+    memory = MemoryService(db_session, llm)
+    budgets = json.dumps({"hallucination_check": 120, "reasoning": 5000})
+
+    with patch.object(settings, "context_token_budgets", budgets):
+        small = await memory.assemble_context(case.id, "alimentos de los hijos", task_type="hallucination_check")
+        large = await memory.build_context_for_llm(case.id, "alimentos de los hijos", task_type="reasoning")
+
+    assert llm.embed.await_count == 2  # una vez por armado, no una por búsqueda
+    assert small.tokens <= 120 and small.budget == 120
+    assert '{"apellido":"Pérez"}' in small.text and "\n  " not in small.text
+    assert "Código Civil" in large and "cuota alimentaria" in large
+    assert count_tokens(large) > small.tokens
@@ -0,0 +1,91 @@
+"""
+Tests unitarios del resumen incremental de conversaciones.
+
+Verifica los umbrales de disparo, que solo se plieguen los mensajes fuera de
+la ventana inmediata (por tramos, avanzando la marca del caso) y que un
+resumen concurrente descarte el propio sin duplicar memorias.
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from application.services.conversation_summarizer import ConversationSummarizer
+from application.services.memory_service import MemoryService
+from core.config import settings
+from infrastructure.persistence.models import Case, Memory, Message
+
+
+@pytest.fixture
+def case(db_session):
+    case = Case(phone="5492604000044", phase="documentacion")
+    db_session.add(case)
+    db_session.commit()
+    db_session.add_all([
+        Message(case_id=case.id, role="user" if i % 2 == 0 else "assistant", content=f"mensaje {i}")
+        for i in range(25)
+    ])
+    db_session.commit()
+    return case
+
+
+@pytest.fixture(autouse=True)
+def thresholds():
+    with patch.object(settings, "summary_every_turns", 5), \
+         patch.object(settings, "summary_keep_recent_messages", 10), \
+         patch.object(settings, "summary_max_messages_per_chunk", 8), \
+         patch.object(settings, "summary_token_threshold", 10_000):
+        yield
+
+
+def _summarizer(db_session, reply="Resumen del tramo."):
+    llm = MagicMock()
+    llm.chat = AsyncMock(return_value=reply)
+    llm.embed = AsyncMock(return_value=[])
+    return ConversationSummarizer(db_session, MemoryService(db_session, llm)), llm
+
+
+def test_thresholds_count_only_messages_outside_the_recent_window(db_session, case):
+    summarizer, _ = _summarizer(db_session)
+
+    assert summarizer.pending_stats(case.id, None)["messages"] == 15
+    assert summarizer.should_summarize(case)
+    last_ids = [m.id for m in db_session.query(Message).order_by(Message.id).all()]
+    assert summarizer.pending_stats(case.id, last_ids[10])["messages"] == 4
+    assert not summarizer.is_due({"messages": 4, "tokens": 100})
+    assert summarizer.is_due({"messages": 1, "tokens": 10_000})
+
+
+async def test_summarize_pending_folds_old_messages_in_chunks(db_session, case):
+    summarizer, llm = _summarizer(db_session)
+    ids = [m.id for m in db_session.query(Message).order_by(Message.id).all()]
+
+    result = await summarizer.summarize_pending(case.id)
+
+    assert (result["summaries"], result["messages"]) == (2, 15)
+    db_session.refresh(case)
+    assert case.summarized_through_message_id == ids[14]
+    assert db_session.query(Memory).filter_by(case_id=case.id, kind="episodic").count() == 2
+    first_prompt = llm.chat.await_args_list[0].args[0][0]["content"]
+    assert "Usuario: mensaje 0" in first_prompt and "mensaje 8" not in first_prompt
+    second_prompt = llm.chat.await_args_list[1].args[0][0]["content"]
+    assert "Resumen del tramo." in second_prompt and "Asistente: mensaje 13" in second_prompt
+    assert "mensaje 15" not in second_prompt
+
+    assert (await summarizer.summarize_pending(case.id, force=True))["summaries"] == 0
+
+
+async def test_concurrent_summary_is_discarded(db_session, case, session_factory):
+    summarizer, llm = _summarizer(db_session)
+
+    async def other_worker_wins(_messages):
+        other = session_factory()
+        other.query(Case).filter_by(id=case.id).update({"summarized_through_message_id": 999})
+        other.commit()
+        other.close()
+        return "Resumen duplicado."
+
+    llm.chat = AsyncMock(side_effect=other_worker_wins)
+    result = await summarizer.summarize_pending(case.id)
+
+    assert result["summaries"] == 0
+    assert db_session.query(Memory).filter_by(case_id=case.id, kind="episodic").count() == 0
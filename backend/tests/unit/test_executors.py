@@ -0,0 +1,80 @@
+"""
+Tests unitarios de los pools gestionados y del monitor del event loop
+(infrastructure/concurrency).
+
+Verifica que el trabajo bloqueante salga del hilo del loop con el contexto
+actual, que el pool de CPU corra en otro proceso (y caiga al de hilos si se
+rompe) y que el monitor identifique al callback que bloquea el loop.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+import pytest
+from structlog.testing import capture_logs
+
+from core.config import settings
+from infrastructure.concurrency import executors
+from infrastructure.concurrency.executors import install_default_executor, run_blocking, run_cpu, shutdown_executors
+from infrastructure.concurrency.loop_monitor import LoopLagMonitor
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools():
+    shutdown_executors()
+    yield
+    shutdown_executors()
+
+
+def _whoami():
+    return threading.current_thread().name, _request_id.get()
+
+
+async def test_blocking_pool_keeps_context_and_serves_to_thread():
+    _request_id.set("req-50")
+
+    name, request_id = await run_blocking(_whoami)
+    assert name.startswith("blocking") and request_id == "req-50"
+
+    install_default_executor()
+    name, _ = await asyncio.to_thread(_whoami)
+    assert name.startswith("blocking")
+
+
+async def test_cpu_pool_runs_in_another_process_and_falls_back_when_broken():
+    with patch.object(settings, "executor_cpu_workers", 1):
+        assert await run_cpu(os.getpid) != os.getpid()
+
+    class Broken(Executor):
+        def submit(self, fn, /, *args, **kwargs):
+            raise BrokenProcessPool("worker muerto")
+
+    with patch.object(executors, "cpu_executor", return_value=Broken()):
+        name, _ = await run_cpu(_whoami)
+    assert name.startswith("blocking")
+
+
+def _parse_everything():
+    time.sleep(0.3)  # simula un SDK síncrono llamado desde una corrutina
+
+
+async def test_loop_monitor_logs_the_blocking_callback():
+    monitor = LoopLagMonitor(threshold_ms=100, interval_ms=20)
+    with capture_logs() as logs:
+        monitor.start()
+        await asyncio.sleep(0.05)
+        _parse_everything()
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    blocked = [log for log in logs if log["event"] == "event_loop_blocked"]
+    assert monitor.blocked == 1 and len(blocked) == 1
+    assert blocked[0]["lag_ms"] >= 250
+    assert any("_parse_everything" in frame for frame in blocked[0]["stack"])
@@ -0,0 +1,84 @@
+"""
+Tests unitarios del chequeo de alucinaciones basado en reglas.
+
+Verifica las marcas y su orden, que un nombre propio no tape un dato
+inventado, que los datos reutilizados del contexto o de la pregunta no se
+marquen, que los nombres propios se verifiquen solo contra el contexto, y la
+búsqueda de frases por palabras completas.
+"""
+import pytest
+
+from application.services.hallucination_detection_service import (
+    HallucinationDetectionService,
+    _KnownText,
+)
+
+
+@pytest.fixture
+def service():
+    return HallucinationDetectionService()
+
+
+async def test_flags_keep_rule_order(service):
+    response = (
+        "Según mis registros y según mi base de datos, su DNI es 30123456. "
+        "Puede ver https://tramites.example/30999888 o preguntar a Juan Pereyra en San Rafael."
+    )
+
+    result = await service.check_response(response, context="Consulta sobre divorcio.", question="¿Qué necesito?")
+
+    assert result.flags == [
+        "claims_system_access",
+        "claims_system_access",
+        "invents_specific_data:30123456",
+        "invents_specific_data:30999888",  # los dígitos de una URL también cuentan como dato
+        "mentions_urls",
+        "unknown_proper_noun:Juan Pereyra",
+    ]
+    assert not result.is_valid and result.confidence == pytest.approx(0.0)
+
+
+async def test_data_reused_from_context_or_question_is_not_flagged(service):
+    context = "Datos del caso: expediente número 4521, juzgado 3, audiencia el 12/03/2025 con Marta Sosa."
+    response = (
+        "Tal vez la audiencia del 12/03/2025 en el Juzgado 3 se postergue. "
+        "Su expediente número 4521 sigue igual y su DNI 28111222 ya está cargado; Marta Sosa lo acompaña."
+    )
+
+    result = await service.check_response(response, context, question="Mi DNI es 28111222")
+    assert result.flags == [] and result.is_valid and result.confidence == 1.0
+
+    impossible = await service.check_response(
+        "Su audiencia es el 15/04/2025.", context, question="¿Qué día exacta es la audiencia?"
+    )
+    assert impossible.flags == ["invents_specific_data:15/04/2025", "answers_impossible_question"]
+
+
+async def test_proper_nouns_are_checked_against_context_only(service):
+    context = "El cónyuge, jorge ruiz, vive en Godoy Cruz."
+    response = "Godoy Cruz queda cerca. Jorge Ruiz y Laura Sosa deberán firmar."
+
+    result = await service.check_response(response, context, question="¿Laura Sosa tiene que firmar?")
+
+    # "Jorge Ruiz" solo aparece en minúsculas y "Laura Sosa" solo en la pregunta
+    assert result.flags == ["unknown_proper_noun:Jorge Ruiz", "unknown_proper_noun:Laura Sosa"]
+
+
+@pytest.mark.parametrize("response, invented", [
+    ("Tu causa está en el Primer Juzgado 5 de familia.", "Juzgado 5"),
+    ("Su Expediente numero 4521 fue abierto.", "Expediente numero 4521"),
+])
+async def test_capitalised_word_does_not_hide_invented_data(service, response, invented):
+    result = await service.check_response(response, context="Consulta sobre divorcio.", question="¿Dónde está?")
+
+    assert f"invents_specific_data:{invented}" in result.flags
+    assert not result.is_valid
+
+
+def test_rules_compiled_once_and_phrases_match_whole_words(service):
+    assert HallucinationDetectionService().rules is service.rules
+
+    known = _KnownText("Expediente Número 4521 del juzgado 3", "mi DNI es 123456789 y el 30123456")
+    assert "expediente número 4521" in known and "Juzgado 3" in known
+    assert "12345678" not in known  # el contenido como substring ya no alcanza
+    assert "30123456" in known and "juzgado 4521" not in known and "" not in known
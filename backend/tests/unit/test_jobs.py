@@ -0,0 +1,102 @@
+"""
+Tests unitarios del subsistema de jobs (Celery en modo eager, Redis en memoria).
+
+Verifica idempotencia por clave, consulta de estado, reintentos con
+backoff y que los errores permanentes no se reintenten.
+"""
+import pytest
+
+from infrastructure.tasks.base import JobTask, PermanentJobError
+from infrastructure.tasks.celery_app import BULK_QUEUE, INTERACTIVE_QUEUE, app
+from infrastructure.tasks.client import JobClient, JobSubmitError, job_id_for
+from infrastructure.tasks import jobs as job_tasks
+
+calls = []
+
+
+@app.task(base=JobTask, name="tests.echo")
+def echo(value):
+    calls.append(value)
+    return {"value": value}
+
+
+@app.task(base=JobTask, name="tests.flaky", bind=True, max_retries=3)
+def flaky(self, fail_times):
+    calls.append(self.request.retries)
+    if self.request.retries < fail_times:
+        raise ConnectionError("WAHA no responde")
+    return "ok"
+
+
+@app.task(base=JobTask, name="tests.permanent")
+def permanent():
+    calls.append("permanent")
+    raise PermanentJobError("caso inexistente")
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app.conf, "task_always_eager", True)
+    monkeypatch.setattr(app.conf, "task_eager_propagates", False)
+    calls.clear()
+    return JobClient(redis_client=FakeRedis())
+
+
+def test_idempotent_submit_runs_once(client):
+    first = client.submit(echo, "hola", idempotency_key="send:1:abc")
+    second = client.submit(echo, "hola", idempotency_key="send:1:abc")
+    assert first == second == job_id_for("tests.echo", "send:1:abc")
+    assert calls == ["hola"]
+    assert client.status(first)["state"] == "SUCCESS"
+    assert client.status(first)["result"] == {"value": "hola"}
+
+
+def test_retries_with_backoff_then_succeeds(client):
+    job_id = client.submit(flaky, 2)
+    assert calls == [0, 1, 2]
+    assert client.status(job_id)["result"] == "ok"
+
+
+def test_permanent_error_is_not_retried(client):
+    job_id = client.submit(permanent)
+    assert calls == ["permanent"]
+    status = client.status(job_id)
+    assert status["state"] == "FAILURE"
+    assert "caso inexistente" in status["error"]
+
+
+def test_broker_failure_fails_fast_and_releases_key(client, monkeypatch):
+    def broken(*args, **kwargs):
+        calls.append("publish")
+        raise OSError("Connection refused")
+
+    monkeypatch.setattr(echo, "apply_async", broken)
+    with pytest.raises(JobSubmitError):
+        client.submit(echo, "x", idempotency_key="k")
+    assert client._redis.data == {}
+    # Durante el backoff ni siquiera intenta publicar
+    with pytest.raises(JobSubmitError):
+        client.submit(echo, "x")
+    assert calls == ["publish"]
+
+
+def test_tasks_are_routed_by_priority():
+    assert job_tasks.deliver_outbound.queue == INTERACTIVE_QUEUE
+    assert job_tasks.render_petition_pdf.queue == INTERACTIVE_QUEUE
+    assert job_tasks.summarize_case_conversation.queue == BULK_QUEUE
+    assert job_tasks.ingest_legal_document.queue == BULK_QUEUE
+    assert job_tasks.deliver_outbound.retry_backoff
@@ -0,0 +1,97 @@
+"""
+Tests unitarios de la búsqueda híbrida en la base de conocimiento.
+
+Verifica la fusión RRF, que las referencias exactas ("art. 438", "Ley 9120")
+se encuentren aunque el embedding apunte a otro fragmento, y que el
+re-ranker opcional respete su tiempo máximo.
+"""
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from application.services import knowledge_retriever
+from application.services.knowledge_retriever import (
+    KnowledgeRetriever,
+    bm25_rank,
+    query_terms,
+    reciprocal_rank_fusion,
+)
+from core.config import settings
+from infrastructure.persistence.models import SemanticKnowledge
+from infrastructure.persistence.vector_index import refresh_knowledge_index
+
+
+def _vector(axis: int) -> list:
+    vector = np.zeros(768, dtype=np.float32)
+    vector[axis] = 1.0
+    return vector.tolist()
+
+
+@pytest.fixture
+def knowledge_db(db_session):
+    db_session.add_all([
+        SemanticKnowledge(title="CCyCN - Parte 1", embedding=_vector(0),
+                          content="**Art. 437 - Petición de divorcio**\nCualquiera de los cónyuges puede pedir el divorcio."),
+        SemanticKnowledge(title="CCyCN - Parte 2", embedding=_vector(1),
+                          content="**Art. 438 - Requisitos**\nNo es necesario invocar causa para solicitar el divorcio."),
+        SemanticKnowledge(title="Procedimiento - Parte 1", embedding=_vector(2),
+                          content="El procedimiento de divorcio en Mendoza se rige por la Ley 9120."),
+        SemanticKnowledge(title="Hijos - Parte 1", embedding=None,
+                          content="La cuota alimentaria de los hijos se fija según sus necesidades."),
+    ])
+    db_session.commit()
+    refresh_knowledge_index(db_session)  # como tras una ingesta
+    return db_session
+
+
+def test_rrf_and_bm25_rank_exact_references():
+    assert query_terms("¿Qué dice el Art. 438?") == ["dice", "art", "438"]
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)[0][0] == 1
+    assert [doc for doc, _ in reciprocal_rank_fusion([[5], [], [7, 5]], k=1)] == [5, 7]
+
+    documents = {1: "Art. 437 petición", 2: "Art. 438 requisitos del divorcio", 3: "Ley 9120 procedimiento"}
+    assert bm25_rank("art. 438", documents, limit=3)[0] == 2
+    assert bm25_rank("ley 9120", documents, limit=3) == [3]
+    assert bm25_rank("jubilación", documents, limit=3) == []
+
+
+async def test_hybrid_search_finds_exact_reference_and_fuses_vectors(knowledge_db):
+    ids = {k.content.split("\n")[0]: k.id for k in knowledge_db.query(SemanticKnowledge).all()}
+    art_438 = ids["**Art. 438 - Requisitos**"]
+    retriever = KnowledgeRetriever(knowledge_db)
+
+    # El embedding de la consulta apunta a otro fragmento; el término exacto rescata el 438
+    hits = await retriever.search("art. 438", _vector(2), limit=2)
+    assert hits[0]["id"] == art_438 and hits[0]["sources"] == ["lexical", "vector"]
+    assert hits[0]["distance"] == pytest.approx(2 ** 0.5)
+
+    vector_only = await retriever.search("art. 438", _vector(2), limit=1, mode="vector")
+    assert vector_only[0]["title"] == "Procedimiento - Parte 1"
+
+    # Sin embedding queda la parte léxica, incluso para fragmentos sin vector
+    hits = await retriever.search("cuota alimentaria de los hijos", [], limit=3)
+    assert [h["title"] for h in hits] == ["Hijos - Parte 1"]
+    assert (await retriever.search("Ley 9120", None, limit=1))[0]["title"] == "Procedimiento - Parte 1"
+
+
+async def test_reranker_reorders_and_falls_back_on_timeout(knowledge_db):
+    class FakeCrossEncoder:
+        delay = 0.0
+
+        def predict(self, pairs):
+            time.sleep(self.delay)
+            return [float("Ley 9120" in doc) for _, doc in pairs]
+
+    model = FakeCrossEncoder()
+    retriever = KnowledgeRetriever(knowledge_db)
+    with patch.object(settings, "knowledge_reranker_model", "fake"), \
+         patch.object(settings, "knowledge_rerank_timeout_ms", 200), \
+         patch.object(knowledge_retriever, "_reranker", model):
+        hits = await retriever.search("divorcio", None, limit=3)
+        assert hits[0]["title"] == "Procedimiento - Parte 1" and "rerank_score" in hits[0]
+
+        model.delay = 0.5
+        hits = await retriever.search("divorcio", None, limit=3)
+        assert "rerank_score" not in hits[0]
@@ -0,0 +1,100 @@
+"""
+Tests unitarios de la ingesta de la base de conocimiento.
+
+Verifica la división por encabezados Markdown y claves JSON con límite en
+tokens y solapamiento, y que la re-ingesta solo genere embeddings de los
+fragmentos nuevos y borre los que ya no están.
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+from application.services.context_assembler import count_tokens
+from application.services.document_chunker import chunk_json, chunk_markdown
+from application.use_cases.ingest_legal_document import IngestLegalDocumentUseCase
+from infrastructure.persistence.models import SemanticKnowledge
+
+DOC = """# Base de Conocimiento: Divorcio
+
+---
+
+## I. MARCO LEGAL
+
+### A. Código Civil
+
+**Art. 437 - Petición de divorcio**
+- Cualquiera de los cónyuges puede pedir el divorcio
+
+**Art. 438 - Requisitos**
+- No es necesario invocar causa
+
+## II. PROCEDIMIENTO
+
+```
+# no es un encabezado
+```
+
+{procedimiento}
+"""
+
+
+def test_markdown_chunks_follow_headings_with_token_limit_and_overlap():
+    pasos = "\n\n".join(f"Paso {i}: el juzgado dicta el decreto de divorcio dentro de diez días." for i in range(12))
+    chunks = chunk_markdown(DOC.format(procedimiento=pasos), max_tokens=60, overlap_tokens=20)
+
+    assert chunks[0].section == "I. MARCO LEGAL › A. Código Civil"
+    assert chunks[0].content.startswith("### A. Código Civil\n\n**Art. 437")
+    assert "**Art. 438 - Requisitos**" in chunks[0].content
+
+    procedure = [c for c in chunks if c.section == "II. PROCEDIMIENTO"]
+    assert len(procedure) > 2 and "# no es un encabezado" in procedure[0].content
+    assert all(count_tokens(c.content) <= 60 for c in procedure)
+    assert all(c.content.startswith("## II. PROCEDIMIENTO") for c in procedure)
+    # Cada continuación arrastra el último paso del fragmento anterior
+    for previous, current in zip(procedure, procedure[1:]):
+        assert previous.content.split("\n\n")[-1] == current.content.split("\n\n")[1]
+
+
+def test_json_chunks_split_large_objects_by_key():
+    data = {
+        "titulo": "Procedimientos",
+        "PROCEDIMIENTO_LEY_9120": {
+            "unilateral": {"plazo": "5 días para responder", "audiencia": "solo si hay discordancia"},
+            "bilateral": {"pasos": [f"paso {i} del trámite bilateral con acuerdo total" for i in range(10)]},
+        },
+    }
+    chunks = chunk_json(data, max_tokens=60)
+
+    sections = [c.section for c in chunks]
+    assert sections[0] == "" and chunks[0].content == "titulo: Procedimientos"
+    assert "PROCEDIMIENTO LEY 9120 › unilateral" in sections
+    unilateral = chunks[sections.index("PROCEDIMIENTO LEY 9120 › unilateral")]
+    assert "plazo: 5 días para responder" in unilateral.content
+    assert sum(s == "PROCEDIMIENTO LEY 9120 › bilateral › pasos" for s in sections) > 1
+    assert all(count_tokens(c.content) <= 60 for c in chunks)
+
+
+async def test_reingest_only_embeds_new_chunks_and_removes_stale(db_session):
+    llm = MagicMock()
+    llm.embed = AsyncMock(side_effect=lambda texts: [[0.1] * 768 for _ in texts])
+    use_case = IngestLegalDocumentUseCase(db_session, llm)
+    use_case.max_chunk_tokens = 15  # cada procedimiento en su propio fragmento
+    db_session.add(SemanticKnowledge(title="Procedimientos JSON - Parte 1/1", content=json.dumps({"viejo": 1})))
+    db_session.commit()
+    original = {"divorcio_unilateral": {"plazo": "5 días"}, "divorcio_bilateral": {"plazo": "10 días"}}
+
+    first = await use_case.execute("Procedimientos JSON", json.dumps(original), source="proc.json", content_format="json")
+    assert (first.chunks_created, first.chunks_unchanged, first.chunks_deleted) == (2, 0, 1)
+
+    again = await use_case.execute("Procedimientos JSON", json.dumps(original), source="proc.json", content_format="json")
+    assert (again.chunks_created, again.chunks_unchanged, again.chunks_deleted) == (0, 2, 0)
+
+    changed = dict(original, divorcio_bilateral={"plazo": "15 días"})
+    result = await use_case.execute("Procedimientos JSON", json.dumps(changed), source="proc.json", content_format="json")
+    assert (result.chunks_created, result.chunks_unchanged, result.chunks_deleted) == (1, 1, 1)
+    assert [len(call.args[0]) for call in llm.embed.await_args_list] == [2, 1]
+
+    rows = db_session.query(SemanticKnowledge).order_by(SemanticKnowledge.section).all()
+    assert [(r.source, r.section) for r in rows] == [
+        ("proc.json", "divorcio bilateral"), ("proc.json", "divorcio unilateral"),
+    ]
+    assert rows[0].title == "Procedimientos JSON — divorcio bilateral" and "15 días" in rows[0].content
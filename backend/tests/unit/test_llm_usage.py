@@ -0,0 +1,104 @@
+"""
+Tests unitarios de la contabilidad de tokens (infrastructure/ai/usage.py).
+
+Verifica que el router registre los tokens informados por el proveedor (o
+los estime), la escritura por lotes en llm_usage, los agregados por caso y
+fase, y el cambio a un modelo más barato cuando el caso supera su presupuesto.
+"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from application.services.llm_usage_service import LLMUsageService
+from core.config import settings
+from infrastructure.ai import router as router_module
+from infrastructure.ai.router import LLMRouter
+from infrastructure.ai.usage import UsageRecorder, case_usage_scope, report_usage
+from infrastructure.persistence.models import Case, LLMUsage
+
+
+@pytest.fixture
+def recorder(session_factory):
+    recorder = UsageRecorder(session_factory, batch_size=100, flush_seconds=60)
+    with patch.object(router_module, "usage_recorder", recorder), \
+         patch("application.services.llm_usage_service.usage_recorder", recorder):
+        yield recorder
+
+
+@pytest.fixture
+def router():
+    with patch("infrastructure.ai.router.OllamaCloudClient"), \
+         patch("infrastructure.ai.router.OllamaClient"), \
+         patch("infrastructure.ai.router.GeminiClient"):
+        return LLMRouter()
+
+
+def _reporting(prompt_tokens, completion_tokens, reply="respuesta"):
+    async def chat(messages, tools=None, model=None):
+        report_usage(prompt_tokens, completion_tokens, model)
+        return reply
+    return chat
+
+
+async def test_router_records_reported_and_estimated_tokens(router, recorder, session_factory):
+    db = session_factory()
+    case = Case(phone="5492604000042", phase="domicilio")
+    db.add(case)
+    db.commit()
+
+    router.providers["ollama_cloud"].chat = AsyncMock(side_effect=RuntimeError("503"))
+    router.providers["ollama_local"].chat = AsyncMock(return_value="x" * 40)
+    with case_usage_scope(case.id, "domicilio"):
+        await router.chat([{"role": "user", "content": "y" * 80}], task_type="reasoning")
+    router.providers["ollama_cloud"].chat = _reporting(120, 30)
+    with case_usage_scope(case.id, "hijos"):
+        await router.chat([{"role": "user", "content": "hola"}])
+
+    assert recorder.pending_tokens(case.id) == 20 + 10 + 150
+    assert recorder.flush() == 3
+    rows = db.query(LLMUsage).order_by(LLMUsage.id).all()
+    assert [(r.provider, r.success, r.estimated) for r in rows] == [
+        ("ollama_cloud", False, True), ("ollama_local", True, True), ("ollama_cloud", True, False),
+    ]
+    assert (rows[1].prompt_tokens, rows[1].completion_tokens, rows[1].task_type) == (20, 10, "reasoning")
+    assert (rows[2].model, rows[2].prompt_tokens, rows[2].phase) == (settings.llm_chat_model, 120, "hijos")
+
+    service = LLMUsageService(db)
+    usage = service.case_usage(case.id)
+    assert (usage["calls"], usage["total_tokens"]) == (3, 180)
+    assert {p["phase"]: p["total_tokens"] for p in usage["by_phase"]} == {"domicilio": 30, "hijos": 150}
+    assert service.top_cases()[0]["case_id"] == case.id
+    assert sum(d["total_tokens"] for d in service.daily()) == 180
+    cloud_chat = next(p for p in service.by_provider() if p["task_type"] == "chat")
+    assert cloud_chat["error_rate"] == 0.0
+    db.close()
+
+
+async def test_over_budget_case_uses_budget_model(router, recorder):
+    router.providers["ollama_cloud"].chat = AsyncMock(return_value="ok")
+
+    with patch.object(settings, "llm_case_token_budget", 1000):
+        with case_usage_scope(7, "inicio", tokens_used=999):
+            await router.chat([{"role": "user", "content": "hola"}], task_type="reasoning")
+            await router.chat([{"role": "user", "content": "hola"}], task_type="reasoning")
+
+    models = [call.kwargs["model"] for call in router.providers["ollama_cloud"].chat.await_args_list]
+    assert models == [settings.llm_reasoning_model, settings.llm_budget_model]
+
+
+async def test_recorder_writes_full_batches_off_the_event_loop(session_factory):
+    recorder = UsageRecorder(session_factory, batch_size=2, flush_seconds=60)
+    row = dict(case_id=None, phase=None, task_type="chat", provider="ollama_local", model="m",
+               prompt_tokens=1, completion_tokens=1, estimated=False, duration_ms=5, success=True, cost_usd=None)
+
+    recorder.record(**row)
+    recorder.record(**row)
+    recorder.record(**row)
+    await asyncio.gather(*recorder._tasks)
+
+    db = session_factory()
+    assert db.query(LLMUsage).count() == 2
+    assert recorder.flush() == 1
+    assert db.query(LLMUsage).count() == 3
+    db.close()
@@ -0,0 +1,30 @@
+"""
+Tests unitarios del guardado de archivos en el media store (MediaService).
+
+Verifica que `save` confirme el registro sin confirmar ni deshacer lo que
+la sesión del llamador tenga pendiente.
+"""
+from application.services.media_service import MediaService
+from infrastructure.persistence.models import Case, MediaObject
+from infrastructure.storage.local_media_store import LocalMediaStore
+
+
+def test_save_leaves_caller_transaction_alone(db_session, tmp_path):
+    service = MediaService(db_session, store=LocalMediaStore(tmp_path), whatsapp=object())
+    db_session.add(Case(phone="5492604000099"))
+
+    first = service.save("waha-media-1", b"%PDF-1.4 uno", "application/pdf")
+    assert first.mime_type == "application/pdf" and first.size == 12
+    db_session.rollback()
+
+    assert db_session.query(Case).count() == 0
+    assert db_session.query(MediaObject).filter(MediaObject.media_id == "waha-media-1").count() == 1
+
+
+def test_save_refreshes_a_record_already_loaded(db_session, tmp_path):
+    service = MediaService(db_session, store=LocalMediaStore(tmp_path), whatsapp=object())
+    loaded = service.save("waha-media-2", b"uno", "image/jpeg")
+
+    again = service.save("waha-media-2", b"otro contenido", "image/jpeg")
+
+    assert again is loaded and again.size == len(b"otro contenido")
@@ -0,0 +1,92 @@
+"""
+Tests del mock local de Ollama/WAHA (scripts/mock_services.py).
+
+Verifica la inyección de fallas por ruta y modelo, las respuestas enlatadas,
+el streaming NDJSON y que el fallback real del LLMRouter funcione contra el
+mock sin red.
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "scripts"))
+
+from mock_services import LatencySpec, MockConfig, MockServer, create_app  # noqa: E402
+from infrastructure.ai.router import LLMRouter  # noqa: E402
+
+CLOUD = {"Authorization": "Bearer test"}
+
+
+def _chat(client, model="minimax-m2:cloud", headers=CLOUD, **extra):
+    payload = {"model": model, "messages": [{"role": "user", "content": "hola, ¿qué horario tienen?"}], **extra}
+    return client.post("/api/chat", json=payload, headers=headers)
+
+
+def test_latency_distributions_are_seeded_and_non_negative():
+    import random
+
+    for distribution in ("fixed", "uniform", "normal", "lognormal"):
+        spec = LatencySpec(distribution, mean_ms=100, spread_ms=80)
+        first = [spec.sample(random.Random(1)) for _ in range(3)]
+        assert first == [spec.sample(random.Random(1)) for _ in range(3)]
+        assert all(v >= 0 for v in first)
+    with pytest.raises(ValueError):
+        LatencySpec("pareto")
+
+
+def test_route_profiles_inject_errors_by_model_and_target():
+    config = MockConfig.from_dict({
+        "routes": {
+            "cloud.chat@glm-4.6:cloud": {"error_rate": 1.0, "error_status": 429},
+            "local": {"outages": [[0, 3600]]},
+        },
+        "responses": [{"contains": "horario", "route": "cloud", "content": "De 8 a 14 hs."}],
+    })
+    client = TestClient(create_app(config))
+
+    assert _chat(client, model="glm-4.6:cloud").status_code == 429
+    ok = _chat(client, stream=False)
+    assert ok.status_code == 200
+    assert ok.json()["message"]["content"] == "De 8 a 14 hs."
+    assert ok.json()["eval_count"] > 0
+    assert _chat(client, headers={}, stream=False).status_code == 503
+
+    routes = client.get("/mock/stats").json()["routes"]
+    assert (routes["cloud.chat"]["requests"], routes["cloud.chat"]["errors"]) == (2, 1)
+    assert routes["local.chat"]["outages"] == 1
+
+    # Reconfiguración en caliente: se levanta la caída de local
+    assert client.post("/mock/config", json={"routes": {"local": {}}}).status_code == 200
+    assert _chat(client, headers={}, stream=False).status_code == 200
+    assert client.post("/mock/config", json={"routes": {"x": {"latency": {"distribution": "?"}}}}).status_code == 422
+
+
+def test_chat_streams_ndjson_by_default():
+    client = TestClient(create_app(MockConfig()))
+    response = _chat(client)
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    chunks = [json.loads(line) for line in response.text.splitlines()]
+    assert chunks[-1]["done"] is True and chunks[-1]["prompt_eval_count"] > 0
+    assert all(not c["done"] for c in chunks[:-1])
+    text = "".join(c["message"]["content"] for c in chunks)
+    assert text == _chat(client, stream=False).json()["message"]["content"]
+
+
+async def test_router_falls_back_to_local_when_cloud_fails():
+    config = MockConfig.from_dict({"routes": {"cloud.chat": {"error_rate": 1.0}}})
+    with MockServer(config) as mock:
+        router = LLMRouter()
+        router.providers["ollama_cloud"].base_url = mock.url
+        router.providers["ollama_cloud"].api_key = "test"
+        router.providers["ollama_local"].base = mock.url
+
+        response = await router.chat([{"role": "user", "content": "¿Cuánto tarda el trámite?"}])
+
+        assert "trámite" in response
+        routes = mock.stats["routes"]
+        assert routes["cloud.chat"]["errors"] == 1
+        assert routes["local.chat"]["requests"] == 1
@@ -0,0 +1,266 @@
+"""
+Tests unitarios de la cola de salida de WhatsApp.
+
+Verifica entrega en orden por chat, reintentos con backoff que frenan a los
+mensajes siguientes del mismo chat, dead-letter ante errores definitivos,
+actualización del estado del historial (incluidos los acks) y el limitador.
+"""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from application.services.outbound_service import OutboundMessageService, retry_delay
+from core.config import settings
+from infrastructure.messaging.rate_limiter import ChatSendLock, SendRateLimiter
+from infrastructure.persistence.models import Case, Message, OutboundMessage
+from infrastructure.tasks.client import JobSubmitError
+
+
+class FakeWhatsApp:
+    def __init__(self, failures=None):
+        self.sent = []
+        self.failures = list(failures or [])
+
+    async def send_message(self, chat_id, text):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((chat_id, text))
+        return {"id": {"_serialized": f"true_{chat_id}_{len(self.sent)}"}}
+
+
+class OpenLimiter:
+    def acquire(self, chat_id):
+        return 0.0
+
+
+class NoLock:
+    def acquire(self, chat_id):
+        return "token"
+
+    def extend(self, chat_id, token):
+        return True
+
+    def release(self, chat_id, token):
+        pass
+
+
+class ExpiringLock(NoLock):
+    """El TTL vence después del primer envío y otro proceso toma el chat."""
+
+    def extend(self, chat_id, token):
+        return False
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.counters = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def incr(self, key):
+        # Una sola ventana: el test no depende de cruzar un segundo de reloj
+        self.counters["window"] = self.counters.get("window", 0) + 1
+        self._last = self.counters["window"]
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        return [self._last]
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def pttl(self, key):
+        return 400
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def eval(self, script, numkeys, key, token, ttl):
+        return 1 if self.data.get(key) == token else 0
+
+
+@pytest.fixture
+def case(db_session):
+    case = Case(phone="5492604000010")
+    db_session.add(case)
+    db_session.commit()
+    return case
+
+
+def _service(db_session, whatsapp):
+    return OutboundMessageService(db_session, whatsapp=whatsapp, limiter=OpenLimiter(), lock=NoLock())
+
+
+async def test_messages_delivered_in_order_with_status(db_session, case):
+    whatsapp = FakeWhatsApp()
+    service = _service(db_session, whatsapp)
+    first = service.enqueue("chat-a", "uno", case_id=case.id, role="operator")
+    service.enqueue("chat-a", "dos", case_id=case.id, role="operator")
+    assert db_session.query(Message).get(first.message_id).status == "queued"
+
+    stats = await service.drain("chat-a")
+
+    assert stats == {"sent": 2, "dead": 0, "retry_in": None}
+    assert whatsapp.sent == [("chat-a", "uno"), ("chat-a", "dos")]
+    assert db_session.query(Message).get(first.message_id).status == "sent"
+    assert db_session.query(OutboundMessage).get(first.id).wa_message_id == "true_chat-a_1"
+
+
+async def test_transient_failure_blocks_rest_of_chat(db_session, case):
+    whatsapp = FakeWhatsApp(failures=[httpx.ConnectError("WAHA caído")])
+    service = _service(db_session, whatsapp)
+    first = service.enqueue("chat-b", "uno", case_id=case.id, role="assistant")
+    service.enqueue("chat-b", "dos", case_id=case.id, role="assistant")
+
+    stats = await service.drain("chat-b")
+    assert stats["sent"] == 0 and stats["retry_in"] > 0
+    assert whatsapp.sent == []
+    assert db_session.query(OutboundMessage).get(first.id).attempts == 1
+
+    # Vencido el backoff se entregan ambos, en orden
+    db_session.query(OutboundMessage).get(first.id).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    assert (await service.drain("chat-b"))["sent"] == 2
+    assert [text for _, text in whatsapp.sent] == ["uno", "dos"]
+
+
+async def test_permanent_error_goes_to_dead_letter_and_requeue(db_session, case):
+    rejected = httpx.HTTPStatusError(
+        "chat inexistente",
+        request=httpx.Request("POST", "http://waha/api/sendText"),
+        response=httpx.Response(404),
+    )
+    whatsapp = FakeWhatsApp(failures=[rejected])
+    service = _service(db_session, whatsapp)
+    dead = service.enqueue("chat-c", "uno", case_id=case.id, role="operator")
+    service.enqueue("chat-c", "dos", case_id=case.id, role="operator")
+
+    stats = await service.drain("chat-c")
+
+    assert stats["dead"] == 1 and stats["sent"] == 1
+    assert db_session.query(Message).get(dead.message_id).status == "failed"
+    assert [o.id for o in service.dead_letters()] == [dead.id]
+
+    service.requeue(dead.id)
+    assert (await service.drain("chat-c"))["sent"] == 1
+    assert db_session.query(Message).get(dead.message_id).status == "sent"
+
+
+async def test_drain_stops_when_lock_is_lost(db_session, case):
+    whatsapp = FakeWhatsApp()
+    service = OutboundMessageService(db_session, whatsapp=whatsapp, limiter=OpenLimiter(), lock=ExpiringLock())
+    service.enqueue("chat-i", "uno", case_id=case.id, role="operator")
+    service.enqueue("chat-i", "dos", case_id=case.id, role="operator")
+
+    stats = await service.drain("chat-i")
+
+    assert whatsapp.sent == [("chat-i", "uno")]
+    assert stats["sent"] == 1 and stats["retry_in"] == 0.0
+
+
+def test_chat_lock_extends_only_its_own_token():
+    fake = FakeRedis()
+    lock = ChatSendLock(redis_client=fake, ttl_seconds=120)
+    token = lock.acquire("chat-j")
+    assert lock.acquire("chat-j") is None
+    assert lock.extend("chat-j", token)
+    fake.data["outbound:lock:chat-j"] = "otro"
+    assert not lock.extend("chat-j", token)
+
+
+async def test_drain_keeps_redis_and_database_off_the_event_loop(db_session, case):
+    loop_thread = threading.get_ident()
+    threads = []
+
+    class RecordingLock(NoLock):
+        def acquire(self, chat_id):
+            threads.append(threading.get_ident())
+            return "token"
+
+    service = OutboundMessageService(db_session, whatsapp=FakeWhatsApp(), limiter=OpenLimiter(), lock=RecordingLock())
+    service.enqueue("chat-k", "hola", case_id=case.id, role="operator")
+
+    with patch.object(db_session, "commit", wraps=lambda: threads.append(threading.get_ident())):
+        await service.drain("chat-k")
+
+    assert threads and loop_thread not in threads
+
+
+def test_chat_lock_falls_back_to_process_lock_without_redis():
+    class DownRedis:
+        def set(self, *args, **kwargs):
+            raise ConnectionError("Redis caído")
+
+    lock = ChatSendLock(redis_client=DownRedis(), ttl_seconds=120)
+    token = lock.acquire("chat-l")
+    assert token is not None
+    assert lock.acquire("chat-l") is None  # el orden se mantiene dentro del proceso
+    assert lock.extend("chat-l", token)
+    lock.release("chat-l", token)
+    assert lock.acquire("chat-l") is not None
+
+
+async def test_ack_updates_status_without_going_back(db_session, case):
+    service = _service(db_session, FakeWhatsApp())
+    queued = service.enqueue("chat-d", "hola", case_id=case.id, role="assistant")
+    await service.drain("chat-d")
+
+    assert service.apply_ack("true_chat-d_1", 3)
+    assert not service.apply_ack("true_chat-d_1", 2)
+    assert db_session.query(Message).get(queued.message_id).status == "read"
+
+
+async def test_without_broker_transient_failure_is_retried_in_process(db_session, case, session_factory):
+    whatsapp = FakeWhatsApp(failures=[httpx.ConnectError("WAHA caído")])
+    service = OutboundMessageService(db_session, whatsapp=whatsapp, limiter=OpenLimiter(), lock=NoLock(),
+                                     session_factory=session_factory)
+    queued = service.enqueue("chat-h", "hola", case_id=case.id, role="assistant")
+
+    def no_broker(chat_id, countdown=None):
+        raise JobSubmitError("broker caído")
+
+    with patch.object(settings, "outbound_retry_base_seconds", 0.05), \
+            patch.object(OutboundMessageService, "schedule", staticmethod(no_broker)):
+        await service.dispatch(queued)
+        assert queued.status == "queued" and whatsapp.sent == []
+        await asyncio.sleep(0.3)
+
+    assert whatsapp.sent == [("chat-h", "hola")]
+    db_session.expire_all()
+    assert db_session.query(OutboundMessage).get(queued.id).status == "sent"
+
+
+def test_idempotency_key_returns_same_message(db_session, case):
+    service = _service(db_session, FakeWhatsApp())
+    first = service.enqueue("chat-e", "hola", case_id=case.id, role="operator", idempotency_key="op:1:k")
+    again = service.enqueue("chat-e", "hola", case_id=case.id, role="operator", idempotency_key="op:1:k")
+    assert first.id == again.id
+    assert db_session.query(Message).filter(Message.case_id == case.id).count() == 1
+
+
+def test_retry_delay_grows_with_jitter():
+    first = retry_delay(1)
+    assert settings.outbound_retry_base_seconds / 2 <= first <= settings.outbound_retry_base_seconds
+    assert retry_delay(30) <= settings.outbound_retry_max_seconds
+
+
+def test_rate_limiter_global_and_per_chat():
+    limiter = SendRateLimiter(redis_client=FakeRedis(), global_per_second=100, chat_interval_ms=1000)
+    assert limiter.acquire("chat-f") == 0.0
+    assert limiter.acquire("chat-f") == pytest.approx(0.4)
+    assert limiter.acquire("chat-g") == 0.0
+
+    tight = SendRateLimiter(redis_client=FakeRedis(), global_per_second=1, chat_interval_ms=0)
+    assert tight.acquire("x") == 0.0
+    assert tight.acquire("y") > 0
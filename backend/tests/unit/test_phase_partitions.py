@@ -0,0 +1,89 @@
+"""
+Tests unitarios del alta de particiones mensuales de phase_events.
+
+Usa una conexión falsa que simula PostgreSQL y registra el SQL ejecutado:
+si la DEFAULT ya tiene filas del mes, hay que moverlas antes de crear la
+partición, y un mes que falla no debe frenar al resto.
+"""
+from contextlib import nullcontext
+from datetime import date
+from types import SimpleNamespace
+
+from infrastructure.persistence.phase_events import ensure_phase_event_partitions
+
+
+class FakeResult:
+    def __init__(self, value=None, rowcount=0):
+        self.value = value
+        self.rowcount = rowcount
+
+    def scalar(self):
+        return self.value
+
+    def first(self):
+        return (1,) if self.value else None
+
+
+class FakePostgres:
+    """Conexión mínima: qué particiones existen y qué meses tienen filas en la DEFAULT"""
+
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self, existing=(), stranded=(), failing=()):
+        self.existing = set(existing)
+        self.stranded = set(stranded)
+        self.failing = set(failing)
+        self.statements = []
+
+    def begin_nested(self):
+        return nullcontext()
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append(sql)
+        params = params or {}
+        if sql.startswith("SELECT to_regclass"):
+            return FakeResult(params["name"] if params["name"] in self.existing else None)
+        if sql.startswith("SELECT 1 FROM phase_events_default"):
+            return FakeResult(params["start"] in self.stranded)
+        if sql.startswith("CREATE TABLE") and any(name in sql for name in self.failing):
+            raise RuntimeError("permission denied")
+        return FakeResult(rowcount=3)
+
+
+def test_creates_missing_partitions_and_skips_existing():
+    conn = FakePostgres(existing={"phase_events_y2025m03"})
+    names = ensure_phase_event_partitions(conn, months_ahead=1, reference=date(2025, 3, 10))
+
+    assert names == ["phase_events_y2025m03", "phase_events_y2025m04"]
+    creates = [sql for sql in conn.statements if sql.startswith("CREATE TABLE")]
+    assert len(creates) == 1
+    assert "phase_events_y2025m04" in creates[0]
+    assert not any("DETACH" in sql for sql in conn.statements)
+
+
+def test_moves_rows_out_of_default_before_creating_partition():
+    conn = FakePostgres(stranded={date(2025, 3, 1)})
+    ensure_phase_event_partitions(conn, months_ahead=0, reference=date(2025, 3, 10))
+
+    steps = [sql.split(" (")[0] for sql in conn.statements[2:]]
+    assert steps[0] == "ALTER TABLE phase_events DETACH PARTITION phase_events_default"
+    assert steps[1].startswith("CREATE TABLE phase_events_y2025m03 PARTITION OF phase_events")
+    assert steps[2] == "INSERT INTO phase_events_y2025m03"
+    assert steps[3].startswith("DELETE FROM phase_events_default")
+    assert steps[4] == "ALTER TABLE phase_events ATTACH PARTITION phase_events_default DEFAULT"
+
+
+def test_failed_month_does_not_stop_the_rest():
+    conn = FakePostgres(failing={"phase_events_y2025m03"})
+    names = ensure_phase_event_partitions(conn, months_ahead=1, reference=date(2025, 3, 10))
+
+    assert names == ["phase_events_y2025m04"]
+
+
+def test_other_dialects_are_ignored():
+    conn = FakePostgres()
+    conn.dialect = SimpleNamespace(name="sqlite")
+
+    assert ensure_phase_event_partitions(conn) == []
+    assert conn.statements == []
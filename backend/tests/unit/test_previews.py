@@ -0,0 +1,63 @@
+"""
+Tests unitarios de generación de previews de documentos.
+"""
+import io
+
+import pytest
+from PIL import Image
+
+from infrastructure.storage.local_media_store import LocalMediaStore
+from infrastructure.storage.previews import PreviewUnavailableError, render_previews, variant_name
+
+
+def _image_bytes(size, fmt="PNG", exif=None):
+    buffer = io.BytesIO()
+    image = Image.new("RGB", size, (10, 120, 200))
+    if exif is not None:
+        image.save(buffer, format=fmt, exif=exif)
+    else:
+        image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_render_image_all_variants():
+    rendered = render_previews(_image_bytes((2000, 1000)), "image/png")
+    assert set(rendered) == {variant_name(s, f) for s in ("thumb", "small", "large") for f in ("webp", "jpeg")}
+    thumb = Image.open(io.BytesIO(rendered["preview-thumb.webp"]))
+    assert thumb.format == "WEBP"
+    assert thumb.size == (160, 80)
+
+
+def test_render_respects_exif_orientation():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotada 90°: el lado mayor pasa a ser el alto
+    data = _image_bytes((800, 400), fmt="JPEG", exif=exif.tobytes())
+    rendered = render_previews(data, "image/jpeg", sizes=["thumb"], formats=["jpeg"])
+    assert Image.open(io.BytesIO(rendered["preview-thumb.jpeg"])).size == (80, 160)
+
+
+def test_render_pdf_first_page():
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.new_page(width=595, height=842)
+    doc.new_page(width=842, height=595)
+    rendered = render_previews(doc.tobytes(), "application/pdf", sizes=["small"], formats=["webp"])
+    width, height = Image.open(io.BytesIO(rendered["preview-small.webp"])).size
+    assert height == 480 and width < height
+
+
+def test_render_unsupported_content():
+    with pytest.raises(PreviewUnavailableError):
+        render_previews(b"PK\x03\x04 not an image", "application/zip")
+
+
+def test_variants_stored_next_to_original(tmp_path):
+    store = LocalMediaStore(tmp_path)
+    digest = store.put(b"original")
+    store.put_variant(digest, "preview-thumb.webp", b"thumb")
+    assert store.exists(digest, "preview-thumb.webp")
+    assert store.size(digest, "preview-thumb.webp") == 5
+    with store.open(digest) as handle:
+        assert handle.read() == b"original"
+    with pytest.raises(ValueError):
+        store.put_variant(digest, "../escape", b"x")
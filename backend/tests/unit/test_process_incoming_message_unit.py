@@ -521,10 +521,14 @@ class TestMediaHandling:
              patch("application.use_cases.process_incoming_message.MemoryService") as MemorySvcMock, \
              patch("application.use_cases.process_incoming_message.HallucinationDetectionService") as HallucMock, \
              patch("application.use_cases.process_incoming_message.LLMRouter") as LLMRouterMock, \
-             patch("application.use_cases.process_incoming_message.MessageRepository") as MsgRepoMock:
+             patch("application.use_cases.process_incoming_message.MessageRepository") as MsgRepoMock, \
+             patch("application.use_cases.process_incoming_message.MediaService") as MediaSvcMock:
 
             CaseRepoMock.return_value.get_or_create_by_phone.return_value = mock_case
 
+            # El media store guarda el archivo con su tipo real (sin base de datos en este test)
+            MediaSvcMock.return_value.save.return_value = Mock(mime_type="application/pdf")
+
             # WhatsApp devuelve bytes de archivo
             WahaMock.return_value.download_media = AsyncMock(return_value=b"%PDF-1.4 fake")
 
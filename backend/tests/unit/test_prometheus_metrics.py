@@ -0,0 +1,98 @@
+"""
+Tests de las métricas Prometheus (infrastructure/observability/metrics.py).
+
+Verifica los labels por ruta y las queries por request del middleware, el
+contador de fallbacks del router, el conteo de resultados del webhook y la
+protección opcional de GET /metrics con token.
+"""
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from core.config import settings
+from infrastructure.ai.router import LLMRouter
+from presentation.api.middleware.metrics import MetricsMiddleware
+from presentation.api.routes.prometheus import router as prometheus_router
+from presentation.api.routes.webhook import _count_result
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_middleware_labels_by_route_template_and_counts_queries(test_engine):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(prometheus_router)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        with test_engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    before = _value("db_queries_per_request_sum", route="/items/{item_id}")
+    client = TestClient(app)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/nada").status_code == 404
+
+    assert _value("http_request_seconds_count", method="GET", route="/items/{item_id}", status="200") >= 2
+    assert _value("db_queries_per_request_sum", route="/items/{item_id}") - before == 6
+    assert _value("http_request_seconds_count", method="GET", route="unmatched", status="404") >= 1
+
+    body = client.get("/metrics").text
+    assert 'http_request_seconds_bucket{le="0.005",method="GET",route="/items/{item_id}",status="200"}' in body
+    assert 'route="/metrics"' not in body
+
+
+async def test_router_counts_fallbacks_and_attempt_latency():
+    with patch("infrastructure.ai.router.OllamaCloudClient"), \
+         patch("infrastructure.ai.router.OllamaClient"), \
+         patch("infrastructure.ai.router.GeminiClient"):
+        router = LLMRouter()
+    router.providers["ollama_cloud"].chat = AsyncMock(side_effect=RuntimeError("503"))
+    router.providers["ollama_local"].chat = AsyncMock(return_value="ok")
+    fallbacks = _value("llm_fallbacks_total", provider="ollama_cloud", task_type="reasoning")
+    errors = _value("llm_request_seconds_count", provider="ollama_cloud", task_type="reasoning", outcome="error")
+    ok = _value("llm_request_seconds_count", provider="ollama_local", task_type="reasoning", outcome="ok")
+
+    await router.chat([{"role": "user", "content": "hola"}], task_type="reasoning")
+
+    assert _value("llm_fallbacks_total", provider="ollama_cloud", task_type="reasoning") == fallbacks + 1
+    assert _value("llm_request_seconds_count", provider="ollama_cloud", task_type="reasoning", outcome="error") == errors + 1
+    assert _value("llm_request_seconds_count", provider="ollama_local", task_type="reasoning", outcome="ok") == ok + 1
+    assert _value("llm_fallbacks_total", provider="ollama_local", task_type="reasoning") == 0
+
+
+async def test_webhook_results_are_counted_by_status():
+    @_count_result
+    async def handler(status):
+        return {"received": True, "status": status}
+
+    duplicates = _value("webhook_messages_total", result="duplicate_ignored")
+    processed = _value("webhook_messages_total", result="processed")
+    await handler("duplicate_ignored")
+    await handler("duplicate_ignored")
+    await handler("processed")
+
+    assert _value("webhook_messages_total", result="duplicate_ignored") == duplicates + 2
+    assert _value("webhook_messages_total", result="processed") == processed + 1
+
+
+def test_metrics_endpoint_requires_token_when_configured():
+    app = FastAPI()
+    app.include_router(prometheus_router)
+    client = TestClient(app)
+
+    with patch.object(settings, "prometheus_token", "s3cret"):
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer otro"}).status_code == 401
+        response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "turn_latency_seconds" in response.text
@@ -0,0 +1,83 @@
+"""
+Tests de las trazas por etapa (infrastructure/observability/tracing.py).
+
+Usa un exportador en memoria instalado una sola vez (el proveedor global de
+OpenTelemetry no se puede reemplazar) y verifica los spans del router de LLMs,
+los commits y el exportador a archivo.
+"""
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from infrastructure.ai.router import LLMRouter
+from infrastructure.observability import tracing
+from infrastructure.observability.tracing import JsonLinesSpanExporter, configure_tracing, traced
+from infrastructure.persistence.models import Case
+
+_exporter = InMemorySpanExporter()
+
+
+@pytest.fixture
+def spans():
+    if not configure_tracing(_exporter) or not isinstance(trace.get_tracer_provider(), tracing.TracerProvider):
+        pytest.skip("Otro proveedor de trazas ya está instalado en este proceso")
+    _exporter.clear()
+    yield _exporter
+    _exporter.clear()
+
+
+def _by_name(exporter, name):
+    return [s for s in exporter.get_finished_spans() if s.name == name]
+
+
+async def test_router_records_one_span_per_provider_attempt(spans):
+    with patch("infrastructure.ai.router.OllamaCloudClient"), \
+         patch("infrastructure.ai.router.OllamaClient"), \
+         patch("infrastructure.ai.router.GeminiClient"):
+        router = LLMRouter()
+    router.providers["ollama_cloud"].chat = AsyncMock(side_effect=RuntimeError("503"))
+    router.providers["ollama_local"].chat = AsyncMock(return_value="respuesta")
+
+    await router.chat([{"role": "user", "content": "hola"}], task_type="reasoning")
+
+    (chat,) = _by_name(spans, "llm.chat")
+    attempts = sorted(_by_name(spans, "llm.attempt"), key=lambda s: s.attributes["llm.attempt"])
+    assert [a.attributes["llm.provider"] for a in attempts] == ["ollama_cloud", "ollama_local"]
+    assert attempts[0].status.status_code.name == "ERROR"
+    assert attempts[0].attributes["llm.model"] == router.model_map["reasoning"]
+    assert all(a.parent.span_id == chat.context.span_id for a in attempts)
+    assert chat.attributes["llm.provider"] == "ollama_local"
+    assert chat.attributes["llm.fallbacks"] == 1
+    assert chat.attributes["llm.response_chars"] == len("respuesta")
+
+
+def test_commits_are_children_of_the_active_span(spans, db_session):
+    with trace.get_tracer(__name__).start_as_current_span("turn.execute") as turn:
+        db_session.add(Case(phone="5492604000040"))
+        db_session.commit()
+
+    (commit,) = _by_name(spans, "db.commit")
+    assert commit.parent.span_id == turn.get_span_context().span_id
+    assert commit.end_time >= commit.start_time
+
+
+async def test_traced_decorator_and_file_exporter(spans, tmp_path):
+    @traced("memory.retrieve", {"memory.kind": "session"})
+    async def retrieve():
+        trace.get_current_span().set_attribute("memory.results", 2)
+        raise ValueError("falló")
+
+    with pytest.raises(ValueError):
+        await retrieve()
+
+    path = tmp_path / "spans.jsonl"
+    JsonLinesSpanExporter(str(path)).export(spans.get_finished_spans())
+    (record,) = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert record["name"] == "memory.retrieve"
+    assert record["status"] == "ERROR"
+    assert record["attributes"] == {"memory.kind": "session", "memory.results": 2}
+    assert record["duration_ms"] >= 0 and len(record["trace_id"]) == 32
+    assert record["events"][0]["name"] == "exception"
@@ -0,0 +1,96 @@
+"""
+Tests unitarios del índice vectorial en memoria (infrastructure/persistence/vector_index.py).
+
+Verifica el top-k contra fuerza bruta, el snapshot memory-mapped, la recarga
+cuando cambia la tabla (desde el snapshot de otro proceso) y la búsqueda
+episódica fuera de PostgreSQL.
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from core.config import settings
+from infrastructure.persistence import vector_index
+from infrastructure.persistence.models import Case, Memory, SemanticKnowledge
+from infrastructure.persistence.vector_index import (
+    VectorIndex,
+    ensure_knowledge_index,
+    episodic_vector_search,
+    knowledge_vector_search,
+    refresh_knowledge_index,
+)
+
+
+def _unit(axis: int, dim: int = 768) -> list:
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[axis] = 1.0
+    return vector.tolist()
+
+
+def test_top_k_matches_brute_force_and_survives_snapshot(tmp_path):
+    rng = np.random.default_rng(47)
+    vectors = rng.normal(size=(500, 64)).astype(np.float32)
+    queries = rng.normal(size=(8, 64)).astype(np.float32)
+    index = VectorIndex("test")
+    index.replace(range(1000, 1500), vectors, signature=(500, 1499))
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (queries / np.linalg.norm(queries, axis=1, keepdims=True)).T), axis=0)[:5].T
+    batched = index.search_many(queries, 5)
+    assert [[doc_id - 1000 for doc_id, _ in hits] for hits in batched] == expected.tolist()
+    assert [doc_id for doc_id, _ in index.search(queries[3], 5)] == [doc_id for doc_id, _ in batched[3]]
+    assert len(index.search(queries[0], 10_000)) == 500
+    assert index.search(np.ones(32), 5) == []
+
+    index.save(str(tmp_path))
+    restored = VectorIndex("test")
+    assert restored.load(str(tmp_path))
+    assert isinstance(restored._data[1], np.memmap) and restored.signature == (500, 1499)
+    assert [[d for d, _ in hits] for hits in restored.search_many(queries, 5)] == [[d for d, _ in h] for h in batched]
+    with patch.object(settings, "llm_embedding_model", "otro-modelo"):
+        assert not VectorIndex("test").load(str(tmp_path))
+
+
+def test_knowledge_index_reloads_when_table_changes(db_session, tmp_path):
+    db_session.add_all([SemanticKnowledge(title=f"Parte {i}", content="x", embedding=_unit(i)) for i in range(3)])
+    db_session.commit()
+    refresh_knowledge_index(db_session)
+    ids = [k.id for k in db_session.query(SemanticKnowledge).order_by(SemanticKnowledge.id)]
+    assert list(knowledge_vector_search(db_session, _unit(1), 1)) == [ids[1]]
+
+    # Otra ingesta (p. ej. en el worker) agrega un fragmento y deja el snapshot
+    db_session.add(SemanticKnowledge(title="Nueva", content="y", embedding=_unit(5)))
+    db_session.commit()
+    new_id = db_session.query(SemanticKnowledge).filter_by(title="Nueva").one().id
+    snapshot = VectorIndex("semantic_knowledge")
+    snapshot.replace(ids + [new_id], [_unit(i) for i in (0, 1, 2, 5)], signature=(4, new_id))
+    snapshot.save(str(tmp_path))
+
+    with patch.object(settings, "vector_index_snapshot_path", str(tmp_path)), \
+         patch.object(vector_index, "refresh_knowledge_index") as refresh:
+        with patch.object(settings, "vector_index_refresh_seconds", 3600):
+            assert knowledge_vector_search(db_session, _unit(5), 1) != {new_id: 0.0}
+        with patch.object(settings, "vector_index_refresh_seconds", 0):
+            index = ensure_knowledge_index(db_session)
+    refresh.assert_not_called()
+    assert index.signature == (4, new_id)
+    assert knowledge_vector_search(db_session, _unit(5), 1) == {new_id: pytest.approx(0.0, abs=1e-6)}
+
+
+def test_episodic_search_without_postgres(db_session):
+    case = Case(phone="5492604000047")
+    db_session.add(case)
+    db_session.commit()
+    db_session.add_all([
+        Memory(case_id=case.id, kind="episodic", content="Habló de la vivienda.", embedding=_unit(1)),
+        Memory(case_id=case.id, kind="episodic", content="Habló de los hijos.", embedding=_unit(2)),
+        Memory(case_id=case.id, kind="episodic", content="Sin embedding.", embedding=None),
+        Memory(case_id=case.id, kind="immediate", content="Usuario: hola", embedding=_unit(2)),
+    ])
+    db_session.commit()
+
+    hits = episodic_vector_search(db_session, case.id, _unit(2), 3)
+
+    assert [h["content"] for h in hits] == ["Habló de los hijos.", "Habló de la vivienda.", "Sin embedding."]
+    assert hits[0]["distance"] == pytest.approx(0.0, abs=1e-6) and hits[2]["distance"] is None
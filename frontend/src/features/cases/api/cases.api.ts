@@ -1,5 +1,7 @@
 import apiClient from '@/lib/api';
-import { Case, CaseDetail, CaseFilters, PaginatedResponse } from '../types/case.types';
+import { Case, CaseDetail, CaseFilters, MessagesPage, PaginatedResponse, SupportDocument } from '../types/case.types';
+
+export type PreviewSize = 'thumb' | 'small' | 'large';
 
 export const casesApi = {
   /**
@@ -28,13 +30,33 @@ export const casesApi = {
   },
 
   /**
-   * Obtiene detalle completo de un caso con mensajes
+   * Obtiene la cabecera de un caso (sin mensajes ni documentos de respaldo)
    */
   async getById(id: number): Promise<CaseDetail> {
     const response = await apiClient.get<CaseDetail>(`/api/cases/${id}`);
     return response.data;
   },
 
+  /**
+   * Obtiene una página del historial, del mensaje más nuevo al más viejo
+   */
+  async getMessages(id: number, cursor?: string | null, limit = 50): Promise<MessagesPage> {
+    const params: any = { limit };
+    if (cursor) {
+      params.cursor = cursor;
+    }
+    const response = await apiClient.get<MessagesPage>(`/api/cases/${id}/messages`, { params });
+    return response.data;
+  },
+
+  /**
+   * Obtiene los documentos de respaldo del caso
+   */
+  async getSupportDocuments(id: number): Promise<SupportDocument[]> {
+    const response = await apiClient.get<{ items: SupportDocument[] }>(`/api/cases/${id}/support-documents`);
+    return response.data.items;
+  },
+
   /**
    * Obtiene estadísticas resumen de casos
    */
@@ -102,6 +124,32 @@ export const casesApi = {
     return response.data;
   },
 
+  /**
+   * Vista previa reducida de un documento (imagen o 1ª página del PDF)
+   */
+  async getDocumentPreview(
+    id: number,
+    docType: 'dni' | 'dni_back' | 'marriage_cert',
+    size: PreviewSize = 'thumb'
+  ): Promise<Blob> {
+    const response = await apiClient.get(`/api/cases/${id}/documents/${docType}/preview`, {
+      params: { size },
+      responseType: 'blob',
+    });
+    return response.data;
+  },
+
+  /**
+   * Vista previa reducida de un documento de respaldo
+   */
+  async getSupportDocumentPreview(id: number, docId: number, size: PreviewSize = 'thumb'): Promise<Blob> {
+    const response = await apiClient.get(`/api/cases/${id}/documents/support/${docId}/preview`, {
+      params: { size },
+      responseType: 'blob',
+    });
+    return response.data;
+  },
+
   /**
    * Enviar solicitud de documentación por WhatsApp (operador)
    */
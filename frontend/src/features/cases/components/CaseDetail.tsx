@@ -1,11 +1,12 @@
-import { useState } from 'react';
-import { useQuery } from '@tanstack/react-query';
+import { useMemo, useState } from 'react';
+import { useInfiniteQuery, useQuery } from '@tanstack/react-query';
 import { useParams, useNavigate } from 'react-router-dom';
 import { format } from 'date-fns';
 import { es } from 'date-fns/locale';
 import toast from 'react-hot-toast';
 import { ArrowLeft, Download, User, Bot, Calendar, Phone, MapPin, Copy } from 'lucide-react';
 import { casesApi } from '../api/cases.api';
+import { useCaseEvents } from '../hooks/useCaseEvents';
 import { Button } from '@/shared/components/ui/Button';
 import { Card } from '@/shared/components/ui/Card';
 import ShimmerButton from '@/shared/components/magicui/ShimmerButton';
@@ -16,6 +17,15 @@ import { DocumentsViewer } from './DocumentsViewer';
 import { EconomicProfileCard } from './EconomicProfileCard';
 import { EconomicBotReport } from './EconomicBotReport';
 import { DocRequestModal } from './DocRequestModal';
+import type { MessageStatus } from '../types/case.types';
+
+const MESSAGE_STATUS_LABELS: Record<MessageStatus, string> = {
+  queued: 'en cola',
+  sent: 'enviado',
+  delivered: 'entregado',
+  read: 'leído',
+  failed: 'no enviado',
+};
 
 export function CaseDetail() {
   const { id } = useParams<{ id: string }>();
@@ -25,12 +35,33 @@ export function CaseDetail() {
   const [showDocModal, setShowDocModal] = useState(false);
   const [opMsg, setOpMsg] = useState('');
 
+  useCaseEvents(caseId || undefined);
+
   const { data: case_, isLoading, error } = useQuery({
     queryKey: ['case', caseId],
     queryFn: () => casesApi.getById(caseId),
     enabled: !!caseId,
   });
 
+  // Historial paginado (más nuevo primero); se muestra en orden cronológico
+  const messagesQuery = useInfiniteQuery({
+    queryKey: ['case', caseId, 'messages'],
+    queryFn: ({ pageParam }) => casesApi.getMessages(caseId, pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next_cursor,
+    enabled: !!caseId,
+  });
+  const messages = useMemo(
+    () => (messagesQuery.data?.pages.flatMap((page) => page.items) ?? []).slice().reverse(),
+    [messagesQuery.data]
+  );
+
+  const { data: supportDocuments } = useQuery({
+    queryKey: ['case', caseId, 'support-documents'],
+    queryFn: () => casesApi.getSupportDocuments(caseId),
+    enabled: !!caseId,
+  });
+
   const handleDownloadPDF = () => {
     setShowPdfModal(true);
   };
@@ -325,7 +356,7 @@ export function CaseDetail() {
               dniImageUrl={case_.dni_image_url}
               dniBackUrl={case_.dni_back_url}
               marriageCertUrl={case_.marriage_cert_url}
-              supportDocuments={case_.support_documents as any}
+              supportDocuments={supportDocuments as any}
             />
           </BlurFade>
 
@@ -334,12 +365,24 @@ export function CaseDetail() {
             <Card className="p-6">
             <h2 className="text-xl font-semibold mb-4 text-gray-900 dark:text-gray-100">Historial de Conversación</h2>
             <div className="space-y-4">
-              {case_.messages.length === 0 ? (
+              {messagesQuery.hasNextPage && (
+                <div className="text-center">
+                  <Button
+                    variant="outline"
+                    size="sm"
+                    onClick={() => messagesQuery.fetchNextPage()}
+                    disabled={messagesQuery.isFetchingNextPage}
+                  >
+                    {messagesQuery.isFetchingNextPage ? 'Cargando...' : 'Cargar mensajes anteriores'}
+                  </Button>
+                </div>
+              )}
+              {messages.length === 0 ? (
                 <p className="text-gray-500 dark:text-gray-400 text-center py-8">
                   No hay mensajes aún
                 </p>
               ) : (
-                case_.messages.map((message) => (
+                messages.map((message) => (
                   <div
                     key={message.id}
                     className={`flex gap-3 ${
@@ -375,6 +418,11 @@ export function CaseDetail() {
                       </div>
                       <p className="text-xs text-gray-500 dark:text-gray-400 mt-1">
                         {format(new Date(message.created_at), "dd/MM/yyyy HH:mm", { locale: es })}
+                        {message.status && (
+                          <span className={`ml-2 ${message.status === 'failed' ? 'text-red-500' : ''}`}>
+                            · {MESSAGE_STATUS_LABELS[message.status]}
+                          </span>
+                        )}
                       </p>
                     </div>
                   </div>
@@ -543,7 +591,7 @@ export function CaseDetail() {
               </div>
               <div>
                 <label className="block text-gray-500 dark:text-gray-400 mb-1">Mensajes</label>
-                <p className="text-gray-900 dark:text-gray-100">{case_.messages.length} mensajes</p>
+                <p className="text-gray-900 dark:text-gray-100">{case_.message_count} mensajes</p>
               </div>
             </div>
             </Card>
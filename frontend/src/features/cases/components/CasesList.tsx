@@ -6,6 +6,7 @@ import { es } from 'date-fns/locale';
 import toast from 'react-hot-toast';
 import { Search, Download, Eye, ChevronLeft, ChevronRight } from 'lucide-react';
 import { casesApi } from '../api/cases.api';
+import { useCaseEvents } from '../hooks/useCaseEvents';
 import { CaseFilters } from '../types/case.types';
 import { Button } from '@/shared/components/ui/Button';
 import { Input } from '@/shared/components/ui/Input';
@@ -18,6 +19,8 @@ export function CasesList() {
     pageSize: 50,
   });
 
+  useCaseEvents();
+
   const { data, isLoading, error } = useQuery({
     queryKey: ['cases', filters],
     queryFn: () => casesApi.getAll(filters),
@@ -1,4 +1,5 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
+import { useQuery } from '@tanstack/react-query';
 import { FileText, X, ZoomIn, ZoomOut, Download } from 'lucide-react';
 import { Card } from '@/shared/components/ui/Card';
 import { Button } from '@/shared/components/ui/Button';
@@ -108,6 +109,47 @@ export function ImageModal({ imageUrl, title, onClose }: ImageModalProps) {
   );
 }
 
+interface DocumentThumbnailProps {
+  queryKey: unknown[];
+  load: () => Promise<Blob>;
+  alt: string;
+  onClick: () => void;
+}
+
+function DocumentThumbnail({ queryKey, load, alt, onClick }: DocumentThumbnailProps) {
+  // La miniatura pesa unos KB; el original solo se baja al abrir o descargar
+  const { data: blob, isError } = useQuery({
+    queryKey,
+    queryFn: load,
+    staleTime: Infinity,
+    retry: false,
+  });
+  const [url, setUrl] = useState<string | null>(null);
+
+  useEffect(() => {
+    if (!blob) return;
+    const objectUrl = URL.createObjectURL(blob);
+    setUrl(objectUrl);
+    return () => URL.revokeObjectURL(objectUrl);
+  }, [blob]);
+
+  if (isError) return null;
+
+  return (
+    <button
+      type="button"
+      onClick={onClick}
+      className="mt-3 w-full h-32 rounded-md overflow-hidden bg-gray-200 dark:bg-gray-700 flex items-center justify-center"
+    >
+      {url ? (
+        <img src={url} alt={alt} loading="lazy" className="max-h-full max-w-full object-contain" />
+      ) : (
+        <FileText className="w-8 h-8 text-gray-400 animate-pulse" />
+      )}
+    </button>
+  );
+}
+
 export function DocumentsViewer({ caseId, dniImageUrl, dniBackUrl, marriageCertUrl, supportDocuments }: DocumentsViewerProps) {
   const hasDni = !!dniImageUrl;
   const hasDniBack = !!dniBackUrl;
@@ -209,6 +251,12 @@ export function DocumentsViewer({ caseId, dniImageUrl, dniBackUrl, marriageCertU
             <p className="text-sm font-medium text-gray-700 dark:text-gray-300 flex items-center gap-2">
               <FileText className="w-4 h-4" /> DNI (frente)
             </p>
+            <DocumentThumbnail
+              queryKey={['document-preview', caseId, 'dni', dniImageUrl]}
+              load={() => casesApi.getDocumentPreview(caseId, 'dni')}
+              alt="DNI (frente)"
+              onClick={() => openDoc('dni')}
+            />
             <div className="mt-3 flex gap-2">
               <Button variant="outline" onClick={() => openDoc('dni')}>Abrir</Button>
               <Button variant="outline" onClick={() => downloadDoc('dni')}><Download className="w-4 h-4 mr-1" />Descargar</Button>
@@ -221,6 +269,12 @@ export function DocumentsViewer({ caseId, dniImageUrl, dniBackUrl, marriageCertU
             <p className="text-sm font-medium text-gray-700 dark:text-gray-300 flex items-center gap-2">
               <FileText className="w-4 h-4" /> DNI (dorso)
             </p>
+            <DocumentThumbnail
+              queryKey={['document-preview', caseId, 'dni_back', dniBackUrl]}
+              load={() => casesApi.getDocumentPreview(caseId, 'dni_back')}
+              alt="DNI (dorso)"
+              onClick={() => openDoc('dni_back')}
+            />
             <div className="mt-3 flex gap-2">
               <Button variant="outline" onClick={() => openDoc('dni_back')}>Abrir</Button>
               <Button variant="outline" onClick={() => downloadDoc('dni_back')}><Download className="w-4 h-4 mr-1" />Descargar</Button>
@@ -233,6 +287,12 @@ export function DocumentsViewer({ caseId, dniImageUrl, dniBackUrl, marriageCertU
             <p className="text-sm font-medium text-gray-700 dark:text-gray-300 flex items-center gap-2">
               <FileText className="w-4 h-4" /> Acta de Matrimonio
             </p>
+            <DocumentThumbnail
+              queryKey={['document-preview', caseId, 'marriage_cert', marriageCertUrl]}
+              load={() => casesApi.getDocumentPreview(caseId, 'marriage_cert')}
+              alt="Acta de Matrimonio"
+              onClick={() => openDoc('marriage_cert')}
+            />
             <div className="mt-3 flex gap-2">
               <Button variant="outline" onClick={() => openDoc('marriage_cert')}>Abrir</Button>
               <Button variant="outline" onClick={() => downloadDoc('marriage_cert')}><Download className="w-4 h-4 mr-1" />Descargar</Button>
@@ -251,6 +311,12 @@ export function DocumentsViewer({ caseId, dniImageUrl, dniBackUrl, marriageCertU
                 <p className="text-sm font-medium text-gray-700 dark:text-gray-300 flex items-center gap-2">
                   <FileText className="w-4 h-4" /> {labelFor(doc.doc_type)}
                 </p>
+                <DocumentThumbnail
+                  queryKey={['support-document-preview', caseId, doc.id]}
+                  load={() => casesApi.getSupportDocumentPreview(caseId, doc.id)}
+                  alt={labelFor(doc.doc_type)}
+                  onClick={() => openSupport(doc.id)}
+                />
                 <div className="mt-3 flex gap-2">
                   <Button variant="outline" onClick={() => openSupport(doc.id)}>Abrir</Button>
                   <Button variant="outline" onClick={() => downloadSupport(doc.id, labelFor(doc.doc_type))}><Download className="w-4 h-4 mr-1" />Descargar</Button>
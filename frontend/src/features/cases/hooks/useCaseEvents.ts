@@ -0,0 +1,88 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import apiClient from '@/lib/api';
+
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+
+interface CaseEvent {
+  type: string;
+  case_id: number;
+}
+
+// Espera antes de volver a abrir un stream que el servidor cerró (p. ej. token vencido)
+const RECONNECT_DELAY_MS = 3000;
+
+/**
+ * Escucha el stream de eventos de casos (SSE) e invalida las queries afectadas.
+ * Sin caseId escucha todos los casos (listado); con caseId solo ese caso.
+ */
+export function useCaseEvents(caseId?: number) {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (!localStorage.getItem('access_token')) {
+      return;
+    }
+
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+
+    const handle = (raw: MessageEvent) => {
+      const event: CaseEvent = JSON.parse(raw.data);
+      if (event.type === 'message.created' || event.type === 'message.status_changed') {
+        queryClient.invalidateQueries({ queryKey: ['case', event.case_id, 'messages'] });
+      } else if (event.type === 'support_document.created') {
+        queryClient.invalidateQueries({ queryKey: ['case', event.case_id, 'support-documents'] });
+      } else {
+        queryClient.invalidateQueries({ queryKey: ['case', event.case_id], exact: true });
+        queryClient.invalidateQueries({ queryKey: ['cases'] });
+      }
+    };
+
+    // La URL de EventSource no lleva el JWT de sesión sino un token de stream de corta duración
+    const connect = async () => {
+      let token: string;
+      try {
+        const { data } = await apiClient.post<{ token: string }>('/api/events/token');
+        token = data.token;
+      } catch {
+        if (!closed) {
+          retry = setTimeout(connect, RECONNECT_DELAY_MS);
+        }
+        return;
+      }
+      if (closed) {
+        return;
+      }
+
+      const params = new URLSearchParams({ token });
+      if (caseId) {
+        params.append('case_id', String(caseId));
+      }
+      const stream = new EventSource(`${API_URL}/api/events/cases?${params.toString()}`);
+      source = stream;
+
+      [
+        'case.created', 'case.phase_changed', 'case.status_changed',
+        'message.created', 'message.status_changed', 'support_document.created',
+      ]
+        .forEach((type) => stream.addEventListener(type, handle as EventListener));
+
+      // EventSource reintenta solo con la misma URL; si el servidor lo rechaza (token vencido) queda cerrado
+      stream.onerror = () => {
+        if (stream.readyState === EventSource.CLOSED && !closed) {
+          retry = setTimeout(connect, RECONNECT_DELAY_MS);
+        }
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      source?.close();
+    };
+  }, [caseId, queryClient]);
+}
@@ -15,10 +15,13 @@ export interface Case {
   updated_at: string;
 }
 
+export type MessageStatus = 'queued' | 'sent' | 'delivered' | 'read' | 'failed';
+
 export interface Message {
   id: number;
-  role: 'user' | 'assistant' | 'system';
+  role: 'user' | 'assistant' | 'system' | 'operator';
   content: string;
+  status?: MessageStatus | null;
   created_at: string;
 }
 
@@ -30,11 +33,10 @@ export interface SupportDocument {
 }
 
 export interface CaseDetail extends Case {
-  messages: Message[];
+  message_count: number;
   dni_image_url?: string | null;
   dni_back_url?: string | null;
   marriage_cert_url?: string | null;
-  support_documents?: SupportDocument[];
   // Perfil económico
   situacion_laboral?: string | null;
   ingreso_mensual_neto?: number | null;
@@ -55,6 +57,11 @@ export interface CaseDetail extends Case {
   econ_razones_conyuge?: string | null;
 }
 
+export interface MessagesPage {
+  items: Message[];
+  next_cursor: string | null;
+}
+
 export interface CaseFilters {
   page?: number;
   pageSize?: number;